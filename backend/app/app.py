@@ -1,7 +1,19 @@
 from flask import Flask
 from app.config.config import get_config_by_name
+from app.services.ai_gateway import AIGateway
 from app.services.ai_service import AIService
+from app.services.chat_cache import ChatCache
+from app.services.compression import response_compression
+from app.services.conditional import conditional_get
+from app.services.draft_store import draft_store
+from app.services.job_queue import job_queue
+from app.services.metrics import request_metrics
+from app.services.vector_index import CallableEmbedder, project_index
 from app.db.db import db
+from app.db.ids import id_generator
+from app.services.cache import reference_cache
+from app.services.response_cache import response_cache
+from app.services.serialization import init_json_provider
 
 ai_service = None
 
@@ -13,20 +25,57 @@ def create_app(config=None) -> Flask:
     app = Flask(__name__)
     app_config = get_config_by_name(config)
     app.config.from_object(app_config)
+    init_json_provider(app)
 
     # Initialize extensions
     db.init_app(app)
+    id_generator.init_app(app)
+    # 最先注册，请求耗时包括其他扩展的 before_request，响应大小为压缩后的大小
+    request_metrics.init_app(app)
+    reference_cache.init_app(app)
+    response_cache.init_app(app)
+    conditional_get.init_app(app)
+    response_compression.init_app(app)
+    draft_store.init_app(app)
+    job_queue.init_app(app)
     
     # Initialize AI Service
+    gateway = AIGateway(
+        app_config.OLLAMA_API_BASE_URL,
+        max_concurrency=app_config.AI_GATEWAY_MAX_CONCURRENCY,
+        model_concurrency=app_config.AI_GATEWAY_MODEL_CONCURRENCY,
+        max_queue=app_config.AI_GATEWAY_MAX_QUEUE,
+        queue_timeout=app_config.AI_GATEWAY_QUEUE_TIMEOUT,
+        max_connections=app_config.AI_GATEWAY_MAX_CONNECTIONS,
+        timeout=app_config.AI_GATEWAY_TIMEOUT,
+    )
+    chat_cache = None
+    if app_config.CHAT_CACHE_PATH:
+        embedding_model = app_config.CHAT_CACHE_EMBEDDING_MODEL
+        chat_cache = ChatCache(
+            app_config.CHAT_CACHE_PATH,
+            max_entries=app_config.CHAT_CACHE_MAX_ENTRIES,
+            ttl=app_config.CHAT_CACHE_TTL,
+            embed=(lambda text: gateway.embed(embedding_model, text)) if embedding_model else None,
+            similarity=app_config.CHAT_CACHE_SIMILARITY,
+        )
+    rag_model = app_config.RAG_EMBEDDING_MODEL
+    project_index.init_app(
+        app,
+        embed=CallableEmbedder(f'ollama:{rag_model}', lambda text: gateway.embed(rag_model, text)) if rag_model else None,
+    )
     ai_service = AIService(
         api_base_url=app_config.OLLAMA_API_BASE_URL,
-        model_name=app_config.OLLAMA_MODEL
+        model_name=app_config.OLLAMA_MODEL,
+        gateway=gateway,
+        cache=chat_cache,
     )
 
     # Import and register blueprints inside the factory
-    from app.initialize_functions import initialize_route, initialize_swagger
+    from app.initialize_functions import initialize_route, initialize_swagger, initialize_commands
     initialize_route(app)
     initialize_swagger(app)
+    initialize_commands(app)
     
     with app.app_context():
         db.create_all()
@@ -11,6 +11,13 @@ def initialize_route(app: Flask):
         app.register_blueprint(bfa_bp, url_prefix='/api/v1/bfa')
 
 
+def initialize_commands(app: Flask):
+    """ Initialize CLI commands """
+    from app.modules.bfa.commands import bfa_cli
+
+    app.cli.add_command(bfa_cli)
+
+
 def initialize_db(app: Flask):
     with app.app_context():
         db.init_app(app)
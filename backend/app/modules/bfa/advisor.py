@@ -0,0 +1,129 @@
+import re
+from urllib.parse import quote
+
+from flask import current_app
+from sqlalchemy import event
+
+from app.db.db import db
+from app.services.cache import reference_cache
+from app.services.response_cache import response_cache
+from .models import LisMeasurePerson, LisProject
+
+URL_PREFIX = '/api/v1/bfa'
+
+# 需要分析的只读接口: (控制器方法, URL 模板)
+ADVISED_ENDPOINTS = [
+    ('get_tasks', '/tasks?person_id={person}'),
+    ('get_task_details', '/tasks/{task_id}?person_id={person}&department_id={department_id}'),
+    ('get_historical_projects', '/history'),
+    ('get_all_persons', '/persons'),
+    ('get_reference_projects', '/tasks/{task_id}/reference-projects?department_id={department_id}'),
+    ('get_historical_project_details', '/history/{history_id}/details'),
+    ('get_historical_project_summary', '/history/{history_id}/summary'),
+    ('get_history_rollup', '/history/rollup?group_by=brand,scale,month'),
+    ('export_history_details', '/history/export?project_ids={history_id}'),
+    ('get_all_baselines', '/baselines'),
+    ('get_all_baselines', '/baselines?limit=100'),
+    ('get_project_order_names', '/projects/{task_id}/order-names'),
+]
+
+_SQLITE_SCAN = re.compile(r'^SCAN (?:TABLE )?(\w+)(?: USING (?:COVERING )?INDEX (\w+))?')
+
+
+def sample_arguments():
+    """
+    从当前数据库中取一组真实的参数，使各接口的查询走到与线上相同的分支。
+    """
+    person = db.session.query(LisMeasurePerson).filter(
+        LisMeasurePerson.project_key.isnot(None)
+    ).order_by(LisMeasurePerson.id).first()
+    history = db.session.query(LisProject.id).filter(
+        LisProject.measure_status == '4'
+    ).order_by(LisProject.id).first()
+
+    return {
+        'person': person.person if person and person.person else '0',
+        'department_id': person.person_department if person and person.person_department else '0',
+        'task_id': person.project_id if person else '0',
+        'history_id': str(history.id) if history else '0',
+    }
+
+
+def capture_queries(client, url):
+    """
+    请求一个接口并记录其执行的所有 SELECT 语句及参数。
+    """
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT'):
+            statements.append((statement, parameters))
+
+    event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        response = client.get(url)
+        # 流式响应的查询在读取响应体时才执行
+        response.get_data()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+    return response.status_code, statements
+
+
+def explain_statement(conn, statement, parameters):
+    """
+    对单条语句执行 EXPLAIN，返回 (执行计划, 全表/全索引扫描列表)。
+    """
+    tables = set(db.metadata.tables)
+    full_scans = []
+
+    if conn.dialect.name == 'sqlite':
+        plan = [dict(row) for row in conn.exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}', parameters).mappings()]
+        for row in plan:
+            match = _SQLITE_SCAN.match(row['detail'])
+            if match and match.group(1) in tables:
+                full_scans.append({
+                    'table': match.group(1),
+                    'kind': 'index' if match.group(2) else 'table',
+                    'index': match.group(2),
+                    'rows': None,
+                })
+    else:
+        plan = [dict(row) for row in conn.exec_driver_sql(f'EXPLAIN {statement}', parameters).mappings()]
+        for row in plan:
+            # type = ALL 为全表扫描，type = index 为全索引扫描
+            if row.get('table') in tables and row.get('type') in ('ALL', 'index'):
+                full_scans.append({
+                    'table': row['table'],
+                    'kind': 'table' if row['type'] == 'ALL' else 'index',
+                    'index': row.get('key'),
+                    'rows': row.get('rows'),
+                })
+    return plan, full_scans
+
+
+def advise(min_rows=0):
+    """
+    依次请求 ADVISED_ENDPOINTS 中的接口，对其执行的每条查询运行 EXPLAIN。
+    估算行数小于 min_rows 的扫描不计入结果 (仅 MySQL 提供估算行数)。
+    """
+    samples = {key: quote(str(value)) for key, value in sample_arguments().items()}
+    client = current_app.test_client()
+    report = []
+
+    # 缓存命中时接口不会访问数据库，分析期间绕过响应缓存并清空参考数据缓存
+    backend, response_cache.backend = response_cache.backend, None
+    reference_cache.init_app(current_app)
+    try:
+        with db.engine.connect() as conn:
+            for name, template in ADVISED_ENDPOINTS:
+                url = URL_PREFIX + template.format(**samples)
+                status_code, statements = capture_queries(client, url)
+                queries = []
+                for statement, parameters in statements:
+                    plan, full_scans = explain_statement(conn, statement, parameters)
+                    full_scans = [scan for scan in full_scans if scan['rows'] is None or scan['rows'] >= min_rows]
+                    queries.append({'sql': statement, 'plan': plan, 'full_scans': full_scans})
+                report.append({'endpoint': name, 'url': url, 'status': status_code, 'queries': queries})
+    finally:
+        response_cache.backend = backend
+    return report
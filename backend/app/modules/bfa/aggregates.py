@@ -0,0 +1,147 @@
+from sqlalchemy import cast, func, Numeric
+
+from app.db.db import db
+from .models import BaHoursBasis, LisProject, LisProjectOrder, PmMonthHoursDetail, PmWorkHours
+from .pivot import MISSING_BASELINE
+
+# 品牌和开发规模的映射关系
+BRAND_NAMES = {
+    '1': 'WEY', '2': '坦克', '3': '沙龙', '4': '哈弗', '5': '欧拉',
+    '6': '皮卡', '7': 'HEM', '8': '重卡', '9': '赛车', '10': '光束', '11': '平台项目'
+}
+SCALE_NAMES = {'0': 'SS', '1': 'S', '2': 'M', '3': 'L'}
+
+PROJECT_DIMENSIONS = ('month', 'power_conf', 'first_task')
+ROLLUP_DIMENSIONS = ('brand', 'scale', 'month')
+
+
+def month_hours():
+    """
+    月度工时求和表达式。month_input 为字符串，在数据库中转换为数值后求和，
+    无法转换的值按 0 计 (与历史详情表格的处理一致)。
+    """
+    return func.coalesce(func.sum(cast(PmMonthHoursDetail.month_input, Numeric(32, 4))), 0)
+
+
+def filled_months():
+    """ 只统计月份和工时均已填写的明细。 """
+    return (
+        PmMonthHoursDetail.mm.isnot(None),
+        PmMonthHoursDetail.mm != 0,
+        PmMonthHoursDetail.month_input.isnot(None),
+        PmMonthHoursDetail.month_input != '',
+    )
+
+
+def project_detail_query(project_id, *columns):
+    """ 指定项目的 订单 -> 工时行 -> 月度明细 关联查询。 """
+    return db.session.query(*columns).select_from(LisProjectOrder).join(
+        PmWorkHours, PmWorkHours.select_order == LisProjectOrder.id
+    ).join(
+        PmMonthHoursDetail, PmMonthHoursDetail.measure_key == PmWorkHours.id
+    ).filter(
+        LisProjectOrder.project_id == str(project_id),
+        *filled_months()
+    )
+
+
+def summarize_project(project_id, dimensions, task_names):
+    """
+    按月份、动力配置、一级任务汇总一个项目的填报工时，每个维度一条 GROUP BY 查询。
+
+    Returns:
+        {'total': 总工时, 'by_month': [...], 'by_power_conf': [...], 'by_first_task': [...]}
+        只包含 dimensions 中请求的维度。
+    """
+    total = project_detail_query(project_id, month_hours()).scalar()
+    summary = {'total': float(total or 0)}
+
+    if 'month' in dimensions:
+        rows = project_detail_query(
+            project_id, PmMonthHoursDetail.mm, month_hours()
+        ).group_by(PmMonthHoursDetail.mm).order_by(PmMonthHoursDetail.mm).all()
+        summary['by_month'] = [{'month': str(mm), 'hours': float(hours)} for mm, hours in rows]
+
+    if 'power_conf' in dimensions:
+        rows = project_detail_query(
+            project_id, PmWorkHours.power_conf, month_hours()
+        ).group_by(PmWorkHours.power_conf).order_by(PmWorkHours.power_conf).all()
+        summary['by_power_conf'] = [
+            {'power_conf': power_conf, 'hours': float(hours)} for power_conf, hours in rows
+        ]
+
+    if 'first_task' in dimensions:
+        rows = project_detail_query(
+            project_id, BaHoursBasis.first_task_key, month_hours()
+        ).outerjoin(
+            BaHoursBasis, PmWorkHours.select_hours_base == BaHoursBasis.id
+        ).group_by(BaHoursBasis.first_task_key).all()
+        # 一级任务名称从缓存的映射中获取，不同ID同名的任务合并为一项
+        by_first_task = {}
+        for first_task_key, hours in rows:
+            name = task_names.get(first_task_key)
+            name = name if name is not None else MISSING_BASELINE
+            by_first_task[name] = by_first_task.get(name, 0.0) + float(hours)
+        summary['by_first_task'] = [
+            {'first_task': name, 'hours': hours} for name, hours in sorted(by_first_task.items())
+        ]
+
+    return summary
+
+
+def rollup_projects(dimensions, brand_codes=None, scale_codes=None, measure_status='4'):
+    """
+    跨项目汇总填报工时，按品牌 (brand)、开发规模 (scale) 及可选的月份分组。
+
+    Returns:
+        [{'brand': ..., 'scale': ..., 'month': ..., 'projects': 项目数, 'hours': 工时}, ...]
+        只包含 dimensions 中请求的维度。
+    """
+    group_columns = {
+        'brand': LisProject.brand,
+        'scale': LisProject.sml,
+        'month': PmMonthHoursDetail.mm,
+    }
+    keys = [group_columns[dimension] for dimension in dimensions]
+
+    query = db.session.query(
+        *keys,
+        func.count(LisProject.id.distinct()),
+        month_hours()
+    ).select_from(LisProject).join(
+        LisProjectOrder, LisProjectOrder.project_key == LisProject.id
+    ).join(
+        PmWorkHours, PmWorkHours.select_order == LisProjectOrder.id
+    ).join(
+        PmMonthHoursDetail, PmMonthHoursDetail.measure_key == PmWorkHours.id
+    ).filter(
+        LisProject.measure_status == measure_status,
+        *filled_months()
+    )
+    if brand_codes:
+        query = query.filter(LisProject.brand.in_(brand_codes))
+    if scale_codes:
+        query = query.filter(LisProject.sml.in_(scale_codes))
+    if keys:
+        query = query.group_by(*keys).order_by(*keys)
+
+    results = []
+    for row in query.all():
+        item = {}
+        for dimension, value in zip(dimensions, row):
+            if dimension == 'brand':
+                value = BRAND_NAMES.get(value, value)
+            elif dimension == 'scale':
+                value = SCALE_NAMES.get(value, value)
+            elif value is not None:
+                value = str(value)
+            item[dimension] = value
+        item['projects'] = row[-2]
+        item['hours'] = float(row[-1])
+        results.append(item)
+    return results
+
+
+def codes_for(names, value):
+    """ 过滤参数同时接受编码和映射后的文本。 """
+    return {code for code, name in names.items() if name == value} | {value}
@@ -0,0 +1,142 @@
+from datetime import date
+
+import numpy as np
+
+from app.db.db import db
+from .models import BaHoursBasis, LisProjectOrder, PmMonthHoursDetail, PmWorkHours
+from .pivot import MISSING_BASELINE, parse_month_inputs, pivot_month_hours
+
+
+def month_index(codes):
+    """
+    将月份编码转换为连续的月序号 (年 * 12 + 月 - 1)，便于整体平移。
+    YYYYMM 格式按年月计算；只有月份 (1-12) 的旧数据没有年份，按整组编码判断跨年：
+    取月份间最大的空档作为年份分界 (如 11、12、1、2 的空档在 2 与 11 之间)，
+    分界之后的月份为第 0 年，之前的为第 1 年，使跨年的项目仍按实际先后排列。
+    """
+    codes = np.asarray(codes, dtype=np.int64)
+    bare = (codes >= 1) & (codes <= 12)
+    years = np.where(bare, 0, codes // 100)
+    months = np.unique(codes[bare])
+    if len(months) > 1:
+        gaps = np.diff(months)
+        # 12 月到次年 1 月方向的空档不小于其余空档时不跨年
+        if gaps.max() > months[0] + 12 - months[-1]:
+            start = months[gaps.argmax() + 1]
+            years = np.where(bare & (codes < start), 1, years)
+    return years * 12 + np.where(bare, codes, codes % 100) - 1
+
+
+def month_codes(indexes):
+    """ month_index 的逆运算，返回 YYYYMM；只有月份的旧数据 (第 0、1 年) 仍返回月份。 """
+    indexes = np.asarray(indexes, dtype=np.int64)
+    return np.where((indexes >= 0) & (indexes < 24), 0, indexes // 12 * 100) + indexes % 12 + 1
+
+
+def parse_start_month(value):
+    """ 解析 YYYYMM 格式的起始月份，缺省为当月；格式错误时抛出 ValueError。 """
+    if value in (None, ''):
+        today = date.today()
+        return today.year * 100 + today.month
+    start = int(value)
+    if not (190001 <= start <= 999912 and 1 <= start % 100 <= 12):
+        raise ValueError(f'start_month 必须为 YYYYMM 格式: {value}')
+    return start
+
+
+def scale_factor_between(factors, target_sml, reference_sml):
+    """ 按开发规模系数之比缩放工时，未配置的规模按 1 计。 """
+    return factors.get(target_sml, 1.0) / factors.get(reference_sml, 1.0)
+
+
+def load_reference_rows(reference_project_id):
+    """
+    参考项目的工时行、月度明细和关联的工时基准，按工时行ID和月份排序。
+    """
+    return db.session.query(
+        PmWorkHours.id.label('measure_id'),
+        PmWorkHours.business_detail,
+        PmWorkHours.base_hours,
+        PmWorkHours.power_conf,
+        PmMonthHoursDetail.mm,
+        PmMonthHoursDetail.month_input,
+        BaHoursBasis.id.label('baseline_id'),
+        BaHoursBasis.total_hour.label('baseline_hours'),
+        BaHoursBasis.first_task_key,
+        BaHoursBasis.change_type,
+        BaHoursBasis.de_range
+    ).select_from(LisProjectOrder).join(
+        PmWorkHours, PmWorkHours.select_order == LisProjectOrder.id
+    ).outerjoin(
+        PmMonthHoursDetail, PmMonthHoursDetail.measure_key == PmWorkHours.id
+    ).outerjoin(
+        BaHoursBasis, PmWorkHours.select_hours_base == BaHoursBasis.id
+    ).filter(
+        LisProjectOrder.project_id == str(reference_project_id)
+    ).order_by(
+        PmWorkHours.id, PmMonthHoursDetail.mm
+    ).all()
+
+
+def compute_draft(rows, task_names, scale_factor, start_month, decimals=1):
+    """
+    由参考项目的扁平查询结果计算测算草稿，全部以 工时行 x 月份 矩阵运算完成：
+    月度工时按规模系数缩放，月份整体平移到以 start_month 开始的窗口，
+    基准工时优先取关联的工时基准 (ba_hours_basis.total_hour)，并计算与基准的差异。
+
+    Returns:
+        (table_data, dynamic_columns)
+    """
+    if not rows:
+        return [], []
+
+    columns = {name: [getattr(row, name) for row in rows] for name in ('measure_id', 'mm', 'month_input')}
+    row_ids, first_index, labels, values, present, _, _ = pivot_month_hours(
+        columns['measure_id'], columns['mm'], columns['month_input']
+    )
+
+    # 缩放并取整；总工时按取整后的单元格求和，保证与表格一致
+    scaled = np.round(values * scale_factor, decimals) * present
+    totals = np.round(scaled.sum(axis=1), decimals)
+
+    # 月份整体平移：参考项目的第一个月对齐到 start_month，列按平移后的月份排序
+    if labels:
+        indexes = month_index([int(label) for label in labels])
+        shifted = month_codes(indexes - indexes.min() + month_index([start_month])[0])
+        order = np.argsort(shifted, kind='stable')
+        dynamic_columns = shifted[order].astype(str).tolist()
+        scaled, present = scaled[:, order], present[:, order]
+    else:
+        dynamic_columns = []
+
+    # 基准匹配：有关联工时基准时取基准工时，否则沿用参考项目的基准工时
+    firsts = [rows[index] for index in first_index.tolist()]
+    baseline_ids = np.array([row.baseline_id for row in firsts], dtype=object)
+    matched = (baseline_ids != None) & np.array([row.baseline_hours not in (None, '') for row in firsts])  # noqa: E711
+    baseline_hours = parse_month_inputs([row.baseline_hours if row.baseline_hours not in (None, '') else 0
+                                         for row in firsts])
+    reference_hours = parse_month_inputs([row.base_hours if row.base_hours is not None else 0 for row in firsts])
+    base = np.where(matched, baseline_hours, reference_hours)
+    diff = np.round(totals - base, decimals)
+
+    cells = np.where(present, scaled.astype(object), '').tolist() if dynamic_columns else [[] for _ in firsts]
+    table_data = []
+    for index, (row, row_cells) in enumerate(zip(firsts, cells)):
+        first_task_name = task_names.get(row.first_task_key)
+        row_data = {
+            'id': index + 1,
+            'reference_id': row.measure_id,
+            'baseline_id': row.baseline_id if matched[index] else None,
+            '序号': index + 1,
+            '动力配置': row.power_conf,
+            '一级任务': first_task_name if first_task_name is not None else MISSING_BASELINE,
+            '改动类型': row.change_type if row.change_type is not None else MISSING_BASELINE,
+            '定义范围': row.de_range if row.de_range is not None else MISSING_BASELINE,
+            '具体事项': row.business_detail,
+            '基准工时': float(base[index]),
+            '填报总工时': float(totals[index]),
+            '差异工时': float(diff[index]),
+        }
+        row_data.update(zip(dynamic_columns, row_cells))
+        table_data.append(row_data)
+    return table_data, dynamic_columns
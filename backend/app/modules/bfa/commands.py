@@ -0,0 +1,101 @@
+import click
+from flask.cli import AppGroup
+
+from app.services.vector_index import project_index
+from .advisor import advise
+from .importer import IMPORT_KINDS, ExcelImportError, import_workbook
+from .inbox import reconcile_inbox
+from .knowledge import sync_project_index
+from .reference import load_task_names
+from .schema import migrate_schema, backfill_typed_keys
+
+bfa_cli = AppGroup('bfa', help='BFA 模块的数据库维护命令。')
+
+
+@bfa_cli.command('migrate')
+def migrate():
+    """补齐模型中新增的列、索引和影子键触发器，并回填已有行的影子键。"""
+    changes = migrate_schema()
+    for change in changes:
+        click.echo(change)
+    click.echo(f'迁移完成，共 {len(changes)} 项变更。')
+    for table_name, count in backfill_typed_keys().items():
+        click.echo(f'{table_name}: 回填 {count} 行')
+
+
+@bfa_cli.command('backfill-keys')
+@click.option('--batch-size', default=5000, show_default=True, help='每批回填的行数。')
+def backfill_keys(batch_size):
+    """回填字符串外键对应的 BIGINT 影子键。"""
+    results = backfill_typed_keys(batch_size=batch_size)
+    for table_name, count in results.items():
+        click.echo(f'{table_name}: 回填 {count} 行')
+
+
+@bfa_cli.command('explain')
+@click.option('--min-rows', default=0, show_default=True, help='忽略估算行数低于该值的扫描 (仅 MySQL)。')
+@click.option('--fail-on-scan', is_flag=True, help='发现全表/全索引扫描时以非零状态退出。')
+def explain(min_rows, fail_on_scan):
+    """对 BfaController 各查询运行 EXPLAIN 并标出全表扫描。"""
+    report = advise(min_rows=min_rows)
+    scan_count = 0
+    for entry in report:
+        click.echo(f"{entry['endpoint']} ({entry['status']}): {len(entry['queries'])} 条查询")
+        for query in entry['queries']:
+            for scan in query['full_scans']:
+                scan_count += 1
+                kind = '全表扫描' if scan['kind'] == 'table' else f"全索引扫描 {scan['index']}"
+                rows = f", 估算 {scan['rows']} 行" if scan['rows'] is not None else ''
+                click.echo(f"  [{kind}] {scan['table']}{rows}")
+                click.echo(f"    {' '.join(query['sql'].split())[:300]}")
+    click.echo(f'共发现 {scan_count} 处全表/全索引扫描。')
+    if fail_on_scan and scan_count:
+        raise SystemExit(1)
+
+
+@bfa_cli.command('rag-sync')
+@click.option('--rebuild', is_flag=True, help='丢弃现有索引，全部重新生成。')
+def rag_sync(rebuild):
+    """增量同步已完成项目的本地向量索引。"""
+    if not project_index.enabled:
+        click.echo('未配置 RAG_INDEX_DIR，历史项目索引未启用。')
+        return
+    result = sync_project_index(project_index, load_task_names(), rebuild=rebuild)
+    stats = project_index.stats()
+    click.echo(f"新增或更新 {result['indexed']} 个项目，移除 {result['removed']} 个项目，"
+               f"索引共 {stats['documents']} 个项目。")
+
+
+@bfa_cli.command('inbox-sync')
+def inbox_sync():
+    """全量对账待办物化表 (首次部署或其他系统批量修改数据后执行)。"""
+    result = reconcile_inbox()
+    click.echo(f"待办物化表共 {result['rows']} 行：新增 {result['inserted']}，更新 {result['updated']}，"
+               f"删除 {result['deleted']}。")
+
+
+@bfa_cli.command('import-excel')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--kind', type=click.Choice(list(IMPORT_KINDS)), required=True,
+              help='baselines 导入工时基准；timesheets 导入历史工时行和月度明细。')
+@click.option('--sheet', default=None, help='工作表名称，默认第一个工作表。')
+@click.option('--batch-size', default=5000, show_default=True, help='每个事务写入的行数。')
+@click.option('--dry-run', is_flag=True, help='只校验，不写入数据库。')
+def import_excel(path, kind, sheet, batch_size, dry_run):
+    """从 Excel 工作簿按编号 (serial_number) 批量插入或更新。"""
+    def progress(report):
+        click.echo(f"已写入 {report['inserted'] + report['updated']} 行")
+
+    try:
+        report = import_workbook(path, kind, sheet=sheet, batch_size=batch_size, dry_run=dry_run, progress=progress)
+    except ExcelImportError as e:
+        raise click.ClickException(str(e))
+    if report['ignored_columns']:
+        click.echo(f"未识别的列: {'、'.join(report['ignored_columns'])}")
+    for error in report['errors']:
+        click.echo(f"  第 {error['row']} 行: {error['error']}")
+    click.echo(f"工作表 {report['sheet']}: 读取 {report['rows']} 行，新增 {report['inserted']}，更新 {report['updated']}，"
+               f"跳过 {report['skipped']}，重复编号 {report['duplicates']}，月度明细 {report['month_details']} 条；"
+               f"耗时 {report['elapsed_s']} 秒，{report['rows_per_sec']} 行/秒。")
+    if report.get('stale_cache_ttl'):
+        click.echo(f"注意: 本命令无法清除运行中服务的进程内缓存，相关数据最长 {report['stale_cache_ttl']} 秒后生效。")
@@ -1,8 +1,230 @@
-from flask import jsonify, request, Response
+import tempfile
+import time
+
+from flask import jsonify, request, Response, current_app, send_file, stream_with_context
 from .models import (LisProject, LisMeasurePerson, LisProjectOrder, BsBasicCenterHr, 
-                   PmSheetControl, PmWorkHours, PmMonthHoursDetail, BaHoursBasis, LisTask)
+                   PmWorkHours, PmMonthHoursDetail, BaHoursBasis, BfaTaskInbox)
 from app.db.db import db
-from sqlalchemy import cast, func, String, BigInteger
+from app.db.ids import id_generator
+from app.services.ai_gateway import GatewayBusy
+from app.services.cache import reference_cache
+from app.services.compression import response_compression
+from app.services.conditional import conditional_get
+from app.services.draft_store import DraftConflict, draft_store
+from app.services.job_queue import JOB_STATUSES, IdempotencyConflict, JobError, job_queue
+from app.services.response_cache import response_cache
+from app.services.serialization import json_encoder, jsonify_large
+from app.services.vector_index import project_index
+from .aggregates import (BRAND_NAMES, PROJECT_DIMENSIONS, ROLLUP_DIMENSIONS, SCALE_NAMES, codes_for,
+                         rollup_projects, summarize_project)
+from .calculation import compute_draft, load_reference_rows, parse_start_month, scale_factor_between
+from .drafts import COMMAND_PROMPT, CommandError, Draft, diff_drafts, extract_commands, parse_commands
+from .export import (EXPORT_FORMATS, Workbook, export_months, export_projects, export_query, export_scope,
+                     iter_export, pa, write_calculation_workbook, write_history_workbook)
+from .inbox import INBOX_COLUMNS, inbox_available, inbox_source, schedule_reconcile
+from .knowledge import retrieve_context, schedule_index_sync
+from .pivot import build_history_table
+from .validation import validate_timesheet
+from .reference import (baseline_query, format_baseline, load_baseline_hours, load_baselines,
+                        load_department_names, load_task_names, load_visible_sheets)
+from sqlalchemy import cast, func, insert, String
+
+# 提交测算表时每批插入的行数，每批结束后更新一次任务进度
+SUBMIT_BATCH_SIZE = 1000
+
+
+def build_submission_rows(project_id, project_order, businesses):
+    """
+    将提交的业务行转换为 pm_work_hours 与 pm_month_hours_detail 的批量插入参数。
+    主键预先分配，月度明细可直接引用工时行ID，无需逐行 flush。
+    """
+    work_hour_ids = id_generator.next_ids(len(businesses))
+    work_hour_rows = []
+    month_rows = []
+    for business, work_hour_id in zip(businesses, work_hour_ids):
+        work_hour_rows.append({
+            'id': work_hour_id,
+            'select_project_id': project_id,
+            'select_order': project_order.id,
+            'order_name': project_order.order_name,
+            'power_conf': business.get('powerConfig'),
+            'market': project_order.market,
+            'business_detail': business.get('specificItem'),
+            'base_hours': business.get('baselineHours'),
+            # 其他字段根据需要从 business 或 project_order 获取
+        })
+
+        for key, value in business.items():
+            if key.startswith('month'):
+                year_month = key.replace('month', '')
+                month = int(year_month[4:])
+                month_rows.append({
+                    'measure_id': str(work_hour_id),
+                    'measure_key': work_hour_id,
+                    'order_id': str(project_order.id),
+                    'select_project_id': project_id,
+                    'mm': month, # 这里假设 mm 存的是月份
+                    'month_input': str(value),
+                    # department 需要确定来源
+                })
+
+    for row, month_id in zip(month_rows, id_generator.next_ids(len(month_rows))):
+        row['id'] = month_id
+    return work_hour_rows, month_rows
+
+
+def run_generate_calculation(payload, progress):
+    """ 后台任务：生成测算草稿并保存到服务端，返回与同步接口相同的响应体。 """
+    started = time.perf_counter()
+    progress(0.1, '读取参考项目')
+    rows = load_reference_rows(payload['reference_project_id'])
+    progress(0.5, '计算测算草稿')
+    decimals = current_app.config['CALCULATION_HOURS_DECIMALS']
+    start_month = payload['start_month']
+    table_data, dynamic_columns = compute_draft(
+        rows, load_task_names(), payload['scale_factor'], start_month, decimals=decimals,
+    )
+    # 草稿保存在服务端，后续修改只需提交命令，返回变化的单元格
+    progress(0.9, '保存测算草稿')
+    calculation_id = str(id_generator.next_id())
+    state = Draft.from_table(table_data, dynamic_columns, decimals).to_state()
+    state.update(task_id=payload['task_id'], reference_project_id=payload['reference_project_id'])
+    version = draft_store.create(calculation_id, state)
+    return {'data': {
+        "calculation_id": calculation_id,
+        "version": version,
+        "task_id": payload['task_id'],
+        "reference_project_id": payload['reference_project_id'],
+        "scale_factor": round(payload['scale_factor'], 4),
+        "start_month": str(start_month),
+        "table_data": table_data,
+        "dynamic_columns": dynamic_columns,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+    }}, 200
+
+
+def run_submit_task(payload, progress):
+    """ 后台任务：写入提交的测算表，工时行和月度明细按批插入并报告进度。 """
+    project_id = payload['project_id']
+    try:
+        with db.session.begin_nested():
+            # 1. 更新 lis_measure_person 表
+            measure_person = LisMeasurePerson.query.filter_by(project_id=project_id, measure_status='1').first()
+            if measure_person:
+                measure_person.measure_status = '2'
+
+            # 2. 找到 lis_project_order
+            project_order = LisProjectOrder.query.filter_by(project_id=project_id).first()
+            if not project_order:
+                raise JobError("找不到对应的项目订单", status_code=404)
+
+            # 3. 预分配主键，批量插入 pm_work_hours 和 pm_month_hours_detail
+            work_hour_rows, month_rows = build_submission_rows(project_id, project_order, payload['businesses'])
+            batches = [(PmWorkHours, work_hour_rows[start:start + SUBMIT_BATCH_SIZE])
+                       for start in range(0, len(work_hour_rows), SUBMIT_BATCH_SIZE)]
+            batches += [(PmMonthHoursDetail, month_rows[start:start + SUBMIT_BATCH_SIZE])
+                        for start in range(0, len(month_rows), SUBMIT_BATCH_SIZE)]
+            for index, (model, rows) in enumerate(batches):
+                db.session.execute(insert(model), rows)
+                progress((index + 1) / (len(batches) + 1), f'已写入 {index + 1}/{len(batches)} 批')
+
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    # 提交不写参考数据 (工时基准、部门、任务名称、表单权限)，参考数据缓存无需失效。
+    # 接口响应缓存使用 sqlite 后端时所有 worker 共享，失效立即生效；local 后端只清除执行任务的进程，其他进程按 TTL 过期
+    response_cache.invalidate_tables('lis_measure_person', 'pm_work_hours', 'pm_month_hours_detail')
+    return {'message': "测算表提交成功",
+            'data': {'work_hours': len(work_hour_rows), 'month_details': len(month_rows)}}, 200
+
+
+def apply_draft_commands(calculation_id, expected_version, translate):
+    """
+    读取测算草稿，依次执行 translate(草稿) 返回的命令并保存为新版本，返回 (响应体, 状态码)。
+    expected_version 不为 None 时校验版本，草稿已被修改则返回 409。
+    """
+    started = time.perf_counter()
+    state, version = draft_store.get(calculation_id)
+    if state is None:
+        return {'error': "找不到测算草稿或草稿已过期"}, 404
+    if expected_version is not None and int(expected_version) != version:
+        return {'error': "测算草稿已被修改，请刷新后重试", 'version': version}, 409
+    before = Draft.from_state(state)
+
+    try:
+        commands = translate(before)
+        after = before.copy()
+        for command in commands:
+            after.apply(command)
+    except CommandError as e:
+        return {'error': "无法执行修改命令", 'message': str(e)}, 422
+
+    patch = diff_drafts(before, after)
+    new_state = after.to_state()
+    new_state.update(task_id=state.get('task_id'), reference_project_id=state.get('reference_project_id'))
+    try:
+        new_version = draft_store.save(calculation_id, new_state, version)
+    except DraftConflict:
+        return {'error': "测算草稿已被修改，请刷新后重试"}, 409
+
+    return {'data': {
+        "calculation_id": str(calculation_id),
+        "version": new_version,
+        "commands": commands,
+        **patch,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+    }}, 200
+
+
+def run_modify_calculation(payload, progress):
+    """ 后台任务：由 AI 把自然语言指令翻译为命令，再修改测算草稿。 """
+    from app.app import ai_service
+
+    def translate(draft):
+        progress(0.1, '翻译修改指令')
+        reply = ai_service.get_chat_completion(payload['command'], system_prompt=COMMAND_PROMPT + draft.describe())
+        progress(0.9, '修改测算草稿')
+        return extract_commands(reply)
+
+    try:
+        return apply_draft_commands(payload['calculation_id'], payload['version'], translate)
+    except GatewayBusy:
+        raise JobError("AI 服务繁忙，请稍后重试", status_code=503)
+
+
+job_queue.register('generate_calculation', run_generate_calculation)
+# 提交会写入业务表，执行进程中断后不自动重试，避免重复插入
+job_queue.register('submit_task', run_submit_task, retry=False)
+job_queue.register('modify_calculation', run_modify_calculation)
+
+
+def parse_dimensions(value, allowed):
+    """
+    解析逗号分隔的分组维度，按 allowed 中的顺序返回；包含不支持的维度时返回 None。
+    """
+    if not value:
+        return list(allowed)
+    requested = {dimension.strip() for dimension in value.split(',') if dimension.strip()}
+    if not requested or not requested.issubset(allowed):
+        return None
+    return [dimension for dimension in allowed if dimension in requested]
+
+
+def xlsx_response(write, filename):
+    """
+    用 write(file) 把工作簿写入临时文件后作为附件返回。只写工作簿的行在写入时已落盘，
+    保存时才组装为 zip，因此先写完整个文件再分块发送；临时文件在响应关闭时删除。
+    """
+    file = tempfile.TemporaryFile()
+    try:
+        write(file)
+        file.seek(0)
+    except Exception:
+        file.close()
+        raise
+    mimetype, _ = EXPORT_FORMATS['xlsx']
+    return send_file(file, mimetype=mimetype, as_attachment=True, download_name=filename, max_age=0)
 
 
 class BfaController:
@@ -11,56 +233,39 @@ class BfaController:
         获取待办任务列表。
         如果提供了 person_id，则只返回该人员的任务。
         任务过滤条件为 measure_tag = '0' (未完成) 和 measure_status = '1' (已下发)。
+        数据来自按人员索引的待办物化表 (bfa_task_inbox)，在业务数据变化时增量刷新并定期全量对账；
+        物化表尚未创建时回退为实时关联查询。
         """
-        # 品牌和开发规模的映射关系
-        brand_map = {
-            '1': 'WEY', '2': '坦克', '3': '沙龙', '4': '哈弗', '5': '欧拉',
-            '6': '皮卡', '7': 'HEM', '8': '重卡', '9': '赛车', '10': '光束', '11': '平台项目'
-        }
-        sml_map = {'0': 'SS', '1': 'S', '2': 'M', '3': 'L'}
-        
         try:
             # 从请求参数中获取人员ID
             person_id = request.args.get('person_id')
 
-            # 基础查询，从测算人员表开始，关联项目表和部门表
-            query = db.session.query(
-                LisMeasurePerson,
-                LisProject,
-                BsBasicCenterHr.department_name
-            ).join(
-                LisProject,
-                cast(LisProject.id, String(32)).collate('utf8mb4_general_ci') == LisMeasurePerson.project_id
-            ).join( # 使用 join 以防人员没有对应的部门信息
-                BsBasicCenterHr,
-                LisMeasurePerson.person_department == BsBasicCenterHr.department_id
-            )
-
-            # 固定过滤条件：未完成且已下发的项目
-            query = query.filter(
-                LisProject.measure_tag == '0',
-                LisProject.measure_status == '1'
-            )
-            
-            # 如果提供了人员ID，则按人员进行过滤
-            if person_id:
-                query = query.filter(LisMeasurePerson.person == person_id)
-
-            user_tasks = query.all()
+            if inbox_available(db.session.connection()):
+                schedule_reconcile(current_app.config['TASK_INBOX_RECONCILE_INTERVAL'])
+                query = db.session.query(*(getattr(BfaTaskInbox, name) for name in INBOX_COLUMNS))
+                if person_id:
+                    query = query.filter(BfaTaskInbox.person == person_id)
+                user_tasks = query.order_by(BfaTaskInbox.id).all()
+            else:
+                query = inbox_source()
+                if person_id:
+                    query = query.where(LisMeasurePerson.person == person_id)
+                user_tasks = db.session.execute(query).all()
 
             # 格式化查询结果
             task_list = [
                 {
-                    'id': str(project.id),
-                    'name': project.measures_project,
-                    'department': department_name if department_name else person.person_department,
-                    'department_id': person.person_department,
-                    'calculator': person.person,
-                    'brand': brand_map.get(project.brand, project.brand),
-                    'spec': sml_map.get(project.sml, project.sml),
-                    'task_person_id': str(person.id)
+                    'id': str(project_key),
+                    'name': project_name,
+                    'department': department_name if department_name else department_id,
+                    'department_id': department_id,
+                    'calculator': person,
+                    'brand': BRAND_NAMES.get(brand, brand),
+                    'spec': SCALE_NAMES.get(sml, sml),
+                    'task_person_id': str(task_person_id)
                 }
-                for person, project, department_name in user_tasks
+                for task_person_id, person, project_key, project_name, brand, sml, department_id, department_name
+                in user_tasks
             ]
 
             return jsonify(data=task_list)
@@ -84,17 +289,13 @@ class BfaController:
             brand_map = {'1': 'WEY', '2': '坦克', '3': '沙龙', '4': '哈弗', '5': '欧拉', '6': '皮卡', '7': 'HEM', '8': '重卡', '9': '赛车', '10': '光束', '11': '平台项目'}
             sml_map = {'0': 'SS', '1': 'S', '2': 'M', '3': 'L'}
 
-            # 基于三个唯一标识符进行精确查询
+            # 基于三个唯一标识符进行精确查询，部门名称从参考数据缓存中获取
             query_result = db.session.query(
                 LisProject,
-                LisMeasurePerson,
-                BsBasicCenterHr.department_name
+                LisMeasurePerson
             ).join(
                 LisProject,
-                cast(LisProject.id, String(32)).collate('utf8mb4_general_ci') == LisMeasurePerson.project_id
-            ).outerjoin(
-                BsBasicCenterHr,
-                LisMeasurePerson.person_department == BsBasicCenterHr.department_id
+                LisMeasurePerson.project_key == LisProject.id
             ).filter(
                 LisMeasurePerson.project_id == str(task_id),
                 LisMeasurePerson.person == person_id,
@@ -104,7 +305,8 @@ class BfaController:
             if not query_result:
                 return jsonify(error="指定的任务未找到"), 404
 
-            project, person, department_name = query_result
+            project, person = query_result
+            department_name = load_department_names().get(person.person_department)
             
             # 聚合订单信息
             orders = db.session.query(LisProjectOrder.order_name).filter(LisProjectOrder.project_id == str(task_id)).distinct().all()
@@ -117,10 +319,7 @@ class BfaController:
             # 根据部门ID查询可见表权限
             visible_sheets = []
             if person and person.person_department:
-                sheets = db.session.query(PmSheetControl.see_sheet).filter(
-                    PmSheetControl.pm_department == person.person_department
-                ).all()
-                visible_sheets = [sheet[0] for sheet in sheets]
+                visible_sheets = load_visible_sheets(person.person_department)
 
             # 组装返回的任务详情数据
             task_details = {
@@ -147,7 +346,9 @@ class BfaController:
 
     def get_historical_projects(self):
         """
-        获取历史测算项目列表 (measure_tag = '1')。
+        获取历史测算项目列表 (measure_status = '4')。
+        支持按品牌 (brand)、开发规模 (scale)、部门 (department_id) 过滤，
+        并使用基于项目ID的游标 (cursor) 进行分页，按项目ID倒序返回。
         """
         # 品牌和开发规模的映射关系
         brand_map = {
@@ -156,33 +357,70 @@ class BfaController:
         }
         sml_map = {'0': 'SS', '1': 'S', '2': 'M', '3': 'L'}
         try:
-            # 查询已完成的项目
-            historical_projects = db.session.query(LisProject).filter(LisProject.measure_status == '4').all()
-            history_list = []
-            for project in historical_projects:
-                # 为每个历史项目找到其主要负责人
-                person = db.session.query(LisMeasurePerson).filter(
-                    LisMeasurePerson.project_id == str(project.id)
-                ).order_by(LisMeasurePerson.id.asc()).first()
- 
-                department_name = person.person_department if person else ''
-                if person and person.person_department:
-                    # 查询部门名称，使用 .first() 避免因重复ID导致 .scalar() 报错
-                    department_result = db.session.query(BsBasicCenterHr.department_name).filter(
-                        BsBasicCenterHr.department_id == person.person_department
-                    ).first()
-                    if department_result:
-                        department_name = department_result[0]
- 
-                history_list.append({
+            brand = request.args.get('brand')
+            scale = request.args.get('scale')
+            department_id = request.args.get('department_id')
+            cursor = request.args.get('cursor')
+            default_limit = current_app.config['HISTORY_PAGE_SIZE']
+            try:
+                limit = int(request.args.get('limit', default_limit))
+                cursor = int(cursor) if cursor else None
+            except ValueError:
+                return jsonify(error="limit 和 cursor 必须为整数"), 400
+            limit = max(1, min(limit, current_app.config['HISTORY_MAX_PAGE_SIZE']))
+
+            # 为每个项目找到ID最小的测算人记录，作为其主要负责人
+            first_person_subq = db.session.query(
+                LisMeasurePerson.project_key,
+                func.min(LisMeasurePerson.id).label('min_person_id')
+            ).group_by(LisMeasurePerson.project_key).subquery()
+
+            # 一次查询取回项目和主要负责人，替代逐个项目的查询；部门名称从参考数据缓存中获取
+            query = db.session.query(
+                LisProject,
+                LisMeasurePerson
+            ).outerjoin(
+                first_person_subq,
+                first_person_subq.c.project_key == LisProject.id
+            ).outerjoin(
+                LisMeasurePerson,
+                LisMeasurePerson.id == first_person_subq.c.min_person_id
+            ).filter(
+                LisProject.measure_status == '4'
+            )
+
+            # 过滤条件同时接受编码和映射后的文本
+            if brand:
+                brand_codes = {code for code, name in brand_map.items() if name == brand}
+                query = query.filter(LisProject.brand.in_(brand_codes | {brand}))
+            if scale:
+                sml_codes = {code for code, name in sml_map.items() if name == scale}
+                query = query.filter(LisProject.sml.in_(sml_codes | {scale}))
+            if department_id:
+                query = query.filter(LisMeasurePerson.person_department == department_id)
+            if cursor is not None:
+                query = query.filter(LisProject.id < cursor)
+
+            # 多取一条用于判断是否还有下一页
+            results = query.order_by(LisProject.id.desc()).limit(limit + 1).all()
+            has_more = len(results) > limit
+            results = results[:limit]
+            department_names = load_department_names()
+
+            history_list = [
+                {
                     'id': str(project.id),
                     'name': project.measures_project,
-                    'department': department_name,
+                    'department': (department_names.get(person.person_department) or person.person_department) if person else '',
+                    'department_id': person.person_department if person else '',
                     'calculator': person.person if person else 'N/A',
                     'brand': brand_map.get(project.brand, project.brand), # 直接返回映射后的文本
                     'spec': sml_map.get(project.sml, project.sml),      # 直接返回映射后的文本
-                })
-            return jsonify(data=history_list)
+                }
+                for project, person in results
+            ]
+            next_cursor = history_list[-1]['id'] if has_more else None
+            return jsonify(data=history_list, next_cursor=next_cursor)
         except Exception as e:
             print(f"获取历史项目时出错: {e}")
             return jsonify(error="获取历史项目失败", message=str(e)), 500
@@ -232,58 +470,189 @@ class BfaController:
         
         # 为AI服务设置系统提示
         system_prompt = "你是一个测算专家，请根据用户的问题给出解答。保证回答尽量简洁"
-        
-        # 使用生成器函数进行流式响应
-        def generate():
-            for chunk in ai_service.get_streaming_chat_completion(user_message, system_prompt=system_prompt):
-                yield chunk
-        
-        return Response(generate(), mimetype='text/plain')
 
-    def generate_calculation(self, data):
+        # 检索相关的历史项目作为参考资料，检索失败不影响对话；索引由后台任务同步，对话只使用已有的索引
+        if project_index.enabled:
+            try:
+                schedule_index_sync(current_app.config['RAG_SYNC_INTERVAL'])
+                context = retrieve_context(
+                    project_index, user_message,
+                    top_k=current_app.config['RAG_TOP_K'],
+                    budget=current_app.config['RAG_CONTEXT_TOKENS'],
+                )
+                if context:
+                    system_prompt = f"{system_prompt}\n\n{context}"
+            except Exception as e:
+                print(f"检索历史项目时出错: {e}")
+
+        # 准入检查在开始流式响应前完成，名额已满时返回 503
+        try:
+            chunks = ai_service.get_streaming_chat_completion(user_message, system_prompt=system_prompt)
+        except GatewayBusy:
+            response = jsonify(error="AI 服务繁忙，请稍后重试")
+            response.status_code = 503
+            response.headers['Retry-After'] = '5'
+            return response
+
+        # 客户端断开时生成器被关闭，网关随之取消上游请求
+        return Response(chunks, mimetype='text/plain')
+
+    def get_chat_stats(self):
+        """
+        获取 AI 网关各模型的并发、排队、拒绝、取消计数和排队等待时间，回复缓存的命中统计，
+        以及历史项目索引的文档数。
         """
-        生成测算表的函数（待实现）。
+        from app.app import ai_service
+        return jsonify(data={
+            'gateway': ai_service.stats(),
+            'cache': ai_service.cache.stats() if ai_service.cache is not None else None,
+            'index': project_index.stats(),
+        })
+
+    def generate_calculation(self, task_id, data):
+        """
+        依据参考项目生成待测算项目的测算草稿：参考项目的工时行和月度明细按开发规模缩放、
+        匹配工时基准，并平移到以 start_month (YYYYMM，默认当月) 开始的月份窗口。
+        参数校验后提交后台任务，立即返回任务ID；?wait=秒数 时在限定时间内等待结果。
         """
-        # TODO: 实现测算生成逻辑
-        task_id = data.get('task_id')
         reference_project_id = data.get('reference_project_id')
-        mock_timesheet = [
-            {"person": "Dev 1", "hours": 40},
-            {"person": "Dev 2", "hours": 32},
-        ]
-        return jsonify(data={"calculation_id": "calc-123", "timesheet": mock_timesheet})
+        if not reference_project_id or not str(reference_project_id).isdigit():
+            return jsonify(error="必须提供 reference_project_id"), 400
+        try:
+            start_month = parse_start_month(data.get('start_month'))
+        except ValueError as e:
+            return jsonify(error=str(e)), 400
 
-    def modify_calculation(self, data):
+        try:
+            target = db.session.get(LisProject, int(task_id))
+            reference = db.session.get(LisProject, int(reference_project_id))
+            if target is None or reference is None:
+                return jsonify(error="找不到待测算项目或参考项目"), 404
+
+            scale_factor = data.get('scale_factor')
+            if scale_factor is None:
+                scale_factor = scale_factor_between(
+                    current_app.config['CALCULATION_SCALE_FACTORS'], target.sml, reference.sml
+                )
+            return self._enqueue_job('generate_calculation', {
+                'task_id': str(task_id),
+                'reference_project_id': str(reference.id),
+                'scale_factor': float(scale_factor),
+                'start_month': start_month,
+            }, data)
+        except IdempotencyConflict as e:
+            return jsonify(error="幂等键冲突", message=str(e)), 422
+        except Exception as e:
+            print(f"生成测算草稿时出错: {e}")
+            return jsonify(error="生成测算草稿失败", message=str(e)), 500
+
+    def get_calculation(self, calculation_id):
         """
-        根据自然语言指令修改测算表的函数（待实现）。
+        获取服务端保存的测算草稿的完整表格和当前版本号。
         """
-        # TODO: 实现基于自然语言指令的测算修改逻辑
-        command = data.get('command')
-        current_timesheet = data.get('current_timesheet')
-        # 模拟修改操作
-        if "add" in command:
-            current_timesheet.append({"person": "New Dev", "hours": 20})
-        
-        return jsonify(data={"updated_timesheet": current_timesheet})
+        try:
+            state, version = draft_store.get(calculation_id)
+            if state is None:
+                return jsonify(error="找不到测算草稿或草稿已过期"), 404
+            table_data, dynamic_columns = Draft.from_state(state).to_table()
+            return jsonify(data={
+                "calculation_id": str(calculation_id),
+                "version": version,
+                "task_id": state.get('task_id'),
+                "reference_project_id": state.get('reference_project_id'),
+                "table_data": table_data,
+                "dynamic_columns": dynamic_columns,
+            })
+        except Exception as e:
+            print(f"获取测算草稿时出错: {e}")
+            return jsonify(error="获取测算草稿失败", message=str(e)), 500
 
-    def validate_calculation(self, data):
+    def export_calculation(self, calculation_id):
         """
-        验证测算表的函数（待实现）。
+        把服务端保存的测算草稿导出为 Excel 工作簿，列与测算表一致，并带差异工时和差异原因。
         """
-        # TODO: 实现验证逻辑
-        timesheet = data.get('timesheet')
-        is_valid = all(isinstance(entry.get('hours', 0), int) and entry.get('hours', 0) > 0 for entry in timesheet)
-        errors = [] if is_valid else ["发现无效的工时。"]
-        return jsonify(data={"is_valid": is_valid, "errors": errors})
+        if Workbook is None:
+            return jsonify(error="导出 Excel 需要安装 openpyxl"), 501
+        try:
+            state, _ = draft_store.get(calculation_id)
+            if state is None:
+                return jsonify(error="找不到测算草稿或草稿已过期"), 404
+            draft = Draft.from_state(state)
+            return xlsx_response(lambda file: write_calculation_workbook(file, draft), f'calculation-{calculation_id}.xlsx')
+        except Exception as e:
+            print(f"导出测算草稿时出错: {e}")
+            return jsonify(error="导出测算草稿失败", message=str(e)), 500
 
-    def submit_task(self, task_id, data):
+    def modify_calculation(self, data):
         """
-        提交任务的函数（待实现）。
+        增量修改服务端保存的测算草稿。commands 为结构化命令 (scale/shift/redistribute/delete/set)，直接执行；
+        也可以用 command 提交自然语言指令，在后台任务中由 AI 翻译为命令后执行，返回任务ID (?wait=秒数 时等待结果)。
+        命令依次作用于草稿后保存为新版本，只返回变化的单元格；提供 version 时校验版本，已被修改则返回 409。
         """
-        # TODO: 实现提交逻辑
-        timesheet = data.get('timesheet')
-        print(f"正在为任务 {task_id} 提交工时表: {timesheet}")
-        return jsonify(data={"status": "success"})
+        calculation_id = data.get('calculation_id')
+        if not calculation_id:
+            return jsonify(error="必须提供 calculation_id"), 400
+        if not data.get('commands') and not data.get('command'):
+            return jsonify(error="必须提供 commands 或 command"), 400
+
+        try:
+            if data.get('commands'):
+                body, status_code = apply_draft_commands(
+                    calculation_id, data.get('version'), lambda draft: parse_commands(data['commands'])
+                )
+                return jsonify(body), status_code
+            # 自然语言指令需要 AI 翻译，耗时不定，提交后台任务；未提供 version 时固定为当前版本，任务重试不会重复修改
+            state, version = draft_store.get(calculation_id)
+            if state is None:
+                return jsonify(error="找不到测算草稿或草稿已过期"), 404
+            return self._enqueue_job('modify_calculation', {
+                'calculation_id': str(calculation_id),
+                'command': data['command'],
+                'version': int(data['version']) if data.get('version') is not None else version,
+            }, data)
+        except IdempotencyConflict as e:
+            return jsonify(error="幂等键冲突", message=str(e)), 422
+        except Exception as e:
+            print(f"修改测算草稿时出错: {e}")
+            return jsonify(error="修改测算草稿失败", message=str(e)), 500
+
+    def validate_calculation(self, data):
+        """
+        校验测算表：月度工时合法性、月份断档、总工时和差异工时、与工时基准的一致性、
+        偏差超限时的差异原因以及 动力配置 + 具体事项 重复。工时基准只加载一次，所有规则按列整体计算。
+        提供 calculation_id 时校验服务端保存的草稿，否则校验请求中的 table_data (或 timesheet)。
+        """
+        calculation_id = data.get('calculation_id')
+        table_data = data.get('table_data', data.get('timesheet'))
+        if not calculation_id and not isinstance(table_data, list):
+            return jsonify(error="必须提供 calculation_id 或 table_data"), 400
+
+        try:
+            started = time.perf_counter()
+            if calculation_id:
+                state, _ = draft_store.get(calculation_id)
+                if state is None:
+                    return jsonify(error="找不到测算草稿或草稿已过期"), 404
+                table_data, dynamic_columns = Draft.from_state(state).to_table()
+            else:
+                dynamic_columns = data.get('dynamic_columns')
+                if dynamic_columns is None:
+                    dynamic_columns = sorted({key for row in table_data for key in row if str(key).isdigit()})
+            errors, summary = validate_timesheet(
+                table_data, dynamic_columns, load_baseline_hours(),
+                tolerance=current_app.config['CALCULATION_DEVIATION_TOLERANCE'],
+                decimals=current_app.config['CALCULATION_HOURS_DECIMALS'],
+            )
+            return jsonify(data={
+                "is_valid": not errors,
+                "errors": errors,
+                "summary": summary,
+                "row_count": len(table_data),
+                "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+            })
+        except Exception as e:
+            print(f"校验测算结果时出错: {e}")
+            return jsonify(error="校验测算结果失败", message=str(e)), 500
 
     def get_reference_projects(self, task_id, department_id):
         """
@@ -302,9 +671,9 @@ class BfaController:
             # 创建一个子查询，为每个项目找到ID最小的测算人记录，以确保唯一性
             # 这样可以避免同一个项目因为有多个测算人而出现重复
             first_person_subq = db.session.query(
-                LisMeasurePerson.project_id,
+                LisMeasurePerson.project_key,
                 func.min(LisMeasurePerson.id).label('min_person_id')
-            ).group_by(LisMeasurePerson.project_id).subquery()
+            ).group_by(LisMeasurePerson.project_key).subquery()
 
             # 主查询，获取项目信息
             query = db.session.query(
@@ -313,13 +682,10 @@ class BfaController:
                 BsBasicCenterHr.department_name
             ).join(
                 first_person_subq,
-                cast(LisProject.id, String(32)).collate('utf8mb4_general_ci') == first_person_subq.c.project_id
+                first_person_subq.c.project_key == LisProject.id
             ).join(
                 LisMeasurePerson,
-                db.and_(
-                    LisMeasurePerson.project_id == first_person_subq.c.project_id,
-                    LisMeasurePerson.id == first_person_subq.c.min_person_id
-                )
+                LisMeasurePerson.id == first_person_subq.c.min_person_id
             ).join(
                 BsBasicCenterHr,
                 LisMeasurePerson.person_department == BsBasicCenterHr.department_id
@@ -350,64 +716,80 @@ class BfaController:
 
     def submit_task(self, task_id, data):
         """
-        提交新的测算表
+        提交新的测算表。参数校验后提交后台任务，立即返回任务ID；?wait=秒数 时在限定时间内等待结果。
         """
-        project_id = task_id
+        project_id = str(task_id)
         businesses = data.get('businesses', [])
 
         if not project_id or not businesses:
             return jsonify(error="缺少 project_id 或 businesses 数据"), 400
 
         try:
-            with db.session.begin_nested():
-                # 1. 更新 lis_measure_person 表
-                measure_person = LisMeasurePerson.query.filter_by(project_id=project_id, measure_status='1').first()
-                if measure_person:
-                    measure_person.measure_status = '2'
-
-                # 2. 找到 lis_project_order
-                project_order = LisProjectOrder.query.filter_by(project_id=project_id).first()
-                if not project_order:
-                    return jsonify(error="找不到对应的项目订单"), 404
-
-                # 3. 插入 pm_work_hours 和 pm_month_hours_detail
-                for business in businesses:
-                    new_work_hour = PmWorkHours(
-                        select_project_id=project_id,
-                        select_order=project_order.id,
-                        order_name=project_order.order_name,
-                        power_conf=business.get('powerConfig'),
-                        market=project_order.market,
-                        business_detail=business.get('specificItem'),
-                        base_hours=business.get('baselineHours'),
-                        # 其他字段根据需要从 business 或 project_order 获取
-                    )
-                    db.session.add(new_work_hour)
-                    db.session.flush() # 为了获取 new_work_hour.id
-
-                    for key, value in business.items():
-                        if key.startswith('month'):
-                            year_month = key.replace('month', '')
-                            year = int(year_month[:4])
-                            month = int(year_month[4:])
-                            
-                            new_month_detail = PmMonthHoursDetail(
-                                measure_id=str(new_work_hour.id),
-                                order_id=str(project_order.id),
-                                select_project_id=project_id,
-                                mm=month, # 这里假设 mm 存的是月份
-                                month_input=str(value),
-                                # department 需要确定来源
-                            )
-                            db.session.add(new_month_detail)
-
-            db.session.commit()
-            return jsonify(message="测算表提交成功"), 200
+            if LisProjectOrder.query.filter_by(project_id=project_id).first() is None:
+                return jsonify(error="找不到对应的项目订单"), 404
+            return self._enqueue_job('submit_task', {'project_id': project_id, 'businesses': businesses}, data)
+        except IdempotencyConflict as e:
+            return jsonify(error="幂等键冲突", message=str(e)), 422
         except Exception as e:
-            db.session.rollback()
             print(f"提交测算表时出错: {e}")
             return jsonify(error="提交测算表失败", message=str(e)), 500
 
+    def _enqueue_job(self, kind, payload, data):
+        """
+        提交后台任务。幂等键取请求头 Idempotency-Key 或请求体 idempotency_key，重复提交返回同一任务。
+        请求带 ?wait=秒数 且任务在此时间内结束时，直接返回任务的响应；否则返回任务状态 (新建的任务为 202)。
+        """
+        idempotency_key = request.headers.get('Idempotency-Key') or data.get('idempotency_key')
+        job, created = job_queue.enqueue(kind, payload, idempotency_key=idempotency_key)
+        return self._job_response(job, accepted=created)
+
+    def _job_response(self, job, accepted=False):
+        wait = request.args.get('wait', type=float)
+        if wait and job['status'] not in ('succeeded', 'failed'):
+            job = job_queue.wait(job['job_id'], min(wait, current_app.config['JOB_MAX_WAIT']))
+        if wait and job['status'] in ('succeeded', 'failed'):
+            response = jsonify(job['result'])
+            response.status_code = job['status_code']
+        else:
+            response = jsonify(data=job)
+            response.status_code = 202 if accepted else 200
+        response.headers['X-Job-Id'] = job['job_id']
+        response.headers['Location'] = f"/api/v1/bfa/jobs/{job['job_id']}"
+        return response
+
+    def get_job(self, job_id):
+        """
+        获取后台任务的状态、进度和结果；?wait=秒数 时在限定时间内等待任务结束。
+        """
+        try:
+            job = job_queue.get(job_id)
+            if job is None:
+                return jsonify(error="找不到后台任务"), 404
+            wait = request.args.get('wait', type=float)
+            if wait and job['status'] not in ('succeeded', 'failed'):
+                job = job_queue.wait(job_id, min(wait, current_app.config['JOB_MAX_WAIT']))
+            return jsonify(data=job)
+        except Exception as e:
+            print(f"获取后台任务时出错: {e}")
+            return jsonify(error="获取后台任务失败", message=str(e)), 500
+
+    def get_jobs(self):
+        """
+        获取最近的后台任务列表 (不含结果)，可按 status、kind 筛选，以及各状态的任务数。
+        """
+        status = request.args.get('status')
+        if status and status not in JOB_STATUSES:
+            return jsonify(error=f"status 只支持 {', '.join(JOB_STATUSES)}"), 400
+        try:
+            limit = min(request.args.get('limit', 50, type=int), 500)
+            return jsonify(data={
+                'jobs': job_queue.recent(status=status, kind=request.args.get('kind'), limit=limit),
+                'stats': job_queue.stats(),
+            })
+        except Exception as e:
+            print(f"获取后台任务列表时出错: {e}")
+            return jsonify(error="获取后台任务列表失败", message=str(e)), 500
+
     def get_historical_project_details(self, project_id):
         """
         获取历史项目的详细测算数据。
@@ -421,17 +803,15 @@ class BfaController:
                 PmWorkHours.power_conf, # 直接从 pm_work_hours 获取名称
                 PmMonthHoursDetail.mm,
                 PmMonthHoursDetail.month_input,
-                LisTask.first_task.label('first_task_name'),
+                BaHoursBasis.first_task_key,
                 BaHoursBasis.change_type,
                 BaHoursBasis.de_range
             ).select_from(LisProjectOrder).join(
                 PmWorkHours, PmWorkHours.select_order == LisProjectOrder.id
             ).outerjoin(
-                PmMonthHoursDetail, cast(PmWorkHours.id, String(32)).collate('utf8mb4_general_ci') == PmMonthHoursDetail.measure_id
+                PmMonthHoursDetail, PmMonthHoursDetail.measure_key == PmWorkHours.id
             ).outerjoin(
                 BaHoursBasis, PmWorkHours.select_hours_base == BaHoursBasis.id
-            ).outerjoin(
-                LisTask, cast(BaHoursBasis.first_task, BigInteger) == LisTask.id
             ).filter(
                 LisProjectOrder.project_id == project_id
             ).order_by(
@@ -441,63 +821,93 @@ class BfaController:
             if not query_results:
                 return jsonify(data={"table_data": [], "dynamic_columns": []})
 
-            # 将扁平化的结果处理成结构化数据
-            processed_data = {}
-            all_months = set()
-
-            for row in query_results:
-                measure_id = row.measure_id
-                if measure_id not in processed_data:
-                    processed_data[measure_id] = {
-                        'power_config': row.power_conf, # 确认这里使用的是 pm_work_hours 的 power_conf
-                        'business_detail': row.business_detail,
-                        'base_hours': float(row.base_hours) if row.base_hours is not None else 0,
-                        'total_hours': 0,
-                        'monthly_inputs': {},
-                        'first_task_name': row.first_task_name if row.first_task_name is not None else '未找到工时基准表',
-                        'change_type': row.change_type if row.change_type is not None else '未找到工时基准表',
-                        'de_range': row.de_range if row.de_range is not None else '未找到工时基准表'
-                    }
-                
-                if row.mm and row.month_input:
-                    month_str = str(row.mm)
-                    try:
-                        month_input_val = float(row.month_input)
-                    except (ValueError, TypeError):
-                        month_input_val = 0
-                    
-                    all_months.add(month_str)
-                    processed_data[measure_id]['monthly_inputs'][month_str] = month_input_val
-                    processed_data[measure_id]['total_hours'] += month_input_val
-
-            # 格式化为最终的表格结构
-            dynamic_columns = sorted(list(all_months))
-            table_data = []
-            
-            for index, (measure_id, data) in enumerate(processed_data.items()):
-                row_data = {
-                    'id': measure_id,
-                    '序号': index + 1,
-                    '动力配置': data['power_config'],
-                    '一级任务': data['first_task_name'],
-                    '改动类型': data['change_type'],
-                    '定义范围': data['de_range'],
-                    '具体事项': data['business_detail'],
-                    '基准工时': data['base_hours'],
-                    '填报总工时': data['total_hours'],
-                }
-                
-                for month in dynamic_columns:
-                    row_data[month] = data['monthly_inputs'].get(month, '')
-
-                table_data.append(row_data)
-                
-            return jsonify(data={"table_data": table_data, "dynamic_columns": dynamic_columns})
+            # 按列批量透视为 工时行 x 月份 的表格，一级任务名称从参考数据缓存中获取
+            table_data, dynamic_columns = build_history_table(query_results, load_task_names())
+            return jsonify_large(data={"table_data": table_data, "dynamic_columns": dynamic_columns})
 
         except Exception as e:
             print(f"获取历史项目详情时出错: {e}")
             return jsonify(error="获取历史项目详情失败", message=str(e)), 500
 
+    def get_historical_project_summary(self, project_id):
+        """
+        获取历史项目按月份、动力配置、一级任务汇总的工时，汇总在数据库中完成。
+        group_by 参数为逗号分隔的维度列表，默认返回全部维度。
+        """
+        try:
+            dimensions = parse_dimensions(request.args.get('group_by'), PROJECT_DIMENSIONS)
+            if dimensions is None:
+                return jsonify(error=f"group_by 只支持: {', '.join(PROJECT_DIMENSIONS)}"), 400
+            summary = summarize_project(project_id, dimensions, load_task_names())
+            return jsonify(data=summary)
+        except Exception as e:
+            print(f"汇总历史项目工时时出错: {e}")
+            return jsonify(error="汇总历史项目工时失败", message=str(e)), 500
+
+    def get_history_rollup(self):
+        """
+        跨历史项目汇总工时，按品牌、开发规模 (可选按月份) 分组。
+        支持按品牌 (brand)、开发规模 (scale) 过滤，参数同时接受编码和映射后的文本。
+        """
+        try:
+            dimensions = parse_dimensions(request.args.get('group_by', 'brand,scale'), ROLLUP_DIMENSIONS)
+            if dimensions is None:
+                return jsonify(error=f"group_by 只支持: {', '.join(ROLLUP_DIMENSIONS)}"), 400
+            brand = request.args.get('brand')
+            scale = request.args.get('scale')
+            rollup = rollup_projects(
+                dimensions,
+                brand_codes=codes_for(BRAND_NAMES, brand) if brand else None,
+                scale_codes=codes_for(SCALE_NAMES, scale) if scale else None,
+            )
+            return jsonify(data=rollup)
+        except Exception as e:
+            print(f"汇总历史项目工时时出错: {e}")
+            return jsonify(error="汇总历史项目工时失败", message=str(e)), 500
+
+    def export_history_details(self):
+        """
+        导出历史项目测算明细 (工时行 + 月度工时) 为 Arrow IPC 流 (format=arrow，默认)、Parquet 文件 (format=parquet)
+        或 Excel 工作簿 (format=xlsx)。Arrow/Parquet 的月份为 float64 列，未填报为 null；
+        Excel 每个项目一个工作表，列与历史详情表一致。project_ids 为逗号分隔的项目ID；all=true 时导出全部已完成测算的项目。
+        逐批从数据库读取并写出，内存占用与导出总量无关。
+        """
+        export_format = request.args.get('format', 'arrow')
+        if export_format not in EXPORT_FORMATS:
+            return jsonify(error=f"format 只支持: {', '.join(EXPORT_FORMATS)}"), 400
+        if export_format == 'xlsx' and Workbook is None:
+            return jsonify(error="导出 Excel 需要安装 openpyxl"), 501
+        if export_format != 'xlsx' and pa is None:
+            return jsonify(error="导出需要安装 pyarrow"), 501
+        export_all = request.args.get('all', '').lower() in ('1', 'true')
+        project_ids = [value.strip() for value in request.args.get('project_ids', '').split(',') if value.strip()]
+        if not export_all and not project_ids:
+            return jsonify(error="需要指定 project_ids 或 all=true"), 400
+        if not all(value.isdigit() for value in project_ids):
+            return jsonify(error="project_ids 必须为逗号分隔的整数"), 400
+
+        try:
+            if export_format == 'xlsx':
+                projects = export_projects(None if export_all else project_ids)
+                return xlsx_response(
+                    lambda file: write_history_workbook(file, projects, load_task_names(),
+                                                        current_app.config['HISTORY_EXPORT_BATCH_ROWS']),
+                    'history-details.xlsx'
+                )
+            scope = export_scope(None if export_all else project_ids)
+            months = export_months(scope)
+            rows = export_query(scope).yield_per(current_app.config['HISTORY_EXPORT_BATCH_ROWS'])
+            body = iter_export(export_format, rows, months, load_task_names(),
+                               current_app.config['HISTORY_EXPORT_BATCH_ROWS'],
+                               current_app.config['HISTORY_EXPORT_COMPRESSION'])
+            mimetype, extension = EXPORT_FORMATS[export_format]
+            response = Response(stream_with_context(body), mimetype=mimetype)
+            response.headers['Content-Disposition'] = f'attachment; filename=history-details.{extension}'
+            return response
+        except Exception as e:
+            print(f"导出历史项目详情时出错: {e}")
+            return jsonify(error="导出历史项目详情失败", message=str(e)), 500
+
     def get_project_order_names(self, project_id):
         """
         根据项目ID获取对应的所有order_name
@@ -524,36 +934,76 @@ class BfaController:
 
     def get_all_baselines(self):
         """
-        获取所有工时基准数据，并关联一级任务名称。
-        返回字段和顺序匹配前端 BaselineBusinessModal.jsx 的要求。
+        获取工时基准数据，并关联一级任务名称。
+        不带参数时返回完整列表 (缓存)；带过滤或分页参数时在数据库中过滤，按ID游标分页。
+        format=ndjson 时以换行分隔的 JSON 流式返回，逐批从数据库读取，内存占用与表大小无关。
         """
-        try:
-            query_results = db.session.query(
-                BaHoursBasis.id,
-                BaHoursBasis.power_type,
-                LisTask.first_task.label('first_task_name'),
-                BaHoursBasis.change_type,
-                BaHoursBasis.de_range,
-                BaHoursBasis.total_hour
-            ).outerjoin(
-                LisTask, cast(BaHoursBasis.first_task, BigInteger) == LisTask.id
-            ).all()
-
-            baselines = [
-                {
-                    "id": row.id,
-                    "动力配置": row.power_type,
-                    "一级任务": row.first_task_name,
-                    "改动类型": row.change_type,
-                    "定义范围": row.de_range,
-                    "具体事项": "",  # 注意：基准库中无此字段，暂时留空
-                    "基准工时": row.total_hour
-                }
-                for row in query_results
-            ]
-            
-            return jsonify(data=baselines)
+        filter_keys = ('power_type', 'first_task', 'change_type', 'q', 'limit', 'cursor', 'format')
+        if not any(request.args.get(key) for key in filter_keys):
+            try:
+                return jsonify_large(data=load_baselines())
+            except Exception as e:
+                print(f"获取所有基准数据时出错: {e}")
+                return jsonify(error="获取所有基准数据失败", message=str(e)), 500
 
+        try:
+            limit = request.args.get('limit')
+            cursor = request.args.get('cursor')
+            try:
+                limit = max(1, min(int(limit), current_app.config['BASELINE_MAX_PAGE_SIZE'])) if limit else None
+                cursor = int(cursor) if cursor else None
+            except ValueError:
+                return jsonify(error="limit 和 cursor 必须为整数"), 400
+
+            task_names = load_task_names()
+            query = baseline_query()
+            if request.args.get('power_type'):
+                query = query.filter(BaHoursBasis.power_type == request.args['power_type'])
+            if request.args.get('change_type'):
+                query = query.filter(BaHoursBasis.change_type == request.args['change_type'])
+            first_task = request.args.get('first_task')
+            if first_task:
+                # 一级任务可传ID或名称
+                task_ids = {task_id for task_id, name in task_names.items() if name == first_task}
+                if first_task.isdigit():
+                    task_ids.add(int(first_task))
+                query = query.filter(BaHoursBasis.first_task_key.in_(task_ids))
+            if request.args.get('q'):
+                query = query.filter(BaHoursBasis.de_range.contains(request.args['q'], autoescape=True))
+            if cursor is not None:
+                query = query.filter(BaHoursBasis.id > cursor)
+            query = query.order_by(BaHoursBasis.id)
+
+            if request.args.get('format') == 'ndjson':
+                if limit:
+                    query = query.limit(limit)
+
+                encode = json_encoder()
+
+                def generate():
+                    for row in query.yield_per(current_app.config['BASELINE_STREAM_BATCH_SIZE']):
+                        yield encode(format_baseline(row, task_names)) + b'\n'
+
+                return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+            limit = limit or current_app.config['BASELINE_PAGE_SIZE']
+            rows = query.limit(limit + 1).all()
+            has_more = len(rows) > limit
+            baselines = [format_baseline(row, task_names) for row in rows[:limit]]
+            next_cursor = str(baselines[-1]['id']) if has_more else None
+            return jsonify(data=baselines, next_cursor=next_cursor)
         except Exception as e:
-            print(f"获取所有基准数据时出错: {e}")
-            return jsonify(error="获取所有基准数据失败", message=str(e)), 500
\ No newline at end of file
+            print(f"获取基准数据时出错: {e}")
+            return jsonify(error="获取基准数据失败", message=str(e)), 500
+
+    def get_cache_stats(self):
+        """
+        获取参考数据缓存各区域和接口响应缓存的命中/未命中统计，用于评估缓存容量和 TTL，
+        以及条件请求返回 304 的次数和响应压缩率。
+        """
+        return jsonify(data={
+            'reference': reference_cache.stats(),
+            'response': response_cache.stats(),
+            'conditional': conditional_get.stats(),
+            'compression': response_compression.stats(),
+        })
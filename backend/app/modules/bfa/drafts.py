@@ -0,0 +1,326 @@
+import json
+import re
+
+import numpy as np
+
+from .calculation import month_codes, month_index
+
+# 草稿中每行的非月份字段，月份列的值保存在 values 矩阵中
+ROW_FIELDS = ['id', 'reference_id', 'baseline_id', '动力配置', '一级任务', '改动类型', '定义范围', '具体事项',
+              '基准工时', '差异原因']
+# 过滤条件和 set 命令中可用的英文字段名
+FIELD_ALIASES = {
+    'power_conf': '动力配置',
+    'first_task': '一级任务',
+    'change_type': '改动类型',
+    'de_range': '定义范围',
+    'business_detail': '具体事项',
+    'diff_reason': '差异原因',
+}
+EDITABLE_FIELDS = {'动力配置', '具体事项', '差异原因'}
+COMMAND_OPS = ('scale', 'shift', 'redistribute', 'delete', 'set')
+
+COMMAND_PROMPT = """你负责把用户对测算表的修改要求翻译为 JSON 命令，只输出 JSON 数组，不要输出其他内容。
+可用命令：
+- {"op": "scale", "factor": 1.1, "where": 过滤条件, "months": ["202601"]}  按系数缩放月度工时，months 可省略表示全部月份
+- {"op": "shift", "months": 2, "where": 过滤条件}  月度工时整体后移 (负数为前移) 若干个月
+- {"op": "redistribute", "start": "202601", "end": "202606", "total": 300, "mode": "even", "where": 过滤条件}
+  将工时重新分配到 start 至 end 的月份，total 省略时保持每行总工时，mode 为 even (平均) 或 proportional (按现有比例)
+- {"op": "delete", "where": 过滤条件}  删除行
+- {"op": "set", "id": 3, "field": "202601", "value": 12}  修改单元格，field 可以是月份或 动力配置/具体事项/差异原因
+过滤条件为对象，键可以是 ids (行号列表)、power_conf (动力配置)、first_task (一级任务)、change_type (改动类型)、
+business_detail (具体事项)、de_range (定义范围)；值为字符串、字符串数组或 {"contains": "关键字"}。
+当前测算表：
+"""
+
+
+class CommandError(ValueError):
+    """ 命令格式或参数错误。 """
+
+
+def _cell(value):
+    """ 表格单元格转换为浮点数，空单元格为 NaN。 """
+    if value in (None, ''):
+        return np.nan
+    return float(value)
+
+
+class Draft:
+    """
+    测算草稿的列式表示：行字段为列表，月度工时为 行 x 月份 的浮点矩阵 (NaN 表示未填)。
+    所有命令都以矩阵运算作用于过滤出的行。
+    """
+
+    def __init__(self, fields, columns, values, decimals=1):
+        self.fields = fields
+        self.columns = list(columns)
+        self.values = values
+        self.decimals = decimals
+
+    @classmethod
+    def from_table(cls, table_data, dynamic_columns, decimals=1):
+        fields = {name: [row.get(name, '' if name == '差异原因' else None) for row in table_data]
+                  for name in ROW_FIELDS}
+        values = np.array([[_cell(row.get(column)) for column in dynamic_columns] for row in table_data],
+                          dtype=np.float64).reshape(len(table_data), len(dynamic_columns))
+        return cls(fields, dynamic_columns, values, decimals)
+
+    @classmethod
+    def from_state(cls, state):
+        values = np.array([[np.nan if value is None else value for value in row] for row in state['values']],
+                          dtype=np.float64).reshape(len(state['fields']['id']), len(state['columns']))
+        return cls(state['fields'], state['columns'], values, state.get('decimals', 1))
+
+    def to_state(self):
+        return {
+            'fields': self.fields,
+            'columns': self.columns,
+            'values': np.where(np.isnan(self.values), None, self.values.astype(object)).tolist(),
+            'decimals': self.decimals,
+        }
+
+    def copy(self):
+        return Draft({name: list(values) for name, values in self.fields.items()}, self.columns,
+                     self.values.copy(), self.decimals)
+
+    def totals(self):
+        return np.round(np.nansum(self.values, axis=1), self.decimals)
+
+    def diffs(self):
+        base = np.array([value or 0 for value in self.fields['基准工时']], dtype=np.float64)
+        return np.round(self.totals() - base, self.decimals)
+
+    def to_table(self):
+        """ 转换为与 generate_calculation 相同的表格格式。 """
+        totals, diffs = self.totals().tolist(), self.diffs().tolist()
+        cells = np.where(np.isnan(self.values), '', self.values.astype(object)).tolist()
+        table_data = []
+        for index in range(len(self.fields['id'])):
+            row = {name: self.fields[name][index] for name in ROW_FIELDS}
+            row['序号'] = index + 1
+            row['填报总工时'] = totals[index]
+            row['差异工时'] = diffs[index]
+            row.update(zip(self.columns, cells[index]))
+            table_data.append(row)
+        return table_data, list(self.columns)
+
+    # ---- 过滤与列 ----
+
+    def select(self, where):
+        """ 按过滤条件返回行掩码；where 为空时选中全部行。 """
+        mask = np.ones(len(self.fields['id']), dtype=bool)
+        for key, condition in (where or {}).items():
+            if key == 'ids':
+                ids = condition if isinstance(condition, list) else [condition]
+                mask &= np.isin(np.array(self.fields['id'], dtype=object), [int(value) for value in ids])
+                continue
+            field = FIELD_ALIASES.get(key, key)
+            if field not in self.fields:
+                raise CommandError(f'未知的过滤字段: {key}')
+            column = np.array([value if value is not None else '' for value in self.fields[field]], dtype=object)
+            if isinstance(condition, dict) and 'contains' in condition:
+                keyword = str(condition['contains'])
+                mask &= np.array([keyword in str(value) for value in column], dtype=bool)
+            elif isinstance(condition, list):
+                mask &= np.isin(column, condition)
+            else:
+                mask &= column == condition
+        return mask
+
+    def _ensure_columns(self, labels):
+        """ 补齐缺少的月份列，列按月份排序，返回各 label 的列下标。 """
+        missing = sorted(set(labels) - set(self.columns))
+        if missing:
+            columns = sorted(self.columns + missing, key=int)
+            order = {label: index for index, label in enumerate(columns)}
+            values = np.full((self.values.shape[0], len(columns)), np.nan)
+            values[:, [order[label] for label in self.columns]] = self.values
+            self.columns, self.values = columns, values
+        order = {label: index for index, label in enumerate(self.columns)}
+        return np.array([order[label] for label in labels], dtype=np.int64)
+
+    def _drop_empty_columns(self):
+        keep = ~np.isnan(self.values).all(axis=0)
+        if not keep.all():
+            self.columns = [label for label, flag in zip(self.columns, keep) if flag]
+            self.values = self.values[:, keep]
+
+    def _month_range(self, start, end):
+        first, last = month_index([int(start)])[0], month_index([int(end)])[0]
+        if last < first:
+            raise CommandError('end 不能早于 start')
+        return month_codes(np.arange(first, last + 1)).astype(str).tolist()
+
+    # ---- 命令 ----
+
+    def apply(self, command):
+        op = command.get('op')
+        if op not in COMMAND_OPS:
+            raise CommandError(f"未知的命令: {op}，可用命令: {', '.join(COMMAND_OPS)}")
+        try:
+            getattr(self, f'_apply_{op}')(command)
+        except (TypeError, ValueError, KeyError) as e:
+            if isinstance(e, CommandError):
+                raise
+            raise CommandError(f'{op} 命令参数错误: {e}')
+
+    def _apply_scale(self, command):
+        factor = float(command['factor'])
+        if factor < 0:
+            raise CommandError('factor 不能为负数')
+        rows = np.flatnonzero(self.select(command.get('where')))
+        months = command.get('months')
+        cols = self._ensure_columns([str(month) for month in months]) if months else np.arange(len(self.columns))
+        block = self.values[np.ix_(rows, cols)]
+        self.values[np.ix_(rows, cols)] = np.round(block * factor, self.decimals)
+
+    def _apply_shift(self, command):
+        offset = int(command['months'])
+        rows = np.flatnonzero(self.select(command.get('where')))
+        if not offset or not len(rows) or not self.columns:
+            return
+        sources = list(self.columns)
+        targets = month_codes(month_index([int(label) for label in sources]) + offset).astype(str).tolist()
+        self._ensure_columns(targets)
+        source_cols = self._ensure_columns(sources)
+        target_cols = self._ensure_columns(targets)
+        block = self.values[np.ix_(rows, source_cols)]
+        self.values[np.ix_(rows, source_cols)] = np.nan
+        self.values[np.ix_(rows, target_cols)] = block
+        self._drop_empty_columns()
+
+    def _apply_redistribute(self, command):
+        labels = self._month_range(command['start'], command['end'])
+        mode = command.get('mode', 'even')
+        if mode not in ('even', 'proportional'):
+            raise CommandError('mode 只支持 even 或 proportional')
+        rows = np.flatnonzero(self.select(command.get('where')))
+        if not len(rows):
+            return
+        totals = self.totals()[rows]
+        if command.get('total') is not None:
+            totals = np.full(len(rows), float(command['total']))
+        cols = self._ensure_columns(labels)
+        window = np.nan_to_num(self.values[np.ix_(rows, cols)])
+        if mode == 'proportional':
+            weights = window
+            # 窗口内没有工时的行退化为平均分配
+            empty = weights.sum(axis=1) == 0
+            weights[empty] = 1
+        else:
+            weights = np.ones_like(window)
+        shares = np.round(weights / weights.sum(axis=1, keepdims=True) * totals[:, None], self.decimals)
+        # 取整误差计入最后一个月，保证每行总工时不变
+        shares[:, -1] += np.round(totals - shares.sum(axis=1), self.decimals)
+        self.values[rows, :] = np.nan
+        self.values[np.ix_(rows, cols)] = shares
+        self._drop_empty_columns()
+
+    def _apply_delete(self, command):
+        if not command.get('where'):
+            raise CommandError('delete 命令必须提供过滤条件')
+        keep = ~self.select(command['where'])
+        self.fields = {name: [value for value, flag in zip(values, keep) if flag]
+                       for name, values in self.fields.items()}
+        self.values = self.values[keep]
+        self._drop_empty_columns()
+
+    def _apply_set(self, command):
+        ids = self.fields['id']
+        row_id = int(command['id'])
+        if row_id not in ids:
+            raise CommandError(f'找不到行: {row_id}')
+        row = ids.index(row_id)
+        field = str(command['field'])
+        field = FIELD_ALIASES.get(field, field)
+        if field in EDITABLE_FIELDS:
+            self.fields[field][row] = command.get('value')
+        elif field.isdigit():
+            col = self._ensure_columns([field])[0]
+            self.values[row, col] = _cell(command.get('value'))
+            self._drop_empty_columns()
+        else:
+            raise CommandError(f'字段不可修改: {field}')
+
+    def describe(self, max_values=20):
+        """ 供自然语言翻译使用的草稿摘要：月份范围和各字段的取值。 """
+        lines = [f"共 {len(self.fields['id'])} 行，月份: {', '.join(self.columns)}"]
+        for alias, field in FIELD_ALIASES.items():
+            if field == '差异原因':
+                continue
+            values = list(dict.fromkeys(value for value in self.fields[field] if value))[:max_values]
+            if values:
+                lines.append(f"{alias} ({field}): {', '.join(map(str, values))}")
+        return '\n'.join(lines)
+
+
+def diff_drafts(before, after):
+    """
+    比较修改前后的草稿，只返回变化的内容：
+    changes 为 [{'id', 'column', 'value'}] (含月份单元格、行字段和派生的总工时/差异工时)，
+    deleted 为被删除的行ID，列集合变化时返回新的 dynamic_columns。
+    """
+    before_ids = {row_id: index for index, row_id in enumerate(before.fields['id'])}
+    after_ids = after.fields['id']
+    rows = np.array([before_ids[row_id] for row_id in after_ids], dtype=np.int64)
+
+    # 修改前的矩阵对齐到修改后的行和列
+    before_cols = {label: index for index, label in enumerate(before.columns)}
+    aligned = np.full(after.values.shape, np.nan)
+    shared = [(index, before_cols[label]) for index, label in enumerate(after.columns) if label in before_cols]
+    if shared and len(rows):
+        after_cols, source_cols = map(list, zip(*shared))
+        aligned[:, after_cols] = before.values[np.ix_(rows, source_cols)]
+    changed = ~((aligned == after.values) | (np.isnan(aligned) & np.isnan(after.values)))
+
+    # 被移除的列中原有值的行，也需要通知前端清空
+    removed_cols = [before_cols[label] for label in before.columns if label not in set(after.columns)]
+    changes = []
+    for row, col in zip(*np.nonzero(changed)):
+        value = after.values[row, col]
+        changes.append({'id': after_ids[row], 'column': after.columns[col],
+                        'value': '' if np.isnan(value) else float(value)})
+    if removed_cols and len(rows):
+        cleared = ~np.isnan(before.values[np.ix_(rows, removed_cols)])
+        for row, col in zip(*np.nonzero(cleared)):
+            changes.append({'id': after_ids[row], 'column': before.columns[removed_cols[col]], 'value': ''})
+
+    derived = (('填报总工时', before.totals()[rows] if len(rows) else np.array([]), after.totals()),
+               ('差异工时', before.diffs()[rows] if len(rows) else np.array([]), after.diffs()))
+    for name, old, new in derived:
+        for row in np.flatnonzero(old != new):
+            changes.append({'id': after_ids[row], 'column': name, 'value': float(new[row])})
+    for field in EDITABLE_FIELDS:
+        for row, (index, value) in enumerate(zip(rows.tolist(), after.fields[field])):
+            if before.fields[field][index] != value:
+                changes.append({'id': after_ids[row], 'column': field, 'value': value})
+
+    patch = {'changes': changes, 'deleted': [row_id for row_id in before.fields['id'] if row_id not in set(after_ids)]}
+    if before.columns != after.columns:
+        patch['dynamic_columns'] = list(after.columns)
+    return patch
+
+
+def parse_commands(value):
+    """ 接受单条命令、命令数组或 {"commands": [...]}，返回命令列表。 """
+    if isinstance(value, dict):
+        value = value.get('commands', [value])
+    if not isinstance(value, list) or not value or not all(isinstance(item, dict) for item in value):
+        raise CommandError('commands 必须为非空的命令对象数组')
+    return value
+
+
+def extract_commands(text):
+    """ 从模型回复中提取 JSON 命令：去掉思考过程和代码块标记。 """
+    text = re.sub(r'<think>.*?</think>', '', text, flags=re.S)
+    match = re.search(r'```(?:json)?\s*(.*?)```', text, flags=re.S)
+    if match:
+        text = match.group(1)
+    start = min((index for index in (text.find('['), text.find('{')) if index >= 0), default=-1)
+    if start < 0:
+        raise CommandError('模型回复中没有 JSON 命令')
+    try:
+        value, _ = json.JSONDecoder().raw_decode(text[start:])
+    except json.JSONDecodeError as e:
+        raise CommandError(f'模型回复不是合法的 JSON: {e}')
+    return parse_commands(value)
@@ -0,0 +1,319 @@
+import re
+
+import numpy as np
+from sqlalchemy import select
+
+from app.db.db import db
+from .models import BaHoursBasis, LisProject, LisProjectOrder, PmMonthHoursDetail, PmWorkHours, to_key
+from .pivot import MISSING_BASELINE, pivot_month_hours
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow 为可选依赖，未安装时导出接口返回 501
+    pa = pq = None
+
+try:
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Alignment, Font, PatternFill
+    from openpyxl.utils import get_column_letter
+except ImportError:  # openpyxl 为可选依赖，未安装时 Excel 导出返回 501
+    Workbook = None
+
+# 导出格式 -> (MIME 类型, 文件扩展名)
+EXPORT_FORMATS = {
+    'arrow': ('application/vnd.apache.arrow.stream', 'arrow'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+    'xlsx': ('application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', 'xlsx'),
+}
+# 固定列的列名和 Arrow 类型，其后为按月份排序的 float64 月度工时列 (未填报为 null)
+FIXED_COLUMNS = (
+    ('project_id', 'int64'),
+    ('order_id', 'int64'),
+    ('id', 'int64'),
+    ('动力配置', 'string'),
+    ('一级任务', 'string'),
+    ('改动类型', 'string'),
+    ('定义范围', 'string'),
+    ('具体事项', 'string'),
+    ('基准工时', 'float64'),
+    ('填报总工时', 'float64'),
+)
+
+
+def export_scope(project_ids=None):
+    """ 导出范围的订单条件：指定的项目，或 project_ids 为 None 时全部已完成测算 (measure_status = '4') 的项目。 """
+    if project_ids is None:
+        completed = select(LisProject.id).where(LisProject.measure_status == '4')
+        return LisProjectOrder.project_key.in_(completed)
+    return LisProjectOrder.project_id.in_([str(project_id) for project_id in project_ids])
+
+
+def export_months(scope):
+    """ 导出范围内出现过的全部月份，按字符串排序 (与历史详情的动态列顺序一致)，用于确定固定的列结构。 """
+    months = db.session.query(PmMonthHoursDetail.mm).select_from(LisProjectOrder).join(
+        PmWorkHours, PmWorkHours.select_order == LisProjectOrder.id
+    ).join(
+        PmMonthHoursDetail, PmMonthHoursDetail.measure_key == PmWorkHours.id
+    ).filter(
+        scope, PmMonthHoursDetail.mm.isnot(None), PmMonthHoursDetail.mm != 0
+    ).distinct().all()
+    return sorted(str(mm) for mm, in months)
+
+
+def export_query(scope):
+    """ 导出范围内的工时行和月度明细，按工时行ID和月份排序，同一工时行的记录相邻。 """
+    return db.session.query(
+        LisProjectOrder.project_id,
+        LisProjectOrder.id.label('order_id'),
+        PmWorkHours.id.label('measure_id'),
+        PmWorkHours.business_detail,
+        PmWorkHours.base_hours,
+        PmWorkHours.power_conf,
+        PmMonthHoursDetail.mm,
+        PmMonthHoursDetail.month_input,
+        BaHoursBasis.first_task_key,
+        BaHoursBasis.change_type,
+        BaHoursBasis.de_range
+    ).select_from(LisProjectOrder).join(
+        PmWorkHours, PmWorkHours.select_order == LisProjectOrder.id
+    ).outerjoin(
+        PmMonthHoursDetail, PmMonthHoursDetail.measure_key == PmWorkHours.id
+    ).outerjoin(
+        BaHoursBasis, PmWorkHours.select_hours_base == BaHoursBasis.id
+    ).filter(
+        scope
+    ).order_by(
+        PmWorkHours.id, PmMonthHoursDetail.mm
+    )
+
+
+def iter_row_chunks(rows, batch_rows):
+    """ 把有序的明细记录按工时行边界切分为每块约 batch_rows 条，同一工时行的记录不会跨块。 """
+    chunk = []
+    for row in rows:
+        if len(chunk) >= batch_rows and row.measure_id != chunk[-1].measure_id:
+            yield chunk
+            chunk = []
+        chunk.append(row)
+    if chunk:
+        yield chunk
+
+
+def build_columns(rows, months, task_names):
+    """
+    将一块明细记录透视为列。
+
+    Returns:
+        (固定列 {列名: 值列表}, 月度工时矩阵, 是否填报的掩码)，矩阵的列与 months 一一对应。
+    """
+    row_ids, first_index, columns, values, present, totals, _ = pivot_month_hours(
+        [row.measure_id for row in rows], [row.mm for row in rows], [row.month_input for row in rows]
+    )
+    firsts = [rows[index] for index in first_index.tolist()]
+    # 本块的月份只是全部月份的子集，放到固定列结构中对应的位置
+    month_values = np.zeros((len(row_ids), len(months)), dtype=np.float64)
+    month_present = np.zeros((len(row_ids), len(months)), dtype=bool)
+    if columns:
+        positions = {month: index for index, month in enumerate(months)}
+        target = [positions[month] for month in columns]
+        month_values[:, target] = values
+        month_present[:, target] = present
+
+    fixed = {
+        'project_id': [to_key(row.project_id) for row in firsts],
+        'order_id': [row.order_id for row in firsts],
+        'id': row_ids.tolist(),
+        '动力配置': [row.power_conf for row in firsts],
+        '一级任务': [task_names.get(row.first_task_key) for row in firsts],
+        '改动类型': [row.change_type for row in firsts],
+        '定义范围': [row.de_range for row in firsts],
+        '具体事项': [row.business_detail for row in firsts],
+        '基准工时': [float(row.base_hours) if row.base_hours is not None else None for row in firsts],
+        '填报总工时': totals.tolist(),
+    }
+    return fixed, month_values, month_present
+
+
+def export_schema(months):
+    fields = [pa.field(name, getattr(pa, type_name)()) for name, type_name in FIXED_COLUMNS]
+    fields += [pa.field(month, pa.float64()) for month in months]
+    return pa.schema(fields)
+
+
+class ChunkSink:
+    """ 只追加写入的文件对象，写入的数据在每批之后取出并清空，供流式响应逐块发送。 """
+
+    def __init__(self):
+        self.closed = False
+        self._chunks = []
+        self._position = 0
+
+    def write(self, data):
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def iter_export(export_format, rows, months, task_names, batch_rows, compression=None):
+    """
+    逐块生成 Arrow IPC 流或 Parquet 文件的字节。每块约 batch_rows 条明细记录，
+    对应 Arrow 的一个 RecordBatch 或 Parquet 的一个 row group，内存占用与导出总量无关。
+    """
+    schema = export_schema(months)
+    sink = ChunkSink()
+    if export_format == 'arrow':
+        writer = pa.ipc.new_stream(sink, schema, options=pa.ipc.IpcWriteOptions(compression=compression))
+    else:
+        writer = pq.ParquetWriter(sink, schema, compression=compression or 'none')
+
+    for chunk in iter_row_chunks(rows, batch_rows):
+        fixed, values, present = build_columns(chunk, months, task_names)
+        arrays = [pa.array(fixed[name], type=schema.field(name).type) for name, _ in FIXED_COLUMNS]
+        arrays += [pa.array(values[:, index], mask=~present[:, index]) for index in range(len(months))]
+        batch = pa.RecordBatch.from_arrays(arrays, schema=schema)
+        if export_format == 'arrow':
+            writer.write_batch(batch)
+        else:
+            writer.write_table(pa.Table.from_batches([batch]))
+        yield sink.drain()
+    writer.close()
+    yield sink.drain()
+
+
+# ---- Excel 导出 ----
+
+# 工作表的固定列，与前端历史详情表 / 测算表的列一致，其后为按月份排序的月度工时列
+HISTORY_SHEET_COLUMNS = ('序号', '动力配置', '一级任务', '改动类型', '定义范围', '具体事项', '基准工时', '填报总工时')
+CALCULATION_SHEET_COLUMNS = HISTORY_SHEET_COLUMNS + ('差异工时', '差异原因')
+# 列宽 (字符数)，未列出的列为 12，月份列为 10
+SHEET_COLUMN_WIDTHS = {'序号': 6, '动力配置': 20, '具体事项': 36, '差异原因': 30}
+MONTH_COLUMN_WIDTH = 10
+# 工作表名称的长度上限和不允许的字符
+_SHEET_TITLE_LENGTH = 31
+_SHEET_TITLE_INVALID = re.compile(r'[\\/*?:\[\]]')
+
+
+def sheet_title(project_id, name=None):
+    """ 项目工作表的名称：项目ID + 项目名称，去掉 Excel 不允许的字符并截断到 31 个字符。 """
+    title = f'{project_id} {name}' if name else str(project_id)
+    return _SHEET_TITLE_INVALID.sub('_', title)[:_SHEET_TITLE_LENGTH]
+
+
+def export_projects(project_ids=None):
+    """ 导出范围内的项目 [(项目ID, 项目名称)]，按项目ID排序；不存在的项目ID也保留 (名称为 None)，导出为空表。 """
+    query = db.session.query(LisProject.id, LisProject.measures_project)
+    if project_ids is None:
+        return query.filter(LisProject.measure_status == '4').order_by(LisProject.id).all()
+    names = dict(query.filter(LisProject.id.in_([int(project_id) for project_id in project_ids])).all())
+    return [(int(project_id), names.get(int(project_id))) for project_id in sorted(set(project_ids), key=int)]
+
+
+def new_sheet(workbook, title, columns, months):
+    """ 在只写工作簿中添加工作表并写入表头：设置列宽、冻结首行，表头加粗。 """
+    sheet = workbook.create_sheet(title)
+    header = list(columns) + list(months)
+    for index, name in enumerate(header):
+        width = SHEET_COLUMN_WIDTHS.get(name, 12) if index < len(columns) else MONTH_COLUMN_WIDTH
+        sheet.column_dimensions[get_column_letter(index + 1)].width = width
+    sheet.freeze_panes = 'B2'
+    font, fill, alignment = Font(bold=True), PatternFill('solid', fgColor='DDEBF7'), Alignment(horizontal='center')
+    cells = []
+    for name in header:
+        cell = WriteOnlyCell(sheet, value=name)
+        cell.font, cell.fill, cell.alignment = font, fill, alignment
+        cells.append(cell)
+    sheet.append(cells)
+    return sheet
+
+
+def write_history_sheet(sheet, rows, months, task_names, batch_rows):
+    """
+    逐块把有序的明细记录透视后追加到工作表，值的约定与历史详情接口一致
+    (缺少工时基准时显示“未找到工时基准表”，未填报的月份为空单元格)。
+    只写工作表的行直接写入临时文件，内存占用只与 batch_rows 有关。
+    """
+    number = 0
+    for chunk in iter_row_chunks(rows, batch_rows):
+        fixed, values, present = build_columns(chunk, months, task_names)
+        cells = np.where(present, values.astype(object), None).tolist()
+        for index, month_cells in enumerate(cells):
+            number += 1
+            sheet.append([
+                number,
+                fixed['动力配置'][index],
+                _or_missing(fixed['一级任务'][index]),
+                _or_missing(fixed['改动类型'][index]),
+                _or_missing(fixed['定义范围'][index]),
+                fixed['具体事项'][index],
+                fixed['基准工时'][index] or 0,
+                fixed['填报总工时'][index],
+            ] + month_cells)
+    return number
+
+
+def _or_missing(value):
+    return value if value is not None else MISSING_BASELINE
+
+
+def write_history_workbook(file, projects, task_names, batch_rows):
+    """
+    把多个历史项目的测算明细写为 Excel 工作簿，每个项目一个工作表，月份列为该项目出现过的月份
+    (与 /history/<id>/details 的 dynamic_columns 一致)。逐个项目从游标分批读取，
+    每个工作表写完即关闭，工作簿以只写模式保存到 file。
+
+    Returns:
+        写入的工时行数
+    """
+    workbook = Workbook(write_only=True)
+    total = 0
+    for project_id, name in projects:
+        scope = export_scope([project_id])
+        months = export_months(scope)
+        sheet = new_sheet(workbook, sheet_title(project_id, name), HISTORY_SHEET_COLUMNS, months)
+        total += write_history_sheet(sheet, export_query(scope).yield_per(batch_rows), months, task_names, batch_rows)
+        sheet.close()
+    if not projects:
+        new_sheet(workbook, '历史明细', HISTORY_SHEET_COLUMNS, [])
+    workbook.save(file)
+    return total
+
+
+def write_calculation_workbook(file, draft, title='测算表'):
+    """ 把测算草稿写为单个工作表的 Excel 工作簿，列与测算表一致，并带差异工时和差异原因。 """
+    workbook = Workbook(write_only=True)
+    sheet = new_sheet(workbook, title, CALCULATION_SHEET_COLUMNS, draft.columns)
+    totals, diffs = draft.totals().tolist(), draft.diffs().tolist()
+    cells = np.where(np.isnan(draft.values), None, draft.values.astype(object)).tolist()
+    fields = draft.fields
+    for index, month_cells in enumerate(cells):
+        sheet.append([
+            index + 1,
+            fields['动力配置'][index],
+            fields['一级任务'][index],
+            fields['改动类型'][index],
+            fields['定义范围'][index],
+            fields['具体事项'][index],
+            fields['基准工时'][index],
+            totals[index],
+            diffs[index],
+            fields['差异原因'][index],
+        ] + month_cells)
+    workbook.save(file)
+    return len(cells)
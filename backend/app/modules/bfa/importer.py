@@ -0,0 +1,338 @@
+import re
+import time
+from datetime import date, datetime
+from itertools import islice
+
+from flask import current_app
+from sqlalchemy import BigInteger, Integer, Numeric, String, delete, insert, select, update
+
+from app.db.db import db
+from app.db.ids import id_generator
+from app.services.cache_backends import SQLiteCacheBackend
+from app.services.response_cache import response_cache
+from .models import BaHoursBasis, LisTask, PmMonthHoursDetail, PmWorkHours, to_key
+
+try:
+    from openpyxl import load_workbook
+except ImportError:  # openpyxl 未安装时导入命令不可用
+    load_workbook = None
+
+# 模型字段 -> 可识别的表头 (字段名本身也可作为表头)
+BASELINE_COLUMNS = {
+    'serial_number': ('编号', '基准编号', '流水号'),
+    'power_type': ('动力配置', '动力类型'),
+    'first_task': ('一级任务',),
+    'change_type': ('改动类型',),
+    'de_range': ('定义范围',),
+    'total_hour': ('基准工时', '总工时'),
+    'market': ('市场',),
+    'department': ('部门',),
+    'section_office': ('科室',),
+    'part_name': ('零部件名称', '零件名称'),
+    'reason': ('原因', '说明'),
+}
+TIMESHEET_COLUMNS = {
+    'serial_number': ('编号', '流水号'),
+    'select_project_id': ('项目ID', '项目编号'),
+    'select_order': ('订单ID',),
+    'order_name': ('订单名称',),
+    'power_conf': ('动力配置',),
+    'business_detail': ('具体事项',),
+    'base_hours': ('基准工时',),
+    'select_hours_base': ('基准ID', 'baseline_id'),
+    'department': ('部门',),
+    'diff_reason': ('差异原因',),
+    'market': ('市场',),
+}
+# 导入类型 -> (模型, 字段映射, 是否包含月度工时列)
+IMPORT_KINDS = {
+    'baselines': (BaHoursBasis, BASELINE_COLUMNS, False),
+    'timesheets': (PmWorkHours, TIMESHEET_COLUMNS, True),
+}
+# 以字符串保存的数值字段，导入时校验为数字
+NUMERIC_TEXT_FIELDS = {'total_hour'}
+MAX_REPORTED_ERRORS = 100
+
+_MONTH_HEADER = re.compile(r'^(\d{4})\s*[-/.年]?\s*(\d{1,2})\s*月?$')
+
+
+class ExcelImportError(ValueError):
+    """ 工作簿无法导入 (缺少工作表或必需的列、表头不合法)。 """
+
+
+def _normalize(name):
+    return re.sub(r'\s+', '', str(name)).lower()
+
+
+def month_header(value):
+    """ 月份列的表头 (202501、'2025-01'、'2025年1月' 或日期) 转换为 YYYYMM，不是月份时返回 None。 """
+    if isinstance(value, (datetime, date)):
+        return value.year * 100 + value.month
+    if value is None:
+        return None
+    match = _MONTH_HEADER.match(str(value).strip().removesuffix('.0'))
+    if not match:
+        return None
+    year, month = int(match.group(1)), int(match.group(2))
+    if not 1 <= month <= 12:
+        raise ExcelImportError(f'月份列表头不合法: {value}')
+    return year * 100 + month
+
+
+def resolve_header(header, columns, with_months):
+    """
+    按表头确定每一列对应的字段。
+
+    Returns:
+        (字段列 [(列下标, 字段名)], 月份列 [(列下标, YYYYMM)], 未识别的表头列表)
+    """
+    aliases = {}
+    for field, names in columns.items():
+        for name in (field,) + names:
+            aliases[_normalize(name)] = field
+    fields, months, ignored = [], [], []
+    seen = set()
+    for index, value in enumerate(header):
+        if value is None or str(value).strip() == '':
+            continue
+        field = aliases.get(_normalize(value))
+        if field is not None and field not in seen:
+            seen.add(field)
+            fields.append((index, field))
+            continue
+        mm = month_header(value) if with_months else None
+        if mm is not None:
+            months.append((index, mm))
+        else:
+            ignored.append(str(value))
+    if 'serial_number' not in seen:
+        raise ExcelImportError(f"缺少编号列 (可用表头: serial_number、{'、'.join(columns['serial_number'])})")
+    return fields, months, ignored
+
+
+def _format_number(value):
+    """ 数字写入字符串列时去掉多余的 .0。 """
+    return str(int(value)) if float(value).is_integer() else str(value)
+
+
+def field_converters(model, fields, task_ids):
+    """ 按模型的列类型为每个字段生成转换函数，转换失败时抛出 ValueError。 """
+    converters = {}
+    for field in fields:
+        column = model.__table__.c[field]
+        if isinstance(column.type, (BigInteger, Integer)):
+            def convert(value):
+                number = float(value)
+                if not number.is_integer():
+                    raise ValueError(f'{value} 不是整数')
+                return int(number)
+        elif isinstance(column.type, Numeric):
+            convert = float
+        elif field == 'first_task':
+            def convert(value):
+                # 一级任务可填任务ID或任务名称
+                text = _format_number(value) if isinstance(value, (int, float)) else str(value).strip()
+                if text.isdigit():
+                    return text
+                if text not in task_ids:
+                    raise ValueError(f'未知的一级任务: {text}')
+                return str(task_ids[text])
+        else:
+            def convert(value, length=column.type.length if isinstance(column.type, String) else None,
+                        numeric=field in NUMERIC_TEXT_FIELDS):
+                if numeric:
+                    value = _format_number(float(value))
+                elif isinstance(value, float):
+                    value = _format_number(value)
+                text = str(value).strip()
+                if length is not None and len(text) > length:
+                    raise ValueError(f'长度超过 {length}')
+                return text
+        converters[field] = convert
+    return converters
+
+
+def parse_row(values, fields, months, converters):
+    """
+    转换一行。
+
+    Returns:
+        (字段值, [(YYYYMM, 月度工时)], 错误信息或 None)
+    """
+    record = {}
+    for index, field in fields:
+        value = values[index] if index < len(values) else None
+        if value is None or (isinstance(value, str) and value.strip() == ''):
+            # 表格为准：空单元格清空原有的值
+            record[field] = None
+            continue
+        try:
+            record[field] = converters[field](value)
+        except (ValueError, TypeError) as e:
+            return None, None, f'{field}: {e}'
+    if not record.get('serial_number'):
+        return None, None, '缺少编号'
+    month_values = []
+    for index, mm in months:
+        value = values[index] if index < len(values) else None
+        if value is None or (isinstance(value, str) and value.strip() == ''):
+            continue
+        try:
+            month_values.append((mm, _format_number(float(value))))
+        except (ValueError, TypeError):
+            return None, None, f'{mm}: {value} 不是数字'
+    return record, month_values, None
+
+
+def upsert_by_serial_number(model, records, now):
+    """
+    按编号批量写入：已存在的行按主键批量更新 (只更新表格中有对应列的字段)，其余行预分配主键后批量插入。
+
+    Returns:
+        (编号 -> 主键, 插入行数, 更新行数)
+    """
+    table = model.__table__
+    existing = dict(db.session.execute(
+        select(table.c.serial_number, table.c.id).where(table.c.serial_number.in_(list(records)))
+    ).all())
+    inserts, updates = [], []
+    new_ids = iter(id_generator.next_ids(len(records) - len(existing)))
+    ids = {}
+    for serial_number, record in records.items():
+        if serial_number in existing:
+            ids[serial_number] = existing[serial_number]
+            updates.append({**record, 'id': existing[serial_number], 'update_time': now})
+        else:
+            ids[serial_number] = next(new_ids)
+            inserts.append({**record, 'id': ids[serial_number], 'create_time': now, 'update_time': now})
+    if inserts:
+        db.session.execute(insert(model), inserts)
+    if updates:
+        db.session.execute(update(model), updates)
+    return ids, len(inserts), len(updates)
+
+
+def replace_month_details(ids, month_values, records, now):
+    """ 以表格为准替换这些工时行的月度明细：先删除原有明细，再批量插入。 """
+    db.session.execute(delete(PmMonthHoursDetail).where(PmMonthHoursDetail.measure_key.in_(list(ids.values()))))
+    rows = []
+    for serial_number, values in month_values.items():
+        work_hour_id = ids[serial_number]
+        record = records[serial_number]
+        for mm, month_input in values:
+            rows.append({
+                'measure_id': str(work_hour_id),
+                'measure_key': work_hour_id,
+                'mm': mm,
+                'month_input': month_input,
+                'select_project_id': record.get('select_project_id'),
+                'department': record.get('department'),
+                'create_time': now,
+                'update_time': now,
+            })
+    for row, detail_id in zip(rows, id_generator.next_ids(len(rows))):
+        row['id'] = detail_id
+    if rows:
+        db.session.execute(insert(PmMonthHoursDetail), rows)
+    return len(rows)
+
+
+def stale_cache_ttl(tables):
+    """
+    命令行进程无法清除服务进程内的缓存：参考数据缓存和 local 响应缓存依赖 tables 的部分最长在返回的秒数后过期。
+    sqlite 响应缓存由同一主机上的所有进程共享，导入后已直接失效，不计入。
+    """
+    ttls = [settings['ttl'] for settings in current_app.config['REFERENCE_CACHE'].values()
+            if set(settings['tables']).intersection(tables)]
+    if response_cache.backend is not None and not isinstance(response_cache.backend, SQLiteCacheBackend):
+        ttls += [settings['ttl'] for settings in current_app.config['RESPONSE_CACHE_NAMESPACES'].values()
+                 if set(settings['tables']).intersection(tables)]
+    return max(ttls, default=0)
+
+
+def import_workbook(path, kind, sheet=None, batch_size=5000, dry_run=False, progress=None):
+    """
+    从工作簿流式导入工时基准 (baselines) 或历史工时 (timesheets)，以编号 (serial_number) 为键插入或更新。
+    逐行读取、校验和转换，每 batch_size 行在一个事务中批量写入并提交；校验失败的行跳过并记录原因。
+    历史工时表中的月份列 (如 202501) 写入 pm_month_hours_detail，替换该工时行原有的月度明细。
+
+    Args:
+        progress: 每批提交后以当前统计调用。
+
+    Returns:
+        导入统计，包括读取、插入、更新、跳过的行数，错误列表和每秒处理行数；
+        stale_cache_ttl 为服务进程中相关缓存的最长过期时间 (秒)，见 stale_cache_ttl()。
+    """
+    if load_workbook is None:
+        raise ExcelImportError('导入需要安装 openpyxl')
+    if kind not in IMPORT_KINDS:
+        raise ExcelImportError(f"导入类型只支持: {', '.join(IMPORT_KINDS)}")
+    model, columns, with_months = IMPORT_KINDS[kind]
+    started = time.perf_counter()
+    report = {'kind': kind, 'sheet': None, 'rows': 0, 'inserted': 0, 'updated': 0, 'skipped': 0,
+              'duplicates': 0, 'month_details': 0, 'errors': [], 'ignored_columns': [], 'dry_run': dry_run}
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        if sheet is not None and sheet not in workbook.sheetnames:
+            raise ExcelImportError(f'工作表不存在: {sheet}')
+        worksheet = workbook[sheet] if sheet is not None else workbook.worksheets[0]
+        report['sheet'] = worksheet.title
+        rows = worksheet.iter_rows(values_only=True)
+        fields, months, report['ignored_columns'] = resolve_header(next(rows, ()), columns, with_months)
+        task_ids = {}
+        if any(field == 'first_task' for _, field in fields):
+            task_ids = {name: task_id for task_id, name in db.session.query(LisTask.id, LisTask.first_task)}
+        converters = field_converters(model, [field for _, field in fields], task_ids)
+
+        line = 1
+        while True:
+            block = list(islice(rows, batch_size))
+            if not block:
+                break
+            records, month_values = {}, {}
+            for values in block:
+                line += 1
+                if all(value is None or (isinstance(value, str) and value.strip() == '') for value in values):
+                    continue
+                report['rows'] += 1
+                record, month_record, error = parse_row(values, fields, months, converters)
+                if error is not None:
+                    report['skipped'] += 1
+                    if len(report['errors']) < MAX_REPORTED_ERRORS:
+                        report['errors'].append({'row': line, 'error': error})
+                    continue
+                if 'first_task' in record:
+                    record['first_task_key'] = to_key(record['first_task'])
+                # 同一编号在表格中出现多次时以最后一行为准
+                if record['serial_number'] in records:
+                    report['duplicates'] += 1
+                records[record['serial_number']] = record
+                month_values[record['serial_number']] = month_record
+            if dry_run or not records:
+                continue
+
+            try:
+                now = datetime.now()
+                ids, inserted, updated = upsert_by_serial_number(model, records, now)
+                if with_months and months:
+                    report['month_details'] += replace_month_details(ids, month_values, records, now)
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                raise
+            report['inserted'] += inserted
+            report['updated'] += updated
+            if progress is not None:
+                progress(report)
+    finally:
+        workbook.close()
+
+    if not dry_run:
+        touched_tables = ('ba_hours_basis',) if kind == 'baselines' else ('pm_work_hours', 'pm_month_hours_detail')
+        response_cache.invalidate_tables(*touched_tables)
+        report['stale_cache_ttl'] = stale_cache_ttl(touched_tables)
+    elapsed = time.perf_counter() - started
+    report['elapsed_s'] = round(elapsed, 3)
+    report['rows_per_sec'] = round(report['rows'] / elapsed, 1) if elapsed > 0 else None
+    return report
@@ -0,0 +1,161 @@
+import threading
+import time
+from datetime import datetime
+from itertools import chain
+
+from sqlalchemy import delete, event, func, inspect, insert, literal, select
+from sqlalchemy.orm import Session
+
+from app.db.db import db
+from app.services.job_queue import job_queue
+from .models import BfaTaskInbox, BsBasicCenterHr, LisMeasurePerson, LisProject, to_key
+
+# 这些字段变化时，项目的待办行需要刷新
+PROJECT_FIELDS = ('measure_status', 'measure_tag', 'measures_project', 'brand', 'sml')
+PERSON_FIELDS = ('person', 'project_id', 'project_key', 'person_department')
+INBOX_COLUMNS = ('id', 'person', 'project_key', 'project_name', 'brand', 'sml', 'department_id', 'department_name')
+
+_inbox_engines = set()
+_schedule_lock = threading.Lock()
+_next_reconcile = 0.0
+
+
+def inbox_source(project_keys=None):
+    """
+    待办行的来源查询，列顺序与 INBOX_COLUMNS 一致。
+    部门ID可能重复，每个ID取一个名称；与原查询一致，没有部门信息的人员不计入。
+    """
+    departments = select(
+        BsBasicCenterHr.department_id,
+        func.min(BsBasicCenterHr.department_name).label('department_name')
+    ).group_by(BsBasicCenterHr.department_id).subquery()
+    query = select(
+        LisMeasurePerson.id,
+        LisMeasurePerson.person,
+        LisMeasurePerson.project_key,
+        LisProject.measures_project,
+        LisProject.brand,
+        LisProject.sml,
+        LisMeasurePerson.person_department,
+        departments.c.department_name,
+    ).join(
+        LisProject, LisMeasurePerson.project_key == LisProject.id
+    ).join(
+        departments, LisMeasurePerson.person_department == departments.c.department_id
+    ).where(
+        LisProject.measure_tag == '0',
+        LisProject.measure_status == '1'
+    )
+    if project_keys is not None:
+        query = query.where(LisMeasurePerson.project_key.in_(project_keys))
+    return query
+
+
+def inbox_available(connection):
+    """ 物化表是否已创建 (执行 flask bfa migrate 之前不存在)，已存在的结果按数据库缓存。 """
+    url = str(connection.engine.url)
+    if url in _inbox_engines:
+        return True
+    if inspect(connection).has_table(BfaTaskInbox.__tablename__):
+        _inbox_engines.add(url)
+        return True
+    return False
+
+
+def refresh_projects(connection, project_keys):
+    """ 按项目重新生成待办行：先删除这些项目的行，再从来源查询插入。 """
+    project_keys = sorted(key for key in project_keys if key is not None)
+    if not project_keys:
+        return
+    table = BfaTaskInbox.__table__
+    connection.execute(delete(table).where(table.c.project_key.in_(project_keys)))
+    source = inbox_source(project_keys).add_columns(literal(datetime.now()).label('refreshed_at'))
+    connection.execute(insert(table).from_select([*INBOX_COLUMNS, 'refreshed_at'], source))
+
+
+def _changed(obj, fields):
+    state = inspect(obj)
+    return any(state.attrs[field].history.has_changes() for field in fields)
+
+
+def affected_projects(session):
+    """ 本次 flush 中新增、修改或删除的测算人员和项目所影响的项目ID。 """
+    keys = set()
+    for obj in chain(session.new, session.dirty, session.deleted):
+        if isinstance(obj, LisProject):
+            if obj in session.dirty and not _changed(obj, PROJECT_FIELDS):
+                continue
+            keys.add(obj.id)
+        elif isinstance(obj, LisMeasurePerson):
+            if obj in session.dirty and not _changed(obj, PERSON_FIELDS):
+                continue
+            keys.add(obj.project_key if obj.project_key is not None else to_key(obj.project_id))
+            # 人员改到其他项目时，原项目也需要刷新
+            for field in ('project_key', 'project_id'):
+                keys.update(to_key(value) for value in inspect(obj).attrs[field].history.deleted)
+    keys.discard(None)
+    return keys
+
+
+@event.listens_for(Session, 'after_flush')
+def _refresh_after_flush(session, flush_context):
+    # 在同一事务中刷新受影响项目的待办行，与业务数据一起提交或回滚
+    keys = affected_projects(session)
+    if not keys:
+        return
+    connection = session.connection()
+    if inbox_available(connection):
+        refresh_projects(connection, keys)
+
+
+def reconcile_inbox(batch_size=1000):
+    """
+    全量对账：比较来源查询与物化表，删除多余的行、补齐缺失的行、替换内容变化的行。
+    用于修复在本服务之外 (其他系统直接写库) 发生的变化。
+
+    Returns:
+        {'rows': 对账后的行数, 'inserted': 新增行数, 'updated': 更新行数, 'deleted': 删除行数}
+    """
+    expected = {row[0]: tuple(row) for row in db.session.execute(inbox_source()).all()}
+    table = BfaTaskInbox.__table__
+    current = {row[0]: tuple(row) for row in db.session.execute(
+        select(*(table.c[name] for name in INBOX_COLUMNS))
+    ).all()}
+    removed = [row_id for row_id in current if row_id not in expected]
+    changed = [row_id for row_id, row in expected.items() if row_id in current and current[row_id] != row]
+    added = [row_id for row_id in expected if row_id not in current]
+
+    stale = removed + changed
+    for start in range(0, len(stale), batch_size):
+        db.session.execute(delete(table).where(table.c.id.in_(stale[start:start + batch_size])))
+    now = datetime.now()
+    fresh = [dict(zip(INBOX_COLUMNS, expected[row_id]), refreshed_at=now) for row_id in changed + added]
+    for start in range(0, len(fresh), batch_size):
+        db.session.execute(insert(table), fresh[start:start + batch_size])
+    db.session.commit()
+    return {'rows': len(expected), 'inserted': len(added), 'updated': len(changed), 'deleted': len(removed)}
+
+
+def run_reconcile_inbox(payload, progress):
+    """ 后台任务：全量对账待办物化表。 """
+    return {'data': reconcile_inbox()}, 200
+
+
+job_queue.register('reconcile_inbox', run_reconcile_inbox)
+
+
+def schedule_reconcile(interval):
+    """
+    距本进程上次提交对账超过 interval 秒时提交一次对账任务。
+    幂等键按时间段划分，多个 worker 进程在同一时间段内只会执行一次。
+    """
+    global _next_reconcile
+    now = time.time()
+    if now < _next_reconcile:
+        return None
+    with _schedule_lock:
+        if now < _next_reconcile:
+            return None
+        _next_reconcile = now + interval
+    job, _ = job_queue.enqueue('reconcile_inbox', {}, idempotency_key=f'inbox-{int(now // interval)}')
+    return job
@@ -0,0 +1,198 @@
+import threading
+import time
+from collections import defaultdict
+
+from sqlalchemy import func
+
+from app.db.db import db
+from app.services.job_queue import job_queue
+from app.services.vector_index import assemble_context, project_index
+from .aggregates import BRAND_NAMES, SCALE_NAMES, filled_months, month_hours
+from .models import BaHoursBasis, LisProject, LisProjectOrder, PmMonthHoursDetail, PmWorkHours
+from .pivot import MISSING_BASELINE
+from .reference import load_task_names
+
+# 每个项目文档中列出的具体事项、定义范围条数上限
+MAX_DOCUMENT_ITEMS = 20
+CONTEXT_HEADER = '以下是与问题相关的已完成测算项目 (按相关度排序)，回答时可引用其中的数据：'
+
+_schedule_lock = threading.Lock()
+_next_sync = 0.0
+
+
+def project_version(update_time, work_hour_count=0, max_work_hour_id=None):
+    """ 项目文档的版本：项目更新时间或工时行变化时重新生成文档。 """
+    updated = update_time.isoformat() if update_time is not None else ''
+    return f'{updated}|{work_hour_count}|{max_work_hour_id or ""}'
+
+
+def completed_project_versions():
+    """ 所有已完成测算 (measure_status = '4') 项目的 ID -> 版本。 """
+    work_hours = dict(
+        (project_id, (count, max_id)) for project_id, count, max_id in db.session.query(
+            LisProjectOrder.project_id, func.count(PmWorkHours.id), func.max(PmWorkHours.id)
+        ).join(
+            PmWorkHours, PmWorkHours.select_order == LisProjectOrder.id
+        ).join(
+            LisProject, LisProjectOrder.project_key == LisProject.id
+        ).filter(
+            LisProject.measure_status == '4'
+        ).group_by(LisProjectOrder.project_id).all()
+    )
+    rows = db.session.query(LisProject.id, LisProject.update_time).filter(
+        LisProject.measure_status == '4'
+    ).all()
+    return {
+        str(project_id): project_version(update_time, *work_hours.get(str(project_id), (0, None)))
+        for project_id, update_time in rows
+    }
+
+
+def _project_detail_query(project_ids, *columns):
+    return db.session.query(LisProjectOrder.project_id, *columns).select_from(LisProjectOrder).join(
+        PmWorkHours, PmWorkHours.select_order == LisProjectOrder.id
+    ).filter(
+        LisProjectOrder.project_id.in_(project_ids)
+    )
+
+
+def build_project_documents(project_ids, task_names):
+    """
+    批量生成项目文档：基本信息、月度工时汇总、一级任务工时、动力配置、具体事项和定义范围。
+    每类信息对所有项目各查询一次，重要信息放在文档前面，便于按 token 预算截断。
+    """
+    project_ids = [str(project_id) for project_id in project_ids]
+    if not project_ids:
+        return []
+
+    # 按主键过滤，不对主键做类型转换，使用主键索引
+    projects = db.session.query(LisProject).filter(
+        LisProject.id.in_([int(project_id) for project_id in project_ids if project_id.isdigit()])
+    ).all()
+
+    monthly = defaultdict(dict)
+    for project_id, mm, hours in _project_detail_query(
+        project_ids, PmMonthHoursDetail.mm, month_hours()
+    ).join(
+        PmMonthHoursDetail, PmMonthHoursDetail.measure_key == PmWorkHours.id
+    ).filter(*filled_months()).group_by(LisProjectOrder.project_id, PmMonthHoursDetail.mm).all():
+        monthly[project_id][mm] = float(hours)
+
+    task_hours = defaultdict(lambda: defaultdict(float))
+    for project_id, first_task_key, hours in _project_detail_query(
+        project_ids, BaHoursBasis.first_task_key, month_hours()
+    ).join(
+        PmMonthHoursDetail, PmMonthHoursDetail.measure_key == PmWorkHours.id
+    ).outerjoin(
+        BaHoursBasis, PmWorkHours.select_hours_base == BaHoursBasis.id
+    ).filter(*filled_months()).group_by(LisProjectOrder.project_id, BaHoursBasis.first_task_key).all():
+        name = task_names.get(first_task_key)
+        task_hours[project_id][name if name is not None else MISSING_BASELINE] += float(hours)
+
+    work_hours = defaultdict(list)
+    items = defaultdict(lambda: {'power_conf': [], 'business_detail': [], 'de_range': []})
+    for project_id, work_hour_id, power_conf, business_detail, de_range in _project_detail_query(
+        project_ids, PmWorkHours.id, PmWorkHours.power_conf, PmWorkHours.business_detail, BaHoursBasis.de_range
+    ).outerjoin(
+        BaHoursBasis, PmWorkHours.select_hours_base == BaHoursBasis.id
+    ).order_by(PmWorkHours.id).all():
+        work_hours[project_id].append(work_hour_id)
+        for field, value in (('power_conf', power_conf), ('business_detail', business_detail),
+                             ('de_range', de_range)):
+            values = items[project_id][field]
+            if value and value not in values and len(values) < MAX_DOCUMENT_ITEMS:
+                values.append(value)
+
+    documents = []
+    for project in projects:
+        project_id = str(project.id)
+        brand = BRAND_NAMES.get(project.brand, project.brand) or ''
+        scale = SCALE_NAMES.get(project.sml, project.sml) or ''
+        months = monthly.get(project_id, {})
+        total = sum(months.values())
+        lines = [
+            f'项目: {project.measures_project or ""} (ID {project_id})',
+            f'品牌: {brand}; 开发规模: {scale}',
+        ]
+        if months:
+            first, last = min(months), max(months)
+            lines.append(f'填报总工时: {total:g}; 月份: {first}-{last}, 共 {len(months)} 个月; '
+                         f'月均工时: {total / len(months):.1f}')
+        else:
+            lines.append('填报总工时: 0')
+        tasks = sorted(task_hours.get(project_id, {}).items(), key=lambda item: -item[1])
+        if tasks:
+            lines.append('一级任务工时: ' + '; '.join(f'{name} {hours:g}' for name, hours in tasks))
+        project_items = items.get(project_id)
+        if project_items:
+            if project_items['power_conf']:
+                lines.append('动力配置: ' + ', '.join(project_items['power_conf']))
+            if project_items['business_detail']:
+                lines.append('具体事项: ' + '; '.join(project_items['business_detail']))
+            if project_items['de_range']:
+                lines.append('定义范围: ' + '; '.join(project_items['de_range']))
+        if months:
+            lines.append('月度工时: ' + ', '.join(f'{mm}: {hours:g}' for mm, hours in sorted(months.items())))
+
+        documents.append({
+            'key': project_id,
+            'version': project_version(project.update_time, len(work_hours[project_id]),
+                                       max(work_hours[project_id], default=None)),
+            'text': '\n'.join(lines),
+            'meta': {'name': project.measures_project, 'brand': brand, 'scale': scale, 'total_hours': total},
+        })
+    return documents
+
+
+def sync_project_index(index, task_names, rebuild=False, batch_size=200):
+    """
+    增量同步项目索引：新完成或更新过的项目重新生成文档，不再是已完成状态的项目从索引中移除。
+
+    Returns:
+        {'indexed': 新增或更新的项目数, 'removed': 移除的项目数}
+    """
+    current = completed_project_versions()
+    indexed = {} if rebuild else index.versions()
+    if rebuild:
+        index.remove(index.versions().keys())
+    changed = [project_id for project_id, version in current.items() if indexed.get(project_id) != version]
+    removed = index.remove(key for key in indexed if key not in current)
+
+    count = 0
+    for start in range(0, len(changed), batch_size):
+        count += index.upsert(build_project_documents(changed[start:start + batch_size], task_names))
+    index.last_sync = time.time()
+    return {'indexed': count, 'removed': removed}
+
+
+def run_sync_project_index(payload, progress):
+    """ 后台任务：增量同步历史项目索引。 """
+    return {'data': sync_project_index(project_index, load_task_names())}, 200
+
+
+job_queue.register('sync_project_index', run_sync_project_index)
+
+
+def schedule_index_sync(interval):
+    """
+    距本进程上次提交同步超过 interval 秒时提交一次增量同步任务，不在对话请求中同步。
+    幂等键按时间段划分，多个 worker 进程在同一时间段内只会执行一次；索引文件更新后各进程按需重新加载。
+    """
+    global _next_sync
+    now = time.time()
+    if now < _next_sync:
+        return None
+    with _schedule_lock:
+        if now < _next_sync:
+            return None
+        _next_sync = now + interval
+    job, _ = job_queue.enqueue('sync_project_index', {}, idempotency_key=f'index-{int(now // interval)}')
+    return job
+
+
+def retrieve_context(index, question, top_k, budget):
+    """ 检索与问题最相关的项目，按 token 预算拼接为上下文；没有相关项目时返回空字符串。 """
+    hits = [row for score, row in index.search(question, k=top_k) if score > 0]
+    if not hits:
+        return ''
+    return assemble_context([row['text'] for row in hits], budget, header=CONTEXT_HEADER)
@@ -1,8 +1,37 @@
+from sqlalchemy import event, text
+
 from app.db.db import db
 
 
+def to_key(value):
+    """
+    将字符串形式的ID转换为 BIGINT 键，无法转换时返回 None。
+    """
+    if value is None:
+        return None
+    value = str(value).strip()
+    return int(value) if value.isdigit() else None
+
+
+def typed_key_default(source):
+    """
+    生成影子键列的默认值函数：插入时根据源字符串列计算对应的 BIGINT 键。
+    """
+    def default(context):
+        return to_key(context.get_current_parameters().get(source))
+    return default
+
+
 class LisProject(db.Model):
     __tablename__ = 'lis_project'
+    __table_args__ = (
+        # 待办任务: measure_status + measure_tag
+        db.Index('ix_lis_project_status_tag', 'measure_status', 'measure_tag'),
+        # 历史项目: measure_status + 品牌/规模过滤
+        db.Index('ix_lis_project_status_brand_sml', 'measure_status', 'brand', 'sml'),
+        # 条件请求的版本: MAX(update_time)
+        db.Index('ix_lis_project_update_time', 'update_time'),
+    )
     
     id = db.Column(db.BigInteger, primary_key=True)
     create_by = db.Column(db.BigInteger)
@@ -19,6 +48,11 @@ class LisProject(db.Model):
 
 class LisProjectOrder(db.Model):
     __tablename__ = 'lis_project_order'
+    __table_args__ = (
+        db.Index('ix_lis_project_order_project_id', 'project_id'),
+        # 条件请求的版本: MAX(update_time)
+        db.Index('ix_lis_project_order_update_time', 'update_time'),
+    )
     
     id = db.Column(db.BigInteger, primary_key=True)
     create_by = db.Column(db.BigInteger)
@@ -29,6 +63,8 @@ class LisProjectOrder(db.Model):
     order_name = db.Column(db.String(32))
     market = db.Column(db.String(2000))
     project_id = db.Column(db.String(32))
+    # project_id 的 BIGINT 影子键，用于与 lis_project.id 直接关联
+    project_key = db.Column(db.BigInteger, index=True, default=typed_key_default('project_id'))
 
 class LisOrderNode(db.Model):
     __tablename__ = 'lis_order_node'
@@ -45,6 +81,15 @@ class LisOrderNode(db.Model):
 
 class LisMeasurePerson(db.Model):
     __tablename__ = 'lis_measure_person'
+    __table_args__ = (
+        # 待办任务按人员过滤
+        db.Index('ix_lis_measure_person_person_project', 'person', 'project_key'),
+        # 任务详情与提交: project_id + person + person_department
+        db.Index('ix_lis_measure_person_project_person_dept', 'project_id', 'person', 'person_department'),
+        # 参考项目与历史项目按部门过滤
+        db.Index('ix_lis_measure_person_dept_project', 'person_department', 'project_key'),
+        db.Index('ix_lis_measure_person_update_time', 'update_time'),
+    )
 
     id = db.Column(db.BigInteger, primary_key=True)
     create_by = db.Column(db.BigInteger)
@@ -53,6 +98,8 @@ class LisMeasurePerson(db.Model):
     update_time = db.Column(db.DateTime)
     person = db.Column(db.String(32))
     project_id = db.Column(db.String(32))
+    # project_id 的 BIGINT 影子键，用于与 lis_project.id 直接关联
+    project_key = db.Column(db.BigInteger, index=True, default=typed_key_default('project_id'))
     measure_status = db.Column(db.String(32))
     type = db.Column(db.String(32))
     relation_tag = db.Column(db.String(32))
@@ -61,6 +108,10 @@ class LisMeasurePerson(db.Model):
 
 class BsBasicCenterHr(db.Model):
     __tablename__ = 'bs_basic_center_hr'
+    __table_args__ = (
+        db.Index('ix_bs_basic_center_hr_department', 'department_id', 'department_name'),
+        db.Index('ix_bs_basic_center_hr_update_time', 'update_time'),
+    )
 
     id = db.Column(db.BigInteger, primary_key=True)
     create_by = db.Column(db.BigInteger)
@@ -76,6 +127,9 @@ class BsBasicCenterHr(db.Model):
 
 class PmSheetControl(db.Model):
     __tablename__ = 'pm_sheet_control'
+    __table_args__ = (
+        db.Index('ix_pm_sheet_control_department', 'pm_department', 'see_sheet'),
+    )
 
     id = db.Column(db.BigInteger, primary_key=True)
     create_by = db.Column(db.BigInteger)
@@ -87,6 +141,14 @@ class PmSheetControl(db.Model):
 
 class PmWorkHours(db.Model):
     __tablename__ = 'pm_work_hours'
+    __table_args__ = (
+        db.Index('ix_pm_work_hours_project_power', 'select_project_id', 'power_conf'),
+        db.Index('ix_pm_work_hours_select_order', 'select_order'),
+        # Excel 导入按编号插入或更新
+        db.Index('ix_pm_work_hours_serial_number', 'serial_number'),
+        # 条件请求的版本: MAX(update_time)
+        db.Index('ix_pm_work_hours_update_time', 'update_time'),
+    )
 
     id = db.Column(db.BigInteger, primary_key=True)
     create_by = db.Column(db.BigInteger)
@@ -113,6 +175,10 @@ class PmWorkHours(db.Model):
 
 class PmMonthHoursDetail(db.Model):
     __tablename__ = 'pm_month_hours_detail'
+    __table_args__ = (
+        # 条件请求的版本: MAX(update_time)
+        db.Index('ix_pm_month_hours_detail_update_time', 'update_time'),
+    )
 
     id = db.Column(db.BigInteger, primary_key=True)
     create_by = db.Column(db.BigInteger)
@@ -123,12 +189,20 @@ class PmMonthHoursDetail(db.Model):
     base_id = db.Column(db.String(32))
     order_id = db.Column(db.String(32))
     measure_id = db.Column(db.String(32))
+    # measure_id 的 BIGINT 影子键，用于与 pm_work_hours.id 直接关联
+    measure_key = db.Column(db.BigInteger, index=True, default=typed_key_default('measure_id'))
     month_input = db.Column(db.String(32))
     select_project_id = db.Column(db.String(32))
     department = db.Column(db.String(32))
 
 class BaHoursBasis(db.Model):
     __tablename__ = 'ba_hours_basis'
+    __table_args__ = (
+        # 工时基准按动力配置/改动类型过滤
+        db.Index('ix_ba_hours_basis_power_change', 'power_type', 'change_type'),
+        db.Index('ix_ba_hours_basis_update_time', 'update_time'),
+        db.Index('ix_ba_hours_basis_serial_number', 'serial_number'),
+    )
 
     id = db.Column(db.BigInteger, primary_key=True)
     create_by = db.Column(db.BigInteger)
@@ -137,6 +211,8 @@ class BaHoursBasis(db.Model):
     update_time = db.Column(db.DateTime)
     department = db.Column(db.String(32))
     first_task = db.Column(db.String(32))
+    # first_task 的 BIGINT 影子键，用于与 lis_task.id 直接关联
+    first_task_key = db.Column(db.BigInteger, index=True, default=typed_key_default('first_task'))
     change_type = db.Column(db.String(32))
     power_type = db.Column(db.String(32))
     market = db.Column(db.String(500))
@@ -164,6 +240,10 @@ class BaHoursBasis(db.Model):
 
 class LisTask(db.Model):
     __tablename__ = 'lis_task'
+    __table_args__ = (
+        # 条件请求的版本: MAX(update_time)
+        db.Index('ix_lis_task_update_time', 'update_time'),
+    )
 
     id = db.Column(db.BigInteger, primary_key=True)
     create_by = db.Column(db.BigInteger)
@@ -174,4 +254,109 @@ class LisTask(db.Model):
     department = db.Column(db.String(100))
     section_office = db.Column(db.String(100))
     task_code = db.Column(db.String(32))
-    delete_tag = db.Column(db.Boolean)
\ No newline at end of file
+    delete_tag = db.Column(db.Boolean)
+
+
+class BfaTaskInbox(db.Model):
+    """
+    待办任务的物化表: 每个测算人员 (lis_measure_person) 一行，冗余项目和部门信息，
+    待办列表按 person 直接查询，不再每次关联 lis_measure_person、lis_project 和 bs_basic_center_hr。
+    只包含未完成 (measure_tag = '0') 且已下发 (measure_status = '1') 的项目。
+    """
+    __tablename__ = 'bfa_task_inbox'
+    __table_args__ = (
+        db.Index('ix_bfa_task_inbox_person', 'person', 'id'),
+    )
+
+    # 与 lis_measure_person.id 相同
+    id = db.Column(db.BigInteger, primary_key=True, autoincrement=False)
+    person = db.Column(db.String(32))
+    project_key = db.Column(db.BigInteger, index=True)
+    project_name = db.Column(db.String(200))
+    brand = db.Column(db.String(32))
+    sml = db.Column(db.String(100))
+    department_id = db.Column(db.String(100))
+    department_name = db.Column(db.String(100))
+    refreshed_at = db.Column(db.DateTime)
+
+
+# 影子键列与其源字符串列的对应关系: 模型 -> (源列, 影子键列)
+TYPED_KEYS = {
+    LisProjectOrder: ('project_id', 'project_key'),
+    LisMeasurePerson: ('project_id', 'project_key'),
+    PmMonthHoursDetail: ('measure_id', 'measure_key'),
+    BaHoursBasis: ('first_task', 'first_task_key'),
+}
+
+
+def _sync_typed_key(source, key):
+    def listener(mapper, connection, target):
+        setattr(target, key, to_key(getattr(target, source)))
+    return listener
+
+
+def typed_key_triggers(dialect, table, source, key):
+    """
+    维护影子键的数据库触发器，返回 [(名称, DDL)]。外部系统绕过 ORM 直接插入或更新源列时，
+    由数据库按与 to_key() 相同的规则 (去掉首尾空白后全为数字) 计算影子键，其他情况为 NULL。
+    只支持 SQLite 和 MySQL，其他数据库返回空列表，需要运行 flask bfa backfill-keys。
+    """
+    name = f'trg_{table}_{key}'
+    if dialect == 'sqlite':
+        value = (f"CASE WHEN TRIM(NEW.{source}) <> '' AND TRIM(NEW.{source}) NOT GLOB '*[^0-9]*' "
+                 f"THEN CAST(TRIM(NEW.{source}) AS INTEGER) END")
+        return [
+            (f'{name}_insert', f'CREATE TRIGGER {name}_insert AFTER INSERT ON {table} '
+                               f'FOR EACH ROW WHEN NEW.{key} IS NULL AND NEW.{source} IS NOT NULL '
+                               f'BEGIN UPDATE {table} SET {key} = {value} WHERE id = NEW.id; END'),
+            (f'{name}_update', f'CREATE TRIGGER {name}_update AFTER UPDATE OF {source} ON {table} '
+                               f'FOR EACH ROW BEGIN UPDATE {table} SET {key} = {value} WHERE id = NEW.id; END'),
+        ]
+    if dialect == 'mysql':
+        value = (f"CASE WHEN TRIM(NEW.{source}) REGEXP '^[0-9]+$' "
+                 f"THEN CAST(TRIM(NEW.{source}) AS UNSIGNED) END")
+        return [
+            (f'{name}_insert', f'CREATE TRIGGER {name}_insert BEFORE INSERT ON {table} '
+                               f'FOR EACH ROW SET NEW.{key} = {value}'),
+            (f'{name}_update', f'CREATE TRIGGER {name}_update BEFORE UPDATE ON {table} '
+                               f'FOR EACH ROW SET NEW.{key} = {value}'),
+        ]
+    return []
+
+
+def existing_triggers(connection):
+    """ 当前数据库中已有的触发器名称。 """
+    dialect = connection.dialect.name
+    if dialect == 'sqlite':
+        return set(connection.execute(text("SELECT name FROM sqlite_master WHERE type = 'trigger'")).scalars())
+    if dialect == 'mysql':
+        return set(connection.execute(text(
+            'SELECT TRIGGER_NAME FROM information_schema.TRIGGERS WHERE TRIGGER_SCHEMA = DATABASE()'
+        )).scalars())
+    return set()
+
+
+def install_typed_key_triggers(connection, models=None):
+    """ 创建缺失的影子键触发器，返回新建的触发器名称。 """
+    existing = existing_triggers(connection)
+    created = []
+    for model in models or TYPED_KEYS:
+        source, key = TYPED_KEYS[model]
+        for name, ddl in typed_key_triggers(connection.dialect.name, model.__tablename__, source, key):
+            if name not in existing:
+                connection.execute(text(ddl))
+                created.append(name)
+    return created
+
+
+def _create_triggers(model):
+    def listener(target, connection, **kw):
+        install_typed_key_triggers(connection, [model])
+    return listener
+
+
+for _model, (_source, _key) in TYPED_KEYS.items():
+    # 通过 ORM 更新源列时同步刷新影子键
+    event.listen(_model, 'before_update', _sync_typed_key(_source, _key))
+    # 新建表时一并创建触发器；已有的表由 flask bfa migrate 补齐
+    event.listen(_model.__table__, 'after_create', _create_triggers(_model))
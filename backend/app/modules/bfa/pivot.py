@@ -0,0 +1,108 @@
+import numpy as np
+
+MISSING_BASELINE = '未找到工时基准表'
+
+
+def parse_month_inputs(values):
+    """
+    将 month_input 字符串批量转换为浮点数，无法解析的值记为 0。
+    先整体转换，只有存在非法值时才逐个处理。
+    """
+    raw = np.asarray(values, dtype=object)
+    try:
+        return np.array(raw.tolist(), dtype=np.float64)
+    except (ValueError, TypeError):
+        def to_float(value):
+            try:
+                return float(value)
+            except (ValueError, TypeError):
+                return 0.0
+        return np.frompyfunc(to_float, 1, 1)(raw).astype(np.float64)
+
+
+def pivot_month_hours(measure_ids, months, month_inputs):
+    """
+    将 (工时行ID, 月份, 月度工时) 的扁平序列透视为 工时行 x 月份 的矩阵。
+
+    Args:
+        measure_ids: 每条记录所属的工时行ID，已按工时行ID排序。
+        months: 每条记录的月份 (mm)，可能为空。
+        month_inputs: 每条记录的月度工时字符串，可能为空。
+
+    Returns:
+        (row_ids, first_index, columns, values, present, totals, has_months)
+        row_ids 为按出现顺序排列的工时行ID；first_index 为每个工时行首条记录的下标；
+        columns 为按字符串排序的月份列；values/present 为月度工时矩阵及其是否有值的掩码；
+        totals 为每行的填报总工时，has_months 标记每行是否有月度数据。
+    """
+    measure_ids = np.asarray(measure_ids, dtype=np.int64)
+    # 输入已按工时行ID排序，相邻ID变化处即为新的一行，无需再排序
+    starts = np.empty(len(measure_ids), dtype=bool)
+    starts[:1] = True
+    np.not_equal(measure_ids[1:], measure_ids[:-1], out=starts[1:])
+    first_index = np.flatnonzero(starts)
+    row_ids = measure_ids[first_index]
+    row_index = np.cumsum(starts) - 1
+
+    months = np.asarray(months, dtype=object)
+    month_inputs = np.asarray(month_inputs, dtype=object)
+    # 与原逻辑一致：月份和工时均非空 (且月份不为 0) 时才计入
+    valid = (months != None) & (months != 0) & (month_inputs != None) & (month_inputs != '')  # noqa: E711
+
+    values_flat = parse_month_inputs(month_inputs[valid])
+    # 先按整数去重，只对去重后的月份转字符串，再按字符串排序
+    month_values, month_index = np.unique(months[valid].astype(np.int64), return_inverse=True)
+    labels = month_values.astype(str)
+    label_order = np.argsort(labels, kind='stable')
+    label_rank = np.empty_like(label_order)
+    label_rank[label_order] = np.arange(len(label_order))
+    columns, column_index = labels[label_order], label_rank[month_index]
+    valid_rows = row_index[valid]
+
+    values = np.zeros((len(row_ids), len(columns)), dtype=np.float64)
+    present = np.zeros((len(row_ids), len(columns)), dtype=bool)
+    # 同一行同一月份有多条记录时，单元格取最后一条，总工时累加全部记录
+    values[valid_rows, column_index] = values_flat
+    present[valid_rows, column_index] = True
+    totals = np.bincount(valid_rows, weights=values_flat, minlength=len(row_ids))
+    has_months = np.bincount(valid_rows, minlength=len(row_ids)) > 0
+
+    return row_ids, first_index, columns.tolist(), values, present, totals, has_months
+
+
+def build_history_table(rows, task_names):
+    """
+    将 get_historical_project_details 的查询结果构建为前端表格数据。
+
+    Returns:
+        (table_data, dynamic_columns)
+    """
+    if not rows:
+        return [], []
+
+    # 只取透视需要的三列，其余字段从每个工时行的首条记录读取
+    row_ids, first_index, dynamic_columns, values, present, totals, has_months = pivot_month_hours(
+        [row.measure_id for row in rows], [row.mm for row in rows], [row.month_input for row in rows]
+    )
+    cells = np.where(present, values.astype(object), '').tolist() if dynamic_columns else [[] for _ in row_ids]
+    totals = totals.tolist()
+    has_months = has_months.tolist()
+
+    table_data = []
+    for index, (first, row_cells) in enumerate(zip(first_index.tolist(), cells)):
+        row = rows[first]
+        first_task_name = task_names.get(row.first_task_key)
+        row_data = {
+            'id': row.measure_id,
+            '序号': index + 1,
+            '动力配置': row.power_conf,
+            '一级任务': first_task_name if first_task_name is not None else MISSING_BASELINE,
+            '改动类型': row.change_type if row.change_type is not None else MISSING_BASELINE,
+            '定义范围': row.de_range if row.de_range is not None else MISSING_BASELINE,
+            '具体事项': row.business_detail,
+            '基准工时': float(row.base_hours) if row.base_hours is not None else 0,
+            '填报总工时': totals[index] if has_months[index] else 0,
+        }
+        row_data.update(zip(dynamic_columns, row_cells))
+        table_data.append(row_data)
+    return table_data, dynamic_columns
@@ -0,0 +1,92 @@
+import numpy as np
+from sqlalchemy import func
+
+from app.db.db import db
+from app.services.cache import reference_cache
+from .models import BaHoursBasis, BsBasicCenterHr, LisTask, PmSheetControl
+from .pivot import parse_month_inputs
+
+
+def baseline_query():
+    """
+    工时基准查询的列，一级任务名称在格式化时从缓存的任务名称映射中获取。
+    """
+    return db.session.query(
+        BaHoursBasis.id,
+        BaHoursBasis.power_type,
+        BaHoursBasis.first_task_key,
+        BaHoursBasis.change_type,
+        BaHoursBasis.de_range,
+        BaHoursBasis.total_hour
+    )
+
+
+def format_baseline(row, task_names):
+    """
+    将一行工时基准格式化为前端 BaselineBusinessModal.jsx 要求的字段和顺序。
+    """
+    return {
+        "id": row.id,
+        "动力配置": row.power_type,
+        "一级任务": task_names.get(row.first_task_key),
+        "改动类型": row.change_type,
+        "定义范围": row.de_range,
+        "具体事项": "",  # 注意：基准库中无此字段，暂时留空
+        "基准工时": row.total_hour
+    }
+
+
+def load_baselines():
+    """
+    完整的工时基准列表，关联一级任务名称。
+    """
+    def loader():
+        task_names = load_task_names()
+        return [format_baseline(row, task_names) for row in baseline_query().all()]
+    return reference_cache.region('baselines').get_or_load('all', loader)
+
+
+def load_department_names():
+    """
+    部门ID到部门名称的映射。部门ID可能重复，每个ID取一个名称。
+    """
+    def loader():
+        rows = db.session.query(
+            BsBasicCenterHr.department_id,
+            func.min(BsBasicCenterHr.department_name)
+        ).group_by(BsBasicCenterHr.department_id).all()
+        return {department_id: department_name for department_id, department_name in rows}
+    return reference_cache.region('departments').get_or_load('all', loader)
+
+
+def load_visible_sheets(department_id):
+    """
+    指定部门可见的表权限列表。
+    """
+    def loader():
+        sheets = db.session.query(PmSheetControl.see_sheet).filter(
+            PmSheetControl.pm_department == department_id
+        ).all()
+        return [sheet[0] for sheet in sheets]
+    return reference_cache.region('sheet_permissions').get_or_load(department_id, loader)
+
+
+def load_task_names():
+    """
+    一级任务ID到任务名称的映射。
+    """
+    def loader():
+        return dict(db.session.query(LisTask.id, LisTask.first_task).all())
+    return reference_cache.region('task_names').get_or_load('all', loader)
+
+
+def load_baseline_hours():
+    """
+    工时基准ID到基准工时 (浮点数) 的映射，由缓存的工时基准列表生成，无法解析的基准工时不计入。
+    """
+    def loader():
+        baselines = load_baselines()
+        hours = parse_month_inputs([row['基准工时'] if row['基准工时'] not in (None, '') else 'nan'
+                                    for row in baselines])
+        return {row['id']: float(value) for row, value in zip(baselines, hours) if not np.isnan(value)}
+    return reference_cache.region('baseline_hours').get_or_load('all', loader)
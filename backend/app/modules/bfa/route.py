@@ -1,10 +1,14 @@
 from flask import Blueprint, request
 from .controller import BfaController
+from app.services.conditional import conditional_get
+from app.services.response_cache import response_cache
+from .versions import namespace_version, project_details_version, tasks_version
 
 bfa_bp = Blueprint('bfa', __name__)
 bfa_controller = BfaController()
 
 @bfa_bp.route('/tasks', methods=['GET'])
+@conditional_get.versioned(tasks_version)
 def get_tasks():
     return bfa_controller.get_tasks()
 
@@ -13,10 +17,14 @@ def get_task_details(task_id):
     return bfa_controller.get_task_details(task_id)
 
 @bfa_bp.route('/history', methods=['GET'])
+@conditional_get.versioned(namespace_version('history'))
+@response_cache.cached('history')
 def get_history():
     return bfa_controller.get_historical_projects()
 
 @bfa_bp.route('/persons', methods=['GET'])
+@conditional_get.versioned(namespace_version('persons'))
+@response_cache.cached('persons')
 def get_persons():
     return bfa_controller.get_all_persons()
 
@@ -25,6 +33,10 @@ def chat():
     data = request.get_json()
     return bfa_controller.handle_chat(data)
 
+@bfa_bp.route('/chat/stats', methods=['GET'])
+def get_chat_stats():
+    return bfa_controller.get_chat_stats()
+
 @bfa_bp.route('/tasks/<int:task_id>/historical-projects', methods=['GET'])
 def get_historical_projects_for_task(task_id):
     return bfa_controller.get_historical_projects_for_task(task_id)
@@ -32,7 +44,15 @@ def get_historical_projects_for_task(task_id):
 @bfa_bp.route('/tasks/<int:task_id>/calculate', methods=['POST'])
 def generate_calculation(task_id):
     data = request.get_json()
-    return bfa_controller.generate_calculation(data)
+    return bfa_controller.generate_calculation(task_id, data)
+
+@bfa_bp.route('/calculations/<string:calculation_id>', methods=['GET'])
+def get_calculation(calculation_id):
+    return bfa_controller.get_calculation(calculation_id)
+
+@bfa_bp.route('/calculations/<string:calculation_id>/export', methods=['GET'])
+def export_calculation(calculation_id):
+    return bfa_controller.export_calculation(calculation_id)
 
 @bfa_bp.route('/calculations/modify', methods=['POST'])
 def modify_calculation():
@@ -49,19 +69,51 @@ def submit_task(task_id):
     data = request.get_json()
     return bfa_controller.submit_task(task_id, data)
 
+@bfa_bp.route('/jobs', methods=['GET'])
+def get_jobs():
+    return bfa_controller.get_jobs()
+
+@bfa_bp.route('/jobs/<string:job_id>', methods=['GET'])
+def get_job(job_id):
+    return bfa_controller.get_job(job_id)
+
 @bfa_bp.route('/tasks/<string:task_id>/reference-projects', methods=['GET'])
 def get_reference_projects(task_id):
     department_id = request.args.get('department_id')
     return bfa_controller.get_reference_projects(task_id, department_id)
 
 @bfa_bp.route('/history/<string:project_id>/details', methods=['GET'])
+@conditional_get.versioned(project_details_version)
+@response_cache.cached('history_details')
 def get_historical_project_details(project_id):
     return bfa_controller.get_historical_project_details(project_id)
 
+@bfa_bp.route('/history/<string:project_id>/summary', methods=['GET'])
+@conditional_get.versioned(project_details_version)
+@response_cache.cached('history_summary')
+def get_historical_project_summary(project_id):
+    return bfa_controller.get_historical_project_summary(project_id)
+
+@bfa_bp.route('/history/rollup', methods=['GET'])
+@conditional_get.versioned(namespace_version('history_rollup'))
+@response_cache.cached('history_rollup')
+def get_history_rollup():
+    return bfa_controller.get_history_rollup()
+
+@bfa_bp.route('/history/export', methods=['GET'])
+def export_history_details():
+    return bfa_controller.export_history_details()
+
 @bfa_bp.route('/baselines', methods=['GET'])
+@conditional_get.versioned(namespace_version('baselines'))
+@response_cache.cached('baselines')
 def get_all_baselines():
     return bfa_controller.get_all_baselines()
 
 @bfa_bp.route('/projects/<string:project_id>/order-names', methods=['GET'])
 def get_project_order_names(project_id):
-    return bfa_controller.get_project_order_names(project_id)
\ No newline at end of file
+    return bfa_controller.get_project_order_names(project_id)
+
+@bfa_bp.route('/cache/stats', methods=['GET'])
+def get_cache_stats():
+    return bfa_controller.get_cache_stats()
@@ -0,0 +1,84 @@
+from sqlalchemy import bindparam, inspect, select, text, update
+from sqlalchemy.schema import CreateColumn
+
+from app.db.db import db
+from .models import TYPED_KEYS, install_typed_key_triggers, to_key
+
+
+def migrate_schema():
+    """
+    将模型中新增的列、索引和影子键触发器同步到已有数据库。
+    db.create_all() 只会创建缺失的表，不会修改已有表，因此这里逐表补齐缺失的列、索引和触发器。
+    返回执行过的变更描述列表。
+    """
+    db.create_all()
+    engine = db.engine
+    inspector = inspect(engine)
+    changes = []
+
+    with engine.begin() as conn:
+        for table in db.metadata.sorted_tables:
+            existing_columns = {col['name'] for col in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing_columns:
+                    continue
+                column_ddl = CreateColumn(column).compile(dialect=engine.dialect)
+                conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column_ddl}'))
+                changes.append(f'{table.name}: 新增列 {column.name}')
+
+    # 新增列之后重新读取索引信息
+    inspector = inspect(engine)
+    for table in db.metadata.sorted_tables:
+        existing_indexes = {idx['name'] for idx in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name in existing_indexes:
+                continue
+            index.create(bind=engine)
+            changes.append(f'{table.name}: 新增索引 {index.name}')
+
+    # 影子键触发器：外部系统直接写入的行也能得到影子键
+    with engine.begin() as conn:
+        changes.extend(f'新增触发器 {name}' for name in install_typed_key_triggers(conn))
+
+    return changes
+
+
+def backfill_typed_keys(batch_size=5000):
+    """
+    按主键分批回填影子键列 (project_key / measure_key / first_task_key)，见 models.TYPED_KEYS。
+    只处理影子键为空而源列不为空的行，可重复执行；触发器创建之前已有的行需要回填一次。
+    返回每张表回填的行数。
+    """
+    results = {}
+    for model, (source, key) in TYPED_KEYS.items():
+        table = model.__table__
+        source_col, key_col = table.c[source], table.c[key]
+        stmt = update(table).where(table.c.id == bindparam('_id')).values({key: bindparam('_key')})
+
+        filled = 0
+        last_id = None
+        while True:
+            query = select(table.c.id, source_col).where(
+                key_col.is_(None),
+                source_col.isnot(None)
+            ).order_by(table.c.id).limit(batch_size)
+            if last_id is not None:
+                query = query.where(table.c.id > last_id)
+
+            rows = db.session.execute(query).all()
+            if not rows:
+                break
+            last_id = rows[-1].id
+
+            # 在 Python 中转换，避免非数字的历史数据在严格模式下导致 UPDATE 失败
+            params = [
+                {'_id': row.id, '_key': to_key(row[1])}
+                for row in rows if to_key(row[1]) is not None
+            ]
+            if params:
+                db.session.execute(stmt, params)
+                filled += len(params)
+            db.session.commit()
+
+        results[table.name] = filled
+    return results
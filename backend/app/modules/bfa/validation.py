@@ -0,0 +1,149 @@
+import numpy as np
+
+from .calculation import month_codes, month_index
+from .models import to_key
+
+# 断档检查展开的最大月份数
+MAX_GAP_SPAN = 1200
+# 规则名称及提示，返回给前端的 errors 中 rule 字段取这里的键
+RULES = {
+    'invalid_hours': '月度工时必须为非负数',
+    'month_gap': '月度工时不连续，中间月份未填报',
+    'total_mismatch': '填报总工时与月度工时之和不一致',
+    'diff_mismatch': '差异工时与 填报总工时 - 基准工时 不一致',
+    'baseline_mismatch': '基准工时与工时基准表不一致',
+    'deviation_reason': '与基准工时偏差超过允许范围，必须填写差异原因',
+    'duplicate': '动力配置和具体事项重复',
+}
+
+
+def _parse_cells(cells):
+    """
+    将单元格矩阵转换为浮点矩阵：空单元格为 NaN，无法解析或为负数的单元格另行标记。
+    先整体转换，只有存在非法值时才逐个处理。
+
+    Returns:
+        (values, invalid)
+    """
+    empty = np.frompyfunc(lambda value: value is None or value == '', 1, 1)(cells).astype(bool)
+    filled = np.where(empty, np.nan, cells)
+    try:
+        values = filled.astype(np.float64)
+        invalid = np.zeros(values.shape, dtype=bool)
+    except (ValueError, TypeError):
+        def to_float(value):
+            try:
+                return float(value)
+            except (ValueError, TypeError):
+                return np.inf
+        values = np.frompyfunc(to_float, 1, 1)(filled).astype(np.float64)
+        invalid = np.isinf(values)
+    invalid |= values < 0
+    values[invalid] = np.nan
+    return values, invalid
+
+
+def _column(rows, name):
+    return np.array([row.get(name) for row in rows], dtype=object)
+
+
+def _numbers(values):
+    """ 将一列可能为空的数值转换为浮点数，空值或无法解析的值为 NaN。 """
+    def to_float(value):
+        try:
+            return float(value) if value not in (None, '') else np.nan
+        except (ValueError, TypeError):
+            return np.nan
+    return np.frompyfunc(to_float, 1, 1)(values).astype(np.float64)
+
+
+def validate_timesheet(table_data, dynamic_columns, baseline_hours, tolerance=0.1, decimals=1):
+    """
+    按列整体校验测算表，所有规则都以 行 x 月份 矩阵运算完成。
+
+    Args:
+        table_data: 测算表行，字段同生成测算结果。
+        dynamic_columns: 月份列 (YYYYMM)。
+        baseline_hours: 工时基准ID -> 基准工时，一次加载后供所有行使用。
+        tolerance: 填报总工时与基准工时的相对偏差超过该比例时必须填写差异原因。
+
+    Returns:
+        (errors, summary) errors 为 [{'id', 'column', 'rule', 'message'}]，summary 为每条规则的错误数。
+    """
+    rows = table_data
+    count = len(rows)
+    columns = sorted((str(column) for column in dynamic_columns), key=int)
+    ids = _column(rows, 'id')
+    errors = []
+
+    def report(rule, mask, column_names, message=None):
+        for row, col in zip(*np.nonzero(mask)):
+            errors.append({'id': ids[row], 'column': column_names[col], 'rule': rule,
+                           'message': message[row] if message is not None else RULES[rule]})
+
+    cells = np.array([[row.get(column) for column in columns] for row in rows], dtype=object)
+    cells = cells.reshape(count, len(columns))
+    values, invalid = _parse_cells(cells)
+    report('invalid_hours', invalid, columns)
+
+    present = ~np.isnan(values) | invalid
+    if columns:
+        # 按月序号展开为连续月份，首尾填报月份之间的空月份即为断档
+        indexes = month_index([int(column) for column in columns])
+        span = np.arange(indexes.min(), indexes.max() + 1)
+        if len(span) > MAX_GAP_SPAN:
+            # 混有只含月份的旧数据时跨度过大，只在已有的月份列之间检查
+            span = indexes
+        positions = np.searchsorted(span, indexes)
+        filled = np.zeros((count, len(span)), dtype=bool)
+        filled[:, positions] = present
+        ever = np.maximum.accumulate(filled, axis=1)
+        until = np.maximum.accumulate(filled[:, ::-1], axis=1)[:, ::-1]
+        gaps = ever & until & ~filled
+        labels = month_codes(span).astype(str).tolist()
+        report('month_gap', gaps, labels)
+
+    totals = np.round(np.nansum(values, axis=1), decimals)
+    base = _numbers(_column(rows, '基准工时'))
+    declared_totals = _numbers(_column(rows, '填报总工时'))
+    declared_diffs = _numbers(_column(rows, '差异工时'))
+    report('total_mismatch', (~np.isnan(declared_totals) & (np.abs(declared_totals - totals) > 1e-6))[:, None],
+           ['填报总工时'])
+    expected_diffs = np.round(totals - np.nan_to_num(base), decimals)
+    report('diff_mismatch', (~np.isnan(declared_diffs) & (np.abs(declared_diffs - expected_diffs) > 1e-6))[:, None],
+           ['差异工时'])
+
+    # 关联了工时基准的行，以工时基准表中的基准工时为准；前端提交的 baseline_id 可能是字符串，按整数键查找
+    baseline_ids = _column(rows, 'baseline_id')
+    reference = np.array([baseline_hours.get(to_key(value), np.nan) for value in baseline_ids.tolist()],
+                         dtype=np.float64)
+    matched = ~np.isnan(reference)
+    report('baseline_mismatch', (matched & (np.abs(np.nan_to_num(base) - reference) > 1e-6))[:, None], ['基准工时'])
+    expected = np.where(matched, reference, base)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        deviation = np.abs(totals - expected) / np.abs(expected)
+    deviation = np.where(expected == 0, np.where(totals == 0, 0.0, np.inf), deviation)
+    reasons = _column(rows, '差异原因')
+    no_reason = np.array([not str(value).strip() if value is not None else True for value in reasons.tolist()],
+                         dtype=bool)
+    deviated = ~np.isnan(expected) & (deviation > tolerance) & no_reason
+    messages = np.array([
+        f"{RULES['deviation_reason']} (填报 {total:g}，基准 {value:g})" for total, value in zip(totals, expected)
+    ], dtype=object) if deviated.any() else None
+    report('deviation_reason', deviated[:, None], ['差异原因'], messages)
+
+    # 动力配置 + 具体事项 重复：对组合键分组，组内除第一行外都报错并指出首次出现的行
+    if count:
+        keys = np.array([f'{power_conf}\x1f{detail}' for power_conf, detail in zip(
+            _column(rows, '动力配置').tolist(), _column(rows, '具体事项').tolist())], dtype=object)
+        _, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+        duplicated = first[inverse] != np.arange(count)
+        messages = np.array([f"{RULES['duplicate']} (与行 {ids[index]} 重复)" for index in first[inverse]],
+                            dtype=object) if duplicated.any() else None
+        report('duplicate', duplicated[:, None], ['具体事项'], messages)
+
+    summary = {rule: 0 for rule in RULES}
+    for error in errors:
+        summary[error['rule']] += 1
+    return errors, summary
@@ -0,0 +1,72 @@
+from flask import current_app, request
+from sqlalchemy import func, select
+
+from app.db.db import db
+from .inbox import inbox_available
+from .models import BfaTaskInbox, LisProjectOrder, PmMonthHoursDetail, PmWorkHours
+
+
+def table_version(table, *criteria, time_column='update_time'):
+    """
+    一张表 (或其中按条件筛选的部分) 的版本。
+    带条件时取筛选范围内的行数、最大ID 和最大更新时间，条件列均有索引，只读取范围内的行；
+    新增行改变行数和最大ID，删除行改变行数，更新行改变更新时间。
+    整表不统计行数 (COUNT(*) 需要扫描整张表)，只取最大ID 和最大更新时间，
+    分别作为标量子查询，主键和 update_time 索引各查找一次即可得到；
+    这些表以 delete_tag 标记删除 (同时更新 update_time)，物理删除旧行不改变版本。
+
+    Returns:
+        (版本字符串, 最大更新时间或 None)
+    """
+    if criteria:
+        query = select(func.count(), func.max(table.c.id), func.max(table.c[time_column])).where(*criteria)
+        count, max_id, updated = db.session.execute(query).one()
+        prefix = f"{table.name}:{count}"
+    else:
+        # 两个 MAX 放在同一个 SELECT 中时 SQLite 不再走索引，需拆成两个子查询
+        query = select(select(func.max(table.c.id)).scalar_subquery(),
+                       select(func.max(table.c[time_column])).scalar_subquery())
+        max_id, updated = db.session.execute(query).one()
+        prefix = table.name
+    return f"{prefix}:{max_id or ''}:{updated.isoformat() if updated else ''}", updated
+
+
+def combine(versions):
+    """ 合并多张表的版本，最后修改时间取其中最晚的一个。 """
+    times = [updated for _, updated in versions if updated is not None]
+    return '|'.join(token for token, _ in versions), max(times) if times else None
+
+
+def tables_version(*table_names):
+    return combine([table_version(db.metadata.tables[name]) for name in table_names])
+
+
+def namespace_version(namespace):
+    """ 按响应缓存命名空间配置的依赖表计算版本，返回供 conditional_get.versioned 使用的函数。 """
+    def version(*args, **kwargs):
+        return tables_version(*current_app.config['RESPONSE_CACHE_NAMESPACES'][namespace]['tables'])
+    return version
+
+
+def tasks_version(*args, **kwargs):
+    """ 待办列表的版本：物化表中该人员的行 (刷新时 refreshed_at 更新)；物化表未创建时取关联的三张表。 """
+    if not inbox_available(db.session.connection()):
+        return tables_version('lis_project', 'lis_measure_person', 'bs_basic_center_hr')
+    table = BfaTaskInbox.__table__
+    person_id = request.args.get('person_id')
+    criteria = [table.c.person == person_id] if person_id else []
+    return combine([table_version(table, *criteria, time_column='refreshed_at')])
+
+
+def project_details_version(project_id, **kwargs):
+    """ 单个历史项目的版本：该项目的订单、工时行和月度明细，以及全局的工时基准和一级任务。 """
+    orders = select(LisProjectOrder.id).where(LisProjectOrder.project_id == str(project_id))
+    work_hours = select(PmWorkHours.id).where(PmWorkHours.select_order.in_(orders))
+    return combine([
+        table_version(LisProjectOrder.__table__, LisProjectOrder.project_id == str(project_id)),
+        table_version(PmWorkHours.__table__, PmWorkHours.select_order.in_(orders)),
+        table_version(PmMonthHoursDetail.__table__, PmMonthHoursDetail.measure_key.in_(work_hours)),
+        table_version(db.metadata.tables['ba_hours_basis']),
+        table_version(db.metadata.tables['lis_task']),
+    ])
+
@@ -0,0 +1,231 @@
+import asyncio
+import os
+import queue
+import threading
+import time
+from collections import deque
+
+import httpx
+from openai import AsyncOpenAI
+
+# 输出队列中的结束标记；_COMPLETED 表示上游正常生成完毕
+_DONE = object()
+_COMPLETED = object()
+
+
+class GatewayBusy(Exception):
+    """ 模型的并发和排队名额均已用完，调用方应稍后重试。 """
+
+
+class _ModelState:
+    """
+    单个模型的准入状态和统计。pending 在调用线程中维护，信号量只在事件循环线程中使用。
+    """
+
+    def __init__(self, max_concurrency):
+        self.max_concurrency = max_concurrency
+        self.semaphore = None
+        self.pending = 0
+        self.active = 0
+        self.completed = 0
+        self.rejected = 0
+        self.cancelled = 0
+        self.queue_timeouts = 0
+        self.errors = 0
+        # 最近的排队等待时间(秒)，用于计算分位数
+        self.wait_times = deque(maxlen=1000)
+
+
+class AIGateway:
+    """
+    流式对话网关。所有上游请求在一个后台事件循环中通过共享的 AsyncOpenAI 客户端发出，
+    连接池保持长连接；每个模型有独立的并发上限和排队上限，排满时直接拒绝 (GatewayBusy)。
+    调用方拿到的是普通的同步生成器，生成器被关闭 (客户端断开) 时取消上游请求，
+    Ollama 随之停止生成。
+    """
+
+    def __init__(self, api_base_url, max_concurrency=2, model_concurrency=None, max_queue=8,
+                 queue_timeout=60.0, max_connections=8, timeout=120.0, transport=None):
+        self.api_base_url = api_base_url
+        self.max_concurrency = max_concurrency
+        self.model_concurrency = model_concurrency or {}
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.transport = transport
+        self._models = {}
+        self._guard = threading.Lock()
+        self._loop = None
+        self._client = None
+        self._pid = None
+
+    def _ensure_loop(self):
+        # 事件循环线程不会被 fork 复制，gunicorn worker 中首次使用时重新创建
+        with self._guard:
+            if self._loop is not None and self._pid == os.getpid():
+                return self._loop
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=loop.run_forever, name='ai-gateway', daemon=True)
+            thread.start()
+            self._client = AsyncOpenAI(
+                base_url=self.api_base_url,
+                api_key='ollama',
+                http_client=httpx.AsyncClient(
+                    timeout=self.timeout,
+                    limits=httpx.Limits(
+                        max_connections=self.max_connections,
+                        max_keepalive_connections=self.max_connections,
+                    ),
+                    transport=self.transport,
+                ),
+            )
+            self._loop, self._pid = loop, os.getpid()
+            self._models = {}
+            return loop
+
+    def _state(self, model):
+        state = self._models.get(model)
+        if state is None:
+            state = self._models[model] = _ModelState(self.model_concurrency.get(model, self.max_concurrency))
+        return state
+
+    def _admit(self, model):
+        """ 在调用线程中占用一个名额 (执行中或排队中)，名额用完时抛出 GatewayBusy。 """
+        with self._guard:
+            state = self._state(model)
+            if state.pending >= state.max_concurrency + self.max_queue:
+                state.rejected += 1
+                raise GatewayBusy(f'模型 {model} 的并发和排队名额已满')
+            state.pending += 1
+            return state
+
+    def stream_chat(self, model, messages, temperature=0.0, busy_message=None, error_message=None,
+                    on_complete=None):
+        """
+        准入检查后返回一个同步生成器，逐段产出模型回复。
+        准入检查在调用时立即执行，调用方可以在开始流式响应前处理 GatewayBusy。
+        on_complete(完整回复) 只在上游正常生成完毕且调用方读完整个流时，在调用方线程中执行。
+        """
+        loop = self._ensure_loop()
+        state = self._admit(model)
+        chunks = queue.Queue()
+        try:
+            future = asyncio.run_coroutine_threadsafe(
+                self._generate(state, model, messages, temperature, chunks, busy_message, error_message), loop
+            )
+        except BaseException:
+            with self._guard:
+                state.pending -= 1
+            raise
+        return self._drain(future, chunks, on_complete)
+
+    def _drain(self, future, chunks, on_complete):
+        received = []
+        completed = False
+        try:
+            while True:
+                chunk = chunks.get()
+                if chunk is _DONE:
+                    break
+                if chunk is _COMPLETED:
+                    completed = True
+                    continue
+                received.append(chunk)
+                yield chunk
+        finally:
+            # 生成器提前关闭 (客户端断开) 时取消上游请求
+            if not future.done():
+                future.cancel()
+        if completed and on_complete is not None:
+            on_complete(''.join(received))
+
+    async def _generate(self, state, model, messages, temperature, chunks, busy_message, error_message):
+        enqueued_at = time.monotonic()
+        acquired = False
+        try:
+            if state.semaphore is None:
+                state.semaphore = asyncio.Semaphore(state.max_concurrency)
+            try:
+                await asyncio.wait_for(state.semaphore.acquire(), self.queue_timeout)
+            except asyncio.TimeoutError:
+                self._count(state, 'queue_timeouts')
+                if busy_message:
+                    chunks.put(busy_message)
+                return
+            acquired = True
+            with self._guard:
+                state.wait_times.append(time.monotonic() - enqueued_at)
+                state.active += 1
+
+            stream = await self._client.chat.completions.create(
+                model=model,
+                messages=messages,
+                temperature=temperature,
+                stream=True,
+            )
+            try:
+                async for chunk in stream:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        chunks.put(chunk.choices[0].delta.content)
+            finally:
+                # 关闭上游连接，取消时 Ollama 会停止生成
+                await stream.close()
+            self._count(state, 'completed')
+            chunks.put(_COMPLETED)
+        except asyncio.CancelledError:
+            self._count(state, 'cancelled')
+            raise
+        except Exception as e:
+            self._count(state, 'errors')
+            print(f"Error communicating with Ollama: {type(e).__name__}: {e}")
+            if error_message:
+                chunks.put(error_message)
+        finally:
+            if acquired:
+                state.semaphore.release()
+            with self._guard:
+                if acquired:
+                    state.active -= 1
+                state.pending -= 1
+            chunks.put(_DONE)
+
+    def embed(self, model, text):
+        """
+        同步计算文本向量，复用网关的连接池。向量模型开销小，不受对话并发上限限制。
+        """
+        loop = self._ensure_loop()
+        future = asyncio.run_coroutine_threadsafe(
+            self._client.embeddings.create(model=model, input=text), loop
+        )
+        return future.result(self.timeout).data[0].embedding
+
+    def _count(self, state, name):
+        with self._guard:
+            setattr(state, name, getattr(state, name) + 1)
+
+    def stats(self):
+        """ 每个模型的并发、排队、拒绝、取消计数和排队等待时间分位数 (毫秒)。 """
+        with self._guard:
+            result = {}
+            for model, state in self._models.items():
+                waits = sorted(state.wait_times)
+
+                def percentile(p):
+                    return round(waits[min(len(waits) - 1, int(p * len(waits)))] * 1000, 1) if waits else None
+
+                result[model] = {
+                    'max_concurrency': state.max_concurrency,
+                    'max_queue': self.max_queue,
+                    'active': state.active,
+                    'waiting': state.pending - state.active,
+                    'completed': state.completed,
+                    'rejected': state.rejected,
+                    'cancelled': state.cancelled,
+                    'queue_timeouts': state.queue_timeouts,
+                    'errors': state.errors,
+                    'wait_ms_p50': percentile(0.5),
+                    'wait_ms_p95': percentile(0.95),
+                    'wait_ms_max': round(waits[-1] * 1000, 1) if waits else None,
+                }
+            return result
@@ -1,31 +1,71 @@
-from openai import OpenAI
-import httpx
+from functools import partial
+
+from app.services.ai_gateway import AIGateway
+
+ERROR_MESSAGE = "对不起，我在连接AI模型时遇到了一个网络问题。请检查Ollama服务是否正在运行，或者网络代理设置是否正确。"
+BUSY_MESSAGE = "对不起，当前排队等待AI模型的请求较多，请稍后重试。"
+
 
 class AIService:
-    def __init__(self, api_base_url, model_name):
-        self.client = OpenAI(
-            base_url=api_base_url,
-            api_key='ollama',
-            http_client=httpx.Client(
-                timeout=120.0, # Increase timeout for streaming
-            ),
-        )
+    def __init__(self, api_base_url, model_name, gateway=None, cache=None):
+        # 请求经由网关在后台事件循环中发出，连接池复用长连接，并按模型限制并发
+        self.gateway = gateway or AIGateway(api_base_url)
         self.model_name = model_name
+        # 可选的回复缓存 (ChatCache)，命中时不再请求模型
+        self.cache = cache
 
     def get_streaming_chat_completion(self, user_message, system_prompt="You are a helpful assistant."):
+        """
+        返回逐段产出回复的生成器。并发和排队名额已满时立即抛出 GatewayBusy。
+        缓存命中时回放缓存的回答；未命中时完整生成的回答写入缓存。
+        """
+        on_complete = None
+        if self.cache is not None:
+            answer, embedding = self.cache.lookup(self.model_name, system_prompt, user_message)
+            if answer is not None:
+                return self.cache.replay(answer)
+
+            on_complete = partial(self._store, system_prompt, user_message, embedding)
+
+        return self.gateway.stream_chat(
+            self.model_name,
+            [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_message},
+            ],
+            temperature=0.0,
+            busy_message=BUSY_MESSAGE,
+            error_message=ERROR_MESSAGE,
+            on_complete=on_complete,
+        )
+
+    def get_chat_completion(self, user_message, system_prompt="You are a helpful assistant."):
+        """
+        返回完整的回复文本，用于需要解析模型输出的场景 (不经过回复缓存)。
+        名额已满时抛出 GatewayBusy，上游出错或排队超时时抛出 RuntimeError。
+        """
+        completed = []
+        chunks = self.gateway.stream_chat(
+            self.model_name,
+            [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_message},
+            ],
+            temperature=0.0,
+            on_complete=completed.append,
+        )
+        for _ in chunks:
+            pass
+        if not completed:
+            raise RuntimeError(ERROR_MESSAGE)
+        return completed[0]
+
+    def _store(self, system_prompt, user_message, embedding, answer):
         try:
-            stream = self.client.chat.completions.create(
-                model=self.model_name,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_message},
-                ],
-                temperature=0.0,
-                stream=True,
-            )
-            for chunk in stream:
-                if chunk.choices[0].delta.content:
-                    yield chunk.choices[0].delta.content
+            self.cache.store(self.model_name, system_prompt, user_message, answer, embedding)
         except Exception as e:
-            print(f"Error communicating with Ollama: {type(e).__name__}: {e}")
-            yield "对不起，我在连接AI模型时遇到了一个网络问题。请检查Ollama服务是否正在运行，或者网络代理设置是否正确。"
+            print(f"写入AI回复缓存时出错: {type(e).__name__}: {e}")
+
+    def stats(self):
+        return self.gateway.stats()
+
@@ -0,0 +1,116 @@
+import threading
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+
+
+class TTLCache:
+    """
+    线程安全的进程内缓存，按条目设置过期时间 (TTL)，并按最近最少使用 (LRU) 淘汰超出容量的条目。
+    """
+
+    def __init__(self, ttl, max_entries):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is not _MISSING:
+                value, expires_at = entry
+                if expires_at > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value, ttl=None):
+        """ 写入条目；ttl 为空时使用缓存默认的 TTL。 """
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + (self.ttl if ttl is None else ttl))
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_load(self, key, loader):
+        """ 命中则返回缓存值，否则调用 loader() 加载并写入缓存。 """
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = loader()
+            self.set(key, value)
+        return value
+
+    def invalidate(self, key=_MISSING):
+        """ 删除指定条目；不传 key 时清空整个缓存。 """
+        with self._lock:
+            if key is _MISSING:
+                self._data.clear()
+            else:
+                self._data.pop(key, None)
+            self.invalidations += 1
+
+    def invalidate_prefix(self, prefix):
+        """ 删除所有以 prefix 开头的字符串键。 """
+        with self._lock:
+            for key in [key for key in self._data if key.startswith(prefix)]:
+                del self._data[key]
+            self.invalidations += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._data),
+                'max_entries': self.max_entries,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+            }
+
+
+class ReferenceCache:
+    """
+    参考数据缓存：由多个命名区域组成，每个区域有独立的 TTL 和容量，并登记其依赖的数据表。
+    写路径通过 invalidate_tables() 使依赖这些表的区域失效。缓存在每个进程内独立保存，
+    invalidate_tables() 只影响调用它的进程，其他 worker 进程和其他程序写入的数据依赖 TTL 过期。
+    """
+
+    def __init__(self):
+        self._regions = {}
+        self._tables = {}
+
+    def init_app(self, app):
+        """ 按应用配置重建所有区域。 """
+        self._regions = {}
+        self._tables = {}
+        for name, settings in app.config['REFERENCE_CACHE'].items():
+            self._regions[name] = TTLCache(settings['ttl'], settings['max_entries'])
+            self._tables[name] = set(settings['tables'])
+
+    def region(self, name):
+        return self._regions[name]
+
+    def invalidate_tables(self, *tables):
+        """ 使依赖任一指定数据表的区域全部失效。 """
+        for name, region_tables in self._tables.items():
+            if region_tables.intersection(tables):
+                self._regions[name].invalidate()
+
+    def stats(self):
+        return {name: region.stats() for name, region in self._regions.items()}
+
+
+reference_cache = ReferenceCache()
@@ -0,0 +1,154 @@
+import os
+import threading
+import time
+
+from app.services.cache import TTLCache
+from app.services.sqlite_connections import SQLiteConnections
+
+
+class CacheBackend:
+    """
+    响应缓存后端接口。值为已序列化的字节串。
+    acquire/release 提供按键的租约锁，用于保证同一个冷键只有一个调用方去查询数据库。
+    """
+
+    def get(self, key):
+        raise NotImplementedError
+
+    def set(self, key, value, ttl):
+        raise NotImplementedError
+
+    def delete_prefix(self, prefix):
+        raise NotImplementedError
+
+    def acquire(self, key, lease):
+        """ 尝试获取 key 的租约锁，租约在 lease 秒后自动过期。成功返回 True。 """
+        raise NotImplementedError
+
+    def release(self, key):
+        raise NotImplementedError
+
+    def stats(self):
+        return {}
+
+
+class LocalCacheBackend(CacheBackend):
+    """
+    进程内后端：每个 gunicorn worker 各自持有一份缓存，重启后失效。
+    """
+
+    def __init__(self, max_entries):
+        self._cache = TTLCache(ttl=0, max_entries=max_entries)
+        self._locks = {}
+        self._guard = threading.Lock()
+
+    def get(self, key):
+        return self._cache.get(key)
+
+    def set(self, key, value, ttl):
+        self._cache.set(key, value, ttl=ttl)
+
+    def delete_prefix(self, prefix):
+        self._cache.invalidate_prefix(prefix)
+
+    def acquire(self, key, lease):
+        now = time.monotonic()
+        with self._guard:
+            expires_at = self._locks.get(key)
+            if expires_at is not None and expires_at > now:
+                return False
+            self._locks[key] = now + lease
+            return True
+
+    def release(self, key):
+        with self._guard:
+            self._locks.pop(key, None)
+
+    def stats(self):
+        return {'backend': 'local', 'size': self._cache.stats()['size']}
+
+
+class SQLiteCacheBackend(CacheBackend):
+    """
+    基于本机 SQLite 文件 (WAL 模式) 的共享后端，同一主机上的所有 worker 读写同一份缓存，
+    worker 重启后缓存依然有效。租约锁记录在 locks 表中，可跨进程生效。
+    """
+
+    def __init__(self, path, max_entries):
+        self.path = path
+        self.max_entries = max_entries
+        self._connections = SQLiteConnections(path)
+        self._writes = 0
+        conn = self._connection()
+        with conn:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS cache ('
+                'key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL NOT NULL)'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS ix_cache_expires_at ON cache (expires_at)')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS locks ('
+                'key TEXT PRIMARY KEY, owner TEXT NOT NULL, expires_at REAL NOT NULL)'
+            )
+
+    def _connection(self):
+        return self._connections.get()
+
+    def _owner(self):
+        return f'{os.getpid()}:{threading.get_ident()}'
+
+    def get(self, key):
+        row = self._connection().execute(
+            'SELECT value FROM cache WHERE key = ? AND expires_at > ?', (key, time.time())
+        ).fetchone()
+        return row[0] if row else None
+
+    def set(self, key, value, ttl):
+        conn = self._connection()
+        conn.execute(
+            'INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)',
+            (key, value, time.time() + ttl)
+        )
+        self._writes += 1
+        if self._writes % 100 == 0:
+            self._purge(conn)
+
+    def _purge(self, conn):
+        """ 删除过期条目，超出容量时删除最早过期的条目。 """
+        conn.execute('DELETE FROM cache WHERE expires_at <= ?', (time.time(),))
+        conn.execute(
+            'DELETE FROM cache WHERE key IN ('
+            'SELECT key FROM cache ORDER BY expires_at DESC LIMIT -1 OFFSET ?)',
+            (self.max_entries,)
+        )
+
+    def delete_prefix(self, prefix):
+        # 按键范围删除，可以使用主键索引
+        self._connection().execute(
+            'DELETE FROM cache WHERE key >= ? AND key < ?', (prefix, prefix + '\U0010ffff')
+        )
+
+    def acquire(self, key, lease):
+        conn = self._connection()
+        now = time.time()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.execute('DELETE FROM locks WHERE key = ? AND expires_at <= ?', (key, now))
+            cursor = conn.execute(
+                'INSERT OR IGNORE INTO locks (key, owner, expires_at) VALUES (?, ?, ?)',
+                (key, self._owner(), now + lease)
+            )
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return cursor.rowcount == 1
+
+    def release(self, key):
+        self._connection().execute(
+            'DELETE FROM locks WHERE key = ? AND owner = ?', (key, self._owner())
+        )
+
+    def stats(self):
+        size = self._connection().execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+        return {'backend': 'sqlite', 'path': self.path, 'size': size}
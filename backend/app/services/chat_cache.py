@@ -0,0 +1,167 @@
+import hashlib
+import json
+import re
+import threading
+import time
+import unicodedata
+
+import numpy as np
+
+from app.services.sqlite_connections import SQLiteConnections
+
+# 归一化时去掉的结尾标点
+_TRAILING_PUNCTUATION = re.compile(r'[\s?!.。？！~～…]+$')
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_message(message):
+    """
+    归一化用户问题：全角转半角 (NFKC)、转小写、合并空白、去掉结尾标点。
+    """
+    text = unicodedata.normalize('NFKC', message).lower()
+    text = _WHITESPACE.sub(' ', text).strip()
+    return _TRAILING_PUNCTUATION.sub('', text)
+
+
+def _digest(*parts):
+    return hashlib.sha256(json.dumps(parts, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+
+class ChatCache:
+    """
+    AI 回复缓存。对话固定使用 temperature=0，相同的 (模型, 系统提示, 归一化问题) 得到相同的回答，
+    命中时直接以流的形式回放，不再占用 Ollama。
+    可选按向量相似度匹配近似问题：embed 为 文本 -> 向量 的函数，相似度不低于 similarity 视为命中。
+    数据保存在本机 SQLite 文件中，重启不丢失、同一主机上的 worker 共享；超出容量时淘汰最久未使用的条目。
+    """
+
+    def __init__(self, path, max_entries=1000, ttl=7 * 24 * 3600, embed=None, similarity=0.95,
+                 replay_chunk_size=16):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.embed = embed
+        self.similarity = similarity
+        self.replay_chunk_size = replay_chunk_size
+        self._connections = SQLiteConnections(path)
+        self._counter_lock = threading.Lock()
+        self.hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.embedding_errors = 0
+        conn = self._connection()
+        with conn:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS chat_cache ('
+                'key TEXT PRIMARY KEY, scope TEXT NOT NULL, answer TEXT NOT NULL, embedding BLOB, '
+                'created_at REAL NOT NULL, last_used REAL NOT NULL, hits INTEGER NOT NULL DEFAULT 0)'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS ix_chat_cache_scope ON chat_cache (scope)')
+            conn.execute('CREATE INDEX IF NOT EXISTS ix_chat_cache_last_used ON chat_cache (last_used)')
+
+    def _connection(self):
+        return self._connections.get()
+
+    def _count(self, name):
+        with self._counter_lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def _embedding(self, message):
+        """ 计算归一化后的单位向量，失败时返回 None，不影响正常对话。 """
+        try:
+            vector = np.asarray(self.embed(message), dtype=np.float32)
+        except Exception as e:
+            self._count('embedding_errors')
+            print(f"计算问题向量时出错: {type(e).__name__}: {e}")
+            return None
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else None
+
+    def lookup(self, model, system_prompt, message):
+        """
+        查找缓存的回答。
+
+        Returns:
+            (answer, embedding) 未命中时 answer 为 None；embedding 为问题向量 (未启用或失败时为 None)，
+            供生成完成后 store 复用，避免重复计算。
+        """
+        normalized = normalize_message(message)
+        key = _digest(model, system_prompt, normalized)
+        conn = self._connection()
+        now = time.time()
+        row = conn.execute(
+            'SELECT answer FROM chat_cache WHERE key = ? AND created_at > ?', (key, now - self.ttl)
+        ).fetchone()
+        if row is not None:
+            self._touch(conn, key, now)
+            self._count('hits')
+            return row[0], None
+
+        embedding = self._embedding(normalized) if self.embed is not None else None
+        if embedding is not None:
+            rows = conn.execute(
+                'SELECT key, answer, embedding FROM chat_cache '
+                'WHERE scope = ? AND embedding IS NOT NULL AND created_at > ?',
+                (_digest(model, system_prompt), now - self.ttl)
+            ).fetchall()
+            vectors = [np.frombuffer(blob, dtype=np.float32) for _, _, blob in rows]
+            vectors = [(index, vector) for index, vector in enumerate(vectors) if vector.shape == embedding.shape]
+            if vectors:
+                indexes, matrix = zip(*vectors)
+                scores = np.vstack(matrix) @ embedding
+                best = int(np.argmax(scores))
+                if scores[best] >= self.similarity:
+                    matched_key, answer, _ = rows[indexes[best]]
+                    self._touch(conn, matched_key, now)
+                    self._count('similar_hits')
+                    return answer, embedding
+
+        self._count('misses')
+        return None, embedding
+
+    def _touch(self, conn, key, now):
+        conn.execute('UPDATE chat_cache SET last_used = ?, hits = hits + 1 WHERE key = ?', (now, key))
+
+    def store(self, model, system_prompt, message, answer, embedding=None):
+        """ 写入一次完整生成的回答，超出容量时淘汰最久未使用的条目。 """
+        if not answer:
+            return
+        normalized = normalize_message(message)
+        now = time.time()
+        conn = self._connection()
+        conn.execute(
+            'INSERT OR REPLACE INTO chat_cache (key, scope, answer, embedding, created_at, last_used, hits) '
+            'VALUES (?, ?, ?, ?, ?, ?, 0)',
+            (
+                _digest(model, system_prompt, normalized), _digest(model, system_prompt), answer,
+                embedding.astype(np.float32).tobytes() if embedding is not None else None, now, now,
+            )
+        )
+        conn.execute(
+            'DELETE FROM chat_cache WHERE key IN ('
+            'SELECT key FROM chat_cache ORDER BY last_used DESC LIMIT -1 OFFSET ?)',
+            (self.max_entries,)
+        )
+        self._count('stores')
+
+    def replay(self, answer):
+        """ 将缓存的回答按固定长度分段，以与实时生成相同的流式形式返回。 """
+        for start in range(0, len(answer), self.replay_chunk_size):
+            yield answer[start:start + self.replay_chunk_size]
+
+    def stats(self):
+        size = self._connection().execute('SELECT COUNT(*) FROM chat_cache').fetchone()[0]
+        with self._counter_lock:
+            lookups = self.hits + self.similar_hits + self.misses
+            return {
+                'path': self.path,
+                'size': size,
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'similar_hits': self.similar_hits,
+                'misses': self.misses,
+                'stores': self.stores,
+                'embedding_errors': self.embedding_errors,
+                'hit_ratio': round((self.hits + self.similar_hits) / lookups, 4) if lookups else None,
+            }
@@ -0,0 +1,115 @@
+import gzip
+import threading
+import zlib
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # brotli 为可选依赖，未安装时只协商 gzip
+    brotli = None
+
+
+class ResponseCompression:
+    """
+    JSON 响应压缩。按请求的 Accept-Encoding 协商 br (已安装 brotli 时) 或 gzip，
+    小于 RESPONSE_COMPRESSION_MIN_SIZE 的响应不压缩；流式响应逐块增量压缩。
+    对话接口的 text/plain 流不在压缩范围内，避免压缩缓冲打断逐字输出。
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self._counter_lock = threading.Lock()
+        self._reset_counters()
+
+    def _reset_counters(self):
+        self.compressed = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    def init_app(self, app):
+        self.enabled = app.config['RESPONSE_COMPRESSION_ENABLED']
+        self.min_size = app.config['RESPONSE_COMPRESSION_MIN_SIZE']
+        self.gzip_level = app.config['RESPONSE_COMPRESSION_GZIP_LEVEL']
+        self.brotli_quality = app.config['RESPONSE_COMPRESSION_BROTLI_QUALITY']
+        self.mimetypes = set(app.config['RESPONSE_COMPRESSION_MIMETYPES'])
+        with self._counter_lock:
+            self._reset_counters()
+        app.after_request(self.compress)
+
+    @property
+    def encodings(self):
+        return ['br', 'gzip'] if brotli is not None else ['gzip']
+
+    def _count(self, size_in, size_out):
+        with self._counter_lock:
+            self.compressed += 1
+            self.bytes_in += size_in
+            self.bytes_out += size_out
+
+    def _compress(self, data, encoding):
+        if encoding == 'br':
+            return brotli.compress(data, quality=self.brotli_quality)
+        return gzip.compress(data, compresslevel=self.gzip_level, mtime=0)
+
+    def _compress_stream(self, chunks, encoding):
+        """ 流式响应逐块压缩。不在每块后 flush，压缩器积累到一个压缩块时才输出，避免小块降低压缩率。 """
+        size_in = size_out = 0
+        if encoding == 'br':
+            compressor = brotli.Compressor(quality=self.brotli_quality)
+            compress, finish = compressor.process, compressor.finish
+        else:
+            compressor = zlib.compressobj(self.gzip_level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+            compress, finish = compressor.compress, compressor.flush
+        try:
+            for chunk in chunks:
+                if isinstance(chunk, str):
+                    chunk = chunk.encode('utf-8')
+                size_in += len(chunk)
+                data = compress(chunk)
+                if data:
+                    size_out += len(data)
+                    yield data
+            data = finish()
+            size_out += len(data)
+            yield data
+            self._count(size_in, size_out)
+        finally:
+            if hasattr(chunks, 'close'):
+                chunks.close()
+
+    def compress(self, response):
+        if (not self.enabled or response.status_code != 200 or response.mimetype not in self.mimetypes
+                or 'Content-Encoding' in response.headers):
+            return response
+        response.vary.add('Accept-Encoding')
+        encoding = request.accept_encodings.best_match(self.encodings)
+        if encoding is None:
+            return response
+
+        if response.is_streamed:
+            response.response = self._compress_stream(response.response, encoding)
+            response.headers.pop('Content-Length', None)
+        else:
+            data = response.get_data()
+            if len(data) < self.min_size:
+                return response
+            compressed = self._compress(data, encoding)
+            self._count(len(data), len(compressed))
+            response.set_data(compressed)
+        response.headers['Content-Encoding'] = encoding
+        return response
+
+    def stats(self):
+        with self._counter_lock:
+            return {
+                'enabled': self.enabled,
+                'encodings': self.encodings,
+                'compressed': self.compressed,
+                'bytes_in': self.bytes_in,
+                'bytes_out': self.bytes_out,
+                'ratio': round(self.bytes_out / self.bytes_in, 4) if self.bytes_in else None,
+            }
+
+
+response_compression = ResponseCompression()
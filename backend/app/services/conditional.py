@@ -0,0 +1,86 @@
+import hashlib
+import threading
+from datetime import timezone
+from functools import wraps
+
+from flask import current_app, request
+
+
+class ConditionalGet:
+    """
+    条件请求 (ETag / Last-Modified)。视图执行前先计算数据版本 (通常是相关表的最大ID和最大 update_time，均走索引)，
+    客户端持有的版本未变化时直接返回 304，不执行查询、不序列化 JSON。
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.salt = ''
+        self._counter_lock = threading.Lock()
+        self.not_modified = 0
+        self.modified = 0
+
+    def init_app(self, app):
+        self.enabled = app.config['CONDITIONAL_GET_ENABLED']
+        self.salt = app.config['CONDITIONAL_ETAG_SALT']
+        with self._counter_lock:
+            self.not_modified = 0
+            self.modified = 0
+
+    def _count(self, name):
+        with self._counter_lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def versioned(self, version):
+        """
+        路由装饰器。version(*args, **kwargs) 返回 (版本字符串, 最后修改时间或 None)，
+        ETag 由版本、请求路径和查询参数计算。应放在 response_cache.cached 外层，304 时不再访问响应缓存。
+        """
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                if not self.enabled or request.method not in ('GET', 'HEAD'):
+                    return view(*args, **kwargs)
+
+                token, last_modified = version(*args, **kwargs)
+                etag = hashlib.sha1(f'{self.salt}|{token}|{request.full_path}'.encode('utf-8')).hexdigest()
+                if last_modified is not None:
+                    # 业务库中的时间为本地时间，HTTP 日期以秒为单位
+                    last_modified = last_modified.replace(microsecond=0).astimezone(timezone.utc)
+
+                # If-None-Match 优先；只有未提供时才按 If-Modified-Since 判断
+                if request.if_none_match:
+                    unchanged = request.if_none_match.contains_weak(etag)
+                else:
+                    since = request.if_modified_since
+                    unchanged = since is not None and last_modified is not None and last_modified <= since
+
+                if unchanged:
+                    self._count('not_modified')
+                    response = current_app.response_class(status=304)
+                else:
+                    self._count('modified')
+                    response = current_app.make_response(view(*args, **kwargs))
+                    if response.status_code != 200:
+                        return response
+                # 弱 ETag：gzip/br 压缩后的响应与原响应语义相同，共用同一个 ETag
+                response.set_etag(etag, weak=True)
+                if last_modified is not None:
+                    response.last_modified = last_modified
+                # 允许客户端缓存，但每次使用前都要重新验证
+                response.headers['Cache-Control'] = 'no-cache'
+                return response
+            return wrapper
+        return decorator
+
+    def stats(self):
+        with self._counter_lock:
+            total = self.not_modified + self.modified
+            return {
+                'enabled': self.enabled,
+                'not_modified': self.not_modified,
+                'modified': self.modified,
+                'not_modified_ratio': round(self.not_modified / total, 4) if total else None,
+            }
+
+
+conditional_get = ConditionalGet()
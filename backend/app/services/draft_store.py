@@ -0,0 +1,69 @@
+import json
+import time
+
+from app.services.sqlite_connections import SQLiteConnections
+
+
+class DraftConflict(Exception):
+    """ 草稿已被其他请求修改，调用方持有的版本号已过期。 """
+
+
+class DraftStore:
+    """
+    测算草稿的服务端状态，按 calculation_id 保存在本机 SQLite 文件中，同一主机上的 worker 共享。
+    每次保存版本号加一，保存时校验版本号，避免并发修改互相覆盖。
+    """
+
+    def __init__(self):
+        self.path = None
+        self.ttl = None
+        self._connections = None
+
+    def init_app(self, app):
+        self.path = app.config['CALCULATION_DRAFT_PATH']
+        self.ttl = app.config['CALCULATION_DRAFT_TTL']
+        self._connections = SQLiteConnections(self.path)
+        conn = self._connection()
+        with conn:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS drafts ('
+                'id TEXT PRIMARY KEY, state TEXT NOT NULL, version INTEGER NOT NULL, updated_at REAL NOT NULL)'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS ix_drafts_updated_at ON drafts (updated_at)')
+
+    def _connection(self):
+        return self._connections.get()
+
+    def create(self, calculation_id, state):
+        """ 保存新草稿，返回版本号 1。同时清理超过有效期未修改的草稿。 """
+        conn = self._connection()
+        now = time.time()
+        conn.execute('DELETE FROM drafts WHERE updated_at <= ?', (now - self.ttl,))
+        conn.execute(
+            'INSERT OR REPLACE INTO drafts (id, state, version, updated_at) VALUES (?, ?, 1, ?)',
+            (str(calculation_id), json.dumps(state, ensure_ascii=False), now)
+        )
+        return 1
+
+    def get(self, calculation_id):
+        """ 返回 (草稿状态, 版本号)，不存在或已过期时返回 (None, None)。 """
+        row = self._connection().execute(
+            'SELECT state, version FROM drafts WHERE id = ? AND updated_at > ?',
+            (str(calculation_id), time.time() - self.ttl)
+        ).fetchone()
+        if row is None:
+            return None, None
+        return json.loads(row[0]), row[1]
+
+    def save(self, calculation_id, state, version):
+        """ 在版本号仍为 version 时保存草稿，返回新版本号；版本号已变化时抛出 DraftConflict。 """
+        cursor = self._connection().execute(
+            'UPDATE drafts SET state = ?, version = version + 1, updated_at = ? WHERE id = ? AND version = ?',
+            (json.dumps(state, ensure_ascii=False), time.time(), str(calculation_id), version)
+        )
+        if cursor.rowcount != 1:
+            raise DraftConflict(f'测算草稿 {calculation_id} 已被修改')
+        return version + 1
+
+
+draft_store = DraftStore()
@@ -0,0 +1,283 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import traceback
+from datetime import datetime
+
+from app.db.db import db
+from app.db.ids import id_generator
+from app.services.sqlite_connections import SQLiteConnections
+
+JOB_STATUSES = ('queued', 'running', 'succeeded', 'failed')
+
+
+class JobError(Exception):
+    """ 任务按业务规则失败，status_code 和 message 原样写入任务结果。 """
+
+    def __init__(self, message, status_code=500, error=None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.error = error
+
+
+class IdempotencyConflict(Exception):
+    """ 同一幂等键已用于参数不同的请求。 """
+
+
+def _iso(timestamp):
+    return datetime.fromtimestamp(timestamp).isoformat(timespec='seconds') if timestamp else None
+
+
+def _digest(payload):
+    return hashlib.sha256(json.dumps(payload, ensure_ascii=False, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+class JobQueue:
+    """
+    后台任务队列。任务保存在本机 SQLite 文件中，重启不丢失，同一主机上的 worker 进程共享；
+    每个进程启动若干工作线程，以 BEGIN IMMEDIATE 事务认领任务，同一任务只会被一个线程执行。
+    执行中的任务持有租约，进度更新时续期；租约过期 (进程退出) 的任务按任务类型决定重新排队或标记失败。
+    """
+
+    def __init__(self):
+        self.app = None
+        self.path = None
+        self._handlers = {}
+        self._connections = None
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._finished = threading.Condition(threading.Lock())
+        self._generation = 0
+        self._started = None
+
+    def init_app(self, app):
+        self.app = app
+        self.path = app.config['JOB_QUEUE_PATH']
+        self.workers = app.config['JOB_WORKERS']
+        self.poll_interval = app.config['JOB_POLL_INTERVAL']
+        self.lease = app.config['JOB_LEASE']
+        self.retention = app.config['JOB_RETENTION']
+        self._connections = SQLiteConnections(self.path, row_factory=sqlite3.Row)
+        with self._lock:
+            # 旧的工作线程看到代数变化后退出
+            self._generation += 1
+            self._started = None
+            self._wakeup.notify_all()
+        conn = self._connection()
+        with conn:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS jobs ('
+                'id TEXT PRIMARY KEY, kind TEXT NOT NULL, payload TEXT NOT NULL, payload_hash TEXT NOT NULL, '
+                'idempotency_key TEXT, status TEXT NOT NULL, progress REAL NOT NULL DEFAULT 0, message TEXT, '
+                'result TEXT, status_code INTEGER, attempts INTEGER NOT NULL DEFAULT 0, '
+                'created_at REAL NOT NULL, started_at REAL, finished_at REAL, lease_until REAL)'
+            )
+            conn.execute('CREATE UNIQUE INDEX IF NOT EXISTS ux_jobs_idempotency ON jobs (kind, idempotency_key)')
+            conn.execute('CREATE INDEX IF NOT EXISTS ix_jobs_status_created ON jobs (status, created_at)')
+        # 每个 worker 进程在处理第一个请求时启动工作线程，已排队的任务不必等到下一次提交
+        app.before_request(self._ensure_workers)
+
+    def _connection(self):
+        return self._connections.get()
+
+    def register(self, kind, handler, retry=True):
+        """
+        注册任务类型。handler(payload, progress) 返回 (响应体, 状态码)；
+        progress(比例, 说明) 更新进度。retry=False 的任务在执行进程退出后不再重试，避免重复写入。
+        """
+        self._handlers[kind] = (handler, retry)
+
+    # ---- 提交与查询 ----
+
+    def enqueue(self, kind, payload, idempotency_key=None):
+        """
+        提交任务，返回 (任务, 是否新建)。相同任务类型和幂等键的重复提交返回已有任务；
+        幂等键相同但参数不同时抛出 IdempotencyConflict。
+        """
+        if kind not in self._handlers:
+            raise KeyError(f'未注册的任务类型: {kind}')
+        conn = self._connection()
+        now = time.time()
+        payload_hash = _digest(payload)
+        conn.execute(
+            "DELETE FROM jobs WHERE status IN ('succeeded', 'failed') AND finished_at <= ?", (now - self.retention,)
+        )
+        job_id = str(id_generator.next_id())
+        cursor = conn.execute(
+            'INSERT OR IGNORE INTO jobs (id, kind, payload, payload_hash, idempotency_key, status, created_at) '
+            "VALUES (?, ?, ?, ?, ?, 'queued', ?)",
+            (job_id, kind, json.dumps(payload, ensure_ascii=False), payload_hash, idempotency_key, now)
+        )
+        created = cursor.rowcount == 1
+        if not created:
+            row = conn.execute(
+                'SELECT * FROM jobs WHERE kind = ? AND idempotency_key = ?', (kind, idempotency_key)
+            ).fetchone()
+            if row['payload_hash'] != payload_hash:
+                raise IdempotencyConflict(f'幂等键 {idempotency_key} 已用于参数不同的请求')
+            return self._format(row), False
+        self._ensure_workers()
+        with self._lock:
+            self._wakeup.notify()
+        return self.get(job_id), True
+
+    def get(self, job_id):
+        row = self._connection().execute('SELECT * FROM jobs WHERE id = ?', (str(job_id),)).fetchone()
+        return self._format(row) if row is not None else None
+
+    def recent(self, status=None, kind=None, limit=50):
+        clauses, params = [], []
+        if status:
+            clauses.append('status = ?')
+            params.append(status)
+        if kind:
+            clauses.append('kind = ?')
+            params.append(kind)
+        where = f"WHERE {' AND '.join(clauses)} " if clauses else ''
+        rows = self._connection().execute(
+            f'SELECT * FROM jobs {where}ORDER BY created_at DESC LIMIT ?', (*params, limit)
+        ).fetchall()
+        return [self._format(row, include_result=False) for row in rows]
+
+    def wait(self, job_id, timeout):
+        """ 等待任务结束，最多 timeout 秒，返回任务的最新状态。 """
+        self._ensure_workers()
+        deadline = time.monotonic() + timeout
+        while True:
+            job = self.get(job_id)
+            remaining = deadline - time.monotonic()
+            if job is None or job['status'] in ('succeeded', 'failed') or remaining <= 0:
+                return job
+            # 本进程执行的任务结束时立即唤醒，其他进程执行的任务按轮询间隔检查
+            with self._finished:
+                self._finished.wait(min(remaining, self.poll_interval))
+
+    def stats(self):
+        counts = dict(self._connection().execute('SELECT status, COUNT(*) FROM jobs GROUP BY status').fetchall())
+        return {
+            'path': self.path,
+            'workers': self.workers,
+            'counts': {status: counts.get(status, 0) for status in JOB_STATUSES},
+        }
+
+    def _format(self, row, include_result=True):
+        job = {
+            'job_id': row['id'],
+            'kind': row['kind'],
+            'status': row['status'],
+            'progress': row['progress'],
+            'message': row['message'],
+            'attempts': row['attempts'],
+            'created_at': _iso(row['created_at']),
+            'started_at': _iso(row['started_at']),
+            'finished_at': _iso(row['finished_at']),
+        }
+        if row['finished_at'] and row['started_at']:
+            job['elapsed_ms'] = round((row['finished_at'] - row['started_at']) * 1000, 1)
+        if include_result and row['status'] in ('succeeded', 'failed'):
+            job['status_code'] = row['status_code']
+            job['result'] = json.loads(row['result']) if row['result'] else None
+        return job
+
+    # ---- 执行 ----
+
+    def _ensure_workers(self):
+        """ 在当前进程中按需启动工作线程 (处理请求、提交或等待任务时)；gunicorn fork 出的每个 worker 各自启动。 """
+        key = (os.getpid(), self._generation)
+        if self._started == key or not self.workers:
+            return
+        with self._lock:
+            if self._started == key:
+                return
+            self._started = key
+            for index in range(self.workers):
+                threading.Thread(target=self._work, args=(self._generation,), daemon=True,
+                                 name=f'bfa-job-worker-{index}').start()
+
+    def _work(self, generation):
+        while generation == self._generation:
+            try:
+                job = self._claim()
+            except sqlite3.OperationalError as e:
+                print(f"认领后台任务时出错: {e}")
+                job = None
+            if job is None:
+                with self._lock:
+                    if generation == self._generation:
+                        self._wakeup.wait(self.poll_interval)
+                continue
+            self._run(job)
+
+    def _claim(self):
+        conn = self._connection()
+        now = time.time()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            # 租约过期且不允许重试的任务直接标记失败
+            for row in conn.execute(
+                "SELECT id, kind FROM jobs WHERE status = 'running' AND lease_until < ?", (now,)
+            ).fetchall():
+                if not self._handlers.get(row['kind'], (None, False))[1]:
+                    conn.execute(
+                        "UPDATE jobs SET status = 'failed', finished_at = ?, status_code = 500, result = ? "
+                        'WHERE id = ?',
+                        (now, json.dumps({'error': '任务执行中断', 'message': '执行任务的进程已退出'},
+                                         ensure_ascii=False), row['id'])
+                    )
+            row = conn.execute(
+                # attempts 为认领后的执行次数，结束时用于确认任务仍归本次执行所有
+                "SELECT id, kind, payload, attempts + 1 AS attempts FROM jobs WHERE status = 'queued' "
+                "OR (status = 'running' AND lease_until < ?) ORDER BY created_at LIMIT 1", (now,)
+            ).fetchone()
+            if row is not None:
+                conn.execute(
+                    "UPDATE jobs SET status = 'running', attempts = attempts + 1, started_at = ?, "
+                    'lease_until = ?, progress = 0 WHERE id = ?', (now, now + self.lease, row['id'])
+                )
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        return row
+
+    def _progress(self, job, fraction, message=None):
+        self._connection().execute(
+            'UPDATE jobs SET progress = ?, message = COALESCE(?, message), lease_until = ? '
+            "WHERE id = ? AND status = 'running' AND attempts = ?",
+            (round(min(max(fraction, 0.0), 1.0), 4), message, time.time() + self.lease, job['id'], job['attempts'])
+        )
+
+    def _run(self, job):
+        handler = self._handlers.get(job['kind'], (None, False))[0]
+        with self.app.app_context():
+            try:
+                if handler is None:
+                    raise JobError(f"未注册的任务类型: {job['kind']}")
+                body, status_code = handler(json.loads(job['payload']),
+                                            lambda fraction, message=None: self._progress(job, fraction, message))
+                status = 'succeeded' if status_code < 400 else 'failed'
+            except JobError as e:
+                body, status_code, status = {'error': e.error or str(e), 'message': str(e)}, e.status_code, 'failed'
+            except Exception as e:
+                print(f"执行后台任务 {job['kind']} 时出错: {e}")
+                traceback.print_exc()
+                body, status_code, status = {'error': '后台任务执行失败', 'message': str(e)}, 500, 'failed'
+            finally:
+                db.session.remove()
+        # 租约过期后任务可能已被其他线程重新认领或标记失败，只在仍归本次执行所有时写入结果
+        cursor = self._connection().execute(
+            'UPDATE jobs SET status = ?, progress = COALESCE(?, progress), result = ?, status_code = ?, finished_at = ? '
+            "WHERE id = ? AND status = 'running' AND attempts = ?",
+            (status, 1.0 if status == 'succeeded' else None, json.dumps(body, ensure_ascii=False), status_code,
+             time.time(), job['id'], job['attempts'])
+        )
+        if cursor.rowcount == 0:
+            print(f"后台任务 {job['kind']} ({job['id']}) 的租约已失效，丢弃本次执行结果")
+        with self._finished:
+            self._finished.notify_all()
+
+
+job_queue = JobQueue()
@@ -0,0 +1,273 @@
+import logging
+import threading
+import time
+from bisect import bisect_left
+
+from flask import Response, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+slow_query_logger = logging.getLogger('bfa.slow_query')
+
+PROMETHEUS_MIMETYPE = 'text/plain; version=0.0.4; charset=utf-8'
+# 慢查询日志中 SQL 和参数的最大长度
+_SQL_LOG_LENGTH = 2000
+_PARAMETERS_LOG_LENGTH = 300
+
+
+def _format_number(value):
+    value = float(value)
+    if value == float('inf'):
+        return '+Inf'
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+def _format_labels(names, values, extra=''):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+class Counter:
+    """ 按标签累加的计数器。 """
+
+    kind = 'counter'
+
+    def __init__(self, name, help_text, labels):
+        self.name, self.help, self.labels = name, help_text, labels
+        self._values = {}
+
+    def inc(self, labels, amount=1):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        for labels, value in sorted(self._values.items()):
+            yield f'{self.name}{_format_labels(self.labels, labels)} {_format_number(value)}'
+
+
+class Histogram:
+    """ 按标签统计的直方图，桶为累积计数 (le 为上界)。 """
+
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, labels, buckets):
+        self.name, self.help, self.labels = name, help_text, labels
+        self.buckets = tuple(sorted(float(bound) for bound in buckets))
+        self._values = {}
+
+    def observe(self, labels, value):
+        counts, total = self._values.get(labels, (None, 0.0))
+        if counts is None:
+            counts = [0] * (len(self.buckets) + 1)
+        counts[bisect_left(self.buckets, value)] += 1
+        self._values[labels] = (counts, total + value)
+
+    def render(self):
+        for labels, (counts, total) in sorted(self._values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                le = f'le="{_format_number(bound)}"'
+                yield f'{self.name}_bucket{_format_labels(self.labels, labels, le)} {cumulative}'
+            yield f'{self.name}_sum{_format_labels(self.labels, labels)} {_format_number(total)}'
+            yield f'{self.name}_count{_format_labels(self.labels, labels)} {cumulative}'
+
+
+class _RequestState:
+    __slots__ = ('endpoint', 'method', 'path', 'started', 'status', 'size', 'statements', 'db_seconds',
+                 'serialization_seconds')
+
+    def __init__(self, endpoint, method, path):
+        self.endpoint, self.method, self.path = endpoint, method, path
+        self.started = time.perf_counter()
+        self.status = None
+        self.size = 0
+        self.statements = 0
+        self.db_seconds = 0.0
+        self.serialization_seconds = 0.0
+
+
+class RequestMetrics:
+    """
+    请求级性能指标：每个接口的耗时、响应大小、SQL 语句数的直方图，数据库耗时和序列化耗时的累计值，
+    以 Prometheus 文本格式在 METRICS_PATH 输出。SQL 语句通过 SQLAlchemy 的游标事件计时，
+    超过 SLOW_QUERY_THRESHOLD_MS 的语句连同所属接口写入慢查询日志 (logger: bfa.slow_query)。
+    流式响应在响应关闭 (全部发送完) 时才计入，耗时包括生成响应体的时间。
+    指标保存在进程内，多 worker 部署时每个 worker 分别统计。
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.slow_query_threshold = None
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._reset((0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10))
+
+    def _reset(self, latency_buckets):
+        labels = ('endpoint', 'method')
+        self.requests = Counter('bfa_http_requests_total', '请求数', labels + ('status',))
+        self.latency = Histogram('bfa_http_request_duration_seconds', '请求耗时 (秒)', labels, latency_buckets)
+        self.response_size = Histogram('bfa_http_response_size_bytes', '响应体大小 (字节，压缩后)', labels,
+                                       (1 << 10, 10 << 10, 100 << 10, 1 << 20, 10 << 20, 100 << 20))
+        self.statements = Histogram('bfa_http_request_db_statements', '每个请求执行的 SQL 语句数', labels,
+                                    (0, 1, 2, 5, 10, 20, 50, 100, 500))
+        self.db_seconds = Counter('bfa_http_request_db_seconds_total', '请求中执行 SQL 的累计耗时 (秒)', labels)
+        self.serialization_seconds = Counter('bfa_http_serialization_seconds_total', 'JSON 序列化的累计耗时 (秒)',
+                                             labels)
+        self.slow_queries = Counter('bfa_db_slow_queries_total', '慢查询数 (后台任务的 endpoint 为 -)', ('endpoint',))
+        self.metrics = (self.requests, self.latency, self.response_size, self.statements, self.db_seconds,
+                        self.serialization_seconds, self.slow_queries)
+
+    def init_app(self, app):
+        self.enabled = app.config['METRICS_ENABLED']
+        threshold = app.config['SLOW_QUERY_THRESHOLD_MS']
+        self.slow_query_threshold = threshold / 1000 if threshold is not None else None
+        with self._lock:
+            self._reset(app.config['METRICS_LATENCY_BUCKETS'])
+        self._configure_slow_query_log(app.config['SLOW_QUERY_LOG_PATH'])
+        if not self.enabled:
+            return
+        # 游标事件注册在 Engine 类上，对所有引擎生效，只需注册一次
+        if not event.contains(Engine, 'before_cursor_execute', self._before_cursor_execute):
+            event.listen(Engine, 'before_cursor_execute', self._before_cursor_execute)
+            event.listen(Engine, 'after_cursor_execute', self._after_cursor_execute)
+            event.listen(Engine, 'handle_error', self._handle_error)
+        self.path = app.config['METRICS_PATH']
+        app.before_request(self._start_request)
+        app.after_request(self._end_request)
+        app.add_url_rule(self.path, 'metrics', self.export)
+
+    def _configure_slow_query_log(self, path):
+        for handler in [handler for handler in slow_query_logger.handlers if getattr(handler, '_bfa_metrics', False)]:
+            slow_query_logger.removeHandler(handler)
+            handler.close()
+        handler = logging.FileHandler(path, encoding='utf-8') if path else logging.StreamHandler()
+        handler._bfa_metrics = True
+        handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s %(message)s'))
+        slow_query_logger.addHandler(handler)
+        slow_query_logger.setLevel(logging.WARNING)
+        slow_query_logger.propagate = False
+
+    # ---- 请求 ----
+
+    def _start_request(self):
+        rule = request.url_rule
+        if rule is not None and rule.rule == self.path:
+            self._local.state = None
+            return
+        self._local.state = _RequestState(rule.rule if rule is not None else 'unmatched', request.method,
+                                          request.path)
+
+    def _end_request(self, response):
+        state = getattr(self._local, 'state', None)
+        if state is None:
+            return response
+        state.status = response.status_code
+        if response.is_streamed and not response.direct_passthrough:
+            # 流式响应在响应关闭时计入，此时响应体已全部生成
+            response.response = self._count_stream(response.response, state)
+            response.call_on_close(lambda: self._finish(state))
+        else:
+            state.size = response.content_length or 0
+            self._finish(state)
+        return response
+
+    def _count_stream(self, chunks, state):
+        try:
+            for chunk in chunks:
+                state.size += len(chunk.encode('utf-8') if isinstance(chunk, str) else chunk)
+                yield chunk
+        finally:
+            if hasattr(chunks, 'close'):
+                chunks.close()
+
+    def _finish(self, state):
+        if getattr(self._local, 'state', None) is state:
+            self._local.state = None
+        labels = (state.endpoint, state.method)
+        with self._lock:
+            self.requests.inc(labels + (str(state.status),))
+            self.latency.observe(labels, time.perf_counter() - state.started)
+            self.response_size.observe(labels, state.size)
+            self.statements.observe(labels, state.statements)
+            self.db_seconds.inc(labels, state.db_seconds)
+            self.serialization_seconds.inc(labels, state.serialization_seconds)
+
+    def current(self):
+        """ 当前线程正在处理的请求的统计，不在请求中时为 None。 """
+        return getattr(self._local, 'state', None) if self.enabled else None
+
+    def observe_serialization(self, seconds):
+        state = self.current()
+        if state is not None:
+            state.serialization_seconds += seconds
+
+    def timed_encoder(self, encode):
+        """ 包装编码函数，把每次调用的耗时计入当前请求的序列化时间。 """
+        def timed(obj):
+            started = time.perf_counter()
+            try:
+                return encode(obj)
+            finally:
+                self.observe_serialization(time.perf_counter() - started)
+        return timed
+
+    # ---- SQL ----
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('bfa_query_started', []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        # 先出栈再检查开关，关闭指标后开始时间也不会在连接上累积
+        started = conn.info.get('bfa_query_started')
+        if not started:
+            return
+        elapsed = time.perf_counter() - started.pop()
+        if not self.enabled:
+            return
+        state = self.current()
+        if state is not None:
+            state.statements += 1
+            state.db_seconds += elapsed
+        if self.slow_query_threshold is not None and elapsed >= self.slow_query_threshold:
+            self._log_slow_query(state, statement, parameters, elapsed)
+
+    def _handle_error(self, context):
+        # 语句执行出错时不会触发 after_cursor_execute，在这里丢弃该语句的开始时间
+        started = context.connection.info.get('bfa_query_started') if context.connection is not None else None
+        if started and context.execution_context is not None:
+            started.pop()
+
+    def _log_slow_query(self, state, statement, parameters, elapsed):
+        endpoint = state.endpoint if state is not None else '-'
+        with self._lock:
+            self.slow_queries.inc((endpoint,))
+        slow_query_logger.warning(
+            '%.1fms endpoint=%s %s path=%s sql=%s parameters=%s',
+            elapsed * 1000, endpoint, state.method if state is not None else '-',
+            state.path if state is not None else '-',
+            ' '.join(statement.split())[:_SQL_LOG_LENGTH], repr(parameters)[:_PARAMETERS_LOG_LENGTH],
+        )
+
+    # ---- 输出 ----
+
+    def render(self):
+        """ Prometheus 文本格式。 """
+        lines = []
+        with self._lock:
+            for metric in self.metrics:
+                lines.append(f'# HELP {metric.name} {metric.help}')
+                lines.append(f'# TYPE {metric.name} {metric.kind}')
+                lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+    def export(self):
+        return Response(self.render(), content_type=PROMETHEUS_MIMETYPE)
+
+
+request_metrics = RequestMetrics()
@@ -0,0 +1,157 @@
+import threading
+import time
+from functools import wraps
+
+from flask import current_app, request
+
+from app.services.cache_backends import LocalCacheBackend, SQLiteCacheBackend
+
+
+# 不可缓存的响应 (分批流式输出的大响应) 在缓存中的标记
+UNCACHEABLE = b'\x00uncacheable'
+
+
+class ResponseCache:
+    """
+    接口响应缓存。缓存成功 (200) 且非流式的 JSON 响应体，按命名空间配置 TTL 和依赖的数据表。
+    冷键采用 single-flight：同一时刻只有一个调用方 (跨线程、跨 worker) 执行查询，
+    其他调用方等待其写入缓存后直接读取；结果不可缓存时记下标记，之后的调用方不再排队而是并行查询。
+    """
+
+    def __init__(self):
+        self.backend = None
+        self._namespaces = {}
+        self._counter_lock = threading.Lock()
+        self._reset_counters()
+
+    def _reset_counters(self):
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.bypassed = 0
+        self.lock_timeouts = 0
+
+    def init_app(self, app):
+        self._namespaces = app.config['RESPONSE_CACHE_NAMESPACES']
+        self.lock_timeout = app.config['RESPONSE_CACHE_LOCK_TIMEOUT']
+        self._reset_counters()
+        backend = app.config['RESPONSE_CACHE_BACKEND']
+        max_entries = app.config['RESPONSE_CACHE_MAX_ENTRIES']
+        if backend == 'local':
+            self.backend = LocalCacheBackend(max_entries)
+        elif backend == 'sqlite':
+            self.backend = SQLiteCacheBackend(app.config['RESPONSE_CACHE_PATH'], max_entries)
+        elif backend is None:
+            self.backend = None
+        else:
+            raise ValueError(f'未知的响应缓存后端: {backend}')
+
+    def _count(self, name):
+        with self._counter_lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def get_or_compute(self, key, compute, ttl):
+        """
+        读取缓存；未命中时由获得租约锁的调用方执行 compute() 并写入缓存。
+        compute 返回 (结果, 可缓存的字节串、UNCACHEABLE 或 None)，返回值为 (结果或 None, 缓存字节串或 None)。
+        compute 返回 UNCACHEABLE 时在缓存中记下该标记，TTL 内的后续调用不再等待租约，各自直接执行 compute()。
+        """
+        value = self.backend.get(key)
+        if value == UNCACHEABLE:
+            self._count('bypassed')
+            return self._compute(key, compute, ttl)
+        if value is not None:
+            self._count('hits')
+            return None, value
+
+        deadline = time.monotonic() + self.lock_timeout
+        delay = 0.005
+        while True:
+            if self.backend.acquire(key, self.lock_timeout):
+                try:
+                    # 获得锁后再检查一次，等待期间可能已被其他调用方写入
+                    value = self.backend.get(key)
+                    if value == UNCACHEABLE:
+                        self._count('bypassed')
+                    elif value is not None:
+                        self._count('coalesced')
+                        return None, value
+                    else:
+                        self._count('misses')
+                    return self._compute(key, compute, ttl)
+                finally:
+                    self.backend.release(key)
+
+            time.sleep(delay)
+            delay = min(delay * 2, 0.1)
+            value = self.backend.get(key)
+            if value == UNCACHEABLE:
+                # 持锁方的结果不可缓存，不再排队
+                self._count('bypassed')
+                return self._compute(key, compute, ttl)
+            if value is not None:
+                self._count('coalesced')
+                return None, value
+            if time.monotonic() > deadline:
+                # 持锁方超时未完成，直接查询，不再等待
+                self._count('lock_timeouts')
+                self._count('misses')
+                return self._compute(key, compute, ttl)
+
+    def _compute(self, key, compute, ttl):
+        result, value = compute()
+        if value is not None:
+            self.backend.set(key, value, ttl)
+        return result, value if value != UNCACHEABLE else None
+
+    def cached(self, namespace):
+        """
+        路由装饰器：按 命名空间 + 请求路径和查询参数 缓存响应。
+        """
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                if self.backend is None:
+                    return view(*args, **kwargs)
+
+                key = f'{namespace}:{request.full_path}'
+
+                def compute():
+                    response = current_app.make_response(view(*args, **kwargs))
+                    # 分批流式输出的大响应不缓存：读取响应体会把整个响应读入内存，失去流式输出的意义
+                    if response.is_streamed:
+                        return response, UNCACHEABLE
+                    cacheable = response.status_code == 200 and response.mimetype == 'application/json'
+                    return response, response.get_data() if cacheable else None
+
+                response, body = self.get_or_compute(key, compute, self._namespaces[namespace]['ttl'])
+                if response is None:
+                    response = current_app.response_class(body, mimetype='application/json')
+                return response
+            return wrapper
+        return decorator
+
+    def invalidate(self, namespace):
+        if self.backend is not None:
+            self.backend.delete_prefix(f'{namespace}:')
+
+    def invalidate_tables(self, *tables):
+        """ 使依赖任一指定数据表的命名空间全部失效。 """
+        for namespace, settings in self._namespaces.items():
+            if set(settings['tables']).intersection(tables):
+                self.invalidate(namespace)
+
+    def stats(self):
+        with self._counter_lock:
+            counters = {
+                'hits': self.hits,
+                'misses': self.misses,
+                'coalesced': self.coalesced,
+                'bypassed': self.bypassed,
+                'lock_timeouts': self.lock_timeouts,
+            }
+        backend_stats = self.backend.stats() if self.backend is not None else {'backend': None}
+        return {**backend_stats, **counters}
+
+
+response_cache = ResponseCache()
@@ -0,0 +1,132 @@
+import json
+import time
+from itertools import islice
+
+from flask import current_app
+from flask.json.provider import DefaultJSONProvider
+
+from app.services.metrics import request_metrics
+
+try:
+    import orjson
+except ImportError:  # 未安装 orjson 时使用 Flask 默认的标准库实现
+    orjson = None
+
+
+class ORJSONProvider(DefaultJSONProvider):
+    """
+    基于 orjson 的 JSON 序列化：直接输出 UTF-8 字节，中文不转义，numpy 数组和标量按原生类型输出。
+    日期、Decimal 等与 Flask 默认实现的输出格式一致 (由 DefaultJSONProvider.default 处理)。
+    键按插入顺序输出；sort_keys 为 True 时排序。
+    """
+    sort_keys = False
+
+    def _options(self, indent=False):
+        option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return option
+
+    @staticmethod
+    def _default(obj):
+        if hasattr(obj, 'tolist'):  # orjson 不直接支持的 numpy 类型，如 float16、object 数组
+            return obj.tolist()
+        return DefaultJSONProvider.default(obj)
+
+    def encode(self, obj, indent=False):
+        """ 序列化为 UTF-8 字节串。 """
+        return orjson.dumps(obj, default=self._default, option=self._options(indent))
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:  # 带标准库参数 (如 cls、indent) 的调用交给默认实现
+            return super().dumps(obj, **kwargs)
+        return self.encode(obj).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = self.compact is False or (self.compact is None and self._app.debug)
+        started = time.perf_counter()
+        body = self.encode(obj, indent)
+        request_metrics.observe_serialization(time.perf_counter() - started)
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
+def init_json_provider(app):
+    """
+    按 JSON_PROVIDER 配置选择序列化实现：'orjson' (未安装时回退) 或 'default'。
+    两种实现都不转义中文。
+    """
+    if app.config['JSON_PROVIDER'] == 'orjson' and orjson is not None:
+        app.json = ORJSONProvider(app)
+    else:
+        app.json = DefaultJSONProvider(app)
+        app.json.ensure_ascii = False
+    return app.json
+
+
+def json_encoder():
+    """
+    当前应用的 JSON 实现对应的编码函数 (对象 -> 紧凑的 UTF-8 字节串)。
+    返回的函数不依赖应用上下文，可在流式响应的生成器中使用；耗时计入当前请求的序列化时间。
+    """
+    provider = current_app.json
+    if isinstance(provider, ORJSONProvider):
+        return request_metrics.timed_encoder(provider.encode)
+
+    def encode(obj):
+        return json.dumps(obj, default=provider.default, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    return request_metrics.timed_encoder(encode)
+
+
+def iter_json(obj, encode, threshold, batch_size):
+    """
+    逐段序列化：长度超过 threshold 的列表每 batch_size 个元素序列化一次，其余部分整体序列化。
+    输出拼接后与 encode(obj) 等价，但不需要一次性生成完整的字节串。
+    """
+    if isinstance(obj, dict):
+        yield b'{'
+        for index, (key, value) in enumerate(obj.items()):
+            yield (b',' if index else b'') + encode(str(key)) + b':'
+            yield from iter_json(value, encode, threshold, batch_size)
+        yield b'}'
+    elif isinstance(obj, (list, tuple)) and len(obj) > threshold:
+        yield b'['
+        items = iter(obj)
+        first = True
+        while True:
+            batch = list(islice(items, batch_size))
+            if not batch:
+                break
+            # 去掉每批的方括号，批之间用逗号连接
+            yield (b'' if first else b',') + encode(batch)[1:-1]
+            first = False
+        yield b']'
+    else:
+        yield encode(obj)
+
+
+def _has_large_list(obj, threshold):
+    if isinstance(obj, dict):
+        return any(_has_large_list(value, threshold) for value in obj.values())
+    return isinstance(obj, (list, tuple)) and len(obj) > threshold
+
+
+def jsonify_large(**kwargs):
+    """
+    与 jsonify(**kwargs) 输出相同，但其中有超过 JSON_STREAM_THRESHOLD 个元素的列表时，
+    按 JSON_STREAM_BATCH_SIZE 分批序列化并流式返回，首字节更早发出，不在内存中保留完整的响应体。
+    """
+    threshold = current_app.config['JSON_STREAM_THRESHOLD']
+    if not _has_large_list(kwargs, threshold):
+        return current_app.json.response(**kwargs)
+    return current_app.response_class(
+        iter_json(kwargs, json_encoder(), threshold, current_app.config['JSON_STREAM_BATCH_SIZE']),
+        mimetype='application/json'
+    )
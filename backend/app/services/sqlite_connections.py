@@ -0,0 +1,30 @@
+import os
+import sqlite3
+import threading
+
+
+class SQLiteConnections:
+    """
+    本机 SQLite 文件的连接，供缓存、草稿和任务队列等多进程共享的存储使用。
+    每个进程、每个线程使用独立连接；fork 后不能复用父进程的连接。
+    连接为自动提交模式 (需要事务时显式 BEGIN)，使用 WAL 日志，多个进程可同时读取、依次写入。
+    """
+
+    def __init__(self, path, row_factory=None, timeout=5.0):
+        self.path = path
+        self.row_factory = row_factory
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def get(self):
+        """ 当前进程、当前线程的连接，首次调用时建立。 """
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None, check_same_thread=False)
+            if self.row_factory is not None:
+                conn.row_factory = self.row_factory
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
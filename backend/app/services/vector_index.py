@@ -0,0 +1,286 @@
+import fcntl
+import json
+import math
+import os
+import re
+import threading
+import unicodedata
+import zlib
+from contextlib import contextmanager
+
+import numpy as np
+
+_CJK = re.compile(r'[㐀-鿿豈-﫿]')
+_WORD = re.compile(r'[a-z0-9]+(?:\.[0-9]+)?')
+
+
+class HashingEmbedder:
+    """
+    离线的文本向量化：中文按单字和相邻双字、英文数字按词，哈希到固定维度后归一化。
+    不依赖向量模型服务，适合项目名称、品牌、动力配置等关键词匹配。
+    """
+
+    name = 'hashing'
+
+    def __init__(self, dim=512):
+        self.dim = dim
+
+    def tokens(self, text):
+        text = unicodedata.normalize('NFKC', text).lower()
+        tokens = _WORD.findall(text)
+        for segment in re.findall(r'[㐀-鿿豈-﫿]+', text):
+            tokens.extend(segment)
+            tokens.extend(segment[i:i + 2] for i in range(len(segment) - 1))
+        return tokens
+
+    def __call__(self, text):
+        hashes = np.fromiter(
+            (zlib.crc32(token.encode('utf-8')) for token in self.tokens(text)), dtype=np.uint32
+        )
+        # 低位决定维度，最高位决定符号，减少哈希冲突带来的偏差
+        signs = np.where(hashes >> 31, -1.0, 1.0)
+        return np.bincount(hashes % self.dim, weights=signs, minlength=self.dim).astype(np.float32)
+
+
+class CallableEmbedder:
+    """
+    包装外部向量模型 (如 Ollama 的 embeddings 接口)。name 用于判断已有向量是否可比较。
+    """
+
+    def __init__(self, name, embed):
+        self.name = name
+        self._embed = embed
+
+    def __call__(self, text):
+        return self._embed(text)
+
+
+def estimate_tokens(text):
+    """ 粗略估算 token 数：每个汉字约 1 个 token，其他字符约 4 个字符 1 个 token。 """
+    cjk = len(_CJK.findall(text))
+    return cjk + math.ceil((len(text) - cjk) / 4)
+
+
+def assemble_context(documents, budget, header=''):
+    """
+    按顺序拼接文档，总长度不超过 budget 个 token。
+    文档按行截断：放不下整篇时只保留前面的行 (重要信息放在前面)，一行都放不下时停止。
+    """
+    parts = [header] if header else []
+    used = estimate_tokens(header) if header else 0
+    for document in documents:
+        lines = []
+        for line in document.splitlines():
+            cost = estimate_tokens(line) + 1
+            if used + cost > budget:
+                break
+            lines.append(line)
+            used += cost
+        if not lines:
+            break
+        parts.append('\n'.join(lines))
+        if len(lines) < len(document.splitlines()):
+            break
+    return '\n\n'.join(parts)
+
+
+class VectorIndex:
+    """
+    本地向量索引。向量按行追加到 vectors.f32 并以内存映射方式读取，
+    manifest.json 记录每行对应的文档键、版本、文本和是否有效。
+    更新文档时追加新行并将旧行标记为无效，无效行过多时整体压缩重写；
+    写入通过文件锁串行化，同一主机上的各 worker 在 manifest 变化后自动重新加载。
+    """
+
+    def __init__(self):
+        self.path = None
+        self.embed = None
+        self._lock = threading.Lock()
+        self._manifest = None
+        self._manifest_mtime = None
+        self._vectors = None
+        self._live = None
+        self.last_sync = None
+
+    def init_app(self, app, embed=None):
+        directory = app.config['RAG_INDEX_DIR']
+        self.path = directory
+        self.embed = embed or HashingEmbedder(app.config['RAG_HASH_DIM'])
+        self.compact_ratio = app.config['RAG_COMPACT_RATIO']
+        self._manifest = None
+        self._manifest_mtime = None
+        self._vectors = None
+        self.last_sync = None
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    @property
+    def enabled(self):
+        return self.path is not None
+
+    def _file(self, name):
+        return os.path.join(self.path, name)
+
+    @contextmanager
+    def _write_lock(self):
+        with open(self._file('index.lock'), 'w') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _empty_manifest(self):
+        return {'embedder': self.embed.name, 'dim': None, 'vectors_file': 'vectors.f32', 'rows': []}
+
+    def _read_manifest(self):
+        try:
+            with open(self._file('manifest.json'), encoding='utf-8') as f:
+                manifest = json.load(f)
+        except FileNotFoundError:
+            return self._empty_manifest()
+        # 向量化方式变化后旧向量不可比较，视为空索引重新构建
+        if manifest.get('embedder') != self.embed.name:
+            return self._empty_manifest()
+        return manifest
+
+    def _write_manifest(self, manifest):
+        tmp = self._file('manifest.json.tmp')
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self._file('manifest.json'))
+
+    def load(self):
+        """ manifest 变化时重新加载元数据和向量映射。返回 (manifest, vectors, live)。 """
+        with self._lock:
+            try:
+                mtime = os.stat(self._file('manifest.json')).st_mtime_ns
+            except FileNotFoundError:
+                mtime = None
+            if self._manifest is None or mtime != self._manifest_mtime:
+                manifest = self._read_manifest()
+                rows = manifest['rows']
+                vectors = None
+                if rows:
+                    vectors = np.memmap(self._file(manifest['vectors_file']), dtype=np.float32, mode='r',
+                                        shape=(len(rows), manifest['dim']))
+                self._manifest, self._manifest_mtime, self._vectors = manifest, mtime, vectors
+                self._live = np.array([row['live'] for row in rows], dtype=bool)
+            return self._manifest, self._vectors, self._live
+
+    def versions(self):
+        """ 当前有效文档的 键 -> 版本。 """
+        manifest, _, _ = self.load()
+        return {row['key']: row['version'] for row in manifest['rows'] if row['live']}
+
+    def _normalize(self, vectors):
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1
+        return (vectors / norms).astype(np.float32)
+
+    def upsert(self, documents):
+        """
+        写入或更新文档。documents 为 [{'key', 'version', 'text', 'meta'}]，
+        同一键的旧行标记为无效，新向量追加到向量文件末尾。
+        """
+        if not documents:
+            return 0
+        vectors = self._normalize(np.vstack([np.asarray(self.embed(doc['text']), dtype=np.float32)
+                                             for doc in documents]))
+        with self._write_lock():
+            manifest = self._read_manifest()
+            if manifest['dim'] is None:
+                manifest['dim'] = int(vectors.shape[1])
+            keys = {doc['key'] for doc in documents}
+            for row in manifest['rows']:
+                if row['live'] and row['key'] in keys:
+                    row['live'] = False
+            # 先追加向量再替换 manifest，读取方只映射 manifest 中记录的行数
+            path = self._file(manifest['vectors_file'])
+            with open(path, 'r+b' if os.path.exists(path) else 'wb') as f:
+                f.truncate(len(manifest['rows']) * manifest['dim'] * 4)
+                f.seek(0, os.SEEK_END)
+                f.write(vectors.tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+            manifest['rows'].extend(
+                {'key': doc['key'], 'version': doc['version'], 'text': doc['text'],
+                 'meta': doc.get('meta', {}), 'live': True}
+                for doc in documents
+            )
+            self._maybe_compact(manifest)
+            self._write_manifest(manifest)
+        return len(documents)
+
+    def remove(self, keys):
+        """ 将指定键的文档标记为无效。 """
+        keys = set(keys)
+        if not keys:
+            return 0
+        with self._write_lock():
+            manifest = self._read_manifest()
+            removed = 0
+            for row in manifest['rows']:
+                if row['live'] and row['key'] in keys:
+                    row['live'] = False
+                    removed += 1
+            if removed:
+                self._maybe_compact(manifest)
+                self._write_manifest(manifest)
+        return removed
+
+    def _maybe_compact(self, manifest):
+        """ 无效行比例超过阈值时，只保留有效行写入新的向量文件。 """
+        rows = manifest['rows']
+        dead = sum(1 for row in rows if not row['live'])
+        if not rows or dead / len(rows) <= self.compact_ratio:
+            return
+        old = np.fromfile(self._file(manifest['vectors_file']), dtype=np.float32,
+                          count=len(rows) * manifest['dim']).reshape(len(rows), manifest['dim'])
+        live = [index for index, row in enumerate(rows) if row['live']]
+        # 写入新文件名，已映射旧文件的读取方不受影响；再上一代文件此时已无人读取，可以删除
+        generation = int(manifest.get('generation', 0)) + 1
+        vectors_file = f'vectors.{generation}.f32'
+        old[live].tofile(self._file(vectors_file))
+        stale = manifest.get('previous_vectors_file')
+        if stale and os.path.exists(self._file(stale)):
+            os.remove(self._file(stale))
+        manifest['previous_vectors_file'] = manifest['vectors_file']
+        manifest['rows'] = [rows[index] for index in live]
+        manifest['vectors_file'] = vectors_file
+        manifest['generation'] = generation
+
+    def search(self, query, k=5):
+        """ 返回与 query 最相似的 k 个有效文档: [(相似度, row)]，按相似度降序。 """
+        manifest, vectors, live = self.load()
+        if vectors is None or not live.any():
+            return []
+        query_vector = np.asarray(self.embed(query), dtype=np.float32)
+        norm = np.linalg.norm(query_vector)
+        if norm == 0:
+            return []
+        scores = np.asarray(vectors @ (query_vector / norm))
+        scores = np.where(live, scores, -np.inf)
+        k = min(k, int(live.sum()))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind='stable')]
+        return [(float(scores[index]), manifest['rows'][index]) for index in top]
+
+    def stats(self):
+        if not self.enabled:
+            return {'enabled': False}
+        manifest, _, live = self.load()
+        return {
+            'enabled': True,
+            'path': self.path,
+            'embedder': manifest['embedder'],
+            'dim': manifest['dim'],
+            'documents': int(live.sum()),
+            'rows': len(manifest['rows']),
+            'last_sync': self.last_sync,
+        }
+
+
+project_index = VectorIndex()
@@ -0,0 +1,111 @@
+"""
+测算草稿生成基准测试：在基准数据库中构造参考项目，测量 generate_calculation 的查询、计算和端到端耗时。
+
+使用方法 (在 backend 目录下)：
+    python -m benchmarks.bench_calculation
+    python -m benchmarks.bench_calculation --sizes 1000 5000 --months 36
+
+默认使用 BenchmarkConfig 中的 SQLite 数据库。
+"""
+import argparse
+import random
+import statistics
+import time
+
+from sqlalchemy import insert
+
+from app.app import create_app
+from app.db.db import db
+from app.db.ids import id_generator
+from app.modules.bfa.calculation import compute_draft, load_reference_rows
+from app.modules.bfa.models import (BaHoursBasis, LisProject, LisProjectOrder, PmMonthHoursDetail,
+                                    PmWorkHours)
+
+TARGET_ID = 900000010
+REFERENCE_ID = 900000011
+ORDER_ID = 900000011
+
+
+def clear_reference():
+    measure_ids = db.session.query(PmWorkHours.id).filter(PmWorkHours.select_order == ORDER_ID)
+    db.session.query(PmMonthHoursDetail).filter(
+        PmMonthHoursDetail.measure_key.in_(measure_ids.scalar_subquery())
+    ).delete(synchronize_session=False)
+    db.session.query(PmWorkHours).filter(PmWorkHours.select_order == ORDER_ID).delete()
+    db.session.commit()
+
+
+def seed_reference(rows, months, seed=7):
+    """ 构造一个包含 rows 个工时行、每行最多 months 个月明细的参考项目。 """
+    rng = random.Random(seed)
+    for model, values in ((LisProject, dict(id=TARGET_ID, measure_status='1', sml='3')),
+                          (LisProject, dict(id=REFERENCE_ID, measure_status='4', sml='2')),
+                          (LisProjectOrder, dict(id=ORDER_ID, project_id=str(REFERENCE_ID)))):
+        if db.session.get(model, values['id']) is None:
+            db.session.add(model(**values))
+    baseline_ids = [row.id for row in db.session.query(BaHoursBasis.id).limit(200)]
+    if not baseline_ids:
+        baseline_ids = id_generator.next_ids(200)
+        db.session.execute(insert(BaHoursBasis), [
+            {'id': baseline_id, 'first_task': str(i % 20), 'total_hour': str(rng.randint(50, 500))}
+            for i, baseline_id in enumerate(baseline_ids)
+        ])
+    clear_reference()
+
+    work_hour_ids = id_generator.next_ids(rows)
+    db.session.execute(insert(PmWorkHours), [
+        {'id': work_hour_id, 'select_order': ORDER_ID, 'power_conf': f'动力配置{i % 9}',
+         'business_detail': f'具体事项{i}', 'base_hours': rng.randint(10, 500),
+         'select_hours_base': rng.choice(baseline_ids) if i % 4 else None}
+        for i, work_hour_id in enumerate(work_hour_ids)
+    ])
+    month_rows = [
+        {'measure_id': str(work_hour_id), 'measure_key': work_hour_id,
+         'mm': (2023 + m // 12) * 100 + m % 12 + 1, 'month_input': str(rng.randint(0, 160))}
+        for work_hour_id in work_hour_ids for m in range(months) if rng.random() > 0.3
+    ]
+    for row, month_id in zip(month_rows, id_generator.next_ids(len(month_rows))):
+        row['id'] = month_id
+    db.session.execute(insert(PmMonthHoursDetail), month_rows)
+    db.session.commit()
+    return len(month_rows)
+
+
+def median_ms(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='测算草稿生成基准测试')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 5000], help='参考项目的工时行数')
+    parser.add_argument('--months', type=int, default=36, help='每行的月份数')
+    parser.add_argument('--repeat', type=int, default=5, help='每组重复次数，取中位数')
+    args = parser.parse_args()
+
+    app = create_app('benchmark')
+    client = app.test_client()
+    # 生成在后台任务中执行，?wait= 等待结果，端到端时间包含排队和认领
+    url = f'/api/v1/bfa/tasks/{TARGET_ID}/calculate?wait=60'
+    body = {'reference_project_id': str(REFERENCE_ID), 'start_month': '202601'}
+    with app.app_context():
+        db.create_all()
+        print(f"{'工时行':>6} {'明细行':>8} {'查询(ms)':>10} {'计算(ms)':>10} {'端到端(ms)':>12}")
+        for size in args.sizes:
+            details = seed_reference(size, args.months)
+            rows = load_reference_rows(REFERENCE_ID)
+            query_ms = median_ms(lambda: load_reference_rows(REFERENCE_ID), args.repeat)
+            compute_ms = median_ms(lambda: compute_draft(rows, {}, 1.3, 202601), args.repeat)
+            response = client.post(url, json=body)
+            assert response.status_code == 200 and len(response.json['data']['table_data']) == size
+            total_ms = median_ms(lambda: client.post(url, json=body), args.repeat)
+            print(f'{size:>6} {details:>8} {query_ms:>10.1f} {compute_ms:>10.1f} {total_ms:>12.1f}')
+        clear_reference()
+
+
+if __name__ == '__main__':
+    main()
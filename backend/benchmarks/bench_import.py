@@ -0,0 +1,78 @@
+"""
+Excel 导入基准测试：生成工时基准工作簿，测量首次导入 (全部插入) 和再次导入 (全部更新) 的耗时和每秒行数，
+并单独测量只读取工作簿 (不写库) 的耗时。
+
+使用方法 (在 backend 目录下)：
+    python -m benchmarks.bench_import
+    python -m benchmarks.bench_import --rows 100000 --batch-size 5000
+
+默认使用 BenchmarkConfig 中的 SQLite 数据库。
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from openpyxl import Workbook, load_workbook
+from sqlalchemy import delete
+
+from app.app import create_app
+from app.db.db import db
+from app.modules.bfa.importer import import_workbook
+from app.modules.bfa.models import BaHoursBasis
+
+SERIAL_PREFIX = 'BENCH-'
+
+
+def write_baselines(path, rows, seed=7):
+    rng = random.Random(seed)
+    # 普通模式保存的工作簿带有 <dimension>，与 Excel 保存的文件一致，只读模式打开时不需要预先扫描整张表
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.title = '工时基准'
+    sheet.append(['编号', '动力配置', '一级任务', '改动类型', '定义范围', '基准工时', '部门'])
+    for i in range(rows):
+        sheet.append([f'{SERIAL_PREFIX}{i}', f'动力配置{i % 9}', rng.randint(1, 20), rng.choice(['新增', '变更', '沿用']),
+                      f'定义范围{i % 300}', rng.randint(10, 800), f'部门{i % 12}'])
+    workbook.save(path)
+
+
+def read_only_seconds(path):
+    started = time.perf_counter()
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    for _ in workbook.worksheets[0].iter_rows(values_only=True):
+        pass
+    workbook.close()
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Excel 导入基准测试')
+    parser.add_argument('--rows', type=int, default=100000, help='工作簿行数')
+    parser.add_argument('--batch-size', type=int, default=5000, help='每个事务写入的行数')
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.gettempdir(), f'bfai-bench-baselines-{args.rows}.xlsx')
+    if not os.path.exists(path):
+        write_baselines(path, args.rows)
+    app = create_app('benchmark')
+    with app.app_context():
+        db.create_all()
+        db.session.execute(delete(BaHoursBasis).where(BaHoursBasis.serial_number.like(f'{SERIAL_PREFIX}%')))
+        db.session.commit()
+
+        read_s = read_only_seconds(path)
+        print(f"{'阶段':<8} {'行数':>8} {'新增':>8} {'更新':>8} {'耗时(s)':>8} {'行/秒':>10}")
+        print(f"{'只读取':<8} {args.rows:>8} {'':>8} {'':>8} {read_s:>8.2f} {args.rows / read_s:>10.0f}")
+        for label in ('首次导入', '再次导入'):
+            report = import_workbook(path, 'baselines', batch_size=args.batch_size)
+            print(f"{label:<8} {report['rows']:>8} {report['inserted']:>8} {report['updated']:>8} "
+                  f"{report['elapsed_s']:>8.2f} {report['rows_per_sec']:>10.0f}")
+
+        db.session.execute(delete(BaHoursBasis).where(BaHoursBasis.serial_number.like(f'{SERIAL_PREFIX}%')))
+        db.session.commit()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""
+JSON 序列化基准测试：在与接口输出同构的载荷 (历史项目详情、工时基准列表) 上对比
+Flask 默认实现 (标准库，转义中文、键排序)、标准库不转义中文、orjson 和 orjson 分批流式序列化，
+并按配置的压缩级别测量 gzip / br 压缩后的大小和耗时。
+
+使用方法 (在 backend 目录下)：
+    python -m benchmarks.bench_json
+    python -m benchmarks.bench_json --measures 1000 5000 --months 48 --baselines 20000
+"""
+import argparse
+import gzip
+import random
+import statistics
+import time
+from collections import namedtuple
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+from app.config.config import BaseConfig
+from app.modules.bfa.pivot import build_history_table
+from app.modules.bfa.reference import format_baseline
+from app.services.compression import brotli
+from app.services.serialization import ORJSONProvider, iter_json, orjson
+from benchmarks.bench_pivot import make_rows
+
+BaselineRow = namedtuple('BaselineRow', ['id', 'power_type', 'first_task_key', 'change_type', 'de_range', 'total_hour'])
+
+
+def make_baselines(count, seed=7):
+    """ 构造与 load_baselines 输出同构的工时基准列表。 """
+    rng = random.Random(seed)
+    task_names = {key: f'一级任务{key}' for key in range(1, 21)}
+    rows = [
+        BaselineRow(1800000000000000000 + i, f'动力配置{i % 9}', rng.randint(1, 25), rng.choice(['新增', '变更', '沿用']),
+                    f'定义范围{i % 300}：适用于{rng.choice(["整车", "发动机", "变速箱"])}标定', str(rng.randint(10, 800)))
+        for i in range(count)
+    ]
+    return [format_baseline(row, task_names) for row in rows]
+
+
+def make_providers(app):
+    legacy = DefaultJSONProvider(app)
+    plain = DefaultJSONProvider(app)
+    plain.ensure_ascii = False
+    plain.sort_keys = False
+    providers = [('Flask 默认', legacy), ('标准库 不转义', plain)]
+    if orjson is not None:
+        providers.append(('orjson', ORJSONProvider(app)))
+    return providers
+
+
+def median_ms(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings), result
+
+
+def report(name, payload, providers, args):
+    print(f'\n{name}')
+    header = f"{'实现':<14} {'序列化(ms)':>10} {'大小(KB)':>10} {'gzip(ms)':>9} {'gzip(KB)':>9}"
+    print(header + (f" {'br(ms)':>8} {'br(KB)':>8}" if brotli is not None else ''))
+    baseline_ms = None
+    for label, provider in providers:
+        encode_ms, body = median_ms(lambda: provider.response(data=payload).get_data(), args.repeat)
+        baseline_ms = baseline_ms or encode_ms
+        gzip_ms, compressed = median_ms(lambda: gzip.compress(body, compresslevel=BaseConfig.RESPONSE_COMPRESSION_GZIP_LEVEL), args.repeat)
+        line = (f'{label:<14} {encode_ms:>10.1f} {len(body) / 1024:>10.1f} '
+                f'{gzip_ms:>9.1f} {len(compressed) / 1024:>9.1f}')
+        if brotli is not None:
+            br_ms, compressed = median_ms(lambda: brotli.compress(body, quality=BaseConfig.RESPONSE_COMPRESSION_BROTLI_QUALITY), args.repeat)
+            line += f' {br_ms:>8.1f} {len(compressed) / 1024:>8.1f}'
+        print(f'{line}   {baseline_ms / encode_ms:.1f}x')
+
+    if orjson is not None:
+        encode = providers[-1][1].encode
+        stream_ms, body = median_ms(
+            lambda: b''.join(iter_json({'data': payload}, encode, args.threshold, args.batch_size)), args.repeat)
+        assert body == encode({'data': payload})
+        print(f"{'orjson 流式':<14} {stream_ms:>10.1f} {len(body) / 1024:>10.1f}"
+              f"   每批 {args.batch_size} 行，首块在序列化第一批后即可发出")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='JSON 序列化基准测试')
+    parser.add_argument('--measures', type=int, nargs='+', default=[1000, 5000], help='历史项目详情的工时行数')
+    parser.add_argument('--months', type=int, default=36, help='月份数')
+    parser.add_argument('--baselines', type=int, default=10000, help='工时基准行数')
+    parser.add_argument('--threshold', type=int, default=2000, help='流式序列化的列表长度阈值')
+    parser.add_argument('--batch-size', type=int, default=500, help='流式序列化每批的元素数')
+    parser.add_argument('--repeat', type=int, default=5, help='每组重复次数，取中位数')
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    providers = make_providers(app)
+    task_names = {key: f'一级任务{key}' for key in range(1, 16)}
+    with app.app_context():
+        for measures in args.measures:
+            table_data, dynamic_columns = build_history_table(make_rows(measures, args.months), task_names)
+            report(f'历史项目详情: {measures} 行 x {args.months} 月',
+                   {'table_data': table_data, 'dynamic_columns': dynamic_columns}, providers, args)
+        report(f'工时基准列表: {args.baselines} 行', make_baselines(args.baselines), providers, args)
+
+
+if __name__ == '__main__':
+    main()
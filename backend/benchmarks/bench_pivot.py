@@ -0,0 +1,117 @@
+"""
+历史项目详情透视基准测试：对比逐行循环的旧实现与基于 NumPy 的批量透视。
+
+使用方法 (在 backend 目录下)：
+    python -m benchmarks.bench_pivot
+    python -m benchmarks.bench_pivot --measures 5000 --months 48
+"""
+import argparse
+import random
+import statistics
+import time
+from collections import namedtuple
+
+from app.modules.bfa.pivot import build_history_table
+
+DetailRow = namedtuple('DetailRow', [
+    'measure_id', 'business_detail', 'base_hours', 'power_conf', 'mm', 'month_input',
+    'first_task_key', 'change_type', 'de_range',
+])
+
+
+def make_rows(measures, months, seed=7):
+    """ 构造与 get_historical_project_details 查询结果同构的扁平行，按工时行ID和月份排序。 """
+    rng = random.Random(seed)
+    month_labels = [(2023 + m // 12) * 100 + m % 12 + 1 for m in range(months)]
+    rows = []
+    for measure_id in range(1, measures + 1):
+        base_hours = rng.randint(10, 500)
+        first_task_key = rng.randint(1, 20)
+        for mm in month_labels:
+            # 约三成单元格没有填报
+            if rng.random() < 0.3:
+                continue
+            rows.append(DetailRow(
+                measure_id, f'具体事项{measure_id}', base_hours, f'动力配置{measure_id % 9}',
+                mm, str(rng.randint(0, 160)), first_task_key, '新增', f'定义范围{measure_id % 50}',
+            ))
+    return rows
+
+
+def legacy_build_history_table(query_results, task_names):
+    """ 旧实现：逐行循环、逐个单元格解析浮点数、dict-of-dicts 组装。 """
+    processed_data = {}
+    all_months = set()
+    for row in query_results:
+        measure_id = row.measure_id
+        if measure_id not in processed_data:
+            first_task_name = task_names.get(row.first_task_key)
+            processed_data[measure_id] = {
+                'power_config': row.power_conf,
+                'business_detail': row.business_detail,
+                'base_hours': float(row.base_hours) if row.base_hours is not None else 0,
+                'total_hours': 0,
+                'monthly_inputs': {},
+                'first_task_name': first_task_name if first_task_name is not None else '未找到工时基准表',
+                'change_type': row.change_type if row.change_type is not None else '未找到工时基准表',
+                'de_range': row.de_range if row.de_range is not None else '未找到工时基准表'
+            }
+        if row.mm and row.month_input:
+            month_str = str(row.mm)
+            try:
+                month_input_val = float(row.month_input)
+            except (ValueError, TypeError):
+                month_input_val = 0
+            all_months.add(month_str)
+            processed_data[measure_id]['monthly_inputs'][month_str] = month_input_val
+            processed_data[measure_id]['total_hours'] += month_input_val
+
+    dynamic_columns = sorted(list(all_months))
+    table_data = []
+    for index, (measure_id, data) in enumerate(processed_data.items()):
+        row_data = {
+            'id': measure_id,
+            '序号': index + 1,
+            '动力配置': data['power_config'],
+            '一级任务': data['first_task_name'],
+            '改动类型': data['change_type'],
+            '定义范围': data['de_range'],
+            '具体事项': data['business_detail'],
+            '基准工时': data['base_hours'],
+            '填报总工时': data['total_hours'],
+        }
+        for month in dynamic_columns:
+            row_data[month] = data['monthly_inputs'].get(month, '')
+        table_data.append(row_data)
+    return table_data, dynamic_columns
+
+
+def measure(fn, rows, task_names, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(rows, task_names)
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='历史项目详情透视基准测试')
+    parser.add_argument('--measures', type=int, nargs='+', default=[100, 1000, 5000], help='工时行数')
+    parser.add_argument('--months', type=int, default=36, help='月份数')
+    parser.add_argument('--repeat', type=int, default=5, help='每组重复次数，取中位数')
+    args = parser.parse_args()
+
+    task_names = {key: f'一级任务{key}' for key in range(1, 16)}
+    print(f"{'工时行':>6} {'明细行':>8} {'逐行循环(ms)':>12} {'NumPy(ms)':>10} {'加速比':>8}")
+    for measures in args.measures:
+        rows = make_rows(measures, args.months)
+        # 两种实现的输出必须一致
+        assert legacy_build_history_table(rows, task_names) == build_history_table(rows, task_names)
+        legacy_ms = measure(legacy_build_history_table, rows, task_names, args.repeat)
+        numpy_ms = measure(build_history_table, rows, task_names, args.repeat)
+        print(f'{measures:>6} {len(rows):>8} {legacy_ms:>12.1f} {numpy_ms:>10.1f} {legacy_ms / numpy_ms:>7.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,403 @@
+"""
+合成数据生成器：按接近生产的规模和分布向基准数据库写入 bfa 全部业务表的数据，供基准测试套件
+(benchmarks/suite) 使用。
+
+- 项目状态约 70% 测算完成、15% 测算中 (其中大部分为待办)、10% 编制中、5% 已作废；
+- 工时行只属于测算完成的项目，按帕累托分布分配，少数大项目占大部分工时行；
+- 每个工时行的月度明细为连续月份，从项目立项月开始；
+- 主键从 1 开始连续编号，字符串外键与 BIGINT 影子键一并写入。
+
+使用方法 (在 backend 目录下)：
+    python -m benchmarks.datagen                  # 5 万项目、50 万工时行、1000 万月度明细
+    python -m benchmarks.datagen --scale 0.01     # 按比例缩小
+    python -m benchmarks.datagen --scale 0.1 --month-details 500000
+
+默认写入 BenchmarkConfig 中的 SQLite 数据库，设置 BFA_BENCHMARK_DATABASE_URI 可写入 MySQL。
+生成前会删除并重建全部表，不要指向业务数据库。
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, inspect, select, text
+
+from app.app import create_app
+from app.db.db import db
+from app.modules.bfa.inbox import reconcile_inbox
+from app.modules.bfa.models import (BaHoursBasis, BsBasicCenterHr, LisMeasurePerson, LisOrderNode, LisProject,
+                                    LisProjectOrder, LisTask, PmMonthHoursDetail, PmSheetControl, PmWorkHours)
+
+# scale = 1 时的行数，其余表按固定比例推算
+FULL_SCALE = {
+    'lis_project': 50000,
+    'pm_work_hours': 500000,
+    'pm_month_hours_detail': 10000000,
+    'bs_basic_center_hr': 200,
+    'ba_hours_basis': 20000,
+}
+MINIMUM_ROWS = {
+    'lis_project': 20,
+    'pm_work_hours': 100,
+    'pm_month_hours_detail': 1000,
+    'bs_basic_center_hr': 5,
+    'ba_hours_basis': 100,
+}
+ORDERS_PER_PROJECT = 2
+NODES_PER_ORDER = 3
+PERSONS_PER_PROJECT = 3
+SHEETS_PER_DEPARTMENT = 3
+TASK_COUNT = 60
+# 每个测算人员平均参与的项目数
+PROJECTS_PER_PERSON = 60
+
+# 项目状态及占比: 4 测算完成、1 测算中、0 编制中、10 已作废
+STATUS_SHARES = (('4', 0.70), ('1', 0.15), ('0', 0.10), ('10', 0.05))
+# 测算中的项目中未完成 (measure_tag = '0'，即待办) 的比例
+TODO_SHARE = 0.9
+BRAND_WEIGHTS = {'1': 8, '2': 10, '3': 3, '4': 30, '5': 10, '6': 12, '7': 2, '8': 3, '9': 1, '10': 6, '11': 15}
+SCALE_WEIGHTS = {'0': 15, '1': 30, '2': 35, '3': 20}
+SERIES = ('H', 'M', 'B', 'P', 'V', 'C', 'E', 'T')
+PROJECT_KINDS = ('换代', '改款', '年型变更', '动力升级', '新增配置', '出口适配', '平台开发', '法规升级')
+POWER_CONFS = ('1.5T', '1.5T HEV', '1.5T PHEV', '2.0T', '2.0T HEV', '2.0T PHEV', '2.4T 柴油', '3.0T', 'EV 单电机',
+               'EV 双电机')
+MARKETS = ('国内', '欧洲', '澳洲', '俄罗斯', '中东', '东南亚', '南美', '南非')
+STAGES = ('立项', '设计冻结', 'SOP')
+TASK_NAMES = ('动力总成', '发动机标定', '变速器', '电驱系统', '电池包', '热管理', '底盘', '悬架', '转向', '制动',
+              '车身', '内外饰', '座椅', '电子电器', '智能座舱', '智能驾驶', '网联', '软件集成', '整车集成', 'NVH',
+              '碰撞安全', '耐久试验', '排放认证', '法规认证', '造型', '工艺', '质量', '采购', '试制', '售后')
+CHANGE_TYPES = ('新增', '变更', '沿用')
+DETAIL_ACTIONS = ('开发', '适配', '验证', '标定', '优化', '认证', '匹配', '设计变更')
+DEPARTMENT_NAMES = ('动力总成开发部', '底盘开发部', '车身开发部', '电子电器开发部', '新能源开发部', '智能化开发部',
+                    '整车集成部', '试验中心', '造型中心', '工艺部', '质量部', '项目管理部')
+SURNAMES = '王李张刘陈杨赵黄周吴徐孙胡朱高林何郭马罗'
+GIVEN_NAMES = '伟芳娜敏静丽强磊军洋勇艳杰涛明超秀霞平刚桂英华玉兰'
+FIRST_MONTH = datetime(2019, 1, 1)
+LAST_MONTH = datetime(2026, 6, 1)
+
+
+def dataset_sizes(scale=1.0, **overrides):
+    """
+    各表的目标行数。scale 按比例缩放默认规模，overrides 按表名直接指定 (None 表示不指定)。
+    """
+    sizes = {table: max(MINIMUM_ROWS[table], round(rows * scale)) for table, rows in FULL_SCALE.items()}
+    sizes.update({table: rows for table, rows in overrides.items() if rows is not None})
+    projects, departments = sizes['lis_project'], sizes['bs_basic_center_hr']
+    sizes.update({
+        'lis_project_order': projects * ORDERS_PER_PROJECT,
+        'lis_order_node': projects * ORDERS_PER_PROJECT * NODES_PER_ORDER,
+        'lis_measure_person': projects * PERSONS_PER_PROJECT,
+        'pm_sheet_control': departments * SHEETS_PER_DEPARTMENT,
+        'lis_task': TASK_COUNT,
+    })
+    return sizes
+
+
+def dataset_matches(sizes):
+    """
+    当前数据库各表的行数是否与 sizes 一致，用于判断是否需要重新生成。
+    """
+    tables = set(inspect(db.engine).get_table_names())
+    if not set(sizes) <= tables:
+        return False
+    for table, rows in sizes.items():
+        count = db.session.execute(select(func.count()).select_from(db.metadata.tables[table])).scalar()
+        if count != rows:
+            return False
+    return True
+
+
+def month_code(index):
+    """ 月份序号 (年 * 12 + 月 - 1) 转为 YYYYMM。 """
+    return index // 12 * 100 + index % 12 + 1
+
+
+def allocate(total, weights):
+    """ 按权重把 total 分配为整数，余数按小数部分从大到小补齐，合计恰好为 total。 """
+    weight_sum = sum(weights)
+    shares = [total * weight / weight_sum for weight in weights]
+    counts = [int(share) for share in shares]
+    by_remainder = sorted(range(len(shares)), key=lambda i: counts[i] - shares[i])
+    for i in by_remainder[:total - sum(counts)]:
+        counts[i] += 1
+    return counts
+
+
+class TableWriter:
+    """ 按批写入一张表 (Core executemany)，每批一个事务，并统计行数和耗时。 """
+
+    def __init__(self, model, batch_size):
+        self.table = model.__table__
+        self.batch_size = batch_size
+        self.rows = []
+        self.count = 0
+        self.started = time.perf_counter()
+
+    def add(self, row):
+        self.rows.append(row)
+        if len(self.rows) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if self.rows:
+            db.session.execute(self.table.insert(), self.rows)
+            db.session.commit()
+            self.count += len(self.rows)
+            self.rows = []
+
+    def close(self):
+        self.flush()
+        elapsed = time.perf_counter() - self.started
+        print(f'{self.table.name:<24} {self.count:>10} 行 {elapsed:>8.1f}s {self.count / max(elapsed, 1e-9):>10.0f} 行/秒')
+
+
+class DatasetGenerator:
+    def __init__(self, sizes, seed=20260101, batch_size=10000):
+        self.sizes = sizes
+        self.rng = random.Random(seed)
+        self.batch_size = batch_size
+
+    def writer(self, model):
+        return TableWriter(model, self.batch_size)
+
+    def run(self):
+        started = time.perf_counter()
+        self.departments()
+        self.tasks()
+        self.baselines()
+        self.projects()
+        self.persons()
+        self.orders()
+        self.work_hours()
+        result = reconcile_inbox()
+        print(f"{'bfa_task_inbox':<24} {result['rows']:>10} 行 (对账)")
+        print(f'合计 {time.perf_counter() - started:.1f}s')
+
+    def departments(self):
+        rng = self.rng
+        self.department_ids = [str(100000 + i) for i in range(1, self.sizes['bs_basic_center_hr'] + 1)]
+        writer = self.writer(BsBasicCenterHr)
+        for i, department_id in enumerate(self.department_ids, start=1):
+            center = i % len(DEPARTMENT_NAMES)
+            writer.add({
+                'id': i, 'create_time': FIRST_MONTH, 'update_time': FIRST_MONTH,
+                'department_id': department_id,
+                'department_name': f'{DEPARTMENT_NAMES[center]}{i // len(DEPARTMENT_NAMES) + 1}科',
+                'center_number': f'C{center:02d}', 'center_department_id': str(900 + center),
+                'center_department_name': DEPARTMENT_NAMES[center], 'is_need_set_center': '0',
+            })
+        writer.close()
+
+        writer = self.writer(PmSheetControl)
+        for i, department_id in enumerate(self.department_ids):
+            for k, sheet in enumerate(rng.sample(('1', '2', '3', '4', '5'), SHEETS_PER_DEPARTMENT)):
+                writer.add({'id': i * SHEETS_PER_DEPARTMENT + k + 1, 'pm_department': department_id, 'see_sheet': sheet})
+        writer.close()
+
+    def tasks(self):
+        rng = self.rng
+        self.task_names = {}
+        writer = self.writer(LisTask)
+        for i in range(1, TASK_COUNT + 1):
+            name = TASK_NAMES[(i - 1) % len(TASK_NAMES)]
+            if i > len(TASK_NAMES):
+                name = f'{name}{(i - 1) // len(TASK_NAMES) + 1}'
+            self.task_names[i] = name
+            writer.add({'id': i, 'first_task': name, 'department': rng.choice(self.department_ids),
+                        'section_office': f'{name}科', 'task_code': f'T{i:03d}', 'delete_tag': False})
+        writer.close()
+
+    def baselines(self):
+        rng = self.rng
+        self.baseline_hours = [None]
+        writer = self.writer(BaHoursBasis)
+        for i in range(1, self.sizes['ba_hours_basis'] + 1):
+            task_id = rng.randint(1, TASK_COUNT)
+            hours = rng.randint(2, 160) * 5
+            self.baseline_hours.append(hours)
+            writer.add({
+                'id': i, 'create_time': FIRST_MONTH, 'update_time': FIRST_MONTH,
+                'department': rng.choice(self.department_ids),
+                'first_task': str(task_id), 'first_task_key': task_id,
+                'change_type': rng.choice(CHANGE_TYPES), 'power_type': rng.choice(POWER_CONFS),
+                'market': rng.choice(MARKETS), 'total_hour': str(hours),
+                'de_range': f'{self.task_names[task_id]}{rng.choice(DETAIL_ACTIONS)}范围{i % 500}',
+                'edit_status': '1', 'in_status': '1', 'delete_tag': False, 'valid': 1,
+                'serial_number': f'BL{i:07d}',
+            })
+        writer.close()
+
+    def projects(self):
+        rng = self.rng
+        count = self.sizes['lis_project']
+        statuses = []
+        for (status, _), rows in zip(STATUS_SHARES, allocate(count, [share for _, share in STATUS_SHARES])):
+            statuses += [status] * rows
+        rng.shuffle(statuses)
+        self.statuses = statuses
+        self.start_months = []
+        months = (LAST_MONTH.year - FIRST_MONTH.year) * 12 + LAST_MONTH.month - FIRST_MONTH.month
+        brands, brand_weights = zip(*BRAND_WEIGHTS.items())
+        scales, scale_weights = zip(*SCALE_WEIGHTS.items())
+
+        writer = self.writer(LisProject)
+        for i, status in enumerate(statuses, start=1):
+            created = FIRST_MONTH + timedelta(days=rng.randint(0, months * 30))
+            self.start_months.append(created.year * 12 + created.month - 1)
+            if status == '1':
+                tag = '0' if rng.random() < TODO_SHARE else '1'
+            else:
+                tag = '0' if status == '0' else '1'
+            writer.add({
+                'id': i, 'create_time': created, 'update_time': created + timedelta(days=rng.randint(0, 400)),
+                'sml': rng.choices(scales, scale_weights)[0],
+                'measures_project': f'{rng.choice(SERIES)}{rng.randint(1, 99):02d} {created.year + 1}款'
+                                    f'{rng.choice(PROJECT_KINDS)}',
+                'measure_tag': tag, 'measure_status': status,
+                'brand': rng.choices(brands, brand_weights)[0],
+                'financial_issuer': f'财务{rng.randint(1, 30):02d}', 'files': '0',
+            })
+        writer.close()
+
+    def persons(self):
+        rng = self.rng
+        pool = max(10, self.sizes['lis_project'] * PERSONS_PER_PROJECT // PROJECTS_PER_PERSON)
+        names = [f'{SURNAMES[i % len(SURNAMES)]}{GIVEN_NAMES[i // len(SURNAMES) % len(GIVEN_NAMES)]}'
+                 f'{i // (len(SURNAMES) * len(GIVEN_NAMES)) or ""}' for i in range(pool)]
+        # 每个人员固定属于一个部门
+        homes = [self.department_ids[i % len(self.department_ids)] for i in range(pool)]
+        person_status = {'4': '2', '1': '1'}
+        self.project_departments = []
+        writer = self.writer(LisMeasurePerson)
+        next_id = 1
+        for project_id, status in enumerate(self.statuses, start=1):
+            chosen = rng.sample(range(pool), PERSONS_PER_PROJECT)
+            self.project_departments.append([homes[person] for person in chosen])
+            for person in chosen:
+                writer.add({
+                    'id': next_id, 'create_time': FIRST_MONTH, 'update_time': FIRST_MONTH,
+                    'person': names[person], 'project_id': str(project_id), 'project_key': project_id,
+                    'measure_status': person_status.get(status, '0'), 'type': rng.choice(('1', '2')),
+                    'relation_tag': '0', 'person_department': homes[person], 'measure_person_id': str(next_id),
+                })
+                next_id += 1
+        writer.close()
+
+    def orders(self):
+        rng = self.rng
+        self.order_info = [None]
+        writer = self.writer(LisProjectOrder)
+        nodes = self.writer(LisOrderNode)
+        for project_id, start in enumerate(self.start_months, start=1):
+            for k in range(ORDERS_PER_PROJECT):
+                order_id = (project_id - 1) * ORDERS_PER_PROJECT + k + 1
+                info = (rng.choice(POWER_CONFS), f'MY{month_code(start) // 100 + 1}-{k + 1}',
+                        ','.join(rng.sample(MARKETS, rng.randint(1, 3))))
+                self.order_info.append(info)
+                power_conf, order_name, market = info
+                writer.add({'id': order_id, 'power_conf': power_conf, 'order_name': order_name, 'market': market,
+                            'project_id': str(project_id), 'project_key': project_id})
+                month = start
+                for n, stage in enumerate(STAGES):
+                    end = month + rng.randint(3, 12)
+                    nodes.add({'id': (order_id - 1) * NODES_PER_ORDER + n + 1, 'schedule_time': month_code(month),
+                               'schedule_stage': stage, 'order_id': str(order_id),
+                               'schedule_end_time': month_code(end)})
+                    month = end
+        writer.close()
+        nodes.close()
+
+    def work_hours(self):
+        """ 工时行与月度明细一起生成：工时行的基准工时取关联的工时基准，或按月度明细合计上下浮动。 """
+        rng = self.rng
+        completed = [i for i, status in enumerate(self.statuses, start=1) if status == '4']
+        weights = [rng.paretovariate(1.2) for _ in completed]
+        per_project = allocate(self.sizes['pm_work_hours'], weights)
+        per_row = allocate(self.sizes['pm_month_hours_detail'], [1] * self.sizes['pm_work_hours'])
+        baseline_count = self.sizes['ba_hours_basis']
+
+        hours = self.writer(PmWorkHours)
+        details = self.writer(PmMonthHoursDetail)
+        work_hour_id = detail_id = 0
+        for project_id, rows in zip(completed, per_project):
+            start = self.start_months[project_id - 1]
+            departments = self.project_departments[project_id - 1]
+            for _ in range(rows):
+                work_hour_id += 1
+                order_id = (project_id - 1) * ORDERS_PER_PROJECT + rng.randint(1, ORDERS_PER_PROJECT)
+                power_conf, order_name, market = self.order_info[order_id]
+                baseline_id = rng.randint(1, baseline_count) if rng.random() < 0.8 else None
+                department = rng.choice(departments)
+                month = start + rng.randint(0, 6)
+                total = 0
+                for _ in range(per_row[work_hour_id - 1]):
+                    detail_id += 1
+                    value = rng.randint(0, 40)
+                    total += value
+                    details.add({
+                        'id': detail_id, 'mm': month_code(month), 'base_id': str(baseline_id) if baseline_id else None,
+                        'order_id': str(order_id), 'measure_id': str(work_hour_id), 'measure_key': work_hour_id,
+                        'month_input': f'{value}.5' if value and rng.random() < 0.1 else str(value),
+                        'select_project_id': str(project_id), 'department': department,
+                    })
+                    month += 1
+                task = self.task_names[rng.randint(1, TASK_COUNT)]
+                hours.add({
+                    'id': work_hour_id,
+                    'base_hours': self.baseline_hours[baseline_id] if baseline_id else round(total * rng.uniform(0.8, 1.2)),
+                    'select_hours_base': baseline_id, 'select_order': order_id, 'department': department,
+                    'select_project_id': str(project_id), 'select_tag': True, 'power_conf': power_conf,
+                    'order_name': order_name, 'market': market,
+                    'business_detail': f'{task}{rng.choice(DETAIL_ACTIONS)}{work_hour_id % 1000}',
+                    'delete_tag': False, 'approval_tag': 1, 'serial_number': f'WH{work_hour_id:08d}',
+                })
+        hours.close()
+        details.close()
+
+
+def analyze():
+    """ 更新优化器统计信息，使查询计划与生产库一致。 """
+    if db.engine.dialect.name == 'sqlite':
+        db.session.execute(text('ANALYZE'))
+    elif db.engine.dialect.name == 'mysql':
+        for table in db.metadata.sorted_tables:
+            db.session.execute(text(f'ANALYZE TABLE {table.name}'))
+    db.session.commit()
+
+
+def generate(sizes, seed=20260101, batch_size=10000):
+    """
+    删除并重建全部表后按 sizes 生成数据。需要在应用上下文中调用。
+    """
+    db.drop_all()
+    db.create_all()
+    if db.engine.dialect.name == 'sqlite':
+        # 生成的数据可以重建，不需要每个事务落盘
+        db.session.execute(text('PRAGMA synchronous = OFF'))
+    DatasetGenerator(sizes, seed=seed, batch_size=batch_size).run()
+    analyze()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='生成 bfa 基准测试数据')
+    parser.add_argument('--scale', type=float, default=1.0, help='相对默认规模 (5 万项目) 的比例')
+    parser.add_argument('--projects', type=int, help='项目数 (lis_project)')
+    parser.add_argument('--work-hours', type=int, help='工时行数 (pm_work_hours)')
+    parser.add_argument('--month-details', type=int, help='月度明细行数 (pm_month_hours_detail)')
+    parser.add_argument('--baselines', type=int, help='工时基准行数 (ba_hours_basis)')
+    parser.add_argument('--departments', type=int, help='部门数 (bs_basic_center_hr)')
+    parser.add_argument('--seed', type=int, default=20260101, help='随机数种子，相同参数生成相同的数据')
+    parser.add_argument('--batch-size', type=int, default=10000, help='每个事务写入的行数')
+    args = parser.parse_args()
+
+    sizes = dataset_sizes(args.scale, lis_project=args.projects, pm_work_hours=args.work_hours,
+                          pm_month_hours_detail=args.month_details, ba_hours_basis=args.baselines,
+                          bs_basic_center_hr=args.departments)
+    app = create_app('benchmark')
+    with app.app_context():
+        print(f'写入 {db.engine.url.render_as_string(hide_password=True)}')
+        generate(sizes, seed=args.seed, batch_size=args.batch_size)
+
+
+if __name__ == '__main__':
+    main()
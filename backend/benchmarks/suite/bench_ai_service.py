@@ -0,0 +1,44 @@
+"""
+AIService 到模拟模型 (stub_llm.StubLLMServer) 的基准测试：流式与非流式回复，以及超过网关并发上限时的排队。
+模拟模型不做推理，测得的是网关事件循环、OpenAI 客户端和 SSE 解析一侧的开销。
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+pytest.importorskip('pytest_benchmark')
+
+MESSAGE = '参考项目的标定工时偏高，应该怎样调整？'
+
+
+def bench_streaming_completion(request, benchmark, ai_service, stub_llm):
+    def run():
+        return ''.join(ai_service.get_streaming_chat_completion(MESSAGE))
+
+    assert run() == stub_llm.reply
+    benchmark.extra_info['chunks'] = stub_llm.chunks
+    benchmark.pedantic(run, rounds=request.config.getoption('--bench-rounds'), iterations=1)
+
+
+def bench_chat_completion(request, benchmark, ai_service, stub_llm):
+    def run():
+        return ai_service.get_chat_completion(MESSAGE)
+
+    assert run() == stub_llm.reply
+    benchmark.pedantic(run, rounds=request.config.getoption('--bench-rounds'), iterations=1)
+
+
+@pytest.mark.parametrize('clients', [4, 8])
+def bench_concurrent_streams(request, benchmark, app, ai_service, stub_llm, clients):
+    """ clients 个线程同时请求，超过 AI_GATEWAY_MAX_CONCURRENCY 的请求在网关中排队；测量全部完成的耗时。 """
+    clients = min(clients, app.config['AI_GATEWAY_MAX_CONCURRENCY'] + app.config['AI_GATEWAY_MAX_QUEUE'])
+
+    def run():
+        with ThreadPoolExecutor(clients) as executor:
+            replies = list(executor.map(lambda _: ''.join(ai_service.get_streaming_chat_completion(MESSAGE)),
+                                        range(clients)))
+        return replies
+
+    assert run() == [stub_llm.reply] * clients
+    benchmark.extra_info.update({'clients': clients, 'max_concurrency': app.config['AI_GATEWAY_MAX_CONCURRENCY']})
+    benchmark.pedantic(run, rounds=request.config.getoption('--bench-rounds'), iterations=1)
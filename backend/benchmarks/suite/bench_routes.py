@@ -0,0 +1,108 @@
+"""
+bfa 全部接口的基准测试。每个用例对应 route.py 中的一个路由，bench_every_route_has_a_case 保证新增路由时补充用例。
+"""
+from collections import namedtuple
+
+import pytest
+from sqlalchemy import delete, select, update
+
+from app.db.db import db
+from app.modules.bfa.export import pa
+from app.modules.bfa.models import LisMeasurePerson, PmMonthHoursDetail, PmWorkHours
+
+pytest.importorskip('pytest_benchmark')
+
+URL_PREFIX = '/api/v1/bfa'
+# 提交用例每轮写入的工时行数和月份数
+SUBMIT_ROWS = 50
+SUBMIT_MONTHS = 12
+
+# rule 为 route.py 中的路由规则；url 和 body 中的 {name} 由 params 填充
+Case = namedtuple('Case', 'rule method url body expect', defaults=('GET', None, None, 200))
+
+CASES = [
+    Case('/tasks', url='/tasks?person_id={person}'),
+    Case('/tasks/<string:task_id>', url='/tasks/{task_id}?person_id={person}&department_id={task_department_id}'),
+    Case('/tasks/<int:task_id>/historical-projects', url='/tasks/{task_id}/historical-projects'),
+    Case('/tasks/<string:task_id>/reference-projects',
+         url='/tasks/{task_id}/reference-projects?department_id={department_id}'),
+    Case('/tasks/<int:task_id>/calculate', 'POST', '/tasks/{task_id}/calculate?wait=60',
+         {'reference_project_id': '{history_id}', 'start_month': '202701'}),
+    Case('/tasks/<int:task_id>/submit', 'POST'),
+    Case('/history', url='/history?limit=50'),
+    Case('/history/<string:project_id>/details', url='/history/{history_id}/details'),
+    Case('/history/<string:project_id>/summary', url='/history/{history_id}/summary'),
+    Case('/history/rollup', url='/history/rollup?group_by=brand,scale,month'),
+    Case('/history/export', url='/history/export?project_ids={history_id}&format=arrow'),
+    Case('/persons', url='/persons'),
+    Case('/baselines', url='/baselines'),
+    Case('/projects/<string:project_id>/order-names', url='/projects/{history_id}/order-names'),
+    Case('/calculations/<string:calculation_id>', url='/calculations/{calculation_id}'),
+    Case('/calculations/<string:calculation_id>/export', url='/calculations/{calculation_id}/export'),
+    Case('/calculations/modify', 'POST', '/calculations/modify',
+         {'calculation_id': '{calculation_id}', 'commands': [{'op': 'scale', 'factor': 1.1}]}),
+    Case('/calculations/validate', 'POST', '/calculations/validate', {'calculation_id': '{calculation_id}'}),
+    Case('/jobs', url='/jobs'),
+    Case('/jobs/<string:job_id>', url='/jobs/{job_id}'),
+    Case('/chat', 'POST', '/chat', {'message': '{history_id} 号项目的标定工时是多少？'}),
+    Case('/chat/stats', url='/chat/stats'),
+    Case('/cache/stats', url='/cache/stats'),
+]
+# 不能在通用用例中测量的路由及原因
+SKIPPED = {
+    '/tasks/<int:task_id>/historical-projects': 'BfaController 中没有 get_historical_projects_for_task，该路由始终返回 500',
+    '/history/export': None if pa is not None else '未安装 pyarrow',
+}
+
+
+def fill(value, params):
+    if isinstance(value, str):
+        return value.format(**params)
+    if isinstance(value, dict):
+        return {key: fill(item, params) for key, item in value.items()}
+    if isinstance(value, list):
+        return [fill(item, params) for item in value]
+    return value
+
+
+@pytest.fixture(scope='module')
+def params(client, samples):
+    """ 在 samples 之上生成一份测算草稿，取得草稿ID和后台任务ID。 """
+    response = client.post(f"{URL_PREFIX}/tasks/{samples['task_id']}/calculate?wait=60",
+                           json={'reference_project_id': samples['history_id'], 'start_month': '202701'})
+    assert response.status_code == 200, response.data[:500]
+    return dict(samples, calculation_id=response.json['data']['calculation_id'], job_id=response.headers['X-Job-Id'])
+
+
+@pytest.mark.parametrize('case', [
+    pytest.param(case, id=case.rule, marks=pytest.mark.skip(reason=SKIPPED[case.rule]) if SKIPPED.get(case.rule) else ())
+    for case in CASES if case.url
+])
+def bench_route(measure, params, ai_service, case):
+    measure(case.method, URL_PREFIX + fill(case.url, params), json=fill(case.body, params), expect=case.expect)
+
+
+def bench_submit(measure, params):
+    """ 提交测算表：每轮写入 SUBMIT_ROWS 行工时和对应的月度明细，结束后删除写入的行并恢复测算人员状态。 """
+    project_id = params['task_id']
+    businesses = [
+        dict({'powerConfig': '2.0T', 'specificItem': f'事项{i}', 'baselineHours': 120},
+             **{f'month{202701 + month}': 10 for month in range(SUBMIT_MONTHS)})
+        for i in range(SUBMIT_ROWS)
+    ]
+    issued = db.session.execute(
+        select(LisMeasurePerson.id).where(LisMeasurePerson.project_id == project_id,
+                                          LisMeasurePerson.measure_status == '1')
+    ).scalars().all()
+    try:
+        measure('POST', f'{URL_PREFIX}/tasks/{project_id}/submit?wait=60', json={'businesses': businesses})
+    finally:
+        db.session.execute(delete(PmMonthHoursDetail).where(PmMonthHoursDetail.select_project_id == project_id))
+        db.session.execute(delete(PmWorkHours).where(PmWorkHours.select_project_id == project_id))
+        db.session.execute(update(LisMeasurePerson).where(LisMeasurePerson.id.in_(issued)).values(measure_status='1'))
+        db.session.commit()
+
+
+def bench_every_route_has_a_case(app):
+    rules = {rule.rule[len(URL_PREFIX):] for rule in app.url_map.iter_rules() if rule.rule.startswith(URL_PREFIX)}
+    assert rules == {case.rule for case in CASES}
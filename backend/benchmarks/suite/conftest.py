@@ -0,0 +1,130 @@
+import pytest
+from sqlalchemy import event, func, select
+
+import app.app as app_module
+from app.app import create_app
+from app.db.db import db
+from app.modules.bfa.models import BfaTaskInbox, LisMeasurePerson, LisProjectOrder, PmWorkHours
+from app.services.ai_gateway import AIGateway
+from app.services.ai_service import AIService
+from app.services.response_cache import response_cache
+from benchmarks.datagen import dataset_matches, dataset_sizes, generate
+from benchmarks.suite.stub_llm import StubLLMServer
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup('bfa', 'bfa 基准测试')
+    group.addoption('--bench-scale', type=float, default=0.01,
+                    help='数据规模，相对 benchmarks.datagen 默认规模 (5 万项目) 的比例，数据不一致时重新生成')
+    group.addoption('--bench-regenerate', action='store_true', help='强制重新生成数据')
+    group.addoption('--bench-rounds', type=int, default=10, help='每个用例的测量轮数')
+    group.addoption('--bench-response-cache', action='store_true',
+                    help='保留接口响应缓存 (默认关闭，测量的是查询本身而不是缓存命中)')
+    group.addoption('--llm-chunks', type=int, default=64, help='模拟模型每次回复的分段数')
+    group.addoption('--llm-delay', type=float, default=0.0, help='模拟模型每段之间的间隔(秒)')
+
+
+@pytest.fixture(scope='session')
+def app(request):
+    app = create_app('benchmark')
+    if not request.config.getoption('--bench-response-cache'):
+        response_cache.backend = None
+    with app.app_context():
+        sizes = dataset_sizes(request.config.getoption('--bench-scale'))
+        if request.config.getoption('--bench-regenerate') or not dataset_matches(sizes):
+            generate(sizes)
+        yield app
+        db.session.remove()
+
+
+@pytest.fixture(scope='session')
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture(scope='session')
+def samples(app):
+    """
+    用例的路径参数：从生成的数据中取待办最多的人员及其一个待办项目、工时行最多的历史项目等。
+    """
+    person = db.session.execute(
+        select(BfaTaskInbox.person).group_by(BfaTaskInbox.person).order_by(func.count().desc())
+    ).scalars().first()
+    task = db.session.execute(
+        select(BfaTaskInbox.project_key, BfaTaskInbox.department_id).where(BfaTaskInbox.person == person)
+        .order_by(BfaTaskInbox.id)
+    ).first()
+    history_id = db.session.execute(
+        select(LisProjectOrder.project_id).join(PmWorkHours, PmWorkHours.select_order == LisProjectOrder.id)
+        .group_by(LisProjectOrder.project_id).order_by(func.count().desc())
+    ).scalars().first()
+    department_id = db.session.execute(
+        select(LisMeasurePerson.person_department).where(LisMeasurePerson.project_key == int(history_id))
+        .order_by(LisMeasurePerson.id)
+    ).scalars().first()
+    return {
+        'person': person,
+        'task_id': str(task.project_key),
+        'task_department_id': task.department_id,
+        'history_id': history_id,
+        'department_id': department_id,
+    }
+
+
+@pytest.fixture(scope='session')
+def stub_llm(request):
+    server = StubLLMServer(chunks=request.config.getoption('--llm-chunks'),
+                           delay=request.config.getoption('--llm-delay')).start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture(scope='session')
+def ai_service(app, stub_llm):
+    """ 指向模拟模型的 AIService，网关参数与应用配置一致；对话接口也使用它。 """
+    config = app.config
+    gateway = AIGateway(
+        stub_llm.url,
+        max_concurrency=config['AI_GATEWAY_MAX_CONCURRENCY'],
+        model_concurrency=config['AI_GATEWAY_MODEL_CONCURRENCY'],
+        max_queue=config['AI_GATEWAY_MAX_QUEUE'],
+        queue_timeout=config['AI_GATEWAY_QUEUE_TIMEOUT'],
+        max_connections=config['AI_GATEWAY_MAX_CONNECTIONS'],
+        timeout=config['AI_GATEWAY_TIMEOUT'],
+    )
+    service = AIService(stub_llm.url, 'stub', gateway=gateway)
+    original, app_module.ai_service = app_module.ai_service, service
+    yield service
+    app_module.ai_service = original
+
+
+@pytest.fixture
+def measure(request, benchmark, client):
+    """
+    measure(method, url, json=None, expect=200) 测量一个接口：先请求一次，校验状态码，
+    把响应大小和 SQL 语句数记入 extra_info (保存在结果 JSON 中)，再按 --bench-rounds 轮测量。
+    响应体完整读取，流式响应的耗时包括生成响应体的时间。
+    """
+    rounds = request.config.getoption('--bench-rounds')
+
+    def call(method, url, json=None):
+        with client.open(url, method=method, json=json) as response:
+            return response.status_code, response.get_data()
+
+    def run(method, url, json=None, expect=200):
+        statements = []
+
+        def count(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', count)
+        try:
+            status, body = call(method, url, json)
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', count)
+        assert status == expect, body[:500]
+        benchmark.extra_info.update({'status': status, 'bytes': len(body), 'sql_statements': len(statements)})
+        return benchmark.pedantic(call, args=(method, url, json), rounds=rounds, iterations=1)
+
+    return run
+
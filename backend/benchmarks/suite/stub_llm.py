@@ -0,0 +1,112 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubLLMServer:
+    """
+    模拟 Ollama 的 OpenAI 兼容接口 (/v1/chat/completions、/v1/embeddings) 的本地 HTTP 服务。
+    流式回复固定为 chunks 段，每段之间等待 delay 秒，用于模拟模型逐 token 输出；
+    使用 HTTP/1.1 长连接和分块传输，与 Ollama 一致，测得的是网关和客户端一侧的开销。
+    """
+
+    def __init__(self, chunks=64, delay=0.0, text='测算', dimension=64):
+        self.chunks = chunks
+        self.delay = delay
+        self.text = text
+        self.dimension = dimension
+        self.requests = 0
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address
+        return f'http://{host}:{port}/v1'
+
+    @property
+    def reply(self):
+        """ 一次完整回复的文本。 """
+        return self.text * self.chunks
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name='stub-llm', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def chunk(self, content, finish_reason=None):
+        payload = {
+            'id': 'chat-stub', 'object': 'chat.completion.chunk', 'created': 0, 'model': 'stub',
+            'choices': [{'index': 0, 'delta': {'content': content} if content else {}, 'finish_reason': finish_reason}],
+        }
+        return f'data: {json.dumps(payload, ensure_ascii=False)}\n\n'.encode('utf-8')
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # 每段立即发出，不被 Nagle 算法合并后延迟
+            disable_nagle_algorithm = True
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+                stub.requests += 1
+                if self.path.endswith('/chat/completions'):
+                    self.chat(body)
+                elif self.path.endswith('/embeddings'):
+                    inputs = body.get('input')
+                    inputs = inputs if isinstance(inputs, list) else [inputs]
+                    self.json({'object': 'list', 'model': body.get('model'), 'data': [
+                        {'object': 'embedding', 'index': i, 'embedding': stub.vector(text)}
+                        for i, text in enumerate(inputs)
+                    ]})
+                else:
+                    self.send_error(404)
+
+            def chat(self, body):
+                if not body.get('stream'):
+                    self.json({
+                        'id': 'chat-stub', 'object': 'chat.completion', 'created': 0, 'model': 'stub',
+                        'choices': [{'index': 0, 'finish_reason': 'stop',
+                                     'message': {'role': 'assistant', 'content': stub.reply}}],
+                    })
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/event-stream')
+                self.send_header('Transfer-Encoding', 'chunked')
+                self.end_headers()
+                for _ in range(stub.chunks):
+                    if stub.delay:
+                        time.sleep(stub.delay)
+                    self.write_chunk(stub.chunk(stub.text))
+                self.write_chunk(stub.chunk(None, finish_reason='stop'))
+                self.write_chunk(b'data: [DONE]\n\n')
+                self.write_chunk(b'')
+
+            def write_chunk(self, data):
+                self.wfile.write(f'{len(data):x}\r\n'.encode() + data + b'\r\n')
+                self.wfile.flush()
+
+            def json(self, payload):
+                data = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        return Handler
+
+    def vector(self, text):
+        seed = sum(ord(char) for char in str(text))
+        return [((seed * (i + 1)) % 97) / 97 for i in range(self.dimension)]
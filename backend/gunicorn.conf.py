@@ -0,0 +1,7 @@
+# gunicorn 会自动加载工作目录下的 gunicorn.conf.py
+# 使用线程 worker：流式聊天只占用一个线程等待 AI 网关的输出，不会占满整个 worker 进程。
+# AI 网关的并发和排队上限按进程计算 (见 AI_GATEWAY_* 配置)，总上限为 workers 倍。
+workers = 2
+worker_class = 'gthread'
+threads = 16
+timeout = 180
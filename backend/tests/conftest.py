@@ -1,6 +1,7 @@
 import pytest
 
 from app.app import create_app
+from app.db.db import db
 
 
 @pytest.fixture
@@ -12,4 +13,15 @@ def app():
 
 @pytest.fixture
 def client(app):
-    return app.test_client()
\ No newline at end of file
+    return app.test_client()
+
+
+@pytest.fixture
+def database(app):
+    """ Fresh schema for each test on the testing database. """
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        yield db
+        db.session.remove()
+        db.drop_all()
@@ -0,0 +1,59 @@
+from app.modules.bfa.models import (LisProject, LisProjectOrder, PmWorkHours, PmMonthHoursDetail,
+                                    BaHoursBasis, LisTask)
+
+
+def seed_projects(db):
+    db.session.add_all([
+        LisTask(id=7, first_task='标定'),
+        BaHoursBasis(id=70, first_task='7'),
+        LisProject(id=1, measure_status='4', brand='4', sml='2'),
+        LisProject(id=2, measure_status='4', brand='1', sml='2'),
+        LisProject(id=3, measure_status='1', brand='4', sml='2'),
+        LisProjectOrder(id=100, project_id='1'),
+        LisProjectOrder(id=200, project_id='2'),
+        LisProjectOrder(id=300, project_id='3'),
+        PmWorkHours(id=1, select_order=100, select_hours_base=70, power_conf='1.5T'),
+        PmWorkHours(id=2, select_order=100, power_conf='2.0T'),
+        PmWorkHours(id=3, select_order=200, power_conf='1.5T'),
+        PmWorkHours(id=4, select_order=300, power_conf='1.5T'),
+        PmMonthHoursDetail(id=11, measure_id='1', mm=202501, month_input='10.5'),
+        PmMonthHoursDetail(id=12, measure_id='1', mm=202502, month_input='20'),
+        PmMonthHoursDetail(id=13, measure_id='2', mm=202501, month_input='4'),
+        PmMonthHoursDetail(id=14, measure_id='2', mm=202502, month_input=''),
+        PmMonthHoursDetail(id=15, measure_id='3', mm=202501, month_input='8'),
+        PmMonthHoursDetail(id=16, measure_id='4', mm=202501, month_input='100'),
+    ])
+    db.session.commit()
+
+
+class TestAggregates():
+    def test_project_summary(self, client, database):
+        seed_projects(database)
+        response = client.get('/api/v1/bfa/history/1/summary')
+        assert response.status_code == 200
+        data = response.json['data']
+        assert data['total'] == 34.5
+        assert data['by_month'] == [{'month': '202501', 'hours': 14.5}, {'month': '202502', 'hours': 20.0}]
+        assert data['by_power_conf'] == [{'power_conf': '1.5T', 'hours': 30.5},
+                                         {'power_conf': '2.0T', 'hours': 4.0}]
+        assert data['by_first_task'] == [{'first_task': '未找到工时基准表', 'hours': 4.0},
+                                         {'first_task': '标定', 'hours': 30.5}]
+
+    def test_project_summary_selected_dimensions(self, client, database):
+        seed_projects(database)
+        data = client.get('/api/v1/bfa/history/1/summary?group_by=month').json['data']
+        assert set(data) == {'total', 'by_month'}
+        assert client.get('/api/v1/bfa/history/1/summary?group_by=order').status_code == 400
+
+    def test_rollup_by_brand_and_scale(self, client, database):
+        seed_projects(database)
+        data = client.get('/api/v1/bfa/history/rollup').json['data']
+        assert data == [
+            {'brand': 'WEY', 'scale': 'M', 'projects': 1, 'hours': 8.0},
+            {'brand': '哈弗', 'scale': 'M', 'projects': 1, 'hours': 34.5},
+        ]
+        by_month = client.get('/api/v1/bfa/history/rollup?group_by=scale,month&brand=哈弗').json['data']
+        assert by_month == [
+            {'scale': 'M', 'month': '202501', 'projects': 1, 'hours': 14.5},
+            {'scale': 'M', 'month': '202502', 'projects': 1, 'hours': 20.0},
+        ]
@@ -0,0 +1,52 @@
+import json
+
+from app.modules.bfa.models import BaHoursBasis, LisTask
+
+
+def seed_baselines(db):
+    db.session.add_all([
+        LisTask(id=1, first_task='动力总成'),
+        LisTask(id=2, first_task='底盘'),
+    ])
+    for i in range(1, 8):
+        db.session.add(BaHoursBasis(
+            id=i,
+            power_type='1.5T' if i % 2 else '2.0T',
+            first_task='1' if i <= 4 else '2',
+            change_type='新增' if i <= 5 else '变更',
+            de_range=f'范围{i} 100%适配' if i == 3 else f'范围{i}',
+            total_hour=str(i * 10),
+        ))
+    db.session.commit()
+
+
+class TestBaselines():
+    def test_without_parameters_returns_full_list(self, client, database):
+        seed_baselines(database)
+        response = client.get('/api/v1/bfa/baselines')
+        assert len(response.json['data']) == 7
+        assert 'next_cursor' not in response.json
+
+    def test_filters_and_keyset_pagination(self, client, database):
+        seed_baselines(database)
+        first = client.get('/api/v1/bfa/baselines?power_type=1.5T&limit=2').json
+        assert [row['id'] for row in first['data']] == [1, 3]
+        second = client.get(f"/api/v1/bfa/baselines?power_type=1.5T&limit=2&cursor={first['next_cursor']}").json
+        assert [row['id'] for row in second['data']] == [5, 7]
+        assert second['next_cursor'] is None
+
+        by_task_name = client.get('/api/v1/bfa/baselines?first_task=底盘&change_type=变更').json['data']
+        assert [row['id'] for row in by_task_name] == [6, 7]
+        assert by_task_name[0]['一级任务'] == '底盘'
+
+        # 自由文本中的 % 按字面匹配
+        by_text = client.get('/api/v1/bfa/baselines?q=100%25').json['data']
+        assert [row['id'] for row in by_text] == [3]
+
+    def test_ndjson_stream(self, client, database):
+        seed_baselines(database)
+        response = client.get('/api/v1/bfa/baselines?format=ndjson&first_task=1')
+        assert response.mimetype == 'application/x-ndjson'
+        rows = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+        assert [row['id'] for row in rows] == [1, 2, 3, 4]
+        assert rows[0]['一级任务'] == '动力总成'
@@ -0,0 +1,173 @@
+import threading
+import time
+
+from sqlalchemy import event
+
+from app.modules.bfa.models import BaHoursBasis, LisTask
+from app.modules.bfa.reference import load_baseline_hours, load_baselines
+from app.services.cache import TTLCache, reference_cache
+from app.services.cache_backends import LocalCacheBackend, SQLiteCacheBackend
+from app.services.response_cache import ResponseCache, response_cache
+from tests.tests_bfa_calculation import seed_reference
+
+
+class TestTTLCache():
+    def test_lru_eviction_and_counters(self):
+        cache = TTLCache(ttl=60, max_entries=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        assert cache.get('a') == 1
+        cache.set('c', 3)
+        assert cache.get('b') is None
+        assert cache.get('a') == 1 and cache.get('c') == 3
+        stats = cache.stats()
+        assert (stats['hits'], stats['misses'], stats['evictions']) == (3, 1, 1)
+
+    def test_expired_entries_are_reloaded(self):
+        cache = TTLCache(ttl=0, max_entries=10)
+        calls = []
+        cache.get_or_load('k', lambda: calls.append(1) or 'v')
+        cache.get_or_load('k', lambda: calls.append(1) or 'v')
+        assert len(calls) == 2
+
+
+class TestReferenceCache():
+    def test_baselines_are_cached_until_invalidated(self, client, database):
+        database.session.add(LisTask(id=5, first_task='动力总成'))
+        database.session.add(BaHoursBasis(id=1, first_task='5', power_type='1.5T', total_hour='80'))
+        database.session.commit()
+
+        first = client.get('/api/v1/bfa/baselines').json['data']
+        assert first[0]['一级任务'] == '动力总成'
+
+        database.session.add(BaHoursBasis(id=2, first_task='5', power_type='2.0T', total_hour='90'))
+        database.session.commit()
+        assert len(client.get('/api/v1/bfa/baselines').json['data']) == 1
+
+        reference_cache.invalidate_tables('ba_hours_basis')
+        assert len(client.get('/api/v1/bfa/baselines').json['data']) == 2
+
+        stats = client.get('/api/v1/bfa/cache/stats').json['data']['reference']
+        assert stats['baselines']['hits'] == 1
+        assert stats['baselines']['misses'] == 2
+
+    def test_baselines_and_baseline_hours_do_not_evict_each_other(self, app, database):
+        seed_reference(database)
+        for _ in range(3):
+            assert len(load_baselines()) == 1
+            assert load_baseline_hours() == {70: 60.0}
+        stats = reference_cache.stats()
+        assert (stats['baselines']['misses'], stats['baselines']['evictions']) == (1, 0)
+        assert (stats['baseline_hours']['hits'], stats['baseline_hours']['misses']) == (2, 1)
+
+
+def make_response_cache(backend):
+    cache = ResponseCache()
+    cache.backend = backend
+    cache.lock_timeout = 5
+    cache._namespaces = {'baselines': {'ttl': 60, 'tables': ['ba_hours_basis']}}
+    return cache
+
+
+class TestResponseCache():
+    def run_concurrently(self, cache, threads=8):
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.1)
+            return 'fresh', b'payload'
+
+        results = []
+        workers = [
+            threading.Thread(target=lambda: results.append(cache.get_or_compute('baselines:/k', compute, 60)))
+            for _ in range(threads)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        return calls, results
+
+    def test_single_flight_local_backend(self):
+        cache = make_response_cache(LocalCacheBackend(max_entries=10))
+        calls, results = self.run_concurrently(cache)
+        assert len(calls) == 1
+        assert all(body == b'payload' for _, body in results)
+        assert cache.stats()['coalesced'] == 7
+
+    def test_single_flight_sqlite_backend(self, tmp_path):
+        cache = make_response_cache(SQLiteCacheBackend(str(tmp_path / 'cache.sqlite3'), max_entries=10))
+        calls, results = self.run_concurrently(cache)
+        assert len(calls) == 1
+        assert all(body == b'payload' for _, body in results)
+
+        # 另一个后端实例 (模拟另一个 worker) 读取同一份缓存
+        other = SQLiteCacheBackend(str(tmp_path / 'cache.sqlite3'), max_entries=10)
+        assert other.get('baselines:/k') == b'payload'
+
+        cache.invalidate_tables('ba_hours_basis')
+        assert other.get('baselines:/k') is None
+
+    def test_streamed_responses_bypass_local_cache(self, app, client, database, monkeypatch):
+        seed_reference(database)
+        monkeypatch.setattr(response_cache, 'backend', LocalCacheBackend(max_entries=10))
+        monkeypatch.setattr(response_cache, 'hits', 0)
+        monkeypatch.setattr(response_cache, 'misses', 0)
+        streamed = []
+        app.after_request(lambda response: streamed.append(response.is_streamed) or response)
+
+        app.config['JSON_STREAM_THRESHOLD'] = 1
+        first = client.get('/api/v1/bfa/history/1/details')
+        second = client.get('/api/v1/bfa/history/1/details')
+        # 大响应保持流式输出，不读入内存也不写入缓存
+        assert streamed == [True, True] and first.json == second.json
+        assert 'Content-Length' not in second.headers
+        # 第一次请求记下不可缓存的标记，第二次请求不再经过租约
+        assert (response_cache.hits, response_cache.misses, response_cache.bypassed) == (0, 1, 1)
+
+        app.config['JSON_STREAM_THRESHOLD'] = 2000
+        client.get('/api/v1/bfa/history/1/summary')
+        cached = client.get('/api/v1/bfa/history/1/summary')
+        assert cached.status_code == 200 and streamed[-2:] == [False, False]
+        assert (response_cache.hits, response_cache.misses) == (1, 2)
+
+    def test_concurrent_streamed_requests_run_in_parallel(self, app, database, monkeypatch, tmp_path):
+        seed_reference(database)
+        monkeypatch.setattr(response_cache, 'backend', SQLiteCacheBackend(str(tmp_path / 'cache.sqlite3'), 10))
+        for counter in ('hits', 'misses', 'coalesced', 'bypassed', 'lock_timeouts'):
+            monkeypatch.setattr(response_cache, counter, 0)
+        app.config['JSON_STREAM_THRESHOLD'] = 1
+        lock = threading.Lock()
+        running = {'now': 0, 'peak': 0}
+
+        def slow_statement(*args):
+            # 每条语句变慢，记录同时执行的语句数
+            with lock:
+                running['now'] += 1
+                running['peak'] = max(running['peak'], running['now'])
+            time.sleep(0.05)
+            with lock:
+                running['now'] -= 1
+
+        bodies = []
+
+        def fetch():
+            with app.test_client().get('/api/v1/bfa/history/1/details') as response:
+                bodies.append(response.get_data())
+
+        event.listen(database.engine, 'before_cursor_execute', slow_statement)
+        try:
+            for _ in range(2):
+                workers = [threading.Thread(target=fetch) for _ in range(4)]
+                for worker in workers:
+                    worker.start()
+                for worker in workers:
+                    worker.join()
+        finally:
+            event.remove(database.engine, 'before_cursor_execute', slow_statement)
+
+        assert len(bodies) == 8 and len(set(bodies)) == 1
+        # 只有第一个冷请求持有租约；其余请求看到不可缓存标记后并行执行，不再逐个排队
+        assert (response_cache.misses, response_cache.bypassed, response_cache.lock_timeouts) == (1, 7, 0)
+        assert running['peak'] >= 2
@@ -0,0 +1,94 @@
+from app.modules.bfa.calculation import month_codes, month_index
+from app.modules.bfa.models import (LisProject, LisProjectOrder, PmWorkHours, PmMonthHoursDetail,
+                                    BaHoursBasis, LisTask)
+from tests.tests_bfa_submit import seed_project
+
+
+def seed_reference(db):
+    db.session.add_all([
+        LisTask(id=7, first_task='标定'),
+        BaHoursBasis(id=70, first_task='7', change_type='新增', de_range='全范围', total_hour='60'),
+        LisProject(id=1, measure_status='4', sml='2'),
+        LisProject(id=2, measure_status='1', sml='3'),
+        LisProjectOrder(id=100, project_id='1'),
+        PmWorkHours(id=1, select_order=100, select_hours_base=70, power_conf='1.5T',
+                    business_detail='事项一', base_hours=50),
+        PmWorkHours(id=2, select_order=100, power_conf='2.0T', business_detail='事项二', base_hours=20),
+        PmMonthHoursDetail(id=11, measure_id='1', mm=202411, month_input='10'),
+        PmMonthHoursDetail(id=12, measure_id='1', mm=202501, month_input='30'),
+        PmMonthHoursDetail(id=13, measure_id='2', mm=202412, month_input='8'),
+    ])
+    db.session.commit()
+
+
+class TestCalculation():
+    def test_month_arithmetic(self):
+        assert month_codes(month_index([202411, 202501]) + 3).tolist() == [202502, 202504]
+        # 只有月份的旧数据保持先后顺序
+        assert (month_index([12]) < month_index([202401])).all()
+        # 只有月份的跨年项目按最大空档分年：11、12 月在前，1、2 月在后
+        assert month_index([1, 2, 11, 12]).tolist() == [12, 13, 10, 11]
+        assert month_codes(month_index([1, 2, 11, 12])).tolist() == [1, 2, 11, 12]
+        assert month_index([3, 4, 6]).tolist() == [2, 3, 5]
+
+    def test_generate_rescales_matches_and_shifts(self, client, database):
+        seed_reference(database)
+        response = client.post('/api/v1/bfa/tasks/2/calculate?wait=10',
+                               json={'reference_project_id': '1', 'start_month': '202603'})
+        assert response.status_code == 200
+        data = response.json['data']
+        assert data['scale_factor'] == 1.3
+        assert data['dynamic_columns'] == ['202603', '202604', '202605']
+        first, second = data['table_data']
+        assert (first['202603'], first['202604'], first['202605']) == (13.0, '', 39.0)
+        assert first['填报总工时'] == 52.0
+        # 关联了工时基准的行取基准工时
+        assert first['baseline_id'] == 70 and first['基准工时'] == 60.0 and first['差异工时'] == -8.0
+        assert first['一级任务'] == '标定'
+        assert second['baseline_id'] is None and second['基准工时'] == 20.0
+        assert second['202604'] == 10.4 and second['一级任务'] == '未找到工时基准表'
+        assert int(data['calculation_id']) > 0
+
+    def test_generate_validates_input(self, client, database):
+        seed_reference(database)
+        assert client.post('/api/v1/bfa/tasks/2/calculate', json={}).status_code == 400
+        assert client.post('/api/v1/bfa/tasks/2/calculate',
+                           json={'reference_project_id': '1', 'start_month': '202613'}).status_code == 400
+        assert client.post('/api/v1/bfa/tasks/2/calculate',
+                           json={'reference_project_id': '9'}).status_code == 404
+
+    def test_submitted_project_with_bare_months_as_reference(self, client, database):
+        database.session.add_all([LisProject(id=2, measure_status='1', sml='2'),
+                                  LisProject(id=100, measure_status='4', sml='2')])
+        seed_project(database)
+        businesses = [{'powerConfig': '1.5T', 'specificItem': '事项', 'month202511': 10, 'month202512': 20}]
+        assert client.post('/api/v1/bfa/tasks/100/submit?wait=10', json={'businesses': businesses}).status_code == 200
+        # 提交的月度明细 mm 只存月份
+        assert sorted(row.mm for row in database.session.query(PmMonthHoursDetail)) == [11, 12]
+
+        response = client.post('/api/v1/bfa/tasks/2/calculate?wait=10',
+                               json={'reference_project_id': '100', 'start_month': '202603'})
+        data = response.json['data']
+        assert data['dynamic_columns'] == ['202603', '202604']
+        assert (data['table_data'][0]['202603'], data['table_data'][0]['202604']) == (10.0, 20.0)
+
+    def test_year_wrapping_bare_month_reference(self, client, database):
+        database.session.add_all([
+            LisProject(id=1, measure_status='4', sml='2'),
+            LisProject(id=2, measure_status='1', sml='2'),
+            LisProjectOrder(id=100, project_id='1'),
+            PmWorkHours(id=1, select_order=100, power_conf='1.5T', business_detail='事项', base_hours=100),
+            # 2025 年 11 月至 2026 年 2 月，mm 只存月份
+            PmMonthHoursDetail(id=11, measure_id='1', mm=11, month_input='11'),
+            PmMonthHoursDetail(id=12, measure_id='1', mm=12, month_input='12'),
+            PmMonthHoursDetail(id=13, measure_id='1', mm=1, month_input='1'),
+            PmMonthHoursDetail(id=14, measure_id='1', mm=2, month_input='2'),
+        ])
+        database.session.commit()
+
+        response = client.post('/api/v1/bfa/tasks/2/calculate?wait=10',
+                               json={'reference_project_id': '1', 'start_month': '202603'})
+        data = response.json['data']
+        assert data['dynamic_columns'] == ['202603', '202604', '202605', '202606']
+        row = data['table_data'][0]
+        assert [row[column] for column in data['dynamic_columns']] == [11.0, 12.0, 1.0, 2.0]
@@ -0,0 +1,174 @@
+import asyncio
+import json
+import time
+
+import httpx
+
+import app.app as app_module
+from app.services.ai_gateway import AIGateway
+from app.services.ai_service import AIService
+from app.services.chat_cache import ChatCache, normalize_message
+
+
+def sse_chunk(content):
+    payload = {
+        'id': 'chat-1', 'object': 'chat.completion.chunk', 'created': 0, 'model': 'stub',
+        'choices': [{'index': 0, 'delta': {'content': content}, 'finish_reason': None}],
+    }
+    return f'data: {json.dumps(payload)}\n\n'.encode()
+
+
+class StubOllama:
+    """ 模拟 Ollama 的 OpenAI 兼容流式接口，release 之前一直挂起。 """
+
+    def __init__(self, chunks, block=False):
+        self.chunks = chunks
+        self.block = block
+        self.release = None
+        self.closed = 0
+        self.requests = 0
+
+    async def handler(self, request):
+        self.requests += 1
+        if self.release is None:
+            self.release = asyncio.Event()
+
+        async def body():
+            try:
+                for chunk in self.chunks:
+                    yield sse_chunk(chunk)
+                if self.block:
+                    await self.release.wait()
+                yield b'data: [DONE]\n\n'
+            finally:
+                self.closed += 1
+
+        return httpx.Response(200, headers={'content-type': 'text/event-stream'}, content=body())
+
+
+def install_service(monkeypatch, stub, cache=None, **kwargs):
+    gateway = AIGateway('http://ollama.test/v1', transport=httpx.MockTransport(stub.handler), **kwargs)
+    service = AIService('http://ollama.test/v1', 'stub', gateway=gateway, cache=cache)
+    monkeypatch.setattr(app_module, 'ai_service', service)
+    return service
+
+
+def wait_until(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+class TestChatGateway():
+    def test_chat_streams_chunks(self, client, monkeypatch):
+        service = install_service(monkeypatch, StubOllama(['你好', '，世界']))
+        response = client.post('/api/v1/bfa/chat', json={'message': '测试'})
+        assert response.status_code == 200
+        assert response.get_data(as_text=True) == '你好，世界'
+        stats = service.stats()['stub']
+        assert stats['completed'] == 1
+        assert stats['active'] == 0 and stats['waiting'] == 0
+
+    def test_chat_rejects_when_queue_full(self, client, monkeypatch):
+        stub = StubOllama(['思考中'], block=True)
+        service = install_service(monkeypatch, stub, max_concurrency=1, max_queue=0)
+        first = service.get_streaming_chat_completion('第一个问题')
+        assert next(first) == '思考中'
+
+        response = client.post('/api/v1/bfa/chat', json={'message': '第二个问题'})
+        assert response.status_code == 503
+        assert response.headers['Retry-After'] == '5'
+        assert service.stats()['stub']['rejected'] == 1
+
+        first.close()
+        wait_until(lambda: service.stats()['stub']['active'] == 0)
+
+    def test_closing_stream_cancels_upstream(self, monkeypatch):
+        stub = StubOllama(['第一段'], block=True)
+        service = install_service(monkeypatch, stub)
+        chunks = service.get_streaming_chat_completion('问题')
+        assert next(chunks) == '第一段'
+        chunks.close()
+        wait_until(lambda: stub.closed == 1)
+        wait_until(lambda: service.stats()['stub']['cancelled'] == 1)
+        stats = service.stats()['stub']
+        assert stats['completed'] == 0
+        assert stats['active'] == 0 and stats['waiting'] == 0
+        assert stats['wait_ms_max'] is not None
+
+    def test_queued_request_times_out(self, monkeypatch):
+        stub = StubOllama(['思考中'], block=True)
+        service = install_service(monkeypatch, stub, max_concurrency=1, max_queue=1, queue_timeout=0.05)
+        first = service.get_streaming_chat_completion('第一个问题')
+        assert next(first) == '思考中'
+        second = service.get_streaming_chat_completion('第二个问题')
+        assert ''.join(second).startswith('对不起')
+        assert service.stats()['stub']['queue_timeouts'] == 1
+        first.close()
+
+
+class FakeEmbedding:
+    """ 按关键词生成向量：包含相同关键词的问题向量相同。 """
+    keywords = ['工时', '基准', '动力']
+
+    def __call__(self, text):
+        return [1.0 if keyword in text else 0.0 for keyword in self.keywords] + [0.1]
+
+
+class TestChatCache():
+    def test_normalize_message(self):
+        assert normalize_message('  如何 填报\n工时？ ') == normalize_message('如何 填报 工时?')
+        assert normalize_message('ＡＢＣ') == 'abc'
+
+    def test_hit_replays_without_calling_model(self, client, monkeypatch, tmp_path):
+        stub = StubOllama(['基准工时', '按月填报'])
+        cache = ChatCache(str(tmp_path / 'chat.sqlite3'), replay_chunk_size=3)
+        install_service(monkeypatch, stub, cache=cache)
+        # 流式响应在读取响应体时才生成，读完后写入缓存
+        first = client.post('/api/v1/bfa/chat', json={'message': '如何填报工时？'}).get_data(as_text=True)
+        second = client.post('/api/v1/bfa/chat', json={'message': ' 如何填报工时 '}).get_data(as_text=True)
+        assert first == second == '基准工时按月填报'
+        assert stub.requests == 1
+        stats = client.get('/api/v1/bfa/chat/stats').json['data']
+        assert stats['cache']['hits'] == 1 and stats['cache']['stores'] == 1
+        assert stats['gateway']['stub']['completed'] == 1
+
+    def test_errors_and_cancelled_streams_are_not_cached(self, monkeypatch, tmp_path):
+        cache = ChatCache(str(tmp_path / 'chat.sqlite3'))
+        service = install_service(monkeypatch, StubOllama(['第一段'], block=True), cache=cache)
+        chunks = service.get_streaming_chat_completion('问题')
+        assert next(chunks) == '第一段'
+        chunks.close()
+
+        def failing(request):
+            raise httpx.ConnectError('refused')
+        service.gateway = AIGateway('http://ollama.test/v1', transport=httpx.MockTransport(failing))
+        assert ''.join(service.get_streaming_chat_completion('问题')).startswith('对不起')
+        assert cache.stats()['size'] == 0
+
+    def test_similar_question_hits_and_persists(self, tmp_path):
+        path = str(tmp_path / 'chat.sqlite3')
+        cache = ChatCache(path, embed=FakeEmbedding(), similarity=0.99)
+        answer, embedding = cache.lookup('stub', '系统', '基准工时怎么算')
+        assert answer is None
+        cache.store('stub', '系统', '基准工时怎么算', '按基准表', embedding)
+
+        reopened = ChatCache(path, embed=FakeEmbedding(), similarity=0.99)
+        assert reopened.lookup('stub', '系统', '请问工时基准如何计算')[0] == '按基准表'
+        assert reopened.lookup('stub', '系统', '动力配置有哪些')[0] is None
+        assert reopened.lookup('stub', '其他系统', '基准工时怎么算')[0] is None
+        assert reopened.stats()['similar_hits'] == 1
+
+    def test_lru_eviction(self, tmp_path):
+        cache = ChatCache(str(tmp_path / 'chat.sqlite3'), max_entries=2)
+        cache.store('stub', '系统', '问题一', '回答一')
+        time.sleep(0.01)
+        cache.store('stub', '系统', '问题二', '回答二')
+        time.sleep(0.01)
+        assert cache.lookup('stub', '系统', '问题一')[0] == '回答一'
+        time.sleep(0.01)
+        cache.store('stub', '系统', '问题三', '回答三')
+        assert cache.lookup('stub', '系统', '问题二')[0] is None
+        assert cache.lookup('stub', '系统', '问题一')[0] == '回答一'
+        assert cache.stats()['size'] == 2
@@ -0,0 +1,91 @@
+from datetime import datetime
+
+from sqlalchemy import event
+
+from app.modules.bfa.models import BaHoursBasis, LisMeasurePerson, LisTask, PmWorkHours
+from app.modules.bfa.versions import namespace_version
+from app.services.conditional import conditional_get
+from tests.tests_bfa_inbox import seed_inbox
+from tests.tests_bfa_submit import seed_project
+
+
+class TestConditionalGet():
+    def test_baselines_not_modified_until_table_changes(self, client, database, monkeypatch):
+        database.session.add(LisTask(id=5, first_task='动力总成'))
+        database.session.add(BaHoursBasis(id=1, first_task='5', total_hour='80',
+                                          update_time=datetime(2025, 3, 1, 8, 30)))
+        database.session.commit()
+
+        first = client.get('/api/v1/bfa/baselines')
+        etag = first.headers['ETag']
+        assert first.headers['Cache-Control'] == 'no-cache' and first.last_modified is not None
+
+        # 304 时不执行视图
+        calls = []
+        monkeypatch.setattr('app.modules.bfa.route.bfa_controller.get_all_baselines',
+                            lambda: calls.append(1) or ('', 500))
+        cached = client.get('/api/v1/bfa/baselines', headers={'If-None-Match': etag})
+        assert cached.status_code == 304 and cached.data == b'' and cached.headers['ETag'] == etag
+        assert calls == []
+        since = client.get('/api/v1/bfa/baselines', headers={'If-Modified-Since': first.headers['Last-Modified']})
+        assert since.status_code == 304
+        monkeypatch.undo()
+
+        database.session.add(BaHoursBasis(id=2, first_task='5', total_hour='90'))
+        database.session.commit()
+        changed = client.get('/api/v1/bfa/baselines', headers={'If-None-Match': etag})
+        assert changed.status_code == 200 and changed.headers['ETag'] != etag
+        assert conditional_get.stats()['not_modified'] == 2
+
+    def test_tasks_version_is_per_person(self, client, database):
+        seed_inbox(database)
+        etag = client.get('/api/v1/bfa/tasks?person_id=张三').headers['ETag']
+        other = client.get('/api/v1/bfa/tasks?person_id=李四').headers['ETag']
+        assert etag != other
+
+        # 只刷新项目 10，李四的待办不受影响
+        database.session.get(LisMeasurePerson, 1).person = '王五'
+        database.session.commit()
+        assert client.get('/api/v1/bfa/tasks?person_id=李四', headers={'If-None-Match': other}).status_code == 304
+        assert client.get('/api/v1/bfa/tasks?person_id=张三', headers={'If-None-Match': etag}).status_code == 200
+
+    def test_history_details_version_follows_project_rows(self, client, database):
+        seed_project(database)
+        url = '/api/v1/bfa/history/100/details'
+        etag = client.get(url).headers['ETag']
+        assert client.get(url, headers={'If-None-Match': etag}).status_code == 304
+        database.session.add(PmWorkHours(id=5, select_order=7, business_detail='事项'))
+        database.session.commit()
+        assert client.get(url, headers={'If-None-Match': etag}).status_code == 200
+
+    def test_table_versions_use_indexes(self, app, database):
+        statements = []
+        engine = database.engine
+        listener = lambda conn, cursor, statement, parameters, context, executemany: statements.append(
+            (statement, parameters))
+        event.listen(engine, 'before_cursor_execute', listener)
+        try:
+            namespace_version('history_rollup')()
+        finally:
+            event.remove(engine, 'before_cursor_execute', listener)
+
+        # 每张表的最大ID 和最大更新时间都是索引查找，不扫描整张表
+        plans = [row[3] for statement, parameters in statements
+                 for row in database.session.connection().exec_driver_sql('EXPLAIN QUERY PLAN ' + statement,
+                                                                          tuple(parameters))]
+        tables = app.config['RESPONSE_CACHE_NAMESPACES']['history_rollup']['tables']
+        assert len(statements) == len(tables)
+        assert [plan for plan in plans if plan.startswith('SCAN') and plan != 'SCAN CONSTANT ROW'] == []
+        assert all(f'SEARCH {name} USING COVERING INDEX ix_{name}_update_time' in plans for name in tables)
+
+    def test_baselines_version_follows_soft_delete(self, client, database):
+        database.session.add(LisTask(id=5, first_task='动力总成'))
+        database.session.add(BaHoursBasis(id=1, first_task='5', total_hour='80',
+                                          update_time=datetime(2025, 3, 1, 8, 30)))
+        database.session.commit()
+        etag = client.get('/api/v1/bfa/baselines').headers['ETag']
+
+        basis = database.session.get(BaHoursBasis, 1)
+        basis.delete_tag, basis.update_time = True, datetime(2025, 3, 2, 9, 0)
+        database.session.commit()
+        assert client.get('/api/v1/bfa/baselines', headers={'If-None-Match': etag}).status_code == 200
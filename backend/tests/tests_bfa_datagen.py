@@ -0,0 +1,33 @@
+from sqlalchemy import func, select
+
+from app.modules.bfa.models import LisProjectOrder, PmMonthHoursDetail, PmWorkHours
+from benchmarks.datagen import allocate, dataset_matches, dataset_sizes, generate
+
+
+class TestDatagen():
+    def test_generates_requested_sizes_with_consistent_keys(self, client, database):
+        sizes = dataset_sizes(0.001, pm_month_hours_detail=2000)
+        generate(sizes)
+        assert dataset_matches(sizes) and not dataset_matches(dict(sizes, lis_project=sizes['lis_project'] + 1))
+
+        # 工时行的订单属于同一个项目，月度明细的影子键与字符串键一致
+        mismatched = database.session.execute(
+            select(func.count()).select_from(PmWorkHours)
+            .join(LisProjectOrder, LisProjectOrder.id == PmWorkHours.select_order)
+            .where(LisProjectOrder.project_id != PmWorkHours.select_project_id)
+        ).scalar()
+        assert mismatched == 0
+        assert database.session.execute(
+            select(func.count()).select_from(PmMonthHoursDetail)
+            .where(PmMonthHoursDetail.measure_key != func.cast(PmMonthHoursDetail.measure_id, database.Integer))
+        ).scalar() == 0
+
+        tasks = client.get('/api/v1/bfa/tasks').json['data']
+        history = client.get('/api/v1/bfa/history?limit=500').json['data']
+        assert tasks and len(history) == round(sizes['lis_project'] * 0.7)
+        details = client.get(f"/api/v1/bfa/history/{history[0]['id']}/details")
+        assert details.status_code == 200
+
+    def test_allocate_keeps_total(self):
+        assert allocate(10, [1, 1, 1]) == [4, 3, 3]
+        assert sum(allocate(500000, [0.3, 7.1, 1e-3, 2])) == 500000
@@ -0,0 +1,128 @@
+import pytest
+
+from app.modules.bfa.drafts import CommandError, Draft, diff_drafts, extract_commands
+from tests.tests_bfa_calculation import seed_reference
+from tests.tests_bfa_chat import StubOllama, install_service
+
+
+def make_draft():
+    table = [
+        {'id': 1, '动力配置': '1.5T', '一级任务': '标定', '改动类型': '新增', '具体事项': '事项一', '基准工时': 60.0,
+         '202601': 10.0, '202602': 20.0, '202603': ''},
+        {'id': 2, '动力配置': '2.0T', '一级任务': '试验', '改动类型': '沿用', '具体事项': '事项二', '基准工时': 20.0,
+         '202601': '', '202602': 8.0, '202603': 4.0},
+    ]
+    return Draft.from_table(table, ['202601', '202602', '202603'])
+
+
+def changed(patch):
+    return {(change['id'], change['column']): change['value'] for change in patch['changes']}
+
+
+def generate(client, database):
+    seed_reference(database)
+    return client.post('/api/v1/bfa/tasks/2/calculate?wait=10',
+                       json={'reference_project_id': '1', 'start_month': '202603'}).json['data']
+
+
+class TestDraftCommands():
+    def test_scale_filtered_rows_returns_only_changed_cells(self):
+        before = make_draft()
+        after = before.copy()
+        after.apply({'op': 'scale', 'factor': 1.5, 'where': {'power_conf': '1.5T'}})
+        patch = diff_drafts(before, after)
+        assert changed(patch) == {(1, '202601'): 15.0, (1, '202602'): 30.0, (1, '填报总工时'): 45.0,
+                                  (1, '差异工时'): -15.0}
+        assert patch['deleted'] == [] and 'dynamic_columns' not in patch
+
+    def test_shift_extends_and_drops_columns(self):
+        before = make_draft()
+        after = before.copy()
+        after.apply({'op': 'shift', 'months': 11})
+        assert after.columns == ['202612', '202701', '202702']
+        assert after.to_table()[0][0]['202612'] == 10.0
+        patch = diff_drafts(before, after)
+        assert patch['dynamic_columns'] == ['202612', '202701', '202702']
+        assert changed(patch)[(1, '202601')] == ''
+
+    def test_redistribute_keeps_totals(self):
+        draft = make_draft()
+        draft.apply({'op': 'redistribute', 'start': '202601', 'end': '202603', 'where': {'ids': [1]}})
+        row = draft.to_table()[0][0]
+        assert (row['202601'], row['202602'], row['202603']) == (10.0, 10.0, 10.0)
+        draft.apply({'op': 'redistribute', 'start': '202604', 'end': '202605', 'total': 9, 'mode': 'proportional',
+                     'where': {'first_task': {'contains': '试'}}})
+        row = draft.to_table()[0][1]
+        assert (row['202604'], row['202605'], row['填报总工时']) == (4.5, 4.5, 9.0)
+
+    def test_delete_and_set(self):
+        before = make_draft()
+        after = before.copy()
+        after.apply({'op': 'delete', 'where': {'change_type': ['沿用']}})
+        after.apply({'op': 'set', 'id': 1, 'field': 'diff_reason', 'value': '新增标定项'})
+        patch = diff_drafts(before, after)
+        assert patch['deleted'] == [2] and patch['dynamic_columns'] == ['202601', '202602']
+        assert changed(patch) == {(1, '差异原因'): '新增标定项'}
+        with pytest.raises(CommandError):
+            after.apply({'op': 'delete'})
+        with pytest.raises(CommandError):
+            after.apply({'op': 'scale', 'factor': 'x'})
+
+    def test_extract_commands_from_model_reply(self):
+        reply = '<think>用户想缩放</think>\n```json\n[{"op": "scale", "factor": 1.1}]\n```'
+        assert extract_commands(reply) == [{'op': 'scale', 'factor': 1.1}]
+        with pytest.raises(CommandError):
+            extract_commands('无法理解')
+
+
+class TestModifyCalculation():
+    def test_modify_applies_patch_and_versions(self, client, database):
+        data = generate(client, database)
+        assert data['version'] == 1
+        response = client.post('/api/v1/bfa/calculations/modify', json={
+            'calculation_id': data['calculation_id'], 'version': 1,
+            'commands': [{'op': 'scale', 'factor': 2, 'where': {'ids': [2]}}],
+        })
+        assert response.status_code == 200
+        patch = response.json['data']
+        assert patch['version'] == 2
+        assert {(change['id'], change['column']) for change in patch['changes']} == {
+            (2, '202604'), (2, '填报总工时'), (2, '差异工时')}
+
+        # 过期版本返回 409，完整草稿反映修改结果
+        stale = client.post('/api/v1/bfa/calculations/modify', json={
+            'calculation_id': data['calculation_id'], 'version': 1, 'commands': [{'op': 'shift', 'months': 1}],
+        })
+        assert stale.status_code == 409
+        draft = client.get(f"/api/v1/bfa/calculations/{data['calculation_id']}").json['data']
+        assert draft['version'] == 2 and draft['table_data'][1]['202604'] == 20.8
+
+    def test_modify_rejects_bad_commands(self, client, database):
+        data = generate(client, database)
+        response = client.post('/api/v1/bfa/calculations/modify', json={
+            'calculation_id': data['calculation_id'], 'commands': [{'op': 'drop'}],
+        })
+        assert response.status_code == 422
+        assert client.post('/api/v1/bfa/calculations/modify',
+                           json={'calculation_id': '1', 'commands': [{'op': 'shift', 'months': 1}]}).status_code == 404
+
+    def test_natural_language_command(self, client, database, monkeypatch):
+        data = generate(client, database)
+        install_service(monkeypatch, StubOllama(['[{"op": "shift", ', '"months": 1}]']))
+        accepted = client.post('/api/v1/bfa/calculations/modify', json={
+            'calculation_id': data['calculation_id'], 'command': '整体推迟一个月',
+        })
+        assert accepted.status_code == 202 and accepted.json['data']['kind'] == 'modify_calculation'
+        job = client.get(f"/api/v1/bfa/jobs/{accepted.json['data']['job_id']}?wait=10").json['data']
+        assert job['status'] == 'succeeded' and job['result']['data']['version'] == 2
+        # 带 ?wait= 时直接返回修改结果；同一版本的草稿已被修改，再提交相同指令返回 409
+        conflict = client.post('/api/v1/bfa/calculations/modify?wait=10', json={
+            'calculation_id': data['calculation_id'], 'command': '整体推迟一个月', 'version': 1,
+        })
+        assert conflict.status_code == 409
+        response = client.post('/api/v1/bfa/calculations/modify?wait=10', json={
+            'calculation_id': data['calculation_id'], 'command': '整体推迟一个月',
+        })
+        assert response.status_code == 200 and response.json['data']['version'] == 3
+        assert response.json['data']['commands'] == [{'op': 'shift', 'months': 1}]
+        assert response.json['data']['dynamic_columns'] == ['202605', '202606', '202607']
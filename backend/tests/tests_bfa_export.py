@@ -0,0 +1,56 @@
+import io
+
+import pytest
+
+from app.modules.bfa.models import LisProject, LisProjectOrder, PmMonthHoursDetail, PmWorkHours
+from tests.tests_bfa_calculation import seed_reference
+
+pa = pytest.importorskip('pyarrow')
+pq = pytest.importorskip('pyarrow.parquet')
+
+
+def seed_second_project(db):
+    db.session.add_all([
+        LisProject(id=3, measure_status='4', sml='1'),
+        LisProjectOrder(id=300, project_id='3'),
+        PmWorkHours(id=30, select_order=300, power_conf='1.5T', business_detail='事项三', base_hours=12),
+        PmMonthHoursDetail(id=31, measure_id='30', mm=202502, month_input='7.5'),
+    ])
+    db.session.commit()
+
+
+class TestExport():
+    def test_arrow_export_keeps_typed_month_columns(self, client, database):
+        seed_reference(database)
+        response = client.get('/api/v1/bfa/history/export?project_ids=1')
+        assert response.status_code == 200 and response.mimetype == 'application/vnd.apache.arrow.stream'
+        assert 'history-details.arrow' in response.headers['Content-Disposition']
+
+        table = pa.ipc.open_stream(response.data).read_all()
+        assert table.column_names[-3:] == ['202411', '202412', '202501']
+        assert table.schema.field('202411').type == pa.float64() and table.schema.field('id').type == pa.int64()
+        rows = table.to_pylist()
+        assert [row['id'] for row in rows] == [1, 2] and rows[0]['project_id'] == 1
+        assert (rows[0]['202411'], rows[0]['202412'], rows[0]['202501']) == (10.0, None, 30.0)
+        assert rows[0]['填报总工时'] == 40.0 and rows[0]['一级任务'] == '标定' and rows[1]['一级任务'] is None
+
+    def test_bulk_parquet_export_in_row_groups(self, app, client, database):
+        seed_reference(database)
+        seed_second_project(database)
+        app.config['HISTORY_EXPORT_BATCH_ROWS'] = 1
+        response = client.get('/api/v1/bfa/history/export?all=true&format=parquet')
+        assert response.status_code == 200
+
+        parquet = pq.ParquetFile(io.BytesIO(response.data))
+        # 每块按工时行边界切分，三个工时行各成一个 row group
+        assert parquet.num_row_groups == 3
+        table = parquet.read()
+        assert table.column('project_id').to_pylist() == [1, 1, 3]
+        assert table.column('202502').to_pylist() == [None, None, 7.5]
+
+    def test_export_validates_arguments(self, client, database):
+        assert client.get('/api/v1/bfa/history/export').status_code == 400
+        assert client.get('/api/v1/bfa/history/export?project_ids=1&format=csv').status_code == 400
+        assert client.get('/api/v1/bfa/history/export?project_ids=a').status_code == 400
+        empty = client.get('/api/v1/bfa/history/export?project_ids=99')
+        assert empty.status_code == 200 and pa.ipc.open_stream(empty.data).read_all().num_rows == 0
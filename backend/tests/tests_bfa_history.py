@@ -0,0 +1,121 @@
+from sqlalchemy import text
+
+from app.modules.bfa.models import (LisProject, LisMeasurePerson, LisProjectOrder, BsBasicCenterHr,
+                                    PmMonthHoursDetail)
+from app.modules.bfa.schema import backfill_typed_keys
+
+
+def seed_history(db):
+    db.session.add_all([
+        BsBasicCenterHr(id=1, department_id='D1', department_name='动力一部'),
+        BsBasicCenterHr(id=2, department_id='D1', department_name='动力一部'),
+        BsBasicCenterHr(id=3, department_id='D2', department_name='底盘部'),
+    ])
+    for pid in range(1, 6):
+        db.session.add(LisProject(id=pid, measures_project=f'项目{pid}', measure_status='4',
+                                  brand='4' if pid % 2 else '1', sml='2'))
+        department = 'D1' if pid <= 3 else 'D2'
+        db.session.add(LisMeasurePerson(id=pid * 10, project_id=str(pid), person=f'主测{pid}',
+                                        person_department=department))
+        db.session.add(LisMeasurePerson(id=pid * 10 + 1, project_id=str(pid), person=f'协测{pid}',
+                                        person_department=department))
+    db.session.add(LisProject(id=99, measures_project='进行中', measure_status='1'))
+    db.session.commit()
+
+
+class TestHistory():
+    def test_history_joins_first_person_and_department(self, client, database):
+        seed_history(database)
+        response = client.get('/api/v1/bfa/history')
+        assert response.status_code == 200
+        data = response.json['data']
+        assert [item['id'] for item in data] == ['5', '4', '3', '2', '1']
+        assert data[-1]['calculator'] == '主测1'
+        assert data[-1]['department'] == '动力一部'
+        assert data[-1]['brand'] == '哈弗'
+        assert response.json['next_cursor'] is None
+
+    def test_history_keyset_pagination(self, client, database):
+        seed_history(database)
+        first = client.get('/api/v1/bfa/history?limit=2').json
+        assert [item['id'] for item in first['data']] == ['5', '4']
+        second = client.get(f"/api/v1/bfa/history?limit=2&cursor={first['next_cursor']}").json
+        assert [item['id'] for item in second['data']] == ['3', '2']
+        third = client.get(f"/api/v1/bfa/history?limit=2&cursor={second['next_cursor']}").json
+        assert [item['id'] for item in third['data']] == ['1']
+        assert third['next_cursor'] is None
+
+    def test_history_filters(self, client, database):
+        seed_history(database)
+        by_brand = client.get('/api/v1/bfa/history?brand=哈弗').json['data']
+        assert [item['id'] for item in by_brand] == ['5', '3', '1']
+        by_department = client.get('/api/v1/bfa/history?department_id=D2&scale=M').json['data']
+        assert [item['id'] for item in by_department] == ['5', '4']
+
+
+class TestTypedKeys():
+    def test_typed_key_set_on_insert_and_update(self, database):
+        person = LisMeasurePerson(id=1, project_id='123')
+        database.session.add(person)
+        database.session.commit()
+        assert person.project_key == 123
+
+        person.project_id = 'not-a-number'
+        database.session.commit()
+        assert person.project_key is None
+
+    def test_triggers_fill_keys_for_direct_writes(self, client, database):
+        # 外部系统绕过 ORM 直接写入的行由数据库触发器计算影子键
+        database.session.execute(text(
+            "INSERT INTO pm_month_hours_detail (id, measure_id) VALUES (1, ' 42 '), (2, 'x'), (3, NULL), (4, '')"
+        ))
+        database.session.execute(text("INSERT INTO lis_measure_person (id, project_id) VALUES (5, '100')"))
+        database.session.commit()
+        keys = dict(database.session.query(PmMonthHoursDetail.id, PmMonthHoursDetail.measure_key).all())
+        assert keys == {1: 42, 2: None, 3: None, 4: None}
+
+        database.session.execute(text("UPDATE pm_month_hours_detail SET measure_id = '7' WHERE id = 2"))
+        database.session.execute(text("UPDATE pm_month_hours_detail SET measure_id = 'y' WHERE id = 1"))
+        database.session.commit()
+        keys = dict(database.session.query(PmMonthHoursDetail.id, PmMonthHoursDetail.measure_key).all())
+        assert (keys[1], keys[2]) == (None, 7)
+        assert database.session.get(LisMeasurePerson, 5).project_key == 100
+
+    def test_migrate_installs_missing_triggers_and_backfills(self, app, database):
+        database.session.execute(text('DROP TRIGGER trg_lis_measure_person_project_key_insert'))
+        database.session.execute(text("INSERT INTO lis_measure_person (id, project_id) VALUES (5, '100')"))
+        database.session.commit()
+        assert database.session.get(LisMeasurePerson, 5).project_key is None
+
+        result = app.test_cli_runner().invoke(args=['bfa', 'migrate'])
+        assert result.exit_code == 0
+        assert '新增触发器 trg_lis_measure_person_project_key_insert' in result.output
+        assert 'lis_measure_person: 回填 1 行' in result.output
+        database.session.expire_all()
+        assert database.session.get(LisMeasurePerson, 5).project_key == 100
+
+    def test_backfill_typed_keys(self, database):
+        database.session.execute(text(
+            "INSERT INTO pm_month_hours_detail (id, measure_id) VALUES (1, '42'), (2, 'x'), (3, NULL)"
+        ))
+        database.session.execute(text("INSERT INTO lis_project_order (id, project_id) VALUES (7, '100')"))
+        # 模拟创建触发器之前写入的行
+        database.session.execute(text('UPDATE pm_month_hours_detail SET measure_key = NULL'))
+        database.session.execute(text('UPDATE lis_project_order SET project_key = NULL'))
+        database.session.commit()
+
+        results = backfill_typed_keys(batch_size=1)
+        assert results['pm_month_hours_detail'] == 1
+        assert database.session.get(LisProjectOrder, 7).project_key == 100
+        keys = dict(database.session.query(PmMonthHoursDetail.id, PmMonthHoursDetail.measure_key).all())
+        assert keys == {1: 42, 2: None, 3: None}
+
+
+class TestIndexAdvisor():
+    def test_explain_reports_every_endpoint(self, app, database):
+        seed_history(database)
+        result = app.test_cli_runner().invoke(args=['bfa', 'explain'])
+        assert result.exit_code == 0
+        for endpoint in ('get_tasks', 'get_historical_projects', 'get_all_baselines'):
+            assert endpoint in result.output
+        assert '全表/全索引扫描' in result.output
@@ -0,0 +1,90 @@
+import pytest
+
+from app.modules.bfa.importer import ExcelImportError, import_workbook
+from app.modules.bfa.models import BaHoursBasis, LisTask, PmMonthHoursDetail, PmWorkHours
+
+openpyxl = pytest.importorskip('openpyxl')
+
+
+def write_workbook(path, rows, title='Sheet1'):
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet(title)
+    for row in rows:
+        sheet.append(row)
+    workbook.save(path)
+    return str(path)
+
+
+class TestExcelImport():
+    def test_baselines_upsert_on_serial_number(self, app, database, tmp_path):
+        database.session.add(LisTask(id=5, first_task='动力总成'))
+        database.session.commit()
+        first = write_workbook(tmp_path / 'baselines.xlsx', [
+            ['编号', '动力配置', '一级任务', '改动类型', '定义范围', '基准工时', '备注'],
+            ['B-1', '1.5T', '动力总成', '新增', '全范围', 80],
+            ['B-2', '2.0T', 7, '沿用', None, '12.5'],
+            ['B-3', '2.0T', '不存在的任务', '沿用', None, 10],
+            [None, None, None, None, None, None],
+            ['B-4', '2.0T', 5, '沿用', None, '很多'],
+        ])
+        report = import_workbook(first, 'baselines', batch_size=2)
+        assert (report['rows'], report['inserted'], report['updated'], report['skipped']) == (4, 2, 0, 2)
+        assert [error['row'] for error in report['errors']] == [4, 6] and report['ignored_columns'] == ['备注']
+        assert report['rows_per_sec'] > 0
+        # 服务进程中的工时基准参考缓存无法从命令行清除，按 TTL 过期
+        assert report['stale_cache_ttl'] == 600
+
+        row = database.session.query(BaHoursBasis).filter_by(serial_number='B-1').one()
+        assert (row.first_task, row.first_task_key, row.total_hour, row.de_range) == ('5', 5, '80', '全范围')
+        assert database.session.query(BaHoursBasis).filter_by(serial_number='B-2').one().total_hour == '12.5'
+
+        # 再次导入：已有编号更新、新编号插入，表格中重复的编号以最后一行为准
+        second = write_workbook(tmp_path / 'baselines2.xlsx', [
+            ['serial_number', 'total_hour', '定义范围'],
+            ['B-1', 90, None],
+            ['B-5', 30, '局部'],
+            ['B-5', 35, '局部'],
+        ])
+        report = import_workbook(second, 'baselines')
+        assert (report['inserted'], report['updated'], report['duplicates']) == (1, 1, 1)
+        database.session.expire_all()
+        row = database.session.query(BaHoursBasis).filter_by(serial_number='B-1').one()
+        # 表格中没有的列保持原值，空单元格清空原值
+        assert (row.total_hour, row.power_type, row.de_range) == ('90', '1.5T', None)
+        assert database.session.query(BaHoursBasis).filter_by(serial_number='B-5').one().total_hour == '35'
+        assert database.session.query(BaHoursBasis).count() == 3
+
+    def test_timesheets_replace_month_details(self, database, tmp_path):
+        path = write_workbook(tmp_path / 'timesheets.xlsx', [
+            ['编号', '项目ID', '订单ID', '动力配置', '具体事项', '基准工时', '202501', '2025-02'],
+            ['W-1', '10', 100, '1.5T', '标定', 50, 10, 20.5],
+            ['W-2', '10', 100, '2.0T', '试验', 20, None, 8],
+        ])
+        report = import_workbook(path, 'timesheets')
+        assert (report['inserted'], report['month_details']) == (2, 3)
+        assert report['stale_cache_ttl'] == 0
+        work_hour = database.session.query(PmWorkHours).filter_by(serial_number='W-1').one()
+        months = database.session.query(PmMonthHoursDetail.mm, PmMonthHoursDetail.month_input).filter_by(
+            measure_key=work_hour.id).order_by(PmMonthHoursDetail.mm).all()
+        assert months == [(202501, '10'), (202502, '20.5')] and work_hour.select_order == 100
+
+        path = write_workbook(tmp_path / 'timesheets2.xlsx', [
+            ['编号', '202503'],
+            ['W-1', 5],
+        ])
+        report = import_workbook(path, 'timesheets')
+        assert (report['inserted'], report['updated'], report['month_details']) == (0, 1, 1)
+        assert database.session.query(PmMonthHoursDetail).filter_by(measure_key=work_hour.id).count() == 1
+        assert database.session.query(PmMonthHoursDetail).count() == 2
+
+    def test_rejects_unusable_workbooks(self, app, database, tmp_path):
+        path = write_workbook(tmp_path / 'bad.xlsx', [['动力配置'], ['1.5T']])
+        with pytest.raises(ExcelImportError):
+            import_workbook(path, 'baselines')
+        with pytest.raises(ExcelImportError):
+            import_workbook(path, 'baselines', sheet='不存在')
+
+        path = write_workbook(tmp_path / 'dry.xlsx', [['编号', '基准工时'], ['B-9', 1]])
+        result = app.test_cli_runner().invoke(args=['bfa', 'import-excel', path, '--kind', 'baselines', '--dry-run'])
+        assert result.exit_code == 0 and '读取 1 行' in result.output
+        assert database.session.query(BaHoursBasis).count() == 0
@@ -0,0 +1,57 @@
+from sqlalchemy import update
+
+from app.modules.bfa.inbox import reconcile_inbox
+from app.modules.bfa.models import BfaTaskInbox, BsBasicCenterHr, LisMeasurePerson, LisProject, LisProjectOrder
+
+
+def seed_inbox(db):
+    db.session.add_all([
+        BsBasicCenterHr(id=1, department_id='D1', department_name='标定部'),
+        LisProject(id=10, measures_project='项目A', measure_tag='0', measure_status='1', brand='4', sml='2'),
+        LisProject(id=11, measures_project='项目B', measure_tag='0', measure_status='1', brand='1', sml='0'),
+        LisProject(id=12, measures_project='项目C', measure_tag='1', measure_status='1'),
+        LisProjectOrder(id=7, project_id='10'),
+        LisMeasurePerson(id=1, project_id='10', person='张三', person_department='D1', measure_status='1'),
+        LisMeasurePerson(id=2, project_id='11', person='张三', person_department='D1', measure_status='1'),
+        LisMeasurePerson(id=3, project_id='11', person='李四', person_department='D1', measure_status='1'),
+        LisMeasurePerson(id=4, project_id='12', person='张三', person_department='D1', measure_status='1'),
+    ])
+    db.session.commit()
+
+
+def task_ids(client, person):
+    return [task['id'] for task in client.get(f'/api/v1/bfa/tasks?person_id={person}').json['data']]
+
+
+class TestTaskInbox():
+    def test_inbox_is_maintained_on_flush(self, client, database):
+        seed_inbox(database)
+        assert database.session.query(BfaTaskInbox).count() == 3
+        tasks = client.get('/api/v1/bfa/tasks?person_id=张三').json['data']
+        assert tasks[0] == {'id': '10', 'name': '项目A', 'department': '标定部', 'department_id': 'D1',
+                            'calculator': '张三', 'brand': '哈弗', 'spec': 'M', 'task_person_id': '1'}
+        assert [task['id'] for task in tasks] == ['10', '11']
+
+        # 项目状态和人员变化在同一事务中刷新
+        database.session.get(LisProject, 11).measure_tag = '1'
+        database.session.get(LisMeasurePerson, 1).person = '王五'
+        database.session.commit()
+        assert task_ids(client, '张三') == []
+        assert task_ids(client, '王五') == ['10']
+        assert task_ids(client, '李四') == []
+
+    def test_reconcile_fixes_external_writes(self, client, database):
+        seed_inbox(database)
+        database.session.get(LisMeasurePerson, 1).person_department = 'D9'
+        database.session.commit()
+        # 部门不存在的人员不进入待办
+        assert task_ids(client, '张三') == ['11']
+
+        # 绕过 ORM 的写入由全量对账修复
+        database.session.execute(update(LisProject).where(LisProject.id == 12).values(measure_tag='0'))
+        database.session.execute(update(BsBasicCenterHr).values(department_name='试验部'))
+        database.session.commit()
+        assert reconcile_inbox() == {'rows': 3, 'inserted': 1, 'updated': 2, 'deleted': 0}
+        tasks = client.get('/api/v1/bfa/tasks?person_id=张三').json['data']
+        assert [(task['id'], task['department']) for task in tasks] == [('11', '试验部'), ('12', '试验部')]
+        assert reconcile_inbox()['inserted'] == 0
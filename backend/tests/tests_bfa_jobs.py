@@ -0,0 +1,75 @@
+import threading
+import uuid
+
+from app.modules.bfa.models import PmWorkHours
+from app.services.job_queue import JobError, job_queue
+from tests.tests_bfa_calculation import seed_reference
+from tests.tests_bfa_submit import seed_project
+
+
+class TestJobs():
+    def test_generate_returns_job_and_reports_result(self, client, database):
+        seed_reference(database)
+        response = client.post('/api/v1/bfa/tasks/2/calculate',
+                               json={'reference_project_id': '1', 'start_month': '202603'})
+        assert response.status_code == 202
+        job = response.json['data']
+        assert job['kind'] == 'generate_calculation' and response.headers['X-Job-Id'] == job['job_id']
+
+        status = client.get(f"/api/v1/bfa/jobs/{job['job_id']}?wait=10").json['data']
+        assert status['status'] == 'succeeded' and status['progress'] == 1.0 and status['status_code'] == 200
+        assert status['result']['data']['dynamic_columns'] == ['202603', '202604', '202605']
+
+        listing = client.get('/api/v1/bfa/jobs?kind=generate_calculation').json['data']
+        assert [item['job_id'] for item in listing['jobs']][0] == job['job_id']
+        assert 'result' not in listing['jobs'][0]
+        assert client.get('/api/v1/bfa/jobs/1').status_code == 404
+
+    def test_idempotency_key_returns_same_job(self, client, database):
+        seed_project(database)
+        # 任务库在测试之间保留，每次使用新的幂等键
+        headers = {'Idempotency-Key': f'submit-100-{uuid.uuid4().hex}'}
+        businesses = [{'powerConfig': '1.5T', 'specificItem': '事项', 'month202501': 5}]
+        first = client.post('/api/v1/bfa/tasks/100/submit?wait=10', json={'businesses': businesses}, headers=headers)
+        second = client.post('/api/v1/bfa/tasks/100/submit', json={'businesses': businesses}, headers=headers)
+        assert first.status_code == 200 and first.json['data'] == {'work_hours': 1, 'month_details': 1}
+        assert second.status_code == 200 and second.headers['X-Job-Id'] == first.headers['X-Job-Id']
+        assert database.session.query(PmWorkHours).count() == 1
+
+        conflict = client.post('/api/v1/bfa/tasks/100/submit', json={'businesses': businesses * 2}, headers=headers)
+        assert conflict.status_code == 422
+
+    def test_failed_job_keeps_status_and_progress(self, app):
+        release = threading.Event()
+
+        def handler(payload, progress):
+            progress(0.5, '处理中')
+            release.wait(5)
+            raise JobError('参考项目不存在', status_code=404)
+
+        job_queue.register('test_failing', handler)
+        job, created = job_queue.enqueue('test_failing', {'value': 1})
+        assert created
+        running = job_queue.wait(job['job_id'], 0.5)
+        assert running['status'] == 'running' and running['progress'] == 0.5 and running['message'] == '处理中'
+        release.set()
+        failed = job_queue.wait(job['job_id'], 5)
+        assert failed['status'] == 'failed' and failed['status_code'] == 404
+        assert failed['result'] == {'error': '参考项目不存在', 'message': '参考项目不存在'}
+
+    def test_stale_execution_does_not_overwrite_reclaimed_job(self, app):
+        release = threading.Event()
+
+        def handler(payload, progress):
+            release.wait(5)
+            return {'data': 'stale'}, 200
+
+        job_queue.register('test_reclaimed', handler)
+        job, _ = job_queue.enqueue('test_reclaimed', {'value': uuid.uuid4().hex})
+        assert job_queue.wait(job['job_id'], 0.5)['status'] == 'running'
+        # 模拟租约过期后被另一个进程重新认领
+        job_queue._connection().execute('UPDATE jobs SET attempts = attempts + 1 WHERE id = ?', (job['job_id'],))
+        release.set()
+        reclaimed = job_queue.wait(job['job_id'], 0.5)
+        assert reclaimed['status'] == 'running' and reclaimed['attempts'] == 2 and 'result' not in reclaimed
+        job_queue._connection().execute('DELETE FROM jobs WHERE id = ?', (job['job_id'],))
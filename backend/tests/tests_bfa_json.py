@@ -0,0 +1,73 @@
+import gzip
+import json
+import zlib
+from datetime import date
+from decimal import Decimal
+
+import numpy as np
+from sqlalchemy import insert
+
+from app.modules.bfa.models import BaHoursBasis, LisTask
+from app.services.serialization import ORJSONProvider, iter_json, json_encoder
+from tests.tests_bfa_calculation import seed_reference
+
+
+def seed_baselines(db, count):
+    db.session.add(LisTask(id=5, first_task='动力总成'))
+    db.session.execute(insert(BaHoursBasis), [
+        {'id': i, 'first_task': '5', 'power_type': '1.5T', 'change_type': '新增', 'de_range': f'范围{i}',
+         'total_hour': str(i)}
+        for i in range(1, count + 1)
+    ])
+    db.session.commit()
+
+
+class TestJson():
+    def test_provider_keeps_cjk_and_default_formats(self, app):
+        assert isinstance(app.json, ORJSONProvider)
+        with app.app_context():
+            encoded = app.json.dumps({'一级任务': '标定', 1: np.float64(2.5), 'day': date(2025, 3, 1),
+                                      'hours': Decimal('1.5'), 'months': np.array([202501, 202502])})
+        # 中文不转义，日期与 Decimal 与 Flask 默认实现的格式一致
+        assert '"一级任务":"标定"' in encoded
+        assert json.loads(encoded) == {'一级任务': '标定', '1': 2.5, 'day': 'Sat, 01 Mar 2025 00:00:00 GMT',
+                                       'hours': '1.5', 'months': [202501, 202502]}
+
+    def test_streamed_encoding_matches_full_encoding(self, app):
+        payload = {'data': {'table_data': [{'id': i, '工时': i / 2} for i in range(7)], 'dynamic_columns': []}}
+        with app.app_context():
+            encode = json_encoder()
+            for threshold, batch_size in ((0, 1), (2, 3), (100, 10)):
+                assert b''.join(iter_json(payload, encode, threshold, batch_size)) == encode(payload)
+
+    def test_large_history_details_are_streamed_and_compressed(self, app, client, database):
+        seed_reference(database)
+        plain = client.get('/api/v1/bfa/history/1/details')
+        assert 'Content-Encoding' not in plain.headers and 'Content-Length' in plain.headers
+
+        app.config['JSON_STREAM_THRESHOLD'] = 1
+        streamed = client.get('/api/v1/bfa/history/1/details', headers={'Accept-Encoding': 'gzip'})
+        assert streamed.headers['Content-Encoding'] == 'gzip' and 'Accept-Encoding' in streamed.headers['Vary']
+        assert 'Content-Length' not in streamed.headers
+        assert json.loads(gzip.decompress(streamed.data)) == plain.json
+
+    def test_baselines_compressed_by_size_and_negotiation(self, client, database):
+        seed_baselines(database, 200)
+        response = client.get('/api/v1/bfa/baselines', headers={'Accept-Encoding': 'br;q=0.9, gzip;q=0.5'})
+        assert response.headers['Content-Encoding'] in ('br', 'gzip')
+        # 弱 ETag，压缩前后共用
+        assert response.headers['ETag'].startswith('W/')
+
+        identity = client.get('/api/v1/bfa/baselines', headers={'Accept-Encoding': 'identity'})
+        assert 'Content-Encoding' not in identity.headers and len(identity.json['data']) == 200
+        assert '动力总成'.encode('utf-8') in identity.data
+
+        ndjson = client.get('/api/v1/bfa/baselines?format=ndjson', headers={'Accept-Encoding': 'gzip'})
+        lines = zlib.decompress(ndjson.data, 16 + zlib.MAX_WBITS).decode('utf-8').splitlines()
+        assert len(lines) == 200 and json.loads(lines[0])['定义范围'] == '范围1'
+
+        small = client.get('/api/v1/bfa/baselines?limit=1', headers={'Accept-Encoding': 'gzip'})
+        assert 'Content-Encoding' not in small.headers
+
+        stats = client.get('/api/v1/bfa/cache/stats').json['data']['compression']
+        assert stats['compressed'] >= 2 and stats['ratio'] < 1
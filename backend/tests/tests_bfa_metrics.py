@@ -0,0 +1,99 @@
+import logging
+import re
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from app.services.metrics import Histogram, request_metrics, slow_query_logger
+from tests.tests_bfa_calculation import seed_reference
+
+
+def sample(text, name, **labels):
+    """ 从 Prometheus 文本中取出指定名称和标签的样本值。 """
+    for line in text.splitlines():
+        match = re.match(r'^(\w+)(?:\{(.*)\})? (\S+)$', line)
+        if not match or match.group(1) != name:
+            continue
+        found = dict(re.findall(r'(\w+)="((?:[^"\\]|\\.)*)"', match.group(2) or ''))
+        if all(found.get(key) == str(value) for key, value in labels.items()):
+            return float(match.group(3))
+    return None
+
+
+class RecordingHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+class TestRequestMetrics():
+    def test_records_latency_statements_and_size_per_endpoint(self, client, database):
+        seed_reference(database)
+        history = client.get('/api/v1/bfa/history')
+        # 流式响应由服务器在发送完后关闭
+        with client.get('/api/v1/bfa/baselines?format=ndjson') as baselines:
+            assert baselines.status_code == 200 and baselines.data
+        assert history.status_code == 200
+        assert client.get('/api/v1/bfa/calculations/1').status_code == 404
+
+        response = client.get('/metrics')
+        assert response.status_code == 200 and response.mimetype == 'text/plain'
+        text = response.get_data(as_text=True)
+        assert '# TYPE bfa_http_request_duration_seconds histogram' in text
+
+        endpoint = '/api/v1/bfa/history'
+        assert sample(text, 'bfa_http_requests_total', endpoint=endpoint, method='GET', status=200) == 1
+        assert sample(text, 'bfa_http_request_duration_seconds_count', endpoint=endpoint) == 1
+        assert sample(text, 'bfa_http_request_duration_seconds_bucket', endpoint=endpoint, le='+Inf') == 1
+        assert sample(text, 'bfa_http_request_db_statements_sum', endpoint=endpoint) >= 1
+        assert sample(text, 'bfa_http_response_size_bytes_sum', endpoint=endpoint) == len(history.data)
+        assert sample(text, 'bfa_http_serialization_seconds_total', endpoint=endpoint) > 0
+        assert sample(text, 'bfa_http_requests_total', endpoint='/api/v1/bfa/calculations/<string:calculation_id>',
+                      status=404) == 1
+        # 流式响应在发送完后按实际字节数计入
+        assert sample(text, 'bfa_http_response_size_bytes_sum', endpoint='/api/v1/bfa/baselines') == len(baselines.data)
+        # /metrics 本身不计入
+        assert sample(text, 'bfa_http_requests_total', endpoint='/metrics') is None
+
+    def test_slow_query_log_names_endpoint(self, client, database):
+        handler = RecordingHandler()
+        slow_query_logger.addHandler(handler)
+        threshold, request_metrics.slow_query_threshold = request_metrics.slow_query_threshold, 0
+        try:
+            client.get('/api/v1/bfa/history')
+        finally:
+            request_metrics.slow_query_threshold = threshold
+            slow_query_logger.removeHandler(handler)
+        messages = [record.getMessage() for record in handler.records]
+        assert messages and all('endpoint=/api/v1/bfa/history GET' in message for message in messages)
+        assert any('sql=SELECT' in message for message in messages)
+        text = client.get('/metrics').get_data(as_text=True)
+        assert sample(text, 'bfa_db_slow_queries_total', endpoint='/api/v1/bfa/history') == len(messages)
+
+    def test_histogram_buckets_are_cumulative(self):
+        histogram = Histogram('latency', '耗时', ('endpoint',), (0.1, 1))
+        for value in (0.05, 0.1, 0.5, 3):
+            histogram.observe(('/a',), value)
+        assert list(histogram.render()) == [
+            'latency_bucket{endpoint="/a",le="0.1"} 2',
+            'latency_bucket{endpoint="/a",le="1"} 3',
+            'latency_bucket{endpoint="/a",le="+Inf"} 4',
+            'latency_sum{endpoint="/a"} 3.65',
+            'latency_count{endpoint="/a"} 4',
+        ]
+
+    def test_failed_and_unmeasured_statements_release_start_times(self, app, database, monkeypatch):
+        connection = database.session.connection()
+        with pytest.raises(OperationalError):
+            connection.execute(text('SELECT * FROM missing_table'))
+        assert connection.info.get('bfa_query_started') == []
+
+        database.session.rollback()
+        monkeypatch.setattr(request_metrics, 'enabled', False)
+        connection = database.session.connection()
+        connection.execute(text('SELECT 1'))
+        assert connection.info.get('bfa_query_started') == []
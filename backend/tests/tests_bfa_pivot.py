@@ -0,0 +1,53 @@
+from app.modules.bfa.models import (LisProjectOrder, PmWorkHours, PmMonthHoursDetail,
+                                    BaHoursBasis, LisTask)
+from app.modules.bfa.pivot import build_history_table, pivot_month_hours
+from benchmarks.bench_pivot import DetailRow, legacy_build_history_table, make_rows
+
+
+def seed_details(db):
+    db.session.add_all([
+        LisTask(id=7, first_task='标定'),
+        BaHoursBasis(id=70, first_task='7', change_type='新增', de_range='全范围'),
+        LisProjectOrder(id=100, project_id='1', order_name='订单A'),
+        PmWorkHours(id=1, select_order=100, select_hours_base=70, power_conf='1.5T',
+                    business_detail='事项一', base_hours=120),
+        PmWorkHours(id=2, select_order=100, power_conf='2.0T', business_detail='事项二'),
+        PmMonthHoursDetail(id=11, measure_id='1', mm=202501, month_input='10.5'),
+        PmMonthHoursDetail(id=12, measure_id='1', mm=202503, month_input='20'),
+        PmMonthHoursDetail(id=13, measure_id='2', mm=202502, month_input='abc'),
+    ])
+    db.session.commit()
+
+
+class TestPivot():
+    def test_pivot_matrix(self):
+        row_ids, first_index, columns, values, present, totals, has_months = pivot_month_hours(
+            [5, 5, 9, 12], [202502, 202501, None, 202501], ['1', '2', '3', '']
+        )
+        assert row_ids.tolist() == [5, 9, 12]
+        assert first_index.tolist() == [0, 2, 3]
+        assert columns == ['202501', '202502']
+        assert values.tolist() == [[2.0, 1.0], [0.0, 0.0], [0.0, 0.0]]
+        assert present.tolist() == [[True, True], [False, False], [False, False]]
+        assert totals.tolist() == [3.0, 0.0, 0.0]
+        assert has_months.tolist() == [True, False, False]
+
+    def test_matches_legacy_pivot(self):
+        task_names = {key: f'一级任务{key}' for key in range(1, 16)}
+        rows = make_rows(50, 13)
+        rows.append(DetailRow(51, '无月度数据', None, '动力', None, None, None, None, None))
+        assert build_history_table(rows, task_names) == legacy_build_history_table(rows, task_names)
+
+    def test_history_details_endpoint(self, client, database):
+        seed_details(database)
+        response = client.get('/api/v1/bfa/history/1/details')
+        assert response.status_code == 200
+        data = response.json['data']
+        assert data['dynamic_columns'] == ['202501', '202502', '202503']
+        first, second = data['table_data']
+        assert first['一级任务'] == '标定'
+        assert first['填报总工时'] == 30.5
+        assert (first['202501'], first['202502'], first['202503']) == (10.5, '', 20.0)
+        assert second['一级任务'] == '未找到工时基准表'
+        assert second['基准工时'] == 0
+        assert second['202502'] == 0
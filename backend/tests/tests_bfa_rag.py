@@ -0,0 +1,121 @@
+import json
+from datetime import datetime
+
+import httpx
+import numpy as np
+
+import app.app as app_module
+from app.modules.bfa import knowledge
+from app.modules.bfa.knowledge import sync_project_index
+from app.modules.bfa.models import (LisProject, LisProjectOrder, PmWorkHours, PmMonthHoursDetail,
+                                    BaHoursBasis, LisTask)
+from app.services.ai_gateway import AIGateway
+from app.services.ai_service import AIService
+from app.services.job_queue import job_queue
+from app.services.vector_index import VectorIndex, assemble_context, estimate_tokens, project_index
+
+
+def make_index(app, path, compact_ratio=0.3):
+    app.config.update(RAG_INDEX_DIR=str(path), RAG_COMPACT_RATIO=compact_ratio)
+    index = VectorIndex()
+    index.init_app(app)
+    return index
+
+
+def seed_projects(db):
+    db.session.add_all([
+        LisTask(id=7, first_task='标定'),
+        BaHoursBasis(id=70, first_task='7', de_range='发动机标定'),
+        LisProject(id=1, measures_project='哈弗H6 混动', measure_status='4', brand='4', sml='2',
+                   update_time=datetime(2025, 1, 1)),
+        LisProject(id=2, measures_project='坦克500 柴油', measure_status='4', brand='2', sml='3',
+                   update_time=datetime(2025, 1, 1)),
+        LisProject(id=3, measures_project='进行中项目', measure_status='1', brand='4', sml='2'),
+        LisProjectOrder(id=100, project_id='1'),
+        LisProjectOrder(id=200, project_id='2'),
+        PmWorkHours(id=1, select_order=100, select_hours_base=70, power_conf='1.5T', business_detail='混动标定'),
+        PmWorkHours(id=2, select_order=200, power_conf='2.4T', business_detail='柴油排放'),
+        PmMonthHoursDetail(id=11, measure_id='1', mm=202501, month_input='30'),
+        PmMonthHoursDetail(id=12, measure_id='1', mm=202502, month_input='50'),
+        PmMonthHoursDetail(id=13, measure_id='2', mm=202501, month_input='10'),
+    ])
+    db.session.commit()
+
+
+class TestVectorIndex():
+    def test_upsert_search_and_reload(self, app, tmp_path):
+        index = make_index(app, tmp_path)
+        index.upsert([
+            {'key': '1', 'version': 'a', 'text': '哈弗 M 规模 混动 标定'},
+            {'key': '2', 'version': 'a', 'text': '坦克 L 规模 柴油 排放'},
+        ])
+        assert [row['key'] for _, row in index.search('哈弗混动项目', k=1)] == ['1']
+        _, vectors, _ = index.load()
+        assert isinstance(vectors, np.memmap)
+
+        reopened = make_index(app, tmp_path)
+        assert [row['key'] for _, row in reopened.search('柴油排放', k=2)][0] == '2'
+        assert reopened.versions() == {'1': 'a', '2': 'a'}
+
+    def test_update_remove_and_compact(self, app, tmp_path):
+        index = make_index(app, tmp_path, compact_ratio=0.5)
+        index.upsert([{'key': str(key), 'version': 'a', 'text': f'项目{key}'} for key in range(4)])
+        index.upsert([{'key': '0', 'version': 'b', 'text': '项目0 更新'}])
+        assert index.versions()['0'] == 'b'
+        assert index.stats()['rows'] == 5
+        index.remove(['1', '2'])
+        # 无效行超过一半，压缩后只剩有效行
+        stats = index.stats()
+        assert stats['documents'] == 2 and stats['rows'] == 2
+        assert sorted(row['key'] for _, row in index.search('项目', k=5)) == ['0', '3']
+
+    def test_assemble_context_respects_budget(self):
+        documents = ['项目: 甲\n' + '工时 ' * 50, '项目: 乙\n品牌: 哈弗']
+        context = assemble_context(documents, budget=20, header='参考:')
+        assert estimate_tokens(context) <= 20
+        assert context.startswith('参考:\n\n项目: 甲')
+        assert '项目: 乙' not in context
+
+
+class TestProjectKnowledge():
+    def test_sync_is_incremental(self, app, database, tmp_path):
+        seed_projects(database)
+        index = make_index(app, tmp_path)
+        assert sync_project_index(index, {7: '标定'}) == {'indexed': 2, 'removed': 0}
+        text = next(row['text'] for _, row in index.search('哈弗', k=1))
+        assert '品牌: 哈弗; 开发规模: M' in text
+        assert '填报总工时: 80' in text and '一级任务工时: 标定 80' in text
+
+        assert sync_project_index(index, {7: '标定'}) == {'indexed': 0, 'removed': 0}
+        database.session.add(PmWorkHours(id=3, select_order=200, business_detail='新增事项'))
+        database.session.get(LisProject, 1).measure_status = '3'
+        database.session.commit()
+        assert sync_project_index(index, {7: '标定'}) == {'indexed': 1, 'removed': 1}
+        assert list(index.versions()) == ['2']
+
+    def test_chat_prompt_includes_retrieved_projects(self, app, client, database, tmp_path, monkeypatch):
+        seed_projects(database)
+        app.config.update(RAG_INDEX_DIR=str(tmp_path), RAG_TOP_K=1)
+        project_index.init_app(app)
+        requests = []
+
+        def handler(request):
+            requests.append(json.loads(request.content))
+            return httpx.Response(200, headers={'content-type': 'text/event-stream'}, content=b'data: [DONE]\n\n')
+
+        gateway = AIGateway('http://ollama.test/v1', transport=httpx.MockTransport(handler))
+        monkeypatch.setattr(app_module, 'ai_service', AIService('http://ollama.test/v1', 'stub', gateway=gateway))
+        app.config.update(JOB_QUEUE_PATH=str(tmp_path / 'jobs.sqlite3'))
+        job_queue.init_app(app)
+        monkeypatch.setattr(knowledge, '_next_sync', 0.0)
+
+        # 第一次对话只提交同步任务，使用尚为空的索引
+        client.post('/api/v1/bfa/chat', json={'message': '类似的哈弗混动项目用了多少工时'}).get_data()
+        assert '哈弗H6' not in requests[0]['messages'][0]['content']
+        job = job_queue.recent(kind='sync_project_index')[0]
+        assert job_queue.wait(job['job_id'], 5)['result'] == {'data': {'indexed': 2, 'removed': 0}}
+
+        client.post('/api/v1/bfa/chat', json={'message': '类似的哈弗混动项目用了多少工时'}).get_data()
+        system_prompt = requests[1]['messages'][0]['content']
+        assert '项目: 哈弗H6 混动 (ID 1)' in system_prompt
+        assert '坦克500' not in system_prompt
@@ -0,0 +1,55 @@
+from app.db.ids import SnowflakeIdGenerator
+from app.modules.bfa.models import (LisMeasurePerson, LisProjectOrder, PmWorkHours,
+                                    PmMonthHoursDetail)
+
+
+def seed_project(db):
+    db.session.add(LisProjectOrder(id=7, project_id='100', order_name='订单A', market='国内'))
+    db.session.add(LisMeasurePerson(id=1, project_id='100', person='张三', measure_status='1'))
+    db.session.commit()
+
+
+class TestSubmit():
+    def test_submit_bulk_inserts_rows(self, client, database):
+        seed_project(database)
+        businesses = [
+            {'powerConfig': '1.5T', 'specificItem': f'事项{i}', 'baselineHours': 10,
+             'month202501': 5, 'month202502': 6}
+            for i in range(3)
+        ]
+        response = client.post('/api/v1/bfa/tasks/100/submit?wait=10', json={'businesses': businesses})
+        assert response.status_code == 200
+
+        work_hours = database.session.query(PmWorkHours).order_by(PmWorkHours.id).all()
+        assert [row.business_detail for row in work_hours] == ['事项0', '事项1', '事项2']
+        assert all(row.select_order == 7 and row.order_name == '订单A' for row in work_hours)
+
+        details = database.session.query(PmMonthHoursDetail).all()
+        assert len(details) == 6
+        ids = {row.id for row in work_hours}
+        assert {row.measure_key for row in details} == ids
+        assert all(row.measure_id == str(row.measure_key) for row in details)
+
+        person = database.session.get(LisMeasurePerson, 1)
+        assert person.measure_status == '2'
+
+    def test_submit_requires_project_order(self, client, database):
+        response = client.post('/api/v1/bfa/tasks/100/submit',
+                               json={'businesses': [{'powerConfig': '1.5T'}]})
+        assert response.status_code == 404
+        assert database.session.query(PmWorkHours).count() == 0
+
+
+class TestSnowflakeIds():
+    def test_processes_lease_distinct_worker_ids(self, tmp_path):
+        first = SnowflakeIdGenerator(datacenter_id=3, lease_dir=str(tmp_path))
+        second = SnowflakeIdGenerator(datacenter_id=3, lease_dir=str(tmp_path))
+        first.next_id(), second.next_id()
+        assert (first.worker_id, second.worker_id) == (0, 1)
+        assert ((second.next_id() >> 12) & 31) == 1
+
+        # 释放租约后机器位可被再次租用
+        first.release()
+        third = SnowflakeIdGenerator(datacenter_id=3, lease_dir=str(tmp_path))
+        assert third.next_id() and third.worker_id == 0
+        second.release(), third.release()
@@ -0,0 +1,79 @@
+import time
+
+from app.modules.bfa.models import BaHoursBasis
+from app.modules.bfa.validation import validate_timesheet
+from tests.tests_bfa_calculation import seed_reference
+
+
+def rules(errors):
+    return {(error['id'], error['column'], error['rule']) for error in errors}
+
+
+class TestValidation():
+    def test_rules_report_cells(self):
+        table = [
+            {'id': 1, 'baseline_id': 70, '动力配置': '1.5T', '具体事项': '事项一', '基准工时': 50,
+             '填报总工时': 40, '差异工时': -10, '202601': 10, '202602': '', '202603': 30},
+            {'id': 2, '动力配置': '1.5T', '具体事项': '事项一', '基准工时': 10, '差异原因': '新增试验',
+             '填报总工时': 20, '202601': 'x', '202602': 20},
+            {'id': 3, '动力配置': '2.0T', '具体事项': '事项三', '基准工时': 10, '202602': -1, '202603': 10},
+        ]
+        errors, summary = validate_timesheet(table, ['202601', '202602', '202603'], {70: 60.0})
+        assert rules(errors) == {
+            (1, '202602', 'month_gap'),
+            (1, '基准工时', 'baseline_mismatch'),
+            (1, '差异原因', 'deviation_reason'),
+            (2, '202601', 'invalid_hours'),
+            (2, '具体事项', 'duplicate'),
+            (3, '202602', 'invalid_hours'),
+        }
+        assert summary['invalid_hours'] == 2 and summary['total_mismatch'] == 0
+        duplicate = next(error for error in errors if error['rule'] == 'duplicate')
+        assert '与行 1 重复' in duplicate['message']
+
+    def test_string_baseline_ids_match_baselines(self):
+        # 前端提交的 baseline_id 为字符串时同样按工时基准表校验
+        table = [
+            {'id': 1, '具体事项': '事项一', 'baseline_id': '70', '基准工时': 50, '填报总工时': 60, '202601': 60},
+            {'id': 2, '具体事项': '事项二', 'baseline_id': ' 71 ', '基准工时': 20, '填报总工时': 20, '202601': 20},
+            {'id': 3, '具体事项': '事项三', 'baseline_id': '', '基准工时': 20, '填报总工时': 20, '202601': 20},
+        ]
+        errors, _ = validate_timesheet(table, ['202601'], {70: 60.0, 71: 20.0})
+        assert rules(errors) == {(1, '基准工时', 'baseline_mismatch')}
+
+    def test_declared_totals_and_gaps_across_missing_columns(self):
+        table = [{'id': 1, '基准工时': 30, '填报总工时': 31, '差异工时': 5, '202611': 10, '202702': 20}]
+        errors, _ = validate_timesheet(table, ['202702', '202611'], {})
+        assert rules(errors) == {
+            (1, '202612', 'month_gap'), (1, '202701', 'month_gap'),
+            (1, '填报总工时', 'total_mismatch'), (1, '差异工时', 'diff_mismatch'),
+        }
+
+    def test_scales_to_large_timesheets(self):
+        columns = [str(202601 + month) for month in range(12)]
+        table = [dict({'id': index, 'baseline_id': index % 50, '动力配置': f'P{index % 7}', '具体事项': f'事项{index}',
+                       '基准工时': 120.0, '填报总工时': 120.0, '差异工时': 0.0},
+                      **{column: 10.0 for column in columns}) for index in range(20000)]
+        started = time.perf_counter()
+        errors, _ = validate_timesheet(table, columns, {index: 120.0 for index in range(50)})
+        assert errors == []
+        assert time.perf_counter() - started < 5
+
+    def test_validate_endpoint(self, client, database):
+        seed_reference(database)
+        data = client.post('/api/v1/bfa/tasks/2/calculate?wait=10',
+                           json={'reference_project_id': '1', 'start_month': '202603'}).json['data']
+        response = client.post('/api/v1/bfa/calculations/validate', json={'calculation_id': data['calculation_id']})
+        assert response.status_code == 200
+        result = response.json['data']
+        assert not result['is_valid'] and result['row_count'] == 2
+        assert (1, '202604', 'month_gap') in rules(result['errors'])
+
+        # 直接提交表格，工时基准从数据库加载
+        database.session.add(BaHoursBasis(id=71, total_hour='10'))
+        database.session.commit()
+        response = client.post('/api/v1/bfa/calculations/validate', json={'table_data': [
+            {'id': 1, 'baseline_id': 71, '基准工时': 10, '差异原因': '', '202601': 12},
+        ]})
+        assert rules(response.json['data']['errors']) == {(1, '差异原因', 'deviation_reason')}
+        assert client.post('/api/v1/bfa/calculations/validate', json={}).status_code == 400
@@ -0,0 +1,64 @@
+import io
+
+import pytest
+
+from app.modules.bfa.export import sheet_title
+from app.modules.bfa.models import LisProject
+from tests.tests_bfa_drafts import generate
+from tests.tests_bfa_export import seed_second_project
+
+openpyxl = pytest.importorskip('openpyxl')
+
+XLSX_MIMETYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+
+def read_sheets(data):
+    workbook = openpyxl.load_workbook(io.BytesIO(data), read_only=True)
+    sheets = {sheet.title: list(sheet.iter_rows(values_only=True)) for sheet in workbook.worksheets}
+    workbook.close()
+    return sheets
+
+
+class TestXlsxExport():
+    def test_history_workbook_matches_details_table(self, app, client, database):
+        generate(client, database)
+        seed_second_project(database)
+        database.session.get(LisProject, 3).measures_project = '新平台/混动'
+        database.session.commit()
+        app.config['HISTORY_EXPORT_BATCH_ROWS'] = 1
+
+        response = client.get('/api/v1/bfa/history/export?all=true&format=xlsx')
+        assert response.status_code == 200 and response.mimetype == XLSX_MIMETYPE
+        assert 'history-details.xlsx' in response.headers['Content-Disposition']
+        sheets = read_sheets(response.data)
+        assert list(sheets) == ['1', '3 新平台_混动']
+
+        # 每个项目的列与 /history/<id>/details 的表格一致
+        details = client.get('/api/v1/bfa/history/1/details').json['data']
+        header, *rows = sheets['1']
+        assert list(header) == ['序号', '动力配置', '一级任务', '改动类型', '定义范围', '具体事项', '基准工时',
+                                '填报总工时'] + details['dynamic_columns']
+        for row, expected in zip(rows, details['table_data']):
+            # 只写工作簿不记录表格范围，行末的空单元格读取时被省略
+            row = list(row) + [None] * (len(header) - len(row))
+            assert row == [expected[name] if expected[name] != '' else None for name in header]
+        assert len(rows) == 2 and rows[1][2] == '未找到工时基准表'
+        assert sheets['3 新平台_混动'][1][-1] == 7.5
+
+    def test_calculation_workbook(self, client, database):
+        data = generate(client, database)
+        response = client.get(f"/api/v1/bfa/calculations/{data['calculation_id']}/export")
+        assert response.status_code == 200 and response.mimetype == XLSX_MIMETYPE
+        header, *rows = read_sheets(response.data)['测算表']
+        table = client.get(f"/api/v1/bfa/calculations/{data['calculation_id']}").json['data']
+        assert list(header[-len(table['dynamic_columns']):]) == table['dynamic_columns']
+        assert header[8:10] == ('差异工时', '差异原因')
+        assert [row[7] for row in rows] == [row['填报总工时'] for row in table['table_data']]
+        assert client.get('/api/v1/bfa/calculations/1/export').status_code == 404
+
+    def test_empty_scope_and_sheet_titles(self, client, database):
+        response = client.get('/api/v1/bfa/history/export?project_ids=99&format=xlsx')
+        assert response.status_code == 200
+        assert read_sheets(response.data) == {'99': [('序号', '动力配置', '一级任务', '改动类型', '定义范围', '具体事项',
+                                                      '基准工时', '填报总工时')]}
+        assert sheet_title(12, '项目[A]:' + '很长' * 20) == ('12 项目_A__' + '很长' * 20)[:31]
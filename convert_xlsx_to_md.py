@@ -3,31 +3,136 @@
 将指定目录及其子目录中的所有 Excel（.xlsx）文件转换为 Markdown 格式的文件。
 
 此脚本会遍历给定目录下的所有文件夹，找到后缀为 `.xlsx` 的文件，
-然后使用 pandas 读取每个工作表，并将其内容导出为 Markdown 表格。
-每个工作表都会被保存为一个独立的 `.md` 文件，文件名由原始
-Excel 文件名和工作表名称组成。例如，如果原文件是 `report.xlsx`，
-工作表名是 `Sheet1`，那么生成的 Markdown 文件名将是
-`report_Sheet1.md`，并且会保存在与原文件同一目录下。
+然后使用 openpyxl 的只读模式逐行读取每个工作表，并将其内容逐行写为
+Markdown 表格（不把整个工作表读入内存）。每个工作表都会被保存为一个
+独立的 `.md` 文件，文件名由原始 Excel 文件名和工作表名称组成。例如，
+如果原文件是 `report.xlsx`，工作表名是 `Sheet1`，那么生成的 Markdown
+文件名将是 `report_Sheet1.md`，并且会保存在与原文件同一目录下。
+
+多个文件由进程池并行转换。转换结果记录在根目录下的清单文件
+`.xlsx_to_md_manifest.json` 中（修改时间、大小和内容哈希），再次运行时
+跳过未变化且输出文件仍存在的工作簿。
 
 使用方法：
-    python convert_xlsx_to_md.py [directory]
+    python convert_xlsx_to_md.py [directory] [--jobs N] [--force]
 
-如果没有指定目录，脚本默认使用当前工作目录。
+如果没有指定目录，脚本默认使用当前工作目录。`--jobs` 为并行进程数
+（默认 CPU 核数，1 为串行）；`--force` 忽略清单，重新转换所有文件。
 """
 
+import argparse
+import hashlib
+import json
 import os
 import sys
-from typing import Optional
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from itertools import islice
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from openpyxl import load_workbook
+
+MANIFEST_NAME = ".xlsx_to_md_manifest.json"
+# 每次批量格式化并写出的行数
+BLOCK_ROWS = 1000
+
+
+def format_cells(rows: List[tuple], width: int) -> str:
+    """将一批行批量格式化为 Markdown 表格行。
+
+    整批先以分隔符拼成一个字符串，再对整块统一转义会破坏表格结构的
+    竖线和换行，最后替换为表格分隔符，避免逐个单元格判断和替换。
+    空单元格转为空串；行的长度不足 width 时补空，超出时截断。
+
+    Args:
+        rows: 单元格值的元组列表。
+        width: 表格列数。
+
+    Returns:
+        多行 Markdown 表格文本（不含末尾换行）。
+    """
+    # \x00 和 \x01 不能出现在 xlsx 的 XML 中，可安全地用作单元格和行的分隔符
+    padding = (None,) * width
+    text = "\x01".join(
+        "\x00".join(["" if value is None else str(value) for value in (row + padding)[:width]])
+        for row in rows
+    )
+    if "|" in text:
+        text = text.replace("|", "\\|")
+    if "\n" in text:
+        text = text.replace("\r\n", "<br>").replace("\n", "<br>")
+    return "| " + text.replace("\x00", " | ").replace("\x01", " |\n| ") + " |"
+
 
-import pandas as pd
+def header_cells(header: tuple, width: int) -> List[str]:
+    """生成表头单元格，与 pandas 的规则一致：空表头记为 `Unnamed: 列号`，
+    重复的表头依次追加 `.1`、`.2` 等后缀。
+
+    Args:
+        header: 工作表首行的单元格值。
+        width: 表格列数。
+
+    Returns:
+        表头字符串列表。
+    """
+    names = []
+    seen = {}
+    for index in range(width):
+        value = header[index] if index < len(header) else None
+        name = f"Unnamed: {index}" if value is None or value == "" else str(value)
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        names.append(name.replace("|", "\\|").replace("\n", " "))
+    return names
+
+
+def rows_to_markdown(header: tuple, rows: Iterable[tuple], width: int) -> Iterator[str]:
+    """逐块生成 Markdown 表格文本，首行为表头。
+
+    空行只有在后面还有数据行时才输出（与 pandas 一致，丢弃末尾的空行）；
+    没有数据行时输出 `(空表)`。
+
+    Args:
+        header: 表头行。
+        rows: 数据行的迭代器。
+        width: 表格列数。
+
+    Yields:
+        以换行结尾的 Markdown 文本块。
+    """
+    wrote_header = False
+    pending_blank = []
+    rows = iter(rows)
+    while True:
+        block = list(islice(rows, BLOCK_ROWS))
+        if not block:
+            break
+        data = []
+        for row in block:
+            if all(value is None or value == "" for value in row):
+                pending_blank.append(row)
+                continue
+            data.extend(pending_blank)
+            pending_blank.clear()
+            data.append(row)
+        if not data:
+            continue
+        if not wrote_header:
+            names = header_cells(header, width)
+            yield "| " + " | ".join(names) + " |\n"
+            yield "| " + " | ".join(["---"] * width) + " |\n"
+            wrote_header = True
+        yield format_cells(data, width) + "\n"
+    if not wrote_header:
+        yield "(空表)\n"
 
 
-def dataframe_to_markdown(df: pd.DataFrame) -> str:
+def dataframe_to_markdown(df) -> str:
     """将 pandas DataFrame 转换为 Markdown 表格字符串。
 
-    由于 pandas 的 `to_markdown` 方法需要额外的 `tabulate` 依赖，
-    这里手动构建 Markdown 表格格式。这种格式在 GitHub 等平台
-    上可以正常渲染。
+    与逐行读取工作表时使用相同的批量格式化，保留给已有调用方使用。
 
     Args:
         df: 要转换的 DataFrame。
@@ -37,96 +142,163 @@ def dataframe_to_markdown(df: pd.DataFrame) -> str:
     """
     if df.empty:
         return "(空表)"
+    rows = df.astype(object).where(df.notna(), None).itertuples(index=False, name=None)
+    header = tuple(str(col) for col in df.columns)
+    return "".join(rows_to_markdown(header, rows, len(df.columns))).rstrip("\n")
 
-    # 构建表头
-    header_cells = [str(col) for col in df.columns]
-    header_row = "| " + " | ".join(header_cells) + " |"
-    # 构建分隔行，使用三个连字符表示列分隔
-    delimiter_row = "| " + " | ".join(["---"] * len(df.columns)) + " |"
-    # 构建数据行
-    data_rows = []
-    for _, row in df.iterrows():
-        cell_values = []
-        for value in row:
-            # 将 NaN 转为空串，否则转为字符串
-            if pd.isna(value):
-                cell_values.append("")
-            else:
-                cell_values.append(str(value))
-        data_rows.append("| " + " | ".join(cell_values) + " |")
-    return "\n".join([header_row, delimiter_row] + data_rows)
-
-
-def convert_xlsx_to_markdown(directory: str) -> None:
+
+def safe_name(sheet_name: str) -> str:
+    """替换工作表名中的特殊字符以避免非法文件名。"""
+    for char in " /\\:*?\"<>|":
+        sheet_name = sheet_name.replace(char, "_")
+    return sheet_name
+
+
+def file_digest(path: str) -> str:
+    """分块计算文件内容的 SHA-256。"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def convert_workbook(xlsx_path: str) -> Tuple[List[str], List[str]]:
+    """将一个工作簿的每个工作表流式转换为 Markdown 文件。
+
+    在进程池的工作进程中执行，日志随结果返回由主进程输出。
+
+    Args:
+        xlsx_path: Excel 文件路径。
+
+    Returns:
+        (已生成的 Markdown 文件路径列表, 错误信息列表)
+    """
+    outputs, errors = [], []
+    try:
+        workbook = load_workbook(xlsx_path, read_only=True, data_only=True)
+    except Exception as exc:
+        return outputs, [f"无法读取 Excel 文件：{xlsx_path}，错误：{exc}"]
+
+    root = os.path.dirname(xlsx_path)
+    base_name, _ = os.path.splitext(os.path.basename(xlsx_path))
+    try:
+        for sheet in workbook.worksheets:
+            sheet_name = sheet.title
+            output_path = os.path.join(root, f"{base_name}_{safe_name(sheet_name)}.md")
+            temp_path = output_path + ".tmp"
+            try:
+                rows = sheet.iter_rows(values_only=True)
+                header = next(rows, ())
+                # 只读模式的列数来自工作表的维度信息，缺失时取表头的列数
+                trimmed = len(header)
+                while trimmed and (header[trimmed - 1] is None or header[trimmed - 1] == ""):
+                    trimmed -= 1
+                width = max(sheet.max_column or 0, trimmed)
+                # 先写临时文件，完整写完后再替换，出错时不留下不完整的输出
+                with open(temp_path, "w", encoding="utf-8") as md_file:
+                    md_file.write(f"# {sheet_name}\n\n")
+                    for text in rows_to_markdown(header, rows, width):
+                        md_file.write(text)
+                os.replace(temp_path, output_path)
+                outputs.append(output_path)
+            except Exception as exc:
+                errors.append(f"转换工作表 '{sheet_name}' 时出错，文件：{xlsx_path}，错误：{exc}")
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+    finally:
+        # 只读模式下工作簿保持文件句柄，需要显式关闭
+        workbook.close()
+    return outputs, errors
+
+
+def load_manifest(path: str) -> dict:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def is_unchanged(entry: Optional[dict], directory: str, xlsx_path: str, stat: os.stat_result) -> bool:
+    """判断工作簿自上次转换后是否未变化且输出文件仍然存在。
+
+    修改时间和大小一致时直接视为未变化；不一致时再比较内容哈希，
+    只是被重新保存或复制（内容相同）的文件同样跳过。
+    """
+    if not entry or not all(os.path.exists(os.path.join(directory, path)) for path in entry.get("outputs", [])):
+        return False
+    if entry.get("mtime") == stat.st_mtime_ns and entry.get("size") == stat.st_size:
+        return True
+    if entry.get("size") != stat.st_size:
+        return False
+    if entry.get("sha256") == file_digest(xlsx_path):
+        entry["mtime"] = stat.st_mtime_ns
+        return True
+    return False
+
+
+def convert_xlsx_to_markdown(directory: str, jobs: Optional[int] = None, force: bool = False) -> None:
     """遍历目录，将其中的所有 .xlsx 文件转换为 Markdown 文件。
 
     Args:
         directory: 需要遍历的根目录路径。
+        jobs: 并行进程数，None 为 CPU 核数，1 为在当前进程中串行转换。
+        force: 为 True 时忽略清单，重新转换所有文件。
     """
+    manifest_path = os.path.join(directory, MANIFEST_NAME)
+    manifest = {} if force else load_manifest(manifest_path)
+
+    pending = []
+    skipped = 0
     # 通过 os.walk 递归遍历目录及其子目录
     for root, _, files in os.walk(directory):
         for filename in files:
-            # 仅处理后缀为 .xlsx 的文件（忽略大小写）
-            if filename.lower().endswith(".xlsx"):
-                xlsx_path = os.path.join(root, filename)
-                try:
-                    excel = pd.ExcelFile(xlsx_path)
-                except Exception as exc:
-                    print(f"无法读取 Excel 文件：{xlsx_path}，错误：{exc}")
-                    continue
-
-                base_name, _ = os.path.splitext(filename)
-                # 遍历每个工作表
-                for sheet_name in excel.sheet_names:
-                    try:
-                        df = pd.read_excel(excel, sheet_name=sheet_name)
-                    except Exception as exc:
-                        print(
-                            f"读取工作表 '{sheet_name}' 时出错，文件：{xlsx_path}，错误：{exc}"
-                        )
-                        continue
-
-                    # 将 DataFrame 转换为 Markdown 格式
-                    # 将 DataFrame 转换为 Markdown 表格
-                    try:
-                        md_table = dataframe_to_markdown(df)
-                    except Exception as exc:
-                        print(
-                            f"转换工作表 '{sheet_name}' 为 Markdown 时出错，文件：{xlsx_path}，错误：{exc}"
-                        )
-                        continue
-
-                    # 构造输出文件名，替换工作表名中的特殊字符以避免非法文件名
-                    safe_sheet_name = (
-                        sheet_name
-                        .replace(" ", "_")
-                        .replace("/", "_")
-                        .replace("\\", "_")
-                        .replace(":", "_")
-                        .replace("*", "_")
-                        .replace("?", "_")
-                        .replace("\"", "_")
-                        .replace("<", "_")
-                        .replace(">", "_")
-                        .replace("|", "_")
-                    )
-                    output_filename = f"{base_name}_{safe_sheet_name}.md"
-                    output_path = os.path.join(root, output_filename)
-
-                    # 写入 Markdown 内容，包括工作表标题
-                    try:
-                        with open(output_path, "w", encoding="utf-8") as md_file:
-                            md_file.write(f"# {sheet_name}\n\n")
-                            md_file.write(md_table)
-                            md_file.write("\n")
-                        print(f"已生成 Markdown 文件：{output_path}")
-                    except Exception as exc:
-                        print(
-                            f"写入 Markdown 文件 '{output_path}' 时出错，错误：{exc}"
-                        )
-
-                # 关闭 ExcelFile 以释放资源
-                excel.close()
+            # 仅处理后缀为 .xlsx 的文件（忽略大小写），跳过 Excel 打开时产生的 ~$ 锁文件
+            if not filename.lower().endswith(".xlsx") or filename.startswith("~$"):
+                continue
+            xlsx_path = os.path.join(root, filename)
+            key = os.path.relpath(xlsx_path, directory)
+            stat = os.stat(xlsx_path)
+            if is_unchanged(manifest.get(key), directory, xlsx_path, stat):
+                skipped += 1
+                continue
+            pending.append((key, xlsx_path, stat))
+
+    def record(key, xlsx_path, stat, outputs, errors):
+        for output_path in outputs:
+            print(f"已生成 Markdown 文件：{output_path}")
+        for message in errors:
+            print(message)
+        if errors:
+            # 有错误的文件不记入清单，下次运行时重试
+            manifest.pop(key, None)
+            return
+        manifest[key] = {
+            "mtime": stat.st_mtime_ns,
+            "size": stat.st_size,
+            "sha256": file_digest(xlsx_path),
+            "outputs": [os.path.relpath(path, directory) for path in outputs],
+        }
+
+    if jobs == 1 or len(pending) <= 1:
+        for key, xlsx_path, stat in pending:
+            record(key, xlsx_path, stat, *convert_workbook(xlsx_path))
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            futures = {
+                executor.submit(convert_workbook, xlsx_path): (key, xlsx_path, stat)
+                for key, xlsx_path, stat in pending
+            }
+            for future in as_completed(futures):
+                record(*futures[future], *future.result())
+
+    # 删除已不存在的工作簿的记录
+    for key in [key for key in manifest if not os.path.exists(os.path.join(directory, key))]:
+        del manifest[key]
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    print(f"转换 {len(pending)} 个文件，跳过未变化的 {skipped} 个文件")
 
 
 def main(args: Optional[list[str]] = None) -> None:
@@ -135,15 +307,17 @@ def main(args: Optional[list[str]] = None) -> None:
     Args:
         args: 命令行参数列表。
     """
-    if args is None:
-        args = sys.argv[1:]
+    parser = argparse.ArgumentParser(description="将目录中的 Excel 文件转换为 Markdown")
     # 如果提供了目录参数，则使用该目录；否则使用当前目录
-    directory = args[0] if args else os.getcwd()
-    if not os.path.isdir(directory):
-        print(f"指定的目录不存在或不是目录：{directory}")
+    parser.add_argument("directory", nargs="?", default=os.getcwd(), help="需要遍历的根目录")
+    parser.add_argument("--jobs", type=int, default=None, help="并行进程数，默认 CPU 核数，1 为串行")
+    parser.add_argument("--force", action="store_true", help="忽略清单，重新转换所有文件")
+    options = parser.parse_args(sys.argv[1:] if args is None else args)
+    if not os.path.isdir(options.directory):
+        print(f"指定的目录不存在或不是目录：{options.directory}")
         sys.exit(1)
-    convert_xlsx_to_markdown(directory)
+    convert_xlsx_to_markdown(options.directory, jobs=options.jobs, force=options.force)
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -54,6 +54,8 @@ const App = () => {
     historicalProjects,
     measurementHistory,
     setMeasurementHistory,
+    hasMoreHistory,
+    loadMoreHistory,
     fetchTasks,
     handleSelectTask,
     setSelectedTask,
@@ -114,6 +116,8 @@ const App = () => {
         <HistorySidebar
           conversationHistory={[]} // 聊天历史暂时留空
           measurementHistory={measurementHistory}
+          hasMoreHistory={hasMoreHistory}
+          onLoadMoreHistory={loadMoreHistory}
           onNewConversation={startNewConversation}
           onHistorySelect={handleHistorySelect}
           loggedIn={!!loggedInUser}
@@ -1,26 +1,44 @@
-import React, { useState, useEffect } from 'react';
-import { Modal, Table, Button } from 'antd';
+import React, { useState, useEffect, useCallback } from 'react';
+import { Modal, Table, Button, Input } from 'antd';
 import PropTypes from 'prop-types';
 import { fetchBaselines } from '../services/api'; // 引入新的 API 函数
 
+const PAGE_SIZE = 100;
+
 const BaselineBusinessModal = ({ visible, onCancel, onOk }) => {
   const [selectedRowKeys, setSelectedRowKeys] = useState([]);
   const [baselines, setBaselines] = useState([]);
   const [loading, setLoading] = useState(false);
+  const [keyword, setKeyword] = useState('');
+  const [nextCursor, setNextCursor] = useState(null);
+  // 已选中的行可能来自不同的搜索结果，按 id 记录
+  const [selectedItems, setSelectedItems] = useState({});
+
+  // 由服务端过滤和分页，cursor 为空时加载第一页
+  const loadBaselines = useCallback((q, cursor) => {
+    setLoading(true);
+    fetchBaselines({ q, cursor, limit: PAGE_SIZE })
+      .then(({ data, nextCursor: next }) => {
+        setBaselines(prev => (cursor ? [...prev, ...data] : data));
+        setNextCursor(next);
+      })
+      .finally(() => {
+        setLoading(false);
+      });
+  }, []);
 
   useEffect(() => {
     if (visible) {
-      setLoading(true);
-      fetchBaselines()
-        .then(data => {
-          setBaselines(data);
-        })
-        .finally(() => {
-          setLoading(false);
-        });
+      loadBaselines(keyword, null);
     }
+    // eslint-disable-next-line react-hooks/exhaustive-deps
   }, [visible]);
 
+  const handleSearch = (value) => {
+    setKeyword(value);
+    loadBaselines(value, null);
+  };
+
   const columns = [
     { title: '动力配置', dataIndex: '动力配置', key: '动力配置' },
     { title: '一级任务', dataIndex: '一级任务', key: '一级任务' },
@@ -31,14 +49,24 @@ const BaselineBusinessModal = ({ visible, onCancel, onOk }) => {
   ];
 
   const handleOk = () => {
-    const selectedItems = baselines.filter(item => selectedRowKeys.includes(item.id));
-    onOk(selectedItems);
+    onOk(selectedRowKeys.map(key => selectedItems[key]).filter(Boolean));
     setSelectedRowKeys([]);
+    setSelectedItems({});
   };
 
   const rowSelection = {
     selectedRowKeys,
-    onChange: setSelectedRowKeys,
+    preserveSelectedRowKeys: true,
+    onChange: (keys, rows) => {
+      setSelectedRowKeys(keys);
+      setSelectedItems(prev => {
+        const next = {};
+        keys.forEach(key => {
+          next[key] = prev[key] || rows.find(row => row && row.id === key);
+        });
+        return next;
+      });
+    },
   };
 
   return (
@@ -56,6 +84,12 @@ const BaselineBusinessModal = ({ visible, onCancel, onOk }) => {
         </Button>,
       ]}
     >
+      <Input.Search
+        placeholder="按定义范围搜索"
+        allowClear
+        onSearch={handleSearch}
+        style={{ marginBottom: 12 }}
+      />
       <Table
         rowSelection={rowSelection}
         columns={columns}
@@ -64,6 +98,13 @@ const BaselineBusinessModal = ({ visible, onCancel, onOk }) => {
         rowKey="id"
         pagination={{ pageSize: 5 }}
       />
+      {nextCursor && (
+        <div style={{ textAlign: 'center', marginTop: 8 }}>
+          <Button size="small" loading={loading} onClick={() => loadBaselines(keyword, nextCursor)}>
+            加载更多
+          </Button>
+        </div>
+      )}
     </Modal>
   );
 };
@@ -13,6 +13,8 @@ const { Title } = Typography;
  * @param {Object[]} measurementHistory - array of records with title and baselineIds.
  * @param {Function} onNewConversation - called when the user clicks "新建会话".
  * @param {Function} onHistorySelect - called with a history record when clicked.
+ * @param {boolean} hasMoreHistory - whether another page of measurement history exists.
+ * @param {Function} onLoadMoreHistory - loads the next page of measurement history.
  * @param {boolean} loggedIn - current login state.
  * @param {Function} onToggleLogin - toggles login state.
  */
@@ -21,6 +23,8 @@ const HistorySidebar = ({
   measurementHistory,
   onNewConversation,
   onHistorySelect,
+  hasMoreHistory,
+  onLoadMoreHistory,
   loggedIn,
   onToggleLogin,
 }) => {
@@ -78,6 +82,11 @@ const HistorySidebar = ({
               </div>
             </List.Item>
           )}
+          loadMore={hasMoreHistory ? (
+            <div style={{ textAlign: 'center', margin: '8px 0' }}>
+              <Button size="small" onClick={onLoadMoreHistory}>加载更多</Button>
+            </div>
+          ) : null}
         />
       </div>
       
@@ -7,6 +7,7 @@ export const useProject = (pushMessages) => {
   const [projectDetails, setProjectDetails] = useState(null);
   const [historicalProjects, setHistoricalProjects] = useState([]);
   const [measurementHistory, setMeasurementHistory] = useState([]);
+  const [historyCursor, setHistoryCursor] = useState(null);
   const [taskDetailsVisible, setTaskDetailsVisible] = useState(false);
 
   const fetchTasks = useCallback(async (loggedInUser) => {
@@ -51,7 +52,7 @@ export const useProject = (pushMessages) => {
 
   const continueToMeasurement = useCallback(async () => {
     try {
-      const history = await apiFetchHistory();
+      const { data: history } = await apiFetchHistory();
       setHistoricalProjects(history || []);
       
       pushMessages([
@@ -69,8 +70,9 @@ export const useProject = (pushMessages) => {
   useEffect(() => {
     const loadHistory = async () => {
       try {
-        const history = await apiFetchHistory();
+        const { data: history, nextCursor } = await apiFetchHistory();
         setMeasurementHistory(history);
+        setHistoryCursor(nextCursor);
       } catch (error) {
         // Errors are handled in the api service.
       }
@@ -78,6 +80,18 @@ export const useProject = (pushMessages) => {
     loadHistory();
   }, []);
 
+  // 按游标加载下一页测算历史
+  const loadMoreHistory = useCallback(async () => {
+    if (!historyCursor) return;
+    try {
+      const { data: history, nextCursor } = await apiFetchHistory({ cursor: historyCursor });
+      setMeasurementHistory(prev => [...prev, ...history]);
+      setHistoryCursor(nextCursor);
+    } catch (error) {
+      // Errors are handled in the api service.
+    }
+  }, [historyCursor]);
+
   return {
     tasks,
     selectedTask,
@@ -85,6 +99,8 @@ export const useProject = (pushMessages) => {
     historicalProjects,
     measurementHistory,
     setMeasurementHistory,
+    hasMoreHistory: !!historyCursor,
+    loadMoreHistory,
     fetchTasks,
     handleSelectTask,
     setSelectedTask,
@@ -23,11 +23,18 @@ export const fetchTaskDetails = async (taskInfo) => {
   }
 };
 
-export const fetchHistory = async () => {
+export const fetchHistory = async (params = {}) => {
   try {
-    const response = await fetch('/api/v1/bfa/history');
+    const query = new URLSearchParams();
+    Object.entries(params).forEach(([key, value]) => {
+      if (value !== undefined && value !== null && value !== '') {
+        query.append(key, value);
+      }
+    });
+    const qs = query.toString();
+    const response = await fetch(`/api/v1/bfa/history${qs ? `?${qs}` : ''}`);
     const result = await handleResponse(response);
-    return result.data || [];
+    return { data: result.data || [], nextCursor: result.next_cursor || null };
   } catch (error) {
     console.error("Failed to fetch history:", error);
     message.error("获取历史记录失败");
@@ -71,6 +78,13 @@ export const streamChatResponse = async (chatMessage, onChunk, onError) => {
       body: JSON.stringify({ message: chatMessage }),
     });
 
+    if (response.status === 503) {
+      message.warning('AI 服务繁忙，请稍后重试');
+      if (onError) {
+        onError(new Error('AI service busy'));
+      }
+      return;
+    }
     if (!response.ok) {
       throw new Error('Network response was not ok');
     }
@@ -105,11 +119,18 @@ export const fetchReferenceProjects = async (taskId, departmentId) => {
   }
 };
 
-export const fetchBaselines = async () => {
+export const fetchBaselines = async (params = {}) => {
   try {
-    const response = await fetch('/api/v1/bfa/baselines');
+    const query = new URLSearchParams();
+    Object.entries(params).forEach(([key, value]) => {
+      if (value !== undefined && value !== null && value !== '') {
+        query.append(key, value);
+      }
+    });
+    const qs = query.toString();
+    const response = await fetch(`/api/v1/bfa/baselines${qs ? `?${qs}` : ''}`);
     const result = await handleResponse(response);
-    return result.data || [];
+    return { data: result.data || [], nextCursor: result.next_cursor || null };
   } catch (error) {
     console.error("Failed to fetch baselines:", error);
     message.error("获取基准业务列表失败");